@@ -1,38 +1,83 @@
 # costing/management/commands/backfill_job_costs.py
 
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
 from django.core.management.base import BaseCommand
-from django.db.models import Sum, F, DecimalField
-from sales.models import SalesOrder
-from costing.models import JobCost
+from django.db.models import Max, Min
+
+# --workers দিলে এই মডিউল spawn করা চাইল্ড প্রসেসেও ইম্পোর্ট হয়, তাই মডেল নির্ভর ইম্পোর্টগুলো ফাংশনের ভিতরে রাখা হয়েছে
+
+
+def _init_worker():
+    # spawn করা প্রসেসে Django আবার সেটআপ করতে হয়
+    django.setup()
+
+
+def _backfill_range(start_id, end_id, chunk_size, rebuild):
+    from costing.services import JobCostService
+
+    totals = {'created': 0, 'updated': 0}
+    for action, _, count in JobCostService.backfill(start_id, end_id, chunk_size, rebuild):
+        totals[action] += count
+    return start_id, end_id, totals
+
+
+def partition(first_id, last_id, parts):
+    """(first_id - 1, last_id] রেঞ্জকে parts টি প্রায় সমান (start, end] ভাগে ভাগ করে।"""
+    span = last_id - first_id + 1
+    parts = max(1, min(parts, span))
+    bounds = [first_id - 1 + span * index // parts for index in range(parts + 1)]
+    return list(zip(bounds[:-1], bounds[1:]))
+
 
 class Command(BaseCommand):
     help = 'Creates missing JobCost records for past delivered Sales Orders.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--rebuild', action='store_true', help='Recompute existing JobCost records as well.')
+        parser.add_argument('--chunk-size', type=int, default=2000, help='Orders written per bulk query.')
+        parser.add_argument('--workers', type=int, default=1, help='Split the order-id range across this many processes.')
+
     def handle(self, *args, **options):
-        self.stdout.write("Starting to backfill JobCost data...")
-        
-        delivered_orders = SalesOrder.objects.filter(status='delivered')
-        created_count = 0
-
-        for order in delivered_orders:
-            # চেক করা হচ্ছে এই অর্ডারের জন্য JobCost আগে থেকেই আছে কি না
-            if not hasattr(order, 'job_cost'):
-                total_revenue = order.total_amount or 0
-                
-                material_cost_agg = order.items.aggregate(
-                    total_cost=Sum(F('quantity') * F('product__cost_price'), output_field=DecimalField())
-                )
-                total_material_cost = material_cost_agg.get('total_cost') or 0
-                
-                profit = total_revenue - total_material_cost
-
-                JobCost.objects.create(
-                    sales_order=order,
-                    total_revenue=total_revenue,
-                    total_material_cost=total_material_cost,
-                    profit=profit
-                )
-                created_count += 1
-                self.stdout.write(self.style.SUCCESS(f"Created JobCost for SO-{order.id}"))
-
-        self.stdout.write(self.style.SUCCESS(f"Backfill complete. Created {created_count} new JobCost records."))
\ No newline at end of file
+        from sales.models import SalesOrder
+
+        chunk_size = max(1, options['chunk_size'])
+        rebuild = options['rebuild']
+        bounds = SalesOrder.objects.filter(status='delivered').aggregate(first=Min('pk'), last=Max('pk'))
+        if bounds['first'] is None:
+            self.stdout.write(self.style.WARNING("No delivered sales orders found."))
+            return
+        # rebuild এ ডেলিভারড না থাকা অর্ডারের পুরনো রো ও আবার হিসাব হয়, তাই শেষ রেঞ্জ খোলা রাখা হয়
+        ranges = partition(bounds['first'], bounds['last'], options['workers'])
+        if rebuild:
+            ranges[0] = (0, ranges[0][1])
+            ranges[-1] = (ranges[-1][0], None)
+
+        self.stdout.write(f"Starting to backfill JobCost data in {len(ranges)} range(s)...")
+        totals = {'created': 0, 'updated': 0}
+
+        if len(ranges) == 1:
+            start_id, end_id = ranges[0]
+            from costing.services import JobCostService
+            for action, last_id, count in JobCostService.backfill(start_id, end_id, chunk_size, rebuild):
+                totals[action] += count
+                self.stdout.write(f"{action.capitalize()} {totals[action]} JobCost records (up to SO-{last_id}).")
+        else:
+            # fork এর বদলে spawn, যাতে প্যারেন্টের ডেটাবেস কানেকশন চাইল্ড প্রসেসে শেয়ার না হয়
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=len(ranges), mp_context=context, initializer=_init_worker) as pool:
+                futures = [pool.submit(_backfill_range, start_id, end_id, chunk_size, rebuild) for start_id, end_id in ranges]
+                for future in as_completed(futures):
+                    start_id, end_id, range_totals = future.result()
+                    for action, count in range_totals.items():
+                        totals[action] += count
+                    self.stdout.write(
+                        f"SO-{start_id + 1}..{end_id if end_id is not None else 'end'}: "
+                        f"created {range_totals['created']}, updated {range_totals['updated']}."
+                    )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfill complete. Created {totals['created']} new JobCost records, updated {totals['updated']}."
+        ))
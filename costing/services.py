@@ -0,0 +1,160 @@
+# costing/services.py
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, ExpressionWrapper, F, FloatField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from inventory_system.transactions import on_commit_batch
+from sales.models import SalesOrder, SalesOrderItem, SalesReturnItem
+from .models import JobCost
+
+ZERO = Decimal('0.00')
+MONEY = DecimalField(max_digits=12, decimal_places=2)
+
+
+def _order_subquery(queryset, group_field, total):
+    return Coalesce(
+        Subquery(queryset.values(group_field).annotate(total=total).values('total')[:1], output_field=MONEY),
+        Value(ZERO), output_field=MONEY
+    )
+
+
+def _weighted_cost(lines, item_cost):
+    # পরিমাণ float এ কাস্ট করা হয়, যাতে SQLite এ পূর্ণসংখ্যার ভাগ না হয়
+    weighted = ExpressionWrapper(
+        Sum(F('quantity') * item_cost, output_field=MONEY) / Cast(Sum('quantity'), FloatField()), output_field=MONEY
+    )
+    return Subquery(lines.values('sales_order_id').annotate(cost=weighted).values('cost')[:1], output_field=MONEY)
+
+
+def job_cost_expressions(order_ref):
+    """
+    একটি অর্ডারের (order_ref = অর্ডারের id নির্দেশকারী OuterRef) revenue ও material cost এর SQL এক্সপ্রেশন।
+    খরচ নেওয়া হয় বিক্রির সময়ে সংরক্ষিত SalesOrderItem.cost_price থেকে (না থাকলে প্রোডাক্টের cost_price);
+    রিটার্ন হওয়া পণ্যের খরচ ঐ অর্ডারের একই লটের লাইনগুলো থেকে, লট না মিললে একই প্রোডাক্টের সব লাইন থেকে,
+    পরিমাণ-ভারিত গড় হিসেবে নেওয়া হয়; তাই একাধিক লাইন থাকলেও ফলাফল নির্দিষ্ট।
+    """
+    item_cost = Coalesce('cost_price', 'product__cost_price', Value(ZERO), output_field=MONEY)
+    order_lines = SalesOrderItem.objects.filter(
+        sales_order_id=OuterRef('sales_return__sales_order_id'), product_id=OuterRef('product_id')
+    )
+    return_cost = Coalesce(
+        _weighted_cost(order_lines.filter(lot_serial_id=OuterRef('lot_serial_id')), item_cost),
+        _weighted_cost(order_lines, item_cost),
+        'product__cost_price', Value(ZERO), output_field=MONEY
+    )
+
+    order_total = Coalesce(
+        Subquery(SalesOrder.objects.filter(pk=order_ref).values('total_amount')[:1], output_field=MONEY),
+        Value(ZERO), output_field=MONEY
+    )
+    returned_revenue = _order_subquery(
+        SalesReturnItem.objects.filter(sales_return__sales_order_id=order_ref), 'sales_return__sales_order_id',
+        Sum(F('quantity') * F('unit_price'), output_field=MONEY)
+    )
+    material_cost = _order_subquery(
+        SalesOrderItem.objects.filter(sales_order_id=order_ref), 'sales_order_id',
+        Sum(F('quantity') * item_cost, output_field=MONEY)
+    )
+    returned_cost = _order_subquery(
+        SalesReturnItem.objects.filter(sales_return__sales_order_id=order_ref), 'sales_return__sales_order_id',
+        Sum(F('quantity') * return_cost, output_field=MONEY)
+    )
+    revenue = order_total - returned_revenue
+    cost = material_cost - returned_cost
+    return revenue, cost
+
+
+class JobCostService:
+    """
+    JobCost রেকর্ড রক্ষণাবেক্ষণ করে। একটি ট্রানজেকশনে যতবারই অর্ডার সেভ হোক বা রিটার্ন আইটেম যোগ হোক,
+    কমিটের পরে প্রতিটি অর্ডারের JobCost একবারই, একটি UPDATE স্টেটমেন্টে, মূল ডেটা থেকে নতুন করে হিসাব হয়।
+    """
+
+    @staticmethod
+    def schedule(order_ids, create=False):
+        """create=True হলে (ডেলিভারড অর্ডার) JobCost না থাকলে তৈরি হয়; না হলে শুধু থাকা রেকর্ড আপডেট হয়।"""
+        def add(pending):
+            for order_id in order_ids:
+                pending[order_id] = pending.get(order_id, False) or create
+
+        on_commit_batch('job_costs', dict, add, JobCostService._run_scheduled)
+
+    @staticmethod
+    def _run_scheduled(pending):
+        JobCostService.refresh(pending.keys(), create_ids=[order_id for order_id, create in pending.items() if create])
+
+    @staticmethod
+    def refresh(order_ids, create_ids=()):
+        """
+        order_ids এর JobCost রো গুলো নতুন করে হিসাব করে। মান সবসময় মূল ডেটা থেকে আসে,
+        তাই একই অর্ডার একাধিকবার রিফ্রেশ করলেও ফল একই থাকে।
+        """
+        order_ids = list(order_ids)
+        with transaction.atomic():
+            if create_ids:
+                JobCost.objects.bulk_create(
+                    [JobCost(sales_order_id=order_id) for order_id in create_ids], ignore_conflicts=True
+                )
+            return JobCostService.recompute(JobCost.objects.filter(sales_order_id__in=order_ids))
+
+    @staticmethod
+    def recompute(job_costs):
+        """job_costs queryset এর সব রো একটি UPDATE স্টেটমেন্টে আপডেট করে; আপডেট হওয়া রো এর সংখ্যা ফেরত দেয়।"""
+        revenue, cost = job_cost_expressions(OuterRef('sales_order_id'))
+        return job_costs.update(
+            total_revenue=revenue, total_material_cost=cost, profit=revenue - cost, updated_at=timezone.now()
+        )
+
+    @staticmethod
+    def backfill(start_id=0, end_id=None, chunk_size=2000, rebuild=False):
+        """
+        (start_id, end_id] রেঞ্জের ডেলিভারড অর্ডারের JobCost সেট-ভিত্তিকভাবে তৈরি করে। প্রতিটি চাংকে একটি
+        কুয়েরি revenue ও material cost হিসাব করে এবং একটি bulk_create রো লেখে। rebuild=True হলে আগে থেকে
+        থাকা রো গুলোও চাংক ধরে একটি করে UPDATE এ আবার হিসাব হয়।
+        প্রতিটি চাংকের পরে (action, last_order_id, count) yield করে, যাতে কলার অগ্রগতি দেখাতে পারে।
+        """
+        if rebuild:
+            last_id = start_id
+            while True:
+                existing = JobCost.objects.filter(sales_order_id__gt=last_id)
+                if end_id is not None:
+                    existing = existing.filter(sales_order_id__lte=end_id)
+                # চাংকের শেষ অর্ডার id; এর চেয়ে কম রো বাকি থাকলে None, অর্থাৎ রেঞ্জের শেষ পর্যন্ত
+                boundary = next(iter(
+                    existing.order_by('sales_order_id').values_list('sales_order_id', flat=True)[chunk_size - 1:chunk_size]
+                ), None)
+                chunk_end = boundary if boundary is not None else end_id
+                chunk = JobCost.objects.filter(sales_order_id__gt=last_id)
+                if chunk_end is not None:
+                    chunk = chunk.filter(sales_order_id__lte=chunk_end)
+                updated = JobCostService.recompute(chunk)
+                if updated:
+                    yield 'updated', chunk_end, updated
+                if boundary is None:
+                    break
+                last_id = boundary
+
+        revenue, cost = job_cost_expressions(OuterRef('pk'))
+        last_id = start_id
+        while True:
+            orders = SalesOrder.objects.filter(status='delivered', job_cost__isnull=True, pk__gt=last_id)
+            if end_id is not None:
+                orders = orders.filter(pk__lte=end_id)
+            rows = list(orders.annotate(
+                revenue_total=revenue, material_total=cost
+            ).order_by('pk').values_list('pk', 'revenue_total', 'material_total')[:chunk_size])
+            if not rows:
+                break
+            JobCost.objects.bulk_create([
+                JobCost(
+                    sales_order_id=order_id, total_revenue=order_revenue,
+                    total_material_cost=order_cost, profit=order_revenue - order_cost
+                )
+                for order_id, order_revenue, order_cost in rows
+            ], ignore_conflicts=True)
+            last_id = rows[-1][0]
+            yield 'created', last_id, len(rows)
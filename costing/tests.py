@@ -1,3 +1,139 @@
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import transaction
 from django.test import TestCase
 
-# Create your tests here.
+from products.models import Product, Category, UnitOfMeasure, UnitOfMeasureCategory
+from sales.models import SalesOrder, SalesOrderItem, SalesReturn, SalesReturnItem
+from stock.models import Location, LotSerialNumber, Warehouse
+from .management.commands.backfill_job_costs import partition
+from .models import JobCost
+from .services import JobCostService
+
+
+class JobCostTestCase(TestCase):
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name="Costing Warehouse")
+        category = Category.objects.create(name="Hardware")
+        uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.product = Product.objects.create(
+            name="Hammer", product_code="HM001", category=category, price=10,
+            cost_price=6, unit_of_measure=unit_of_measure
+        )
+
+    def _deliver(self, quantity=5, unit_price=10):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = SalesOrder.objects.create(warehouse=self.warehouse, status='draft')
+            SalesOrderItem.objects.create(
+                sales_order=order, product=self.product, quantity=quantity, unit_price=unit_price, cost_price=6
+            )
+            order.status = 'delivered'
+            order.total_amount = quantity * unit_price
+            order.save()
+            order.save()
+        return order
+
+
+class JobCostServiceTest(JobCostTestCase):
+    def test_uses_captured_cost_price(self):
+        order = self._deliver()
+        # প্রোডাক্টের বর্তমান cost_price বদলালেও আগের অর্ডারের খরচ বদলায় না
+        Product.objects.filter(pk=self.product.pk).update(cost_price=9)
+        JobCostService.refresh([order.pk])
+
+        job_cost = JobCost.objects.get(sales_order=order)
+        self.assertEqual(
+            (job_cost.total_revenue, job_cost.total_material_cost, job_cost.profit),
+            (Decimal('50.00'), Decimal('30.00'), Decimal('20.00'))
+        )
+
+    def test_return_is_applied_once_per_transaction(self):
+        order = self._deliver()
+        with self.captureOnCommitCallbacks(execute=True):
+            sales_return = SalesReturn.objects.create(sales_order=order, warehouse=self.warehouse)
+            SalesReturnItem.objects.create(sales_return=sales_return, product=self.product, quantity=1, unit_price=10)
+            SalesReturnItem.objects.create(sales_return=sales_return, product=self.product, quantity=1, unit_price=10)
+
+        job_cost = JobCost.objects.get(sales_order=order)
+        self.assertEqual(
+            (job_cost.total_revenue, job_cost.total_material_cost, job_cost.profit),
+            (Decimal('30.00'), Decimal('18.00'), Decimal('12.00'))
+        )
+
+    def test_return_cost_is_weighted_over_the_orders_lines(self):
+        location = Location.objects.create(name="Costing Shelf", warehouse=self.warehouse)
+        lot = LotSerialNumber.objects.create(product=self.product, location=location, lot_number="HM-1", quantity=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            order = SalesOrder.objects.create(warehouse=self.warehouse, status='draft')
+            SalesOrderItem.objects.create(sales_order=order, product=self.product, quantity=2, unit_price=10, cost_price=6)
+            SalesOrderItem.objects.create(sales_order=order, product=self.product, quantity=1, unit_price=10, cost_price=9)
+            SalesOrderItem.objects.create(
+                sales_order=order, product=self.product, quantity=1, unit_price=10, cost_price=5, lot_serial=lot
+            )
+            order.status = 'delivered'
+            order.total_amount = 40
+            order.save()
+            sales_return = SalesReturn.objects.create(sales_order=order, warehouse=self.warehouse)
+            # লট মিললে ঐ লাইনের খরচ (5), না মিললে সব লাইনের গড় (12 + 9 + 5) / 4 = 6.5
+            SalesReturnItem.objects.create(sales_return=sales_return, product=self.product, quantity=1, unit_price=10, lot_serial=lot)
+            SalesReturnItem.objects.create(sales_return=sales_return, product=self.product, quantity=2, unit_price=10)
+
+        job_cost = JobCost.objects.get(sales_order=order)
+        self.assertEqual(job_cost.total_material_cost, Decimal('26.00') - Decimal('5.00') - Decimal('13.00'))
+
+    def test_unrelated_saves_are_ignored(self):
+        order = self._deliver()
+        with mock.patch.object(JobCostService, 'refresh') as refresh:
+            with self.captureOnCommitCallbacks(execute=True):
+                order.notes = "Gift wrap"
+                order.save(update_fields=['notes'])
+        refresh.assert_not_called()
+
+    def test_rolled_back_orders_are_not_refreshed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = SalesOrder.objects.create(warehouse=self.warehouse, status='delivered', total_amount=10)
+            try:
+                with transaction.atomic():
+                    rolled_back = SalesOrder.objects.create(warehouse=self.warehouse, status='delivered')
+                    raise ValueError
+            except ValueError:
+                pass
+            order.save()
+
+        self.assertTrue(JobCost.objects.filter(sales_order=order).exists())
+        self.assertFalse(JobCost.objects.filter(sales_order_id=rolled_back.pk).exists())
+
+
+class BackfillJobCostsCommandTest(JobCostTestCase):
+    def setUp(self):
+        super().setUp()
+        self.orders = [self._deliver() for _ in range(5)]
+        JobCost.objects.filter(sales_order__in=self.orders[:3]).delete()
+        # একটি রো ইচ্ছাকৃতভাবে ভুল মান দিয়ে রাখা হচ্ছে
+        JobCost.objects.filter(sales_order=self.orders[3]).update(total_revenue=0, total_material_cost=0, profit=0)
+
+    def test_creates_missing_rows_in_chunks(self):
+        out = StringIO()
+        call_command('backfill_job_costs', chunk_size=2, stdout=out)
+
+        self.assertEqual(JobCost.objects.count(), 5)
+        self.assertEqual(
+            set(JobCost.objects.filter(sales_order__in=self.orders[:3]).values_list('profit', flat=True)),
+            {Decimal('20.00')}
+        )
+        self.assertEqual(JobCost.objects.get(sales_order=self.orders[3]).profit, Decimal('0.00'))
+        self.assertIn("Created 3 new JobCost records", out.getvalue())
+
+    def test_rebuild_recomputes_existing_rows(self):
+        call_command('backfill_job_costs', rebuild=True, chunk_size=1, stdout=StringIO())
+        self.assertEqual(set(JobCost.objects.values_list('profit', flat=True)), {Decimal('20.00')})
+
+    def test_partition_covers_range(self):
+        self.assertEqual(partition(1, 10, 3), [(0, 3), (3, 6), (6, 10)])
+        self.assertEqual(partition(5, 6, 4), [(4, 5), (5, 6)])
@@ -1,7 +1,5 @@
 # costing/views.py
 
-import os
-from django.conf import settings
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
 from django.core.paginator import Paginator
@@ -12,13 +10,11 @@ from .forms import JobCostFilterForm
 from inventory_system.settings import DEFAULT_CURRENCY_SYMBOL
 
 from django.http import HttpResponse
-from io import BytesIO
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.pagesizes import A4, landscape
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.pagesizes import landscape
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
+from inventory_system.pdf import build_pdf, document_header, get_styles, render_response, signature_block
 
 
 # --- পেজ নম্বর যোগ করার জন্য নতুন ফাংশন ---
@@ -67,11 +63,14 @@ def job_costing_report(request):
 def export_job_costing_pdf(request):
     if not request.user.is_superuser:
         return HttpResponse("Unauthorized", status=401)
+    return render_response(render_job_costing_pdf, request, 'Job_Costing_Report.pdf')
 
+
+def render_job_costing_pdf(user, params, output_file):
     job_costs_list = JobCost.objects.select_related('sales_order', 'sales_order__user', 'sales_order__warehouse').order_by('-sales_order__created_at')
     
     # --- ফিল্টারিং লজিক ---
-    filter_form = JobCostFilterForm(request.GET or None)
+    filter_form = JobCostFilterForm(params or None)
     filter_details_list = []
     if filter_form.is_valid():
         start_date = filter_form.cleaned_data.get('start_date')
@@ -92,29 +91,13 @@ def export_job_costing_pdf(request):
             job_costs_list = job_costs_list.filter(sales_order__user=user)
             filter_details_list.append(f"<b>User:</b> {user.username}")
 
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=0.5*inch, bottomMargin=0.5*inch, leftMargin=0.5*inch, rightMargin=0.5*inch)
     story = []
 
-    # --- কাস্টম স্টাইল তৈরি ---
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='TitleStyle', fontSize=22, fontName='Helvetica-Bold', alignment=TA_RIGHT, textColor=colors.HexColor("#2B3674")))
-    styles.add(ParagraphStyle(name='CompanyInfo', fontSize=9, fontName='Helvetica', alignment=TA_RIGHT, leading=12))
-    styles.add(ParagraphStyle(name='ReportInfo', fontSize=10, fontName='Helvetica', leading=14))
-    styles.add(ParagraphStyle(name='TotalLabel', fontSize=10, fontName='Helvetica-Bold', alignment=TA_RIGHT))
-    styles.add(ParagraphStyle(name='TotalValue', fontSize=10, fontName='Helvetica-Bold', alignment=TA_RIGHT))
-    styles.add(ParagraphStyle(name='SignatureStyle', fontSize=10, fontName='Helvetica', alignment=TA_CENTER))
+    # --- শেয়ার্ড স্টাইল (প্রসেসে একবার তৈরি) ---
+    styles = get_styles()
 
     # --- ১. হেডার সেকশন ---
-    logo_path = os.path.join(settings.STATICFILES_DIRS[0], 'images', 'logo.png')
-    logo = Image(logo_path, width=1.5*inch, height=0.5*inch)
-    company_info = "<b>NOVO ERP Solutions</b><br/>Doha, Qatar"
-    
-    header_data = [[logo, Paragraph("Job Costing Report", styles['TitleStyle'])]]
-    header_table = Table(header_data, colWidths=[4.5*inch, 3*inch], style=[('VALIGN', (0,0), (-1,-1), 'TOP')])
-    story.append(header_table)
-    story.append(Spacer(1, 0.05*inch))
-    story.append(Paragraph(company_info, styles['CompanyInfo']))
+    story.extend(document_header("Job Costing Report", (1.5*inch, 0.5*inch), [4.5*inch, 3*inch], gap=0.05*inch))
     story.append(Spacer(1, 0.3*inch))
 
     # --- ২. রিপোর্টের তথ্য ---
@@ -129,7 +112,7 @@ def export_job_costing_pdf(request):
     
     total_revenue = total_cost = total_profit = 0
     for job in job_costs_list:
-        profit_style = ParagraphStyle(name='ProfitCellStyle', alignment=TA_RIGHT, textColor=colors.red if job.profit < 0 else colors.darkgreen)
+        profit_style = styles['LossCell'] if job.profit < 0 else styles['ProfitCell']
         
         table_data.append([
             f"SO-{job.sales_order.pk}",
@@ -167,17 +150,9 @@ def export_job_costing_pdf(request):
 
     # --- ৫. সিগনেচার সেকশন ---
     story.append(Spacer(1, 0.7*inch))
-    signature_data = [
-        [Paragraph('--------------------------------<br/>Prepared By', styles['SignatureStyle']),
-         Paragraph('--------------------------------<br/>Checked By', styles['SignatureStyle']),
-         Paragraph('--------------------------------<br/>Approved By', styles['SignatureStyle'])]
-    ]
-    signature_table = Table(signature_data, colWidths=[2.3*inch, 2.3*inch, 2.3*inch], hAlign='CENTER')
-    story.append(signature_table)
+    story.append(signature_block(['Prepared By', 'Checked By', 'Approved By'], 2.3*inch))
 
-    doc.build(story)
-    
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="Job_Costing_Report.pdf"'
-    return response
+    build_pdf(
+        story, output_file, page_numbers=False,
+        topMargin=0.5*inch, bottomMargin=0.5*inch, leftMargin=0.5*inch, rightMargin=0.5*inch
+    )
@@ -0,0 +1,234 @@
+# inventory_system/pdf.py
+
+import functools
+import os
+import tempfile
+
+from django.conf import settings
+from django.http import FileResponse
+from reportlab.lib import colors
+from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import ParagraphStyle, getSampleStyleSheet
+from reportlab.lib.units import inch, mm
+from reportlab.lib.utils import ImageReader
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.pdfmetrics import stringWidth
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+# একটি Table flowable এ সর্বোচ্চ কতগুলো রো; বড় টেবিল ভাঙার (split) খরচ রো সংখ্যার সাথে দ্রুত বাড়ে
+TABLE_CHUNK_ROWS = 200
+
+BRAND_COLOR = colors.HexColor("#2B3674")
+COMPANY_INFO = "<b>NOVO ERP Solutions</b><br/>Doha, Qatar"
+SIGNATURE_LINE = '--------------------------------<br/>'
+
+# সব এক্সপোর্টারের ParagraphStyle এক জায়গায়; একই নামের স্টাইল ভিন্ন ফাইলে ভিন্ন হলে আলাদা নাম দেওয়া হয়েছে
+STYLE_DEFINITIONS = (
+    dict(name='TitleStyle', fontSize=22, fontName='Helvetica-Bold', alignment=TA_RIGHT, textColor=BRAND_COLOR),
+    dict(name='TitleStyleGrey', fontSize=22, fontName='Helvetica-Bold', alignment=TA_RIGHT, textColor=colors.HexColor("#444444")),
+    dict(name='ReportTitle', fontSize=18, fontName='Helvetica-Bold', alignment=TA_CENTER, textColor=BRAND_COLOR),
+    dict(name='ReportHeading', fontSize=18, alignment=TA_CENTER, fontName='Helvetica-Bold', spaceAfter=5),
+    dict(name='SubHeading', fontSize=10, alignment=TA_CENTER, spaceAfter=20),
+    dict(name='CompanyInfo', fontSize=9, fontName='Helvetica', alignment=TA_RIGHT, leading=12),
+    dict(name='ReportInfo', fontSize=10, fontName='Helvetica', leading=14),
+    dict(name='CustomerInfo', fontSize=10, fontName='Helvetica', leading=14),
+    dict(name='SupplierInfo', fontSize=10, fontName='Helvetica', leading=14),
+    dict(name='HeaderStyle', fontSize=10, fontName='Helvetica-Bold', alignment=TA_LEFT),
+    dict(name='TotalHeaderStyle', fontSize=10, fontName='Helvetica-Bold', alignment=TA_RIGHT),
+    dict(name='TotalLabel', fontSize=10, fontName='Helvetica-Bold', alignment=TA_RIGHT),
+    dict(name='TotalValue', fontSize=10, fontName='Helvetica-Bold', alignment=TA_RIGHT),
+    dict(name='SignatureStyle', fontSize=10, fontName='Helvetica', alignment=TA_CENTER),
+    dict(name='BoldText', fontName='Helvetica-Bold'),
+    dict(name='TableHeader', fontSize=9, fontName='Helvetica-Bold', alignment=TA_LEFT, textColor=BRAND_COLOR),
+    dict(name='TableHeaderCenter', fontSize=9, fontName='Helvetica-Bold', alignment=TA_CENTER, textColor=BRAND_COLOR),
+    dict(name='TableCell', fontSize=8, fontName='Helvetica', alignment=TA_CENTER),
+    dict(name='TableCellLeft', fontSize=9, alignment=TA_LEFT),
+    dict(name='TableCellRight', fontSize=9, alignment=TA_RIGHT),
+    dict(name='TableCellRightRed', fontSize=9, alignment=TA_RIGHT, textColor=colors.red),
+    dict(name='CompactTableHeader', fontSize=8, alignment=TA_CENTER, fontName='Helvetica-Bold'),
+    dict(name='CompactTableCell', fontSize=7, alignment=TA_CENTER),
+    dict(name='CompactTableCellLeft', fontSize=7, alignment=TA_LEFT),
+    dict(name='ProfitCell', alignment=TA_RIGHT, textColor=colors.darkgreen),
+    dict(name='LossCell', alignment=TA_RIGHT, textColor=colors.red),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def register_fonts():
+    """settings.PDF_FONTS এর TrueType ফন্টগুলো প্রসেসে একবার রেজিস্টার করে; রেজিস্টার করা নামের tuple ফেরত দেয়।"""
+    fonts = getattr(settings, 'PDF_FONTS', {})
+    for name, path in fonts.items():
+        pdfmetrics.registerFont(TTFont(name, path))
+    return tuple(fonts)
+
+
+@functools.lru_cache(maxsize=None)
+def get_styles():
+    """
+    সব PDF এক্সপোর্টারের শেয়ার্ড স্টাইলশিট, প্রসেসে প্রথমবার দরকার হলে একবারই তৈরি হয়।
+    Paragraph শুধু স্টাইল পড়ে, তাই একই অবজেক্ট সব রিকোয়েস্টে (ও থ্রেডে) ব্যবহার করা নিরাপদ; কেউ এতে বদল করবে না।
+    """
+    register_fonts()
+    styles = getSampleStyleSheet()
+    for definition in STYLE_DEFINITIONS:
+        styles.add(ParagraphStyle(**definition))
+    return styles
+
+
+@functools.lru_cache(maxsize=None)
+def logo_image():
+    """
+    static/images/logo.png একবার পড়ে ডিকোড করা ImageReader (ফাইল না থাকলে None)। RGB ও alpha ডেটা আগেই বের
+    করে রাখা হয়, তাই প্রতিটি PDF এ আবার PNG ডিকোড হয় না।
+    """
+    path = os.path.join(settings.STATICFILES_DIRS[0], 'images', 'logo.png')
+    if not os.path.exists(path):
+        return None
+    reader = ImageReader(path)
+    reader.getRGBData()
+    if reader._dataA:
+        reader._dataA.getRGBData()
+    return reader
+
+
+def logo(width, height):
+    """নির্দিষ্ট মাপের লোগো flowable, ক্যাশ করা ছবি থেকে; লোগো না থাকলে None।"""
+    reader = logo_image()
+    if reader is None:
+        return None
+    image = Image(reader.fileName, width=width, height=height)
+    image._img = reader
+    return image
+
+
+def document_header(title, logo_size, col_widths, title_style='TitleStyle', company_info=COMPANY_INFO, gap=0.1*inch, valign='TOP'):
+    """
+    লোগো ও শিরোনামের হেডার টেবিল, তার নিচে কোম্পানির তথ্য (company_info=None হলে বাদ)।
+    লোগো না থাকলে শুধু শিরোনাম বসে। flowable এর list ফেরত দেয়।
+    """
+    styles = get_styles()
+    header_logo = logo(*logo_size)
+    if header_logo is None:
+        flowables = [Paragraph(title, styles[title_style])]
+    else:
+        flowables = [Table([[header_logo, Paragraph(title, styles[title_style])]], colWidths=col_widths,
+                           style=[('VALIGN', (0,0), (-1,-1), valign)])]
+    if company_info:
+        flowables.append(Spacer(1, gap))
+        flowables.append(Paragraph(company_info, styles['CompanyInfo']))
+    return flowables
+
+
+def signature_block(labels, col_width):
+    """প্রতিটি label এর উপরে একটি সই করার লাইন, পাশাপাশি কলামে।"""
+    styles = get_styles()
+    row = [Paragraph(SIGNATURE_LINE + label, styles['SignatureStyle']) for label in labels]
+    return Table([row], colWidths=[col_width] * len(labels), hAlign='CENTER')
+
+
+class FlowableStream(list):
+    """
+    doc.build() এর জন্য lazy story। reportlab প্রতিটি flowable আঁকার পর তালিকা থেকে মুছে ফেলে, আর এই
+    তালিকা iterator থেকে দরকার মতো পরের flowable টেনে আনে; তাই পুরো story কখনো একসাথে মেমোরিতে থাকে না।
+    """
+    LOOKAHEAD = 2
+
+    def __init__(self, flowables):
+        super().__init__()
+        self._source = iter(flowables)
+
+    def _fill(self):
+        while list.__len__(self) < self.LOOKAHEAD:
+            flowable = next(self._source, None)
+            if flowable is None:
+                return
+            self.append(flowable)
+
+    def __len__(self):
+        self._fill()
+        return list.__len__(self)
+
+    def __getitem__(self, index):
+        self._fill()
+        return list.__getitem__(self, index)
+
+
+class PageCountCanvas(canvas.Canvas):
+    """
+    প্রতিটি পেজে "Page X of Y" লেখে, কিন্তু পেজের state জমা রাখে না: মোট পেজ সংখ্যার জায়গায় একটি
+    PDF form বসানো হয় এবং save() এর ঠিক আগে সেই form এ সংখ্যাটি লেখা হয়।
+    """
+    FOOTER_FONT = ('Helvetica', 8)
+    FOOTER_RIGHT = 15 * mm
+    FOOTER_Y = 12 * mm
+    TOTAL_FORM = 'page_count_total'
+
+    def showPage(self):
+        self.draw_page_number()
+        super().showPage()
+
+    def draw_page_number(self):
+        font_name, font_size = self.FOOTER_FONT
+        # মোট সংখ্যার জন্য চার অঙ্কের জায়গা রাখা হয়
+        total_width = stringWidth('0000', font_name, font_size)
+        x = self._pagesize[0] - self.FOOTER_RIGHT - total_width
+        self.saveState()
+        self.setFont(font_name, font_size)
+        self.drawRightString(x, self.FOOTER_Y, f"Page {self.getPageNumber()} of ")
+        self.translate(x, self.FOOTER_Y)
+        self.doForm(self.TOTAL_FORM)
+        self.restoreState()
+
+    def save(self):
+        self.beginForm(self.TOTAL_FORM)
+        self.setFont(*self.FOOTER_FONT)
+        self.drawString(0, 0, str(self.getPageNumber() - 1))
+        self.endForm()
+        super().save()
+
+
+def table_chunks(header, rows, col_widths, style_commands=(), chunk_size=TABLE_CHUNK_ROWS):
+    """
+    rows (যেকোনো iterator, যেমন queryset.iterator()) থেকে chunk_size রো এর আলাদা আলাদা Table তৈরি করে,
+    প্রতিটির উপরে header সহ। একটির নিচে আরেকটি বসালে একটি টেবিলের মতোই দেখায়।
+    """
+    style = TableStyle(list(style_commands))
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == chunk_size:
+            yield Table([header] + chunk, colWidths=col_widths, style=style, repeatRows=1)
+            chunk = []
+    if chunk:
+        yield Table([header] + chunk, colWidths=col_widths, style=style, repeatRows=1)
+
+
+def build_pdf(story, output_file, pagesize=A4, page_numbers=True, **doc_options):
+    """
+    story (list বা generator) থেকে PDF তৈরি করে output_file এ লেখে; পুরো PDF কখনো মেমোরিতে জমা থাকে না।
+    doc_options: SimpleDocTemplate এর margin ইত্যাদি।
+    """
+    doc = SimpleDocTemplate(output_file, pagesize=pagesize, **doc_options)
+    doc.build(FlowableStream(story), canvasmaker=PageCountCanvas if page_numbers else canvas.Canvas)
+
+
+def pdf_response(story, filename, pagesize=A4, page_numbers=True, **doc_options):
+    """story থেকে PDF একটি অস্থায়ী ফাইলে লেখে এবং সেটি FileResponse হিসেবে টুকরো টুকরো করে পাঠায়।"""
+    report_file = tempfile.TemporaryFile()
+    build_pdf(story, report_file, pagesize, page_numbers, **doc_options)
+    report_file.seek(0)
+    return FileResponse(report_file, as_attachment=True, filename=filename, content_type='application/pdf')
+
+
+def render_response(render, request, filename):
+    """
+    render(user, params, output_file) এক্সপোর্টারটি request এর ইউজার ও GET ফিল্টার দিয়ে একটি অস্থায়ী ফাইলে
+    চালিয়ে FileResponse পাঠায়। ব্যাকগ্রাউন্ড রিপোর্ট জব একই এক্সপোর্টার সরাসরি জবের ফাইলে চালায়।
+    """
+    report_file = tempfile.TemporaryFile()
+    render(request.user, request.GET, report_file)
+    report_file.seek(0)
+    return FileResponse(report_file, as_attachment=True, filename=filename, content_type='application/pdf')
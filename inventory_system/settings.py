@@ -133,6 +133,54 @@ DBBACKUP_STORAGE_OPTIONS = {'location': os.path.join(BASE_DIR, 'backups')}
 # Custom Global Constants
 DEFAULT_CURRENCY_SYMBOL = 'QAR '
 
+# PDF এক্সপোর্টে ব্যবহারের জন্য অতিরিক্ত TrueType ফন্ট, যেমন {'NotoSansBengali': '/path/NotoSansBengali.ttf'}
+# (প্রসেসে একবার রেজিস্টার হয়; স্টাইলে fontName হিসেবে এই নাম ব্যবহার করা যাবে)
+PDF_FONTS = {}
+
+# প্রোডাক্ট সেভের পরে বারকোড ছবি তৈরির worker থ্রেড সংখ্যা (0 হলে কমিটের পরে একই থ্রেডে তৈরি হয়)
+BARCODE_WORKERS = 2
+
+# টেস্ট রানে অস্থায়ী MEDIA_ROOT এবং BARCODE_WORKERS = 0
+TEST_RUNNER = 'inventory_system.test_runner.TestRunner'
+
+# Cache (একাধিক worker প্রসেস চালালে Redis/Memcached এর মতো শেয়ার্ড ব্যাকএন্ড ব্যবহার করুন,
+# নাহলে ড্যাশবোর্ড ক্যাশ বাতিল হওয়ার খবর অন্য প্রসেসে পৌঁছাবে না এবং শুধু TTL এর উপর নির্ভর করবে)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'inventory-system',
+    }
+}
+
+# ড্যাশবোর্ডের ক্যাশ করা হিসাব সর্বোচ্চ কত সেকেন্ড রাখা হবে (স্টক/বিক্রি/রিটার্ন হলে আগেই বাতিল হয়)
+DASHBOARD_CACHE_TTL = 300
+
+# রি-অর্ডার প্রস্তাব (purchase.replenishment): smoothing এর alpha, সাপ্লায়ারের লিড টাইম এবং
+# প্রতিবার অর্ডারে কত দিনের চাহিদা কভার করা হবে
+REPLENISHMENT_SMOOTHING_ALPHA = 0.2
+REPLENISHMENT_LEAD_TIME_DAYS = 7
+REPLENISHMENT_REVIEW_DAYS = 14
+
+# বিক্রির সময় কোন লট আগে নেওয়া হবে: 'fefo' (আগে মেয়াদ শেষ), 'fifo' (আগে আসা) বা 'lifo' (শেষে আসা)
+STOCK_ALLOCATION_STRATEGY = 'fefo'
+
+# স্টকের খরচ হিসাবের পদ্ধতি (stock.costing): 'average' (weighted-average) অথবা 'fifo' (কস্ট লেয়ার)
+STOCK_COSTING_METHOD = 'average'
+
+# ইনভেন্টরি ভ্যালুয়েশন স্ন্যাপশট (`snapshot_valuation` কমান্ড, প্রতিদিন দিনের শেষে চালাতে হয়) কখন লেখা হবে:
+# 'daily', 'weekly' (রবিবার) অথবা 'monthly' (মাসের শেষ দিন)
+VALUATION_SNAPSHOT_INTERVAL = 'monthly'
+
+# Stock Ledger (True হলে Stock/লট কাউন্টার সরাসরি আপডেট না করে শুধু InventoryTransaction লেখা হয়;
+# কাউন্টারগুলো `snapshot_stock --materialize` কমান্ড দিয়ে সময়ে সময়ে মেলানো হয়)
+STOCK_LEDGER_MODE = False
+
+# স্ন্যাপশট রানের as_of এর চেয়ে এত সেকেন্ড পুরনো হয়, যাতে তখনো কমিট না হওয়া পোস্টিং বাদ না পড়ে
+STOCK_SNAPSHOT_LAG_SECONDS = 300
+
+# POS ক্যাটালগের ভার্সন/delta তে এর চেয়ে নতুন চেঞ্জলগ রো ধরা হয় না, যাতে দেরিতে কমিট হওয়া ছোট id বাদ না পড়ে
+POS_CATALOG_COMMIT_LAG_SECONDS = 5
+
 # Password Hashers (Argon2 first, fallback to others)
 PASSWORD_HASHERS = [
     'django.contrib.auth.hashers.Argon2PasswordHasher',
@@ -0,0 +1,25 @@
+# inventory_system/test_runner.py
+
+import shutil
+import tempfile
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    পুরো টেস্ট রানে আপলোড ও তৈরি হওয়া ফাইল (বারকোড, রিপোর্ট) একটি অস্থায়ী MEDIA_ROOT এ যায় এবং শেষে মুছে
+    ফেলা হয়; বারকোড worker pool এর বদলে কমিটের পরে একই থ্রেডে তৈরি হয়, তাই টেস্ট থেকে কোনো থ্রেড বাকি থাকে না।
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._media_root = tempfile.mkdtemp(prefix='test-media-')
+        self._test_settings = override_settings(MEDIA_ROOT=self._media_root, BARCODE_WORKERS=0)
+        self._test_settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._test_settings.disable()
+        shutil.rmtree(self._media_root, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)
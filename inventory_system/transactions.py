@@ -0,0 +1,38 @@
+# inventory_system/transactions.py
+
+import threading
+
+from django.db import connection, transaction
+
+_batches = threading.local()
+
+
+def on_commit_batch(key, factory, update, run):
+    """
+    কমিটের পরে একবার চলা কাজ জমা করে। একই ট্রানজেকশনের (একই savepoint এর) মধ্যে একই key এর সব কল
+    একটি ব্যাচে (factory() দিয়ে তৈরি) update(batch) করে, আর কমিটের পরে run(batch) একবারই চলে।
+    ব্যাচটি কলব্যাকের closure এ থাকে, তাই রোলব্যাক হলে কলব্যাকের সাথে ব্যাচও বাদ যায়, পরের ট্রানজেকশনে যায় না।
+    """
+    batches = getattr(_batches, 'open', None)
+    if batches is None:
+        batches = _batches.open = {}
+
+    entry = batches.get(key)
+    if entry is not None and connection.in_atomic_block:
+        batch, callback = entry
+        savepoint_ids = set(connection.savepoint_ids)
+        # কলব্যাকটি এখনো একই savepoint এ অপেক্ষায় থাকলে সেটির রোলব্যাক এই কলেরও রোলব্যাক
+        if any(func is callback and sids == savepoint_ids for sids, func, _ in connection.run_on_commit):
+            update(batch)
+            return
+
+    batch = factory()
+    update(batch)
+
+    def callback():
+        if batches.get(key, (None, None))[1] is callback:
+            del batches[key]
+        run(batch)
+
+    batches[key] = (batch, callback)
+    transaction.on_commit(callback)
@@ -3,8 +3,9 @@
 import json
 from decimal import Decimal
 from django.shortcuts import render, redirect
+from django.core.cache import cache
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count, Q, F, Value, IntegerField, ExpressionWrapper, DecimalField
+from django.db.models import Sum, Count, Q, F, Value, IntegerField, ExpressionWrapper
 from django.db.models.functions import Coalesce, TruncMonth
 from django.utils import timezone
 from datetime import timedelta, datetime
@@ -12,9 +13,11 @@ from collections import OrderedDict
 
 # Local Application Imports
 from products.models import Product
-from sales.models import SalesOrder, SalesOrderItem, SalesReturn, SalesReturnItem
+from sales.models import SalesOrder
 from partners.models import Supplier, Customer
-from stock.models import Stock, LotSerialNumber
+from stock.models import Stock, LotSerialNumber, StockValuation
+from reports.models import DailySalesSummary
+from reports import dashboard_cache
 
 DEFAULT_CURRENCY_SYMBOL = 'QAR '
 
@@ -63,41 +66,58 @@ def dashboard(request):
         period = 'today'
         # ... কিন্তু ইনপুট ফিল্ড খালি থাকবে
 
-    # --- (বাকি কোড অপরিবর্তিত) ---
-    sales_base_qs = SalesOrder.objects.filter(status='delivered')
-    returns_base_qs = SalesReturn.objects.all()
+    # ড্যাশবোর্ডের হিসাবগুলো একই ওয়্যারহাউস ও একই তারিখ সীমার সব ইউজারের জন্য এক, তাই ক্যাশ থেকে দেওয়া হয়
+    cache_key = dashboard_cache.make_key(user, user_warehouse, query_start_date, query_end_date)
+    metrics = cache.get(cache_key)
+    if metrics is None:
+        metrics = _dashboard_metrics(user, user_warehouse, query_start_date, query_end_date)
+        cache.set(cache_key, metrics, dashboard_cache.ttl())
+
+    context = {
+        'period': period,
+        'start_date': form_start_date,
+        'end_date': form_end_date,
+        **metrics,
+        'DEFAULT_CURRENCY_SYMBOL': DEFAULT_CURRENCY_SYMBOL,
+        'title': 'Dashboard'
+    }
+    return render(request, 'dashboard.html', context)
+
+
+def _dashboard_metrics(user, user_warehouse, query_start_date, query_end_date):
+    today = timezone.now().date()
+
+    # বিক্রি ও রিটার্নের সব হিসাব প্রি-অ্যাগ্রিগেটেড DailySalesSummary টেবিল থেকে পড়া হয়,
+    # তাই ইতিহাস যত বড়ই হোক ড্যাশবোর্ডের গতি একই থাকে
+    summary_qs = DailySalesSummary.objects.all()
     products_with_stock = Product.objects.filter(stocks__isnull=False).distinct()
     stock_qs_user_specific = Stock.objects.all()
+    valuation_qs = StockValuation.objects.all()
 
     if not user.is_superuser and user_warehouse:
-        sales_base_qs = sales_base_qs.filter(warehouse=user_warehouse)
-        returns_base_qs = returns_base_qs.filter(warehouse=user_warehouse)
+        summary_qs = summary_qs.filter(warehouse=user_warehouse)
         products_with_stock = Product.objects.filter(stocks__warehouse=user_warehouse).distinct()
         stock_qs_user_specific = stock_qs_user_specific.filter(warehouse=user_warehouse)
+        valuation_qs = valuation_qs.filter(warehouse=user_warehouse)
 
-    # তারিখ অনুযায়ী ফিল্টার (query_start_date এবং query_end_date ব্যবহার করে)
+    # তারিখ অনুযায়ী ফিল্টার (query_start_date এবং query_end_date ব্যবহার করে)
+    period_summary_qs = summary_qs
     if query_start_date:
-        sales_base_qs = sales_base_qs.filter(order_date__gte=query_start_date)
-        returns_base_qs = returns_base_qs.filter(return_date__gte=query_start_date)
+        period_summary_qs = period_summary_qs.filter(date__gte=query_start_date)
     if query_end_date:
-        end_date_plus_one = query_end_date + timedelta(days=1)
-        sales_base_qs = sales_base_qs.filter(order_date__lt=end_date_plus_one)
-        returns_base_qs = returns_base_qs.filter(return_date__lt=end_date_plus_one)
+        period_summary_qs = period_summary_qs.filter(date__lte=query_end_date)
+
+    period_totals = period_summary_qs.aggregate(
+        sales_amount=Coalesce(Sum('sales_amount'), Decimal('0.0')),
+        sales_cost=Coalesce(Sum('sales_cost'), Decimal('0.0')),
+        returns_amount=Coalesce(Sum('returns_amount'), Decimal('0.0')),
+        returns_cost=Coalesce(Sum('returns_cost'), Decimal('0.0')),
+    )
 
-    # ... (আপনার পুরোনো লাভ, ইনভেনটরি টার্নওভার, ইত্যাদি সকল গণনা অপরিবর্তিত থাকবে)
     total_profit = 0
     if user.is_superuser and query_start_date and query_end_date:
-        sales_items_qs = SalesOrderItem.objects.filter(sales_order__in=sales_base_qs)
-        profit_agg = sales_items_qs.aggregate(
-            total_profit=Sum(F('quantity') * (F('unit_price') - F('cost_price')), output_field=DecimalField())
-        )
-        gross_profit = profit_agg.get('total_profit') or 0
-
-        returned_items_qs = SalesReturnItem.objects.filter(sales_return__in=returns_base_qs)
-        lost_profit_agg = returned_items_qs.aggregate(
-            total_lost_profit=Sum(F('quantity') * (F('unit_price') - F('product__cost_price')), output_field=DecimalField())
-        )
-        lost_profit = lost_profit_agg.get('total_lost_profit') or 0
+        gross_profit = period_totals['sales_amount'] - period_totals['sales_cost']
+        lost_profit = period_totals['returns_amount'] - period_totals['returns_cost']
         total_profit = gross_profit - lost_profit
 
 
@@ -105,20 +125,10 @@ def dashboard(request):
     avg_days_to_sell = 0
     if query_start_date and query_end_date:
         number_of_days = (query_end_date - query_start_date).days + 1
-        sales_items_qs_period = SalesOrderItem.objects.filter(sales_order__in=sales_base_qs)
-
-        cogs_agg = sales_items_qs_period.aggregate(total_cogs=Sum(F('quantity') * F('cost_price'), output_field=DecimalField()))
-        gross_cogs = cogs_agg.get('total_cogs') or 0
+        net_cogs = period_totals['sales_cost'] - period_totals['returns_cost']
 
-        returned_items_qs_period = SalesReturnItem.objects.filter(sales_return__in=returns_base_qs)
-        returned_cogs_agg = returned_items_qs_period.aggregate(
-            total_returned_cogs=Sum(F('quantity') * F('product__cost_price'), output_field=DecimalField())
-        )
-        returned_cogs = returned_cogs_agg.get('total_returned_cogs') or 0
-
-        net_cogs = gross_cogs - returned_cogs
-
-        avg_inventory_value_agg = stock_qs_user_specific.aggregate(total_value=Sum(F('quantity') * F('product__cost_price'), output_field=DecimalField()))
+        # স্টকের মূল্য কস্ট লেয়ার থেকে আগেই হিসাব করা থাকে (stock.costing), এখানে শুধু যোগফল
+        avg_inventory_value_agg = valuation_qs.aggregate(total_value=Sum('value'))
         avg_inventory_value = avg_inventory_value_agg.get('total_value') or 0
 
         if net_cogs > 0 and avg_inventory_value > 0 and number_of_days > 0:
@@ -144,31 +154,21 @@ def dashboard(request):
     start_of_month = today.replace(day=1)
 
     # Today's and This month's data should be based on current date, not filtered date range
-    todays_sales_qs_unfiltered = SalesOrder.objects.filter(status='delivered', order_date__date=today)
-    this_months_sales_qs_unfiltered = SalesOrder.objects.filter(status='delivered', order_date__gte=start_of_month)
-    todays_returns_qs_unfiltered = SalesReturn.objects.filter(return_date__date=today)
-    this_months_returns_qs_unfiltered = SalesReturn.objects.filter(return_date__gte=start_of_month)
-
-    if not user.is_superuser and user_warehouse:
-        todays_sales_qs_unfiltered = todays_sales_qs_unfiltered.filter(warehouse=user_warehouse)
-        this_months_sales_qs_unfiltered = this_months_sales_qs_unfiltered.filter(warehouse=user_warehouse)
-        todays_returns_qs_unfiltered = todays_returns_qs_unfiltered.filter(warehouse=user_warehouse)
-        this_months_returns_qs_unfiltered = this_months_returns_qs_unfiltered.filter(warehouse=user_warehouse)
+    current_totals = summary_qs.filter(date__gte=start_of_month, date__lte=today).aggregate(
+        todays_gross_sales=Coalesce(Sum('sales_amount', filter=Q(date=today)), Decimal('0.0')),
+        this_months_gross_sales=Coalesce(Sum('sales_amount'), Decimal('0.0')),
+        todays_returns_total=Coalesce(Sum('returns_amount', filter=Q(date=today)), Decimal('0.0')),
+        this_months_returns_total=Coalesce(Sum('returns_amount'), Decimal('0.0')),
+    )
+    todays_gross_sales = current_totals['todays_gross_sales']
+    this_months_gross_sales = current_totals['this_months_gross_sales']
+    todays_returns_total = current_totals['todays_returns_total']
+    this_months_returns_total = current_totals['this_months_returns_total']
 
-    todays_gross_sales = todays_sales_qs_unfiltered.aggregate(total=Sum('total_amount'))['total'] or 0
-    this_months_gross_sales = this_months_sales_qs_unfiltered.aggregate(total=Sum('total_amount'))['total'] or 0
-    
-    todays_returns_total = todays_returns_qs_unfiltered.aggregate(
-        total=Coalesce(Sum(F('items__quantity') * F('items__unit_price')), Decimal('0.0'), output_field=DecimalField())
-    )['total']
-    this_months_returns_total = this_months_returns_qs_unfiltered.aggregate(
-        total=Coalesce(Sum(F('items__quantity') * F('items__unit_price')), Decimal('0.0'), output_field=DecimalField())
-    )['total']
-    
     todays_net_sales = todays_gross_sales - todays_returns_total
     this_months_net_sales = this_months_gross_sales - this_months_returns_total
 
-    unfulfilled_orders_query = SalesOrder.objects.filter(Q(status='confirmed') | Q(status__iexact='partially_delivered'))
+    unfulfilled_orders_query = SalesOrder.objects.filter(status__in=['confirmed', 'partially_delivered'])
     if not user.is_superuser and user_warehouse:
         unfulfilled_orders_query = unfulfilled_orders_query.filter(warehouse=user_warehouse)
     unfulfilled_orders_count = unfulfilled_orders_query.count()
@@ -178,29 +178,19 @@ def dashboard(request):
         expiring_lots_qs = expiring_lots_qs.filter(location__warehouse=user_warehouse)
     expiring_lots_count = expiring_lots_qs.count()
     ninety_days_ago = today - timedelta(days=90)
-    sold_product_ids = SalesOrderItem.objects.filter(sales_order__order_date__gte=ninety_days_ago).values_list('product_id', flat=True).distinct()
+    sold_product_ids = DailySalesSummary.objects.filter(date__gte=ninety_days_ago, quantity_sold__gt=0).values_list('product_id', flat=True).distinct()
     dead_stock_products_qs = stock_qs_user_specific.filter(quantity__gt=0).exclude(product_id__in=sold_product_ids)
     dead_stock_count = dead_stock_products_qs.values('product_id').distinct().count()
     thirty_days_ago = today - timedelta(days=30)
     purchase_suggestion_count = 0
     products_in_stock = stock_qs_user_specific.filter(quantity__gt=0).values('product_id').annotate(current_stock=Sum('quantity'))
     product_stock_map = {item['product_id']: item['current_stock'] for item in products_in_stock}
-    sales_qs = SalesOrderItem.objects.filter(sales_order__order_date__gte=thirty_days_ago, product_id__in=product_stock_map.keys())
-    if not user.is_superuser and user_warehouse:
-        sales_qs = sales_qs.filter(sales_order__warehouse=user_warehouse)
-    sales_last_30_days_agg = sales_qs.values('product_id').annotate(total_sold=Sum('quantity'))
-    sales_map = {item['product_id']: item['total_sold'] for item in sales_last_30_days_agg}
-    returns_qs = SalesReturnItem.objects.filter(sales_return__return_date__gte=thirty_days_ago, product_id__in=product_stock_map.keys())
-    if not user.is_superuser and user_warehouse:
-        returns_qs = returns_qs.filter(sales_return__warehouse=user_warehouse)
-    returns_last_30_days_agg = returns_qs.values('product_id').annotate(total_returned=Sum('quantity'))
-    returns_map = {item['product_id']: item['total_returned'] for item in returns_last_30_days_agg}
-    all_product_ids = set(sales_map.keys()) | set(returns_map.keys())
-    for product_id in all_product_ids:
-        sold_qty = sales_map.get(product_id, 0)
-        returned_qty = returns_map.get(product_id, 0)
-        net_sold = sold_qty - returned_qty
-        if product_stock_map.get(product_id, 0) < net_sold:
+    movement_last_30_days_agg = summary_qs.filter(date__gte=thirty_days_ago, product_id__in=product_stock_map.keys()).values('product_id').annotate(
+        total_sold=Sum('quantity_sold'), total_returned=Sum('quantity_returned')
+    )
+    for item in movement_last_30_days_agg:
+        net_sold = item['total_sold'] - item['total_returned']
+        if product_stock_map.get(item['product_id'], 0) < net_sold:
             purchase_suggestion_count += 1
     category_data_query = products_with_stock.values('category__name').annotate(count=Count('id')).order_by('-count')
     category_labels = [item['category__name'] or "Uncategorized" for item in category_data_query]
@@ -215,26 +205,18 @@ def dashboard(request):
         months_data[month_key] = {'sales': 0, 'returns': 0}
         next_month = (current_month_start.replace(day=28) + timedelta(days=4))
         current_month_start = next_month.replace(day=1)
-    monthly_sales_base_qs = SalesOrder.objects.filter(status='delivered', order_date__gte=twelve_months_ago)
-    if not user.is_superuser and user_warehouse:
-        monthly_sales_base_qs = monthly_sales_base_qs.filter(warehouse=user_warehouse)
-    monthly_sales_query = monthly_sales_base_qs.annotate(month=TruncMonth('order_date')).values('month').annotate(total_sales=Sum('total_amount')).order_by('month')
-    for data in monthly_sales_query:
+    monthly_summary_query = summary_qs.filter(date__gte=twelve_months_ago).annotate(month=TruncMonth('date')).values('month').annotate(
+        total_sales=Sum('sales_amount'), total_returns=Sum('returns_amount')
+    ).order_by('month')
+    for data in monthly_summary_query:
         if data['month']:
             month_key = data['month'].strftime('%b %Y')
             if month_key in months_data:
                 months_data[month_key]['sales'] = float(data['total_sales'])
-    monthly_returns_base_qs = SalesReturn.objects.filter(return_date__gte=twelve_months_ago)
-    if not user.is_superuser and user_warehouse:
-        monthly_returns_base_qs = monthly_returns_base_qs.filter(warehouse=user_warehouse)
-    monthly_returns_query = monthly_returns_base_qs.annotate(month=TruncMonth('return_date')).values('month').annotate(
-        total_returns=Sum(F('items__quantity') * F('items__unit_price'))
-    ).order_by('month')
-    for data in monthly_returns_query:
-        if data['month']:
-            month_key = data['month'].strftime('%b %Y')
-            if month_key in months_data and data['total_returns']:
                 months_data[month_key]['returns'] = float(data['total_returns'])
+    monthly_sales_base_qs = SalesOrder.objects.filter(status='delivered', order_date__gte=twelve_months_ago)
+    if not user.is_superuser and user_warehouse:
+        monthly_sales_base_qs = monthly_sales_base_qs.filter(warehouse=user_warehouse)
     monthly_sales_labels = list(months_data.keys())
     monthly_sales_data = [d['sales'] for d in months_data.values()]
     monthly_returns_data = [d['returns'] for d in months_data.values()]
@@ -243,10 +225,7 @@ def dashboard(request):
     monthly_orders_data = [int(data['order_count']) for data in monthly_orders_query]
 
 
-    context = {
-        'period': period,
-        'start_date': form_start_date,
-        'end_date': form_end_date,
+    return {
         'todays_sales': todays_gross_sales,
         'this_months_sales': this_months_gross_sales,
         'todays_gross_sales': todays_gross_sales,
@@ -277,10 +256,7 @@ def dashboard(request):
         'monthly_returns_data': json.dumps(monthly_returns_data),
         'monthly_orders_labels': json.dumps(monthly_orders_labels),
         'monthly_orders_data': json.dumps(monthly_orders_data),
-        'DEFAULT_CURRENCY_SYMBOL': DEFAULT_CURRENCY_SYMBOL,
-        'title': 'Dashboard'
     }
-    return render(request, 'dashboard.html', context)
 
 @login_required
 def home(request):
@@ -1,56 +1,63 @@
-from django.core.management.base import BaseCommand
-from django.db.models import Sum
-from stock.models import Stock, LotSerialNumber, Warehouse
-from products.models import Product
+from datetime import datetime
+from io import StringIO
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from stock.reconciliation import StockReconciliation
 
 class Command(BaseCommand):
     help = 'Reconciles the main Stock table quantities with the sum of LotSerialNumber quantities for tracked products.'
 
-    def handle(self, *args, **kwargs):
-        self.stdout.write(self.style.NOTICE('Starting lot reconciliation...'))
-
-        # শুধুমাত্র যে প্রোডাক্টগুলো লট/সিরিয়াল দিয়ে ট্র্যাক করা হয়, সেগুলোর জন্য চালানো হবে
-        tracked_products = Product.objects.filter(tracking_method__in=['lot', 'serial'])
-
-        for product in tracked_products:
-            # এই প্রোডাক্টটি যে সব ওয়্যারহাউজে আছে, সেগুলো খুঁজে বের করা
-            warehouses_with_lots = Warehouse.objects.filter(
-                locations__lots__product=product
-            ).distinct()
-            
-            for warehouse in warehouses_with_lots:
-                # এই ওয়্যারহাউজের সব লোকেশন থেকে এই প্রোডাক্টের লটের মোট পরিমাণ গণনা করা
-                total_from_lots = LotSerialNumber.objects.filter(
-                    product=product,
-                    location__warehouse=warehouse
-                ).aggregate(total=Sum('quantity'))['total'] or 0
-
-                # ওয়্যারহাউজের জন্য বর্তমানে সংরক্ষিত মোট স্টক খুঁজে বের করা
-                stock_record, created = Stock.objects.get_or_create(
-                    product=product,
-                    warehouse=warehouse,
-                    defaults={'quantity': 0}
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Only report discrepancies, do not update Stock.')
+        parser.add_argument('--warehouse', type=int, help='Only reconcile the warehouse with this ID.')
+        parser.add_argument('--since', help='Only reconcile product/warehouse pairs with movements since this date (YYYY-MM-DD).')
+        parser.add_argument(
+            '--include-without-lots', action='store_true',
+            help='Also reconcile stock in warehouses that hold no lots of the product (their stock becomes 0).'
+        )
+        parser.add_argument('--report', help='Write the diff report to this file ("-" for stdout).')
+        parser.add_argument('--format', choices=['csv', 'json'], default='csv', help='Diff report format.')
+
+    def handle(self, *args, **options):
+        # রিপোর্ট stdout এ গেলে স্ট্যাটাস বার্তা stderr এ যায়, যাতে CSV/JSON আউটপুট পরিষ্কার থাকে
+        log = self.stderr if options['report'] == '-' else self.stdout
+        log.write(self.style.NOTICE('Starting lot reconciliation...'))
+
+        since = None
+        if options['since']:
+            try:
+                since = timezone.make_aware(datetime.strptime(options['since'], '%Y-%m-%d'))
+            except ValueError:
+                raise CommandError(f"Invalid --since value: {options['since']}")
+
+        # পুরো ক্যাটালগের জন্য একটি গ্রুপড কুয়েরি দিয়ে গড়মিল খুঁজে বের করা
+        discrepancies = StockReconciliation.find_discrepancies(
+            warehouse_id=options['warehouse'], since=since, include_without_lots=options['include_without_lots']
+        )
+
+        for d in discrepancies:
+            log.write(
+                self.style.WARNING(
+                    f'Discrepancy found for "{d["product_name"]}" in "{d["warehouse_name"]}": '
+                    f'Stored Total = {d["stored_quantity"]}, Sum of Lots = {d["lot_quantity"]}.'
                 )
-                
-                stored_quantity = stock_record.quantity
-
-                # যদি গড়মিল পাওয়া যায়
-                if stored_quantity != total_from_lots:
-                    self.stdout.write(
-                        self.style.WARNING(
-                            f'Discrepancy found for "{product.name}" in "{warehouse.name}": '
-                            f'Stored Total = {stored_quantity}, Sum of Lots = {total_from_lots}.'
-                        )
-                    )
-                    
-                    # সংরক্ষিত মোট স্টককে লটের মোট পরিমাণ দিয়ে আপডেট করা
-                    stock_record.quantity = total_from_lots
-                    stock_record.save()
-                    
-                    self.stdout.write(
-                        self.style.SUCCESS(
-                            f'---> Stock for "{product.name}" in "{warehouse.name}" updated to {total_from_lots}.'
-                        )
-                    )
-
-        self.stdout.write(self.style.SUCCESS('Lot reconciliation completed successfully.'))
\ No newline at end of file
+            )
+
+        if options['report']:
+            if options['report'] == '-':
+                report = StringIO()
+                StockReconciliation.write_report(discrepancies, report, options['format'])
+                self.stdout.write(report.getvalue(), ending='')
+            else:
+                with open(options['report'], 'w', newline='', encoding='utf-8') as report_file:
+                    StockReconciliation.write_report(discrepancies, report_file, options['format'])
+                log.write(self.style.NOTICE(f'Diff report written to {options["report"]}.'))
+
+        if options['dry_run']:
+            log.write(self.style.SUCCESS(f'Dry run: {len(discrepancies)} discrepancies found, nothing updated.'))
+            return
+
+        # সংরক্ষিত মোট স্টককে লটের মোট পরিমাণ দিয়ে একবারে আপডেট করা
+        updated = StockReconciliation.apply(discrepancies)
+        log.write(self.style.SUCCESS(f'Lot reconciliation completed successfully. {updated} stock records updated.'))
@@ -0,0 +1,169 @@
+# pos/catalog.py
+
+import json
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.db.models import Max, Min, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from products.models import Product
+from stock.ledger import StockLedger
+from .models import CatalogChange
+
+ALL_WAREHOUSES = 'all'
+SNAPSHOT_TTL = 60 * 60 * 24
+
+
+def scope_for(user):
+    """superuser সব ওয়্যারহাউসের মোট স্টক দেখে, বাকিরা শুধু নিজের ওয়্যারহাউসের।"""
+    if user.is_superuser:
+        return ALL_WAREHOUSES
+    warehouse = getattr(user, 'warehouse', None)
+    return warehouse.pk if warehouse else None
+
+
+def _changes(scope):
+    changes = CatalogChange.objects.all()
+    if scope != ALL_WAREHOUSES:
+        changes = changes.filter(Q(warehouse_id=scope) | Q(warehouse__isnull=True))
+    return changes
+
+
+def version(scope):
+    """
+    scope এর জন্য প্রযোজ্য সর্বশেষ চেঞ্জলগ রো এর id; কোনো পরিবর্তন না থাকলে 0।
+    id ইনসার্টের সময় দেওয়া হয়, কমিটের ক্রমে নয়: ছোট id এর রো বড় id এর পরে কমিট হতে পারে। তাই
+    POS_CATALOG_COMMIT_LAG_SECONDS এর চেয়ে নতুন রো ভার্সনে ধরা হয় না, ততক্ষণে আগের id গুলো কমিট হয়ে যায়
+    এবং কোনো টিল সেগুলো ডিঙিয়ে যায় না; নতুন রো গুলো পরের delta তে আসে।
+    """
+    lag = getattr(settings, 'POS_CATALOG_COMMIT_LAG_SECONDS', 5)
+    watermark = timezone.now() - timedelta(seconds=lag)
+    return _changes(scope).filter(created_at__lte=watermark).aggregate(v=Max('id'))['v'] or 0
+
+
+def compacted_version():
+    """
+    prune এর পরে সবচেয়ে পুরনো যে ভার্সন থেকে delta দেওয়া যায়; এর চেয়ে পুরনো since এর পরের কিছু রো মুছে
+    গেছে, তাই সেগুলো পুরো স্ন্যাপশট পায়।
+    """
+    oldest = CatalogChange.objects.aggregate(v=Min('id'))['v']
+    return oldest - 1 if oldest else 0
+
+
+def prune(before):
+    """
+    before এর আগে তৈরি চেঞ্জলগ রো মুছে ফেলে; মুছে ফেলা রো এর সংখ্যা ফেরত দেয়। সর্বশেষ রো কখনো মোছে না,
+    যাতে ভার্সন পিছিয়ে না যায় এবং মুছে ফেলা id আবার ব্যবহার না হয়।
+    """
+    latest = version(ALL_WAREHOUSES)
+    compaction = CatalogChange.objects.filter(created_at__lt=before, id__lt=latest).aggregate(v=Max('id'))['v']
+    if compaction is None:
+        return 0
+    deleted, _ = CatalogChange.objects.filter(id__lte=compaction).delete()
+    return deleted
+
+
+def etag(scope, version, since=None):
+    if since is None:
+        return f'"pos-catalog-{scope}-{version}"'
+    return f'"pos-catalog-{scope}-{since}-{version}"'
+
+
+def _rows(scope, product_ids=None):
+    products = Product.objects.all()
+    if product_ids is None:
+        products = products.filter(is_active=True)
+    else:
+        products = products.filter(pk__in=product_ids)
+
+    ledger_stock = None
+    if StockLedger.enabled():
+        # লেজার মোডে Stock কাউন্টার আপডেট হয় না, তাই স্টক লেজারের ব্যালেন্স থেকে
+        ledger_stock = defaultdict(int)
+        totals = StockLedger.totals(product_ids, None if scope == ALL_WAREHOUSES else [scope])
+        for (product_id, _), quantity in totals.items():
+            ledger_stock[product_id] += quantity
+        if product_ids is None:
+            products = products.filter(pk__in=[pk for pk, quantity in ledger_stock.items() if quantity > 0])
+        # কাউন্টারের জায়গায় নিচে লেজারের ব্যালেন্স বসানো হয়
+        products = products.annotate(current_stock=Value(0))
+    else:
+        stock_filter = None if scope == ALL_WAREHOUSES else Q(stocks__warehouse_id=scope)
+        products = products.annotate(
+            current_stock=Coalesce(Sum('stocks__quantity', filter=stock_filter), 0)
+        )
+        if product_ids is None:
+            products = products.filter(current_stock__gt=0)
+
+    for pk, name, code, sale_price, image, is_active, current_stock in products.order_by('name').values_list(
+        'pk', 'name', 'product_code', 'sale_price', 'image', 'is_active', 'current_stock'
+    ):
+        if ledger_stock is not None:
+            current_stock = ledger_stock[pk]
+        yield {
+            'id': pk,
+            'name': name,
+            'code': code,
+            'sale_price': float(sale_price),
+            # ছবির URL ফাইল সিস্টেম না ছুঁয়ে শুধু নাম থেকে তৈরি হয়
+            'image_url': default_storage.url(image) if image else '',
+            'current_stock': current_stock,
+        }, is_active
+
+
+def snapshot(scope):
+    """
+    scope এর পুরো ক্যাটালগ (version, JSON bytes)। একই ভার্সনের স্ন্যাপশট ক্যাশ থেকে দেওয়া হয়,
+    তাই যতগুলো টিলই রিফ্রেশ করুক, প্রতিটি পরিবর্তনের পরে ক্যাটালগ কুয়েরি একবারই চলে।
+    """
+    # ভার্সন আগে পড়া হচ্ছে: মাঝে কোনো পরিবর্তন এলে সেটি পরের delta তে আবার আসবে, হারাবে না
+    current = version(scope)
+    key = f'pos_catalog:{scope}:{current}'
+    body = cache.get(key)
+    if body is None:
+        products = [row for row, _ in _rows(scope)]
+        body = json.dumps({'version': current, 'products': products}, separators=(',', ':')).encode()
+        cache.set(key, body, SNAPSHOT_TTL)
+    return current, body
+
+
+def delta(scope, since):
+    """
+    since ভার্সনের পরে যেসব প্রোডাক্টের দাম/স্টক/সক্রিয়তা বদলেছে শুধু সেগুলো।
+    স্টক শেষ বা নিষ্ক্রিয় হয়ে যাওয়া প্রোডাক্টের id 'removed' তালিকায় থাকে।
+    """
+    current = version(scope)
+    product_ids = set(
+        _changes(scope).filter(id__gt=since, id__lte=current).values_list('product_id', flat=True)
+    )
+    products, removed = [], []
+    if product_ids:
+        for row, is_active in _rows(scope, product_ids):
+            if is_active and row['current_stock'] > 0:
+                products.append(row)
+            else:
+                removed.append(row['id'])
+    body = json.dumps(
+        {'version': current, 'since': since, 'products': products, 'removed': removed},
+        separators=(',', ':')
+    ).encode()
+    return current, body
+
+
+def record_changes(stock_keys=(), product_ids=()):
+    """
+    চেঞ্জলগে রো যোগ করে। stock_keys: (product_id, warehouse_id) জোড়া (স্টক পরিবর্তন);
+    product_ids: যেসব প্রোডাক্ট সব ওয়্যারহাউসে বদলেছে (দাম, নাম, সক্রিয়তা)।
+    """
+    changes = [
+        CatalogChange(product_id=product_id, warehouse_id=warehouse_id)
+        for product_id, warehouse_id in set(stock_keys)
+    ]
+    changes += [CatalogChange(product_id=product_id) for product_id in set(product_ids)]
+    if changes:
+        CatalogChange.objects.bulk_create(changes)
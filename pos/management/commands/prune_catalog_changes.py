@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from pos import catalog
+
+
+class Command(BaseCommand):
+    help = 'Deletes old POS catalog change log rows; tills asking for a pruned version get a full snapshot.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Keep changes from the last this many days.')
+
+    def handle(self, *args, **options):
+        if options['days'] < 0:
+            raise CommandError('--days must not be negative.')
+        deleted = catalog.prune(timezone.now() - timedelta(days=options['days']))
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} catalog changes. Deltas are served from version {catalog.compacted_version()}.'
+        ))
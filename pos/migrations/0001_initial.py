@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:45
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('stock', '0003_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('warehouse', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='stock.warehouse')),
+            ],
+            options={
+                'db_table': 'inventory_poscatalogchange',
+                'indexes': [models.Index(fields=['warehouse', 'id'], name='inventory_p_warehou_7709d2_idx')],
+            },
+        ),
+    ]
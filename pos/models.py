@@ -1,3 +1,31 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class CatalogChange(models.Model):
+    """
+    POS ক্যাটালগের চেঞ্জলগ। প্রতিটি রো মানে একটি প্রোডাক্টের দাম/স্টক/সক্রিয়তা বদলেছে;
+    warehouse খালি থাকলে পরিবর্তনটি সব ওয়্যারহাউসের জন্য প্রযোজ্য। রো এর id-ই ক্যাটালগ ভার্সন।
+    """
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='+')
+    warehouse = models.ForeignKey('stock.Warehouse', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'inventory_poscatalogchange'
+        indexes = [models.Index(fields=['warehouse', 'id'])]
+
+
+class OfflineSale(models.Model):
+    """
+    টিল থেকে ব্যাচে আসা প্রতিটি বিক্রির idempotency key। একই key আবার এলে নতুন অর্ডার তৈরি না করে
+    আগের অর্ডারটিই ফেরত দেওয়া হয়, তাই নেটওয়ার্ক সমস্যায় টিল নিরাপদে আবার পাঠাতে পারে। পোস্ট করার আগে
+    key দাবি করার সময় sales_order ফাঁকা থাকে; একই ট্রানজেকশনে অর্ডার তৈরি হলে সেটি বসানো হয়।
+    """
+    idempotency_key = models.CharField(max_length=64, unique=True)
+    sales_order = models.ForeignKey('sales.SalesOrder', on_delete=models.CASCADE, null=True, related_name='+')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'inventory_posofflinesale'
@@ -0,0 +1,177 @@
+# pos/services.py
+
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from costing.services import JobCostService
+from products.models import Product
+from reports.services import SalesRollupService
+from sales.models import SalesOrder, SalesOrderItem
+from stock.allocation import LotAllocator, InsufficientStockError
+from stock.services import StockService
+from .models import OfflineSale
+
+MAX_BATCH_SIZE = 200
+
+
+class OfflineSaleService:
+    """
+    টিলে জমানো বিক্রিগুলো একটি ব্যাচে পোস্ট করে। সব অর্ডার, আইটেম ও স্টক মুভমেন্ট bulk কুয়েরিতে
+    একটি ট্রানজেকশনে লেখা হয়; প্রতিটি বিক্রির ফলাফল আলাদাভাবে ফেরত দেওয়া হয়।
+    """
+
+    @staticmethod
+    def post_batch(sales, user, warehouse):
+        """
+        sales: dict এর তালিকা, প্রতিটিতে key (idempotency key), cart ([{id, quantity, sale_price}]),
+        ঐচ্ছিকভাবে payment_method, amount_tendered, change_due ও sold_at (ISO সময়)।
+        প্রতিটি বিক্রির জন্য {'key', 'status': created/duplicate/error, 'order_id' বা 'message'} ফেরত দেয়।
+        স্টক পোস্টিং ব্যর্থ হলে ValueError ওঠে এবং ব্যাচের কিছুই সেভ হয় না।
+
+        পোস্ট করার আগে key গুলো OfflineSale এ দাবি (claim) করা হয়। একই key নিয়ে দুটি আপলোড একসাথে এলে
+        unique key এ দ্বিতীয়টির insert প্রথমটির কমিট পর্যন্ত অপেক্ষা করে এবং বাদ পড়ে, তাই সেটি duplicate পায়।
+        """
+        results = [None] * len(sales)
+        parsed = []
+        seen_keys = {}
+        for index, sale in enumerate(sales):
+            try:
+                entry = OfflineSaleService._parse(sale)
+            except ValueError as e:
+                results[index] = {'key': sale.get('key') if isinstance(sale, dict) else None, 'status': 'error', 'message': str(e)}
+                continue
+            if entry['key'] in seen_keys:
+                # একই ব্যাচে একই key দুবার এলে দ্বিতীয়টি প্রথমটির ফলাফল পাবে
+                seen_keys[entry['key']].append(index)
+                continue
+            seen_keys[entry['key']] = [index]
+            parsed.append((index, entry))
+
+        with transaction.atomic():
+            OfflineSale.objects.bulk_create(
+                [OfflineSale(idempotency_key=entry['key'], user=user) for _, entry in parsed], ignore_conflicts=True
+            )
+            # অর্ডার ছাড়া দাবিগুলো এই ট্রানজেকশনের; অন্যগুলো আগেই (বা অন্য আপলোডে) পোস্ট হয়েছে
+            claims = {}
+            existing = {}
+            for claim in OfflineSale.objects.filter(idempotency_key__in=seen_keys.keys()):
+                if claim.sales_order_id is None:
+                    claims[claim.idempotency_key] = claim
+                else:
+                    existing[claim.idempotency_key] = claim.sales_order_id
+            product_ids = {line['id'] for _, entry in parsed if entry['key'] in claims for line in entry['cart']}
+            products = Product.objects.in_bulk(product_ids)
+            session = LotAllocator.session(warehouse, products.values())
+
+            accepted = []
+            for index, entry in parsed:
+                if entry['key'] not in claims:
+                    results[index] = {'key': entry['key'], 'status': 'duplicate', 'order_id': existing.get(entry['key'])}
+                    continue
+                try:
+                    lines = []
+                    for line in entry['cart']:
+                        if line['id'] not in products:
+                            raise ValueError(f"Product {line['id']} not found.")
+                        lines.append((products[line['id']], line['quantity']))
+                    plan = session.allocate(lines)
+                except (ValueError, InsufficientStockError) as e:
+                    results[index] = {'key': entry['key'], 'status': 'error', 'message': str(e)}
+                    continue
+                accepted.append((index, entry, lines, plan))
+
+            orders = SalesOrder.objects.bulk_create([
+                SalesOrder(
+                    status='delivered', user=user, warehouse=warehouse, order_date=entry['sold_at'],
+                    payment_method=entry['payment_method'], amount_tendered=entry['amount_tendered'],
+                    change_due=entry['change_due'],
+                    total_amount=sum(line['quantity'] * line['sale_price'] for line in entry['cart'])
+                )
+                for _, entry, _, _ in accepted
+            ])
+
+            order_items = []
+            stock_movements = []
+            offline_sales = []
+            rollup_buckets = defaultdict(set)
+            for order, (index, entry, lines, plan) in zip(orders, accepted):
+                for line, (product, _), picks in zip(entry['cart'], lines, plan):
+                    for lot, quantity in picks:
+                        order_items.append(SalesOrderItem(
+                            sales_order=order, product=product, quantity=quantity,
+                            unit_price=line['sale_price'], cost_price=product.cost_price, lot_serial=lot
+                        ))
+                    stock_movements.extend(LotAllocator.movements(
+                        picks, product, warehouse, 'sale', user,
+                        content_object=order, notes=f"POS Sale SO-{order.id}"
+                    ))
+                    rollup_buckets[timezone.localdate(order.order_date)].add(product.pk)
+                claim = claims.pop(entry['key'])
+                claim.sales_order = order
+                offline_sales.append(claim)
+                results[index] = {'key': entry['key'], 'status': 'created', 'order_id': order.id}
+
+            # আইটেম ও মুভমেন্ট এক-এক করে মেলে; খরচ নেওয়া হয় কস্ট লেয়ার থেকে পাওয়া ইউনিট খরচ
+            posted = StockService.apply_movements(stock_movements)
+            for order_item, inventory_transaction in zip(order_items, posted):
+                order_item.cost_price = inventory_transaction.unit_cost
+            SalesOrderItem.objects.bulk_create(order_items, batch_size=1000)
+            OfflineSale.objects.bulk_update(offline_sales, ['sales_order'])
+            # ব্যর্থ বিক্রির দাবি ছেড়ে দেওয়া হয়, যাতে টিল সেগুলো ঠিক করে আবার পাঠাতে পারে
+            OfflineSale.objects.filter(pk__in=[claim.pk for claim in claims.values()]).delete()
+
+            # bulk_create এ post_save সিগন্যাল চলে না, তাই রোলআপ ও JobCost রিফ্রেশ এখানেই নির্ধারণ করা হচ্ছে
+            for date, day_product_ids in rollup_buckets.items():
+                SalesRollupService.schedule_refresh(date, warehouse.pk, day_product_ids)
+            JobCostService.schedule([order.pk for order in orders], create=True)
+
+        for indexes in seen_keys.values():
+            for index in indexes[1:]:
+                results[index] = dict(results[indexes[0]])
+                if results[index]['status'] == 'created':
+                    results[index]['status'] = 'duplicate'
+        return results
+
+    @staticmethod
+    def _parse(sale):
+        if not isinstance(sale, dict):
+            raise ValueError("Invalid sale.")
+        key = str(sale.get('key') or '').strip()
+        if not key or len(key) > 64:
+            raise ValueError("A sale key of up to 64 characters is required.")
+        cart = sale.get('cart') or []
+        if not cart:
+            raise ValueError("Cart is empty.")
+        try:
+            lines = [
+                {'id': int(line['id']), 'quantity': int(line['quantity']), 'sale_price': Decimal(str(line['sale_price']))}
+                for line in cart
+            ]
+            amount_tendered = sale.get('amount_tendered')
+            change_due = sale.get('change_due')
+            amount_tendered = Decimal(str(amount_tendered)) if amount_tendered is not None else None
+            change_due = Decimal(str(change_due)) if change_due is not None else None
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            raise ValueError("Invalid cart line.")
+        if any(line['quantity'] <= 0 for line in lines):
+            raise ValueError("Quantities must be positive.")
+
+        try:
+            sold_at = parse_datetime(sale['sold_at']) if sale.get('sold_at') else None
+        except (TypeError, ValueError):
+            raise ValueError("Invalid sold_at.")
+        if sold_at is not None and timezone.is_naive(sold_at):
+            sold_at = timezone.make_aware(sold_at)
+
+        return {
+            'key': key,
+            'cart': lines,
+            'payment_method': sale.get('payment_method') or 'cash',
+            'amount_tendered': amount_tendered,
+            'change_due': change_due,
+            'sold_at': sold_at or timezone.now(),
+        }
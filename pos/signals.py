@@ -0,0 +1,28 @@
+# pos/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from products.models import Product
+from stock.models import Stock
+from stock.signals import stock_changed
+from . import catalog
+
+
+@receiver(stock_changed)
+def record_catalog_stock_change(sender, stock_keys=(), **kwargs):
+    catalog.record_changes(stock_keys=stock_keys)
+
+
+@receiver(post_save, sender=Stock)
+def record_catalog_stock_save(sender, instance, **kwargs):
+    # StockService ছাড়া সরাসরি Stock.save() (যেমন ম্যানুয়াল অ্যাডজাস্টমেন্ট) এর জন্য
+    key = (instance.product_id, instance.warehouse_id)
+    transaction.on_commit(lambda: catalog.record_changes(stock_keys=[key]))
+
+
+@receiver(post_save, sender=Product)
+def record_catalog_product_change(sender, instance, **kwargs):
+    product_id = instance.pk
+    transaction.on_commit(lambda: catalog.record_changes(product_ids=[product_id]))
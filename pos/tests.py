@@ -1,3 +1,205 @@
-from django.test import TestCase
+import json
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from products.models import Product, Category, UnitOfMeasure, UnitOfMeasureCategory
+from reports.models import DailySalesSummary
+from sales.models import SalesOrder, SalesOrderItem
+from stock.models import Location, LotSerialNumber, Stock, Warehouse
+from stock.services import StockService
+from . import catalog
+from .models import CatalogChange, OfflineSale
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'], POS_CATALOG_COMMIT_LAG_SECONDS=0)
+class PosCatalogTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.warehouse = Warehouse.objects.create(name="Till Warehouse")
+        self.other_warehouse = Warehouse.objects.create(name="Other Till Warehouse")
+        self.user = get_user_model().objects.create_user(username="cashier", password="x", warehouse=self.warehouse)
+        category = Category.objects.create(name="Snacks")
+        uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=uom_category, ratio=1.0, is_base_unit=True
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chips = Product.objects.create(
+                name="Chips", product_code="CH001", category=category, price=2.00,
+                sale_price=2.50, unit_of_measure=unit_of_measure
+            )
+            self.nuts = Product.objects.create(
+                name="Nuts", product_code="NU001", category=category, price=4.00,
+                sale_price=5.00, unit_of_measure=unit_of_measure
+            )
+            StockService.change_stock(self.chips, self.warehouse, 10, 'purchase', None)
+            StockService.change_stock(self.nuts, self.warehouse, 3, 'purchase', None)
+        self.client.force_login(self.user)
+        self.url = reverse('pos:pos_catalog_view')
+
+    def test_snapshot_is_cached_per_version_and_served_with_etag(self):
+        response = self.client.get(self.url)
+        data = json.loads(response.content)
+        self.assertEqual([p['name'] for p in data['products']], ["Chips", "Nuts"])
+        self.assertEqual(data['version'], catalog.version(self.warehouse.pk))
+
+        with self.assertNumQueries(1):
+            catalog.snapshot(self.warehouse.pk)
+
+        not_modified = self.client.get(self.url, HTTP_IF_NONE_MATCH=response.headers['ETag'])
+        self.assertEqual(not_modified.status_code, 304)
+
+    def test_delta_returns_only_changed_products(self):
+        version = json.loads(self.client.get(self.url).content)['version']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StockService.change_stock(self.nuts, self.warehouse, -3, 'sale', None)
+            StockService.change_stock(self.chips, self.other_warehouse, 7, 'purchase', None)
+
+        data = json.loads(self.client.get(self.url, {'since': version}).content)
+        self.assertEqual(data['products'], [])
+        self.assertEqual(data['removed'], [self.nuts.pk])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.chips.sale_price = 3
+            self.chips.save()
+
+        data = json.loads(self.client.get(self.url, {'since': data['version']}).content)
+        self.assertEqual([(p['id'], p['sale_price']) for p in data['products']], [(self.chips.pk, 3.0)])
+
+    def test_pruned_versions_get_a_full_snapshot(self):
+        old_version = json.loads(self.client.get(self.url).content)['version']
+        with self.captureOnCommitCallbacks(execute=True):
+            StockService.change_stock(self.nuts, self.warehouse, -1, 'sale', None)
+        with self.captureOnCommitCallbacks(execute=True):
+            StockService.change_stock(self.chips, self.warehouse, -1, 'sale', None)
+        latest = catalog.version(catalog.ALL_WAREHOUSES)
+
+        out = StringIO()
+        call_command('prune_catalog_changes', '--days', '0', stdout=out)
+        self.assertIn(f'Deltas are served from version {latest - 1}', out.getvalue())
+        self.assertEqual(list(CatalogChange.objects.values_list('id', flat=True)), [latest])
+
+        data = json.loads(self.client.get(self.url, {'since': old_version}).content)
+        self.assertNotIn('since', data)
+        self.assertEqual([p['name'] for p in data['products']], ["Chips", "Nuts"])
+        data = json.loads(self.client.get(self.url, {'since': latest - 1}).content)
+        self.assertEqual([p['id'] for p in data['products']], [self.chips.pk])
+
+    @override_settings(POS_CATALOG_COMMIT_LAG_SECONDS=60)
+    def test_changes_newer_than_the_commit_lag_wait_for_a_later_delta(self):
+        CatalogChange.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        version = catalog.version(self.warehouse.pk)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StockService.change_stock(self.nuts, self.warehouse, -3, 'sale', None)
+
+        # সদ্য লেখা রো এর আগের id হয়তো এখনো কমিট হয়নি, তাই ভার্সন এগোয় না
+        data = json.loads(self.client.get(self.url, {'since': version}).content)
+        self.assertEqual((data['version'], data['removed']), (version, []))
+
+        CatalogChange.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        data = json.loads(self.client.get(self.url, {'since': version}).content)
+        self.assertGreater(data['version'], version)
+        self.assertEqual(data['removed'], [self.nuts.pk])
+
+    @override_settings(STOCK_LEDGER_MODE=True)
+    def test_ledger_mode_reads_stock_from_the_ledger(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            StockService.change_stock(self.nuts, self.warehouse, -3, 'sale', None)
+            StockService.change_stock(self.chips, self.warehouse, -4, 'sale', None)
+
+        data = json.loads(self.client.get(self.url).content)
+        self.assertEqual([(p['name'], p['current_stock']) for p in data['products']], [("Chips", 6)])
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class OfflineSaleSyncTest(TestCase):
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name="Offline Warehouse")
+        location = Location.objects.create(name="Front", warehouse=self.warehouse)
+        self.user = get_user_model().objects.create_user(username="till", password="x", warehouse=self.warehouse)
+        category = Category.objects.create(name="Drinks")
+        uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.product = Product.objects.create(
+            name="Cola", product_code="CO001", category=category, price=1.00,
+            sale_price=1.50, cost_price=1.00, unit_of_measure=unit_of_measure
+        )
+        lot = LotSerialNumber.objects.create(product=self.product, location=location, lot_number="C1", quantity=0)
+        StockService.change_stock(self.product, self.warehouse, 5, 'purchase', None, location=location, lot_serial=lot)
+        self.client.force_login(self.user)
+        self.url = reverse('pos:pos_sync_sales_view')
+
+    def _sale(self, key, quantity):
+        return {'key': key, 'cart': [{'id': self.product.pk, 'quantity': quantity, 'sale_price': '1.50'}]}
+
+    def _upload(self, sales):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(self.url, json.dumps({'sales': sales}), content_type='application/json')
+        return response.status_code, json.loads(response.content)
+
+    def test_batch_posts_sales_with_per_sale_results(self):
+        status, data = self._upload([
+            self._sale("a", 2), self._sale("b", 2), self._sale("c", 2), self._sale("a", 2), {'key': "d", 'cart': []},
+        ])
+        self.assertEqual(status, 200)
+        self.assertEqual(
+            [r['status'] for r in data['results']], ['created', 'created', 'error', 'duplicate', 'error']
+        )
+        self.assertEqual(Stock.objects.get(product=self.product, warehouse=self.warehouse).quantity, 1)
+        self.assertEqual(SalesOrder.objects.filter(status='delivered').count(), 2)
+        summary = DailySalesSummary.objects.get(product=self.product, warehouse=self.warehouse)
+        self.assertEqual(summary.quantity_sold, 4)
+
+    def test_retry_is_idempotent(self):
+        _, first = self._upload([self._sale("retry-1", 1)])
+        _, second = self._upload([self._sale("retry-1", 1), self._sale("retry-2", 1)])
+        self.assertEqual(second['results'][0], {'key': "retry-1", 'status': 'duplicate', 'order_id': first['results'][0]['order_id']})
+        self.assertEqual(second['results'][1]['status'], 'created')
+        self.assertEqual(OfflineSale.objects.count(), 2)
+        self.assertEqual(Stock.objects.get(product=self.product, warehouse=self.warehouse).quantity, 3)
+
+    def test_key_posted_by_concurrent_upload_is_reported_as_duplicate(self):
+        bulk_create = OfflineSale.objects.bulk_create
+        other_order = SalesOrder.objects.create(status='delivered', user=self.user, warehouse=self.warehouse)
+
+        def claim_after_other_upload(objs, **kwargs):
+            # অন্য আপলোড একই key নিয়ে ঠিক আগে কমিট করেছে
+            OfflineSale.objects.create(idempotency_key="race", sales_order=other_order, user=self.user)
+            return bulk_create(objs, **kwargs)
+
+        with mock.patch.object(OfflineSale.objects, 'bulk_create', side_effect=claim_after_other_upload):
+            status, data = self._upload([self._sale("race", 1)])
+        self.assertEqual(status, 200)
+        self.assertEqual(data['results'], [{'key': "race", 'status': 'duplicate', 'order_id': other_order.pk}])
+        self.assertEqual(Stock.objects.get(product=self.product, warehouse=self.warehouse).quantity, 5)
+
+    def test_rejected_sale_releases_its_key(self):
+        _, first = self._upload([self._sale("later", 9)])
+        self.assertEqual(first['results'][0]['status'], 'error')
+        self.assertFalse(OfflineSale.objects.filter(idempotency_key="later").exists())
+        _, second = self._upload([self._sale("later", 1)])
+        self.assertEqual(second['results'][0]['status'], 'created')
+        self.assertEqual(OfflineSale.objects.get(idempotency_key="later").sales_order_id, second['results'][0]['order_id'])
+
+    def test_till_sale_records_cost_from_the_cost_layers(self):
+        # কার্ডের দাম বদলালেও বিক্রির খরচ স্টক যে খরচে ঢুকেছিল সেটাই থাকে
+        Product.objects.filter(pk=self.product.pk).update(cost_price=3)
+        cart = {'cart': [{'id': self.product.pk, 'quantity': 2, 'sale_price': '1.50'}]}
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('pos:pos_view'), json.dumps(cart), content_type='application/json')
+        self.assertEqual(json.loads(response.content)['status'], 'success')
+        item = SalesOrderItem.objects.get(sales_order_id=json.loads(response.content)['order_id'])
+        self.assertEqual(item.cost_price, Decimal('1.00'))
@@ -8,6 +8,9 @@ app_name = 'pos'
 urlpatterns = [
     path('', views.pos_view, name='pos_view'),
     
+    # টিলের ক্যাটালগ স্ন্যাপশট ও delta (ETag সহ)
+    path('ajax/catalog/', views.pos_catalog_view, name='pos_catalog_view'),
+
     # কার্ট পরিচালনার জন্য AJAX URL
     path('ajax/add-to-cart/', views.pos_add_to_cart, name='pos_add_to_cart'),
     path('ajax/remove-from-cart/', views.pos_remove_from_cart, name='pos_remove_from_cart'),
@@ -16,6 +19,9 @@ urlpatterns = [
     # চেকআউট প্রক্রিয়া সম্পন্ন করার জন্য AJAX URL
     path('ajax/checkout/', views.pos_checkout_view, name='pos_checkout_view'),
     
+    # অফলাইনে জমানো বিক্রির ব্যাচ আপলোড
+    path('ajax/sync-sales/', views.pos_sync_sales_view, name='pos_sync_sales_view'),
+    
     # রসিদ (Receipt) দেখানোর জন্য URL
     path('receipt/<int:order_id>/', views.pos_receipt_view, name='pos_receipt_view'),
 ]
\ No newline at end of file
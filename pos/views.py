@@ -4,20 +4,26 @@ import json
 from django.shortcuts import render, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.csrf import csrf_protect
+from django.views.decorators.gzip import gzip_page
+from django.views.decorators.http import require_GET
+from django.utils.cache import get_conditional_response, patch_cache_control
 from django.db import transaction
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
+from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils import timezone
-from django.db.models import Sum, Q, F
-from django.db.models.functions import Coalesce
 from decimal import Decimal
 
 # মডেল ইম্পোর্ট
 from products.models import Product
+from reports.services import SalesRollupService
 from sales.models import SalesOrder, SalesOrderItem
-from stock.models import Stock, Warehouse, LotSerialNumber
+from stock.models import Stock, Warehouse
 from stock.services import StockService
+from stock.allocation import LotAllocator
 from partners.models import Customer
+from . import catalog
+from .services import OfflineSaleService, MAX_BATCH_SIZE
 
 
 DEFAULT_CURRENCY_SYMBOL = 'QAR'
@@ -58,33 +64,45 @@ def pos_view(request):
                 )
                 
                 total_amount = Decimal('0.0')
+                order_items = []
+                stock_movements = []
                 
                 for item_data in cart:
                     product = get_object_or_404(Product, id=item_data['id'])
                     quantity = Decimal(item_data['quantity'])
                     unit_price = Decimal(item_data['sale_price']) # আপনার JS থেকে 'sale_price' আসছে
                     
-                    order_item = SalesOrderItem.objects.create(
+                    order_item = SalesOrderItem(
                         sales_order=sales_order,
                         product=product,
                         quantity=quantity,
                         unit_price=unit_price,
                         cost_price=product.cost_price
                     )
+                    order_items.append(order_item)
                     
-                    # আপনার StockService ব্যবহার করে স্টক আপডেট
-                    StockService.change_stock(
-                        product=product,
-                        warehouse=warehouse,
-                        quantity_change=-quantity,
-                        transaction_type='sale',
-                        user=request.user,
-                        content_object=sales_order,
-                        notes=f"POS Sale - SO-{sales_order.id}"
-                    )
+                    stock_movements.append({
+                        'product': product,
+                        'warehouse': warehouse,
+                        'quantity_change': -quantity,
+                        'transaction_type': 'sale',
+                        'user': request.user,
+                        'content_object': sales_order,
+                        'notes': f"POS Sale - SO-{sales_order.id}",
+                    })
                     
                     total_amount += order_item.subtotal
 
+                # সব লাইনের স্টক একবারে আপডেট করা হচ্ছে; আইটেম ও মুভমেন্ট এক-এক করে মেলে
+                posted = StockService.apply_movements(stock_movements)
+                for order_item, inventory_transaction in zip(order_items, posted):
+                    order_item.cost_price = inventory_transaction.unit_cost
+                SalesOrderItem.objects.bulk_create(order_items)
+                # bulk_create এ post_save সিগন্যাল চলে না, তাই রোলআপ রিফ্রেশ এখানেই নির্ধারণ করা হচ্ছে
+                SalesRollupService.schedule_refresh(
+                    timezone.localdate(sales_order.order_date), warehouse.pk, {item.product_id for item in order_items}
+                )
+
                 sales_order.total_amount = total_amount
                 sales_order.save()
 
@@ -100,42 +118,13 @@ def pos_view(request):
             return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
     # --- AJAX GET অনুরোধ (প্রোডাক্ট লোড করার জন্য) ---
-    # আপনার পুরোনো এবং সঠিক লজিকটি এখানে অক্ষুণ্ণ রাখা হয়েছে।
+    # পুরোনো ক্লায়েন্টের জন্য রাখা হয়েছে; ডেটা আসে ভার্সন করা ক্যাটালগ স্ন্যাপশট থেকে (pos_catalog_view দেখুন)
     if request.headers.get('x-requested-with') == 'XMLHttpRequest':
-        user_warehouse = getattr(request.user, 'warehouse', None)
-        products_qs = Product.objects.filter(is_active=True)
-
-        if not request.user.is_superuser:
-            if not user_warehouse:
-                return JsonResponse({'products': [], 'error': 'No warehouse assigned.'}, status=400)
-            products_qs = products_qs.filter(stocks__warehouse=user_warehouse, stocks__quantity__gt=0).distinct()
-            products_qs = products_qs.annotate(
-                current_stock=Coalesce(Sum('stocks__quantity', filter=Q(stocks__warehouse=user_warehouse)), 0)
-            )
-        else:
-            products_qs = products_qs.annotate(
-                current_stock=Coalesce(Sum('stocks__quantity'), 0)
-            )
-
-        products_data = []
-        for product in products_qs.order_by('name'):
-            if product.current_stock > 0:
-                image_url = ''
-                try:
-                    if product.image and hasattr(product.image, 'url'):
-                        image_url = product.image.url
-                except Exception:
-                    image_url = '/static/images/placeholder.png' # একটি ডিফল্ট ইমেজ পাথ
-                
-                products_data.append({
-                    'id': product.id,
-                    'name': product.name,
-                    'code': product.product_code,
-                    'sale_price': float(product.sale_price), # 'price' এর পরিবর্তে 'sale_price'
-                    'image_url': image_url,
-                    'current_stock': product.current_stock,
-                })
-        return JsonResponse({'products': products_data})
+        scope = catalog.scope_for(request.user)
+        if scope is None:
+            return JsonResponse({'products': [], 'error': 'No warehouse assigned.'}, status=400)
+        _, body = catalog.snapshot(scope)
+        return HttpResponse(body, content_type='application/json')
     
     # --- সাধারণ GET অনুরোধ (POS পেজ লোড) ---
     context = {
@@ -146,6 +135,41 @@ def pos_view(request):
     return render(request, 'pos/pos.html', context)
 
 
+@gzip_page
+@require_GET
+@login_required
+def pos_catalog_view(request):
+    """
+    টিলের জন্য ক্যাটালগ। since ছাড়া পুরো স্ন্যাপশট, ?since=<version> দিলে শুধু তার পরের পরিবর্তন।
+    ETag মিলে গেলে 304 ফেরত যায়, তাই কিছু না বদলালে পোলিং এর খরচ শুধু একটি ভার্সন কুয়েরি।
+    """
+    scope = catalog.scope_for(request.user)
+    if scope is None:
+        return JsonResponse({'products': [], 'error': 'No warehouse assigned.'}, status=400)
+
+    current = catalog.version(scope)
+    since = request.GET.get('since')
+    try:
+        since = int(since) if since not in (None, '') else None
+    except ValueError:
+        since = None
+    # ভবিষ্যতের ভার্সন (যেমন ডাটাবেস রিস্টোরের পরে) বা prune হয়ে যাওয়া পুরনো ভার্সন পেলে পুরো স্ন্যাপশট দেওয়া হয়
+    if since is not None and (since > current or since < catalog.compacted_version()):
+        since = None
+
+    etag = catalog.etag(scope, current, since)
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        if since is None:
+            _, body = catalog.snapshot(scope)
+        else:
+            _, body = catalog.delta(scope, since)
+        response = HttpResponse(body, content_type='application/json')
+    response.headers['ETag'] = etag
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 @csrf_protect
 @login_required
 def pos_checkout_view(request):
@@ -166,40 +190,43 @@ def pos_checkout_view(request):
                 )
                 
                 total_amount = 0
+                stock_movements = []
+                # পুরো কার্টের লট বরাদ্দ একটি কুয়েরিতে (একই প্রোডাক্ট একাধিক লাইনে থাকলেও সঠিকভাবে)
+                products = Product.objects.in_bulk({item['id'] for item in cart_data})
+                lines = []
                 for item in cart_data:
-                    product = get_object_or_404(Product, id=item['id'])
-                    quantity_sold = Decimal(item['quantity'])
-                    
-                    available_lots = LotSerialNumber.objects.filter(
-                        product=product, location__warehouse=user_warehouse, quantity__gt=0
-                    ).order_by('expiration_date', 'created_at')
-
-                    if (available_lots.aggregate(total=Sum('quantity'))['total'] or 0) < quantity_sold:
-                        raise ValueError(f"Insufficient stock for {product.name}.")
-
-                    remaining_qty_to_sell = quantity_sold
-                    for lot in available_lots:
-                        if remaining_qty_to_sell <= 0: break
-                        
-                        qty_from_this_lot = min(lot.quantity, remaining_qty_to_sell)
+                    if item['id'] not in products:
+                        raise ValueError("Product not found.")
+                    lines.append((products[item['id']], Decimal(item['quantity'])))
+                allocation_plan = LotAllocator.allocate(user_warehouse, lines)
 
+                order_items = []
+                for item, (product, _), picks in zip(cart_data, lines, allocation_plan):
+                    for lot, qty_from_this_lot in picks:
                         # --- মূল পরিবর্তন: SalesOrderItem-এর সাথে লট এবং cost_price সেভ করা ---
-                        SalesOrderItem.objects.create(
-                            sales_order=sales_order, 
-                            product=product, 
+                        order_items.append(SalesOrderItem(
+                            sales_order=sales_order,
+                            product=product,
                             quantity=qty_from_this_lot,
                             unit_price=item['sale_price'],
-                            cost_price=product.cost_price,  # <-- এই লাইনটি যোগ করা হয়েছে
+                            cost_price=product.cost_price,
                             lot_serial=lot
-                        )
-
-                        StockService.change_stock(
-                            product=product, warehouse=user_warehouse, quantity_change=-qty_from_this_lot,
-                            transaction_type='sale', user=request.user, content_object=sales_order,
-                            location=lot.location, lot_serial=lot, notes=f"POS Sale SO-{sales_order.id}"
-                        )
-                        remaining_qty_to_sell -= qty_from_this_lot
-                
+                        ))
+                    stock_movements.extend(LotAllocator.movements(
+                        picks, product, user_warehouse, 'sale', request.user,
+                        content_object=sales_order, notes=f"POS Sale SO-{sales_order.id}"
+                    ))
+                # পুরো বাস্কেটের স্টক ও লট একবারে লক করে আপডেট করা হচ্ছে
+                posted = StockService.apply_movements(stock_movements)
+                # প্রতিটি আইটেমের একটি মুভমেন্ট; খরচ নেওয়া হয় কস্ট লেয়ার থেকে পাওয়া ইউনিট খরচ
+                for order_item, inventory_transaction in zip(order_items, posted):
+                    order_item.cost_price = inventory_transaction.unit_cost
+                SalesOrderItem.objects.bulk_create(order_items)
+                # bulk_create এ post_save সিগন্যাল চলে না, তাই রোলআপ রিফ্রেশ এখানেই নির্ধারণ করা হচ্ছে
+                SalesRollupService.schedule_refresh(
+                    timezone.localdate(sales_order.order_date), user_warehouse.pk, {item.product_id for item in order_items}
+                )
+
                 total_amount = sum(Decimal(i['quantity']) * Decimal(i['sale_price']) for i in cart_data)
                 sales_order.total_amount = total_amount
                 sales_order.save()
@@ -212,6 +239,37 @@ def pos_checkout_view(request):
     return JsonResponse({'status': 'error'}, status=400)
 
 
+@csrf_protect
+@login_required
+def pos_sync_sales_view(request):
+    """
+    অফলাইনে জমানো বিক্রির ব্যাচ আপলোড: {"sales": [{"key": ..., "cart": [...], ...}, ...]}।
+    প্রতিটি বিক্রির ফলাফল আলাদাভাবে ফেরত যায়; একই key আবার পাঠালে 'duplicate' ও আগের order_id পাওয়া যায়।
+    """
+    if request.method != 'POST':
+        return JsonResponse({'status': 'error', 'message': 'Invalid request method.'}, status=405)
+
+    user_warehouse = getattr(request.user, 'warehouse', None)
+    if not user_warehouse:
+        return JsonResponse({'status': 'error', 'message': 'No warehouse assigned.'}, status=400)
+
+    try:
+        sales = json.loads(request.body).get('sales')
+    except (ValueError, AttributeError):
+        sales = None
+    if not isinstance(sales, list) or not sales:
+        return JsonResponse({'status': 'error', 'message': 'No sales to upload.'}, status=400)
+    if len(sales) > MAX_BATCH_SIZE:
+        return JsonResponse({'status': 'error', 'message': f'At most {MAX_BATCH_SIZE} sales per batch.'}, status=400)
+
+    try:
+        results = OfflineSaleService.post_batch(sales, request.user, user_warehouse)
+    except ValueError as e:
+        # স্টক পোস্টিং ব্যর্থ হলে পুরো ব্যাচ বাতিল হয়; টিল একই key দিয়ে আবার পাঠাতে পারবে
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=409)
+    return JsonResponse({'status': 'success', 'results': results})
+
+
 @login_required
 def pos_add_to_cart(request):
     if request.method == 'POST':
@@ -0,0 +1,129 @@
+# products/barcodes.py
+
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import barcode
+from barcode.writer import ImageWriter
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import connection
+
+from inventory_system.transactions import on_commit_batch
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# একটি worker কাজে কতগুলো প্রোডাক্টের বারকোড তৈরি হবে
+BATCH_SIZE = 200
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def render_png(product_code):
+    """product_code এর Code128 বারকোড PNG (python-barcode + Pillow) এর bytes।"""
+    buffer = BytesIO()
+    barcode.get_barcode_class('code128')(product_code, writer=ImageWriter()).write(buffer)
+    return buffer.getvalue()
+
+
+def batches(product_ids, batch_size=BATCH_SIZE):
+    product_ids = list(product_ids)
+    return [product_ids[start:start + batch_size] for start in range(0, len(product_ids), batch_size)]
+
+
+def _worker_pool():
+    """প্রসেসে একটিই thread pool, প্রথমবার দরকার হলে তৈরি হয়।"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=settings.BARCODE_WORKERS, thread_name_prefix='barcodes')
+    return _pool
+
+
+class BarcodeService:
+    """
+    প্রোডাক্টের বারকোড ছবি (media/barcodes/<product_code>.png) তৈরি করে। Product.save() শুধু প্রোডাক্টটিকে
+    তালিকায় রাখে; ট্রানজেকশন কমিটের পরে পুরো তালিকা ব্যাচে ভাগ হয়ে worker pool এ তৈরি হয়, তাই সেভ বা
+    ইমপোর্টের সময় ছবি রেন্ডারিং এর খরচ লাগে না। কোনোটি ব্যর্থ হলে বা প্রসেস থেমে গেলে
+    `generate_barcodes --missing-only` বাকিগুলো তৈরি করে।
+    """
+
+    @staticmethod
+    def schedule(product_ids, stale_files=()):
+        """
+        product_ids এর বারকোড কমিটের পরে তৈরি হবে; stale_files (পুরনো কোডের ছবি) তখন মুছে ফেলা হবে।
+        দুটি তালিকাই এই ট্রানজেকশনের কলব্যাকের সাথে থাকে, তাই রোলব্যাক হলে কোনো ফাইল মোছে না বা তৈরি হয় না।
+        """
+        def add(pending):
+            pending['product_ids'].update(product_ids)
+            pending['stale_files'].extend(stale_files)
+
+        on_commit_batch(
+            'barcodes', lambda: {'product_ids': set(), 'stale_files': []}, add, BarcodeService._run_scheduled
+        )
+
+    @staticmethod
+    def _run_scheduled(pending):
+        product_ids, stale_files = pending['product_ids'], pending['stale_files']
+        if not product_ids and not stale_files:
+            return
+        jobs = batches(sorted(product_ids)) or [[]]
+        jobs = [(batch, stale_files if index == 0 else ()) for index, batch in enumerate(jobs)]
+
+        # BARCODE_WORKERS = 0 হলে (যেমন টেস্টে) কমিটের পরে একই থ্রেডে তৈরি হয়
+        if settings.BARCODE_WORKERS <= 0:
+            for batch, batch_stale_files in jobs:
+                BarcodeService.generate(batch, batch_stale_files)
+            return
+        pool = _worker_pool()
+        for batch, batch_stale_files in jobs:
+            pool.submit(BarcodeService._generate_in_worker, batch, batch_stale_files)
+
+    @staticmethod
+    def _generate_in_worker(product_ids, stale_files):
+        try:
+            BarcodeService.generate(product_ids, stale_files)
+        except Exception:
+            logger.exception("Barcode batch failed for products %s", product_ids)
+        finally:
+            # worker থ্রেডের নিজের ডেটাবেস কানেকশন
+            connection.close()
+
+    @staticmethod
+    def generate(product_ids, stale_files=()):
+        """
+        product_ids এর বারকোড ছবি তৈরি করে এবং barcode ফিল্ড আপডেট করে; (তৈরি হওয়া সংখ্যা, ব্যর্থ id এর list)
+        ফেরত দেয়। একই নামের পুরনো ফাইল প্রতিস্থাপিত হয়, আর আগের অন্য নামের ফাইল মুছে যায়। ছবি তৈরির মধ্যে
+        product_code বদলে গেলে সেই প্রোডাক্টের ফিল্ড আপডেট হয় না (নতুন কোডের কাজ আলাদাভাবে আসবে)।
+        """
+        field = Product._meta.get_field('barcode')
+        storage = field.storage
+        products = Product.objects.filter(pk__in=product_ids).exclude(product_code__isnull=True).exclude(
+            product_code=''
+        ).only('pk', 'product_code', 'barcode')
+
+        generated, failed = 0, []
+        for product in products:
+            try:
+                png = render_png(product.product_code)
+            except Exception:
+                logger.exception("Could not generate barcode for %s", product.product_code)
+                failed.append(product.pk)
+                continue
+            name = field.generate_filename(product, f'{product.product_code}.png')
+            if storage.exists(name):
+                storage.delete(name)
+            saved_name = storage.save(name, ContentFile(png))
+            if Product.objects.filter(pk=product.pk, product_code=product.product_code).update(barcode=saved_name):
+                generated += 1
+                previous_name = product.barcode.name
+                if previous_name and previous_name != saved_name:
+                    storage.delete(previous_name)
+
+        for name in stale_files:
+            storage.delete(name)
+        return generated, failed
@@ -0,0 +1,128 @@
+# products/labels.py
+
+import functools
+
+from reportlab.graphics import renderPDF
+from reportlab.graphics.barcode import createBarcodeDrawing
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.units import inch, mm
+from reportlab.lib.utils import simpleSplit
+from reportlab.pdfgen import canvas
+
+from .models import Product
+
+# লেবেলের নকশা এই মাপে (থার্মাল রোলের লেবেল) করা; অন্য মাপের লেবেলে পুরোটা সমান অনুপাতে ছোট/বড় হয়
+LABEL_WIDTH, LABEL_HEIGHT = 2.25 * inch, 1.25 * inch
+LABEL_PADDING = 0.1 * inch
+BARCODE_WIDTH, BARCODE_HEIGHT = 1.8 * inch, 0.4 * inch
+BARCODE_Y = 0.42 * inch
+# প্রসেসে কতগুলো বারকোড drawing মেমোরিতে রাখা হবে
+BARCODE_CACHE_SIZE = 4096
+
+
+class LabelTemplate:
+    """একটি পেজে লেবেল কীভাবে সাজানো হবে: পেজের মাপ, লেবেলের মাপ, কলাম/রো এবং মার্জিন ও ফাঁক।"""
+
+    def __init__(self, title, pagesize, label_size, columns=1, rows=1, margins=(0, 0), gaps=(0, 0)):
+        self.title = title
+        self.pagesize = pagesize
+        self.label_width, self.label_height = label_size
+        self.columns = columns
+        self.rows = rows
+        self.left_margin, self.top_margin = margins
+        self.column_gap, self.row_gap = gaps
+
+    @property
+    def per_page(self):
+        return self.columns * self.rows
+
+    @property
+    def scale(self):
+        return min(self.label_width / LABEL_WIDTH, self.label_height / LABEL_HEIGHT)
+
+    def position(self, slot):
+        """পেজের slot নম্বর লেবেলের নিচের-বাম কোণ (বাম থেকে ডানে, উপর থেকে নিচে সাজানো)।"""
+        row, column = divmod(slot, self.columns)
+        x = self.left_margin + column * (self.label_width + self.column_gap)
+        y = self.pagesize[1] - self.top_margin - (row + 1) * self.label_height - row * self.row_gap
+        return x, y
+
+
+LABEL_TEMPLATES = {
+    'thermal': LabelTemplate('Thermal roll (2.25" x 1.25")', (LABEL_WIDTH, LABEL_HEIGHT), (LABEL_WIDTH, LABEL_HEIGHT)),
+    'a4_3x8': LabelTemplate('A4 sheet, 24 labels (70 x 37 mm)', A4, (70 * mm, 37 * mm), columns=3, rows=8, margins=(0, 0.5 * mm)),
+    'a4_4x10': LabelTemplate('A4 sheet, 40 labels (48.5 x 25.4 mm)', A4, (48.5 * mm, 25.4 * mm), columns=4, rows=10, margins=(8 * mm, 21.5 * mm)),
+}
+DEFAULT_LABEL_TEMPLATE = 'thermal'
+LABEL_TEMPLATE_CHOICES = [(key, template.title) for key, template in LABEL_TEMPLATES.items()]
+
+
+@functools.lru_cache(maxsize=BARCODE_CACHE_SIZE)
+def barcode_drawing(value):
+    """product_code এর Code128 বারকোড, ভেক্টর Drawing হিসেবে; প্রতিটি কোড প্রসেসে একবারই তৈরি হয়।"""
+    return createBarcodeDrawing(
+        'Code128', value=value, width=BARCODE_WIDTH, height=BARCODE_HEIGHT, humanReadable=False
+    )
+
+
+def load_label_items(quantities):
+    """
+    quantities: {product_id: কপি সংখ্যা}। সব প্রোডাক্ট একটি কুয়েরিতে আনে এবং নির্বাচনের ক্রমে
+    (product, copies) ফেরত দেয়; product_code ছাড়া বা না পাওয়া প্রোডাক্ট বাদ যায়।
+    """
+    products = Product.objects.filter(pk__in=list(quantities), product_code__isnull=False).exclude(
+        product_code=''
+    ).only('name', 'product_code', 'sale_price').in_bulk()
+    return [(products[pk], copies) for pk, copies in quantities.items() if pk in products and copies > 0]
+
+
+def _draw_label(pdf, product, currency):
+    """একটি লেবেল LABEL_WIDTH x LABEL_HEIGHT মাপে আঁকে: নাম, বারকোড, কোড ও দাম।"""
+    name = product.name or ''
+    font_size, leading = (6, 7) if len(name) > 30 else (7, 8)
+    lines = simpleSplit(name, 'Helvetica', font_size, LABEL_WIDTH - 2 * LABEL_PADDING)[:2]
+    pdf.setFont('Helvetica', font_size)
+    y = LABEL_HEIGHT - LABEL_PADDING - font_size
+    for line in lines:
+        pdf.drawCentredString(LABEL_WIDTH / 2, y, line)
+        y -= leading
+
+    renderPDF.draw(barcode_drawing(product.product_code), pdf, (LABEL_WIDTH - BARCODE_WIDTH) / 2, BARCODE_Y)
+
+    pdf.setFont('Helvetica', 7)
+    pdf.drawString(LABEL_PADDING, LABEL_PADDING, product.product_code)
+    pdf.setFont('Helvetica-Bold', 10)
+    pdf.drawRightString(LABEL_WIDTH - LABEL_PADDING, LABEL_PADDING, f"{currency}{product.sale_price:.2f}")
+
+
+def render_labels(items, output, template=LABEL_TEMPLATES[DEFAULT_LABEL_TEMPLATE], currency=''):
+    """
+    (product, copies) এর লেবেল template অনুযায়ী output এ PDF হিসেবে লেখে। প্রতিটি প্রোডাক্টের লেবেল
+    একবার একটি PDF form এ আঁকা হয়, তারপর প্রতিটি কপি শুধু সেই form বসায়; তাই হাজার কপিতেও
+    ফাইল ও সময় প্রায় প্রোডাক্ট সংখ্যার উপর নির্ভর করে। মোট লেবেল সংখ্যা ফেরত দেয়।
+    """
+    pdf = canvas.Canvas(output, pagesize=template.pagesize)
+    scale = template.scale
+    # লেবেলের ঘরের মাঝখানে বসানোর জন্য
+    offset_x = (template.label_width - LABEL_WIDTH * scale) / 2
+    offset_y = (template.label_height - LABEL_HEIGHT * scale) / 2
+    slot = 0
+    for product, copies in items:
+        form_name = f'label_{product.pk}'
+        pdf.beginForm(form_name, 0, 0, LABEL_WIDTH, LABEL_HEIGHT)
+        _draw_label(pdf, product, currency)
+        pdf.endForm()
+        for _ in range(copies):
+            if slot == template.per_page:
+                pdf.showPage()
+                slot = 0
+            x, y = template.position(slot)
+            pdf.saveState()
+            pdf.translate(x + offset_x, y + offset_y)
+            pdf.scale(scale, scale)
+            pdf.doForm(form_name)
+            pdf.restoreState()
+            slot += 1
+    pdf.showPage()
+    pdf.save()
+    return sum(copies for _, copies in items)
@@ -0,0 +1,66 @@
+# products/management/commands/generate_barcodes.py
+
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+# --workers দিলে এই মডিউল spawn করা চাইল্ড প্রসেসেও ইম্পোর্ট হয়, তাই মডেল নির্ভর ইম্পোর্টগুলো ফাংশনের ভিতরে রাখা হয়েছে
+
+
+def _init_worker():
+    # spawn করা প্রসেসে Django আবার সেটআপ করতে হয়
+    django.setup()
+
+
+def _generate_batch(product_ids):
+    from products.barcodes import BarcodeService
+    return BarcodeService.generate(product_ids)
+
+
+class Command(BaseCommand):
+    help = 'Generates Code128 barcode images for products in batches, optionally across several processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--missing-only', action='store_true', help='Only products that have no barcode image yet.')
+        parser.add_argument('--batch-size', type=int, default=200, help='Products rendered per batch.')
+        parser.add_argument('--workers', type=int, default=1, help='Render batches in this many processes.')
+
+    def handle(self, *args, **options):
+        from products.barcodes import BarcodeService, batches
+        from products.models import Product
+
+        products = Product.objects.exclude(product_code__isnull=True).exclude(product_code='')
+        if options['missing_only']:
+            products = products.filter(Q(barcode__isnull=True) | Q(barcode=''))
+        jobs = batches(products.order_by('pk').values_list('pk', flat=True), max(1, options['batch_size']))
+        if not jobs:
+            self.stdout.write(self.style.WARNING("No products need a barcode."))
+            return
+
+        workers = max(1, min(options['workers'], len(jobs)))
+        self.stdout.write(f"Generating barcodes in {len(jobs)} batch(es) with {workers} worker(s)...")
+        generated, failed = 0, []
+
+        if workers == 1:
+            for batch in jobs:
+                batch_generated, batch_failed = BarcodeService.generate(batch)
+                generated += batch_generated
+                failed += batch_failed
+                self.stdout.write(f"Generated {generated} barcodes (up to product #{batch[-1]}).")
+        else:
+            # fork এর বদলে spawn, যাতে প্যারেন্টের ডেটাবেস কানেকশন চাইল্ড প্রসেসে শেয়ার না হয়
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+                futures = [pool.submit(_generate_batch, batch) for batch in jobs]
+                for future in as_completed(futures):
+                    batch_generated, batch_failed = future.result()
+                    generated += batch_generated
+                    failed += batch_failed
+                    self.stdout.write(f"Generated {generated} barcodes.")
+
+        if failed:
+            self.stdout.write(self.style.ERROR(f"Could not generate barcodes for product ids: {', '.join(map(str, sorted(failed)))}"))
+        self.stdout.write(self.style.SUCCESS(f"Barcode generation complete. Generated {generated} barcodes."))
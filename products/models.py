@@ -1,10 +1,6 @@
 # products/models.py
 
 from django.db import models
-from io import BytesIO
-from django.core.files import File
-import barcode
-from barcode.writer import ImageWriter
 from django.db.models import Sum # এটি স্টক স্ট্যাটাস আপডেটের জন্য প্রয়োজন
 from django.core.exceptions import ValidationError # Custom validation এর জন্য (যদি আপনি clean মেথড ব্যবহার করেন)
 from django.utils.translation import gettext_lazy as _ # Custom validation এর জন্য (যদি আপনি clean মেথড ব্যবহার করেন)
@@ -124,22 +120,34 @@ class Product(models.Model):
             return f"{self.name} ({self.product_code})"
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # save() এ product_code বদলেছে কিনা বোঝার জন্য লোড হওয়া মান রাখা হয় (ফিল্ডটি deferred না হলে)
+        if 'product_code' in instance.__dict__:
+            instance._loaded_product_code = instance.product_code
+        return instance
+
     def save(self, *args, **kwargs):
-        # বারকোড তৈরির লজিক: যদি barcode ফিল্ড খালি থাকে এবং product_code থাকে
-        if not self.barcode and self.product_code:
-            try:
-                Code128 = barcode.get_barcode_class('code128')
-                code = Code128(self.product_code, writer=ImageWriter())
-                buffer = BytesIO()
-                code.write(buffer)
-                self.barcode.save(f'{self.product_code}.png', File(buffer), save=False)
-            except Exception as e:
-                print(f"Error generating barcode for {self.product_code}: {e}")
-                # আপনি চাইলে এখানে একটি error message যোগ করতে পারেন বা log করতে পারেন।
+        # product_code বদলালে পুরনো বারকোড আর ঠিক নয়: ফিল্ড খালি করা হয় এবং পুরনো ফাইল পরে মুছে যায়
+        stale_files = []
+        if not self._state.adding and hasattr(self, '_loaded_product_code') and self.product_code != self._loaded_product_code:
+            if self.barcode:
+                stale_files.append(self.barcode.name)
+                self.barcode = None
+                if kwargs.get('update_fields') is not None:
+                    kwargs['update_fields'] = {*kwargs['update_fields'], 'barcode'}
 
         # স্টক স্ট্যাটাস আপডেট করার লজিকটি এখন সিগনাল দ্বারা পরিচালিত হবে।
         # তাই এটি save() মেথড থেকে সরানো হয়েছে।
         super().save(*args, **kwargs)
+        self._loaded_product_code = self.product_code
+
+        # বারকোড ছবি এখানে তৈরি হয় না; কমিটের পরে BarcodeService ব্যাচে তৈরি করে
+        needs_barcode = bool(self.product_code) and not self.barcode
+        if needs_barcode or stale_files:
+            from .barcodes import BarcodeService # circular import এড়াতে এখানে ইম্পোর্ট
+            BarcodeService.schedule([self.pk] if needs_barcode else [], stale_files)
     
     class Meta:
         db_table = 'inventory_product'
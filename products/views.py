@@ -21,6 +21,8 @@ from partners.models import Supplier, Customer
 from products.models import Product
 from stock.models import Stock
 from stock.models import Warehouse
+from inventory_system.pdf import build_pdf, get_styles, render_response
+from .labels import DEFAULT_LABEL_TEMPLATE, LABEL_TEMPLATE_CHOICES, LABEL_TEMPLATES, load_label_items, render_labels
 
 # Standard Library Imports
 from io import BytesIO
@@ -37,24 +39,21 @@ from openpyxl.styles import Font, Alignment
 from PIL import Image as PillowImage
 
 # Third-Party Imports for PDF Export
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image as RLImage
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.pagesizes import A4
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_RIGHT
 
 DEFAULT_CURRENCY_SYMBOL = 'QAR '
 
-def apply_product_filters(request, base_queryset):
+def apply_product_filters(params, base_queryset):
     """
     এই কেন্দ্রীয় ফাংশনটি এখন স্টক স্ট্যাটাস অনুযায়ী সঠিকভাবে ফিল্টার করবে।
     """
-    query = request.GET.get('q')
-    category_id = request.GET.get('category')
-    brand_id = request.GET.get('brand')
-    status = request.GET.get('status')
-    warehouse_id = request.GET.get('warehouse')
+    query = params.get('q')
+    category_id = params.get('category')
+    brand_id = params.get('brand')
+    status = params.get('status')
+    warehouse_id = params.get('warehouse')
 
     filtered_queryset = base_queryset
     
@@ -99,7 +98,7 @@ def product_list(request):
     ).order_by('name')
 
     # --- নতুন: কেন্দ্রীয় ফিল্টার ফাংশনকে কল করা হয়েছে ---
-    filtered_products = apply_product_filters(request, products_query)
+    filtered_products = apply_product_filters(request.GET, products_query)
 
     # পেজিনেশন
     paginator = Paginator(filtered_products, 15) # আপনার পছন্দমত সংখ্যা দিন
@@ -114,6 +113,7 @@ def product_list(request):
         'product_statuses': Product.STATUS_CHOICES,
         'all_warehouses': Warehouse.objects.all().order_by('name'),
         'DEFAULT_CURRENCY_SYMBOL': 'QAR ', # আপনার কারেন্সি সিম্বল
+        'label_templates': LABEL_TEMPLATE_CHOICES,
     }
     return render(request, 'products/product_list.html', context)
 
@@ -301,7 +301,7 @@ def export_products_excel(request):
     ).order_by('name')
 
     # নিচের অংশ প্রায় অপরিবর্তিত থাকবে
-    filtered_products = apply_product_filters(request, products_query)
+    filtered_products = apply_product_filters(request.GET, products_query)
 
     report_branch_info = "All Branches"
     warehouse_id = request.GET.get('warehouse')
@@ -361,7 +361,10 @@ def export_products_excel(request):
 @login_required
 @permission_required('products.view_product', login_url='/admin/')
 def export_products_pdf(request):
-    user = request.user
+    return render_response(render_products_pdf, request, 'products_inventory.pdf')
+
+
+def render_products_pdf(user, params, output_file):
     user_warehouse = getattr(user, 'warehouse', None)
 
     quantity_annotation_filter = Q()
@@ -372,10 +375,10 @@ def export_products_pdf(request):
         calculated_total_quantity=Coalesce(Sum('stocks__quantity', filter=quantity_annotation_filter), 0)
     ).order_by('name')
 
-    filtered_products = apply_product_filters(request, products_query)
+    filtered_products = apply_product_filters(params, products_query)
     
     report_branch_info = "All Branches"
-    warehouse_id = request.GET.get('warehouse')
+    warehouse_id = params.get('warehouse')
 
     if user.is_superuser and warehouse_id:
         try:
@@ -386,33 +389,25 @@ def export_products_pdf(request):
     elif not user.is_superuser and user_warehouse:
         report_branch_info = f"Branch: {user_warehouse.name}"
 
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=50, bottomMargin=50)
-    styles = getSampleStyleSheet()
+    styles = get_styles()
     story = []
 
-    styles.add(ParagraphStyle(name='ReportHeading', fontSize=18, alignment=TA_CENTER, fontName='Helvetica-Bold', spaceAfter=5))
-    styles.add(ParagraphStyle(name='SubHeading', fontSize=10, alignment=TA_CENTER, spaceAfter=20))
-    styles.add(ParagraphStyle(name='TableHeader', fontSize=8, alignment=TA_CENTER, fontName='Helvetica-Bold'))
-    styles.add(ParagraphStyle(name='TableCell', fontSize=7, alignment=TA_CENTER))
-    styles.add(ParagraphStyle(name='TableCellLeft', fontSize=7, alignment=TA_LEFT))
-
     story.append(Paragraph("Product Inventory Report", styles['ReportHeading']))
     story.append(Paragraph(f"({report_branch_info})", styles['SubHeading']))
     
     table_data = [
-        [Paragraph(h, styles['TableHeader']) for h in ['Product Name', 'SKU', 'Category', 'Brand', 'Cost Price', 'Sale Price', 'Qty']]
+        [Paragraph(h, styles['CompactTableHeader']) for h in ['Product Name', 'SKU', 'Category', 'Brand', 'Cost Price', 'Sale Price', 'Qty']]
     ]
     
     for product in filtered_products:
         table_data.append([
-            Paragraph(product.name, styles['TableCellLeft']),
-            Paragraph(product.product_code or 'N/A', styles['TableCell']),
-            Paragraph(product.category.name if product.category else 'N/A', styles['TableCell']),
-            Paragraph(product.brand.name if product.brand else 'N/A', styles['TableCell']),
-            Paragraph(f"{product.cost_price:.2f}", styles['TableCell']),
-            Paragraph(f"{product.sale_price:.2f}", styles['TableCell']),
-            Paragraph(str(product.calculated_total_quantity), styles['TableCell']),
+            Paragraph(product.name, styles['CompactTableCellLeft']),
+            Paragraph(product.product_code or 'N/A', styles['CompactTableCell']),
+            Paragraph(product.category.name if product.category else 'N/A', styles['CompactTableCell']),
+            Paragraph(product.brand.name if product.brand else 'N/A', styles['CompactTableCell']),
+            Paragraph(f"{product.cost_price:.2f}", styles['CompactTableCell']),
+            Paragraph(f"{product.sale_price:.2f}", styles['CompactTableCell']),
+            Paragraph(str(product.calculated_total_quantity), styles['CompactTableCell']),
         ])
 
     table = Table(table_data, colWidths=[2.5*inch, 1*inch, 1*inch, 0.8*inch, 0.8*inch, 0.8*inch, 0.5*inch])
@@ -425,12 +420,7 @@ def export_products_pdf(request):
     ]))
     
     story.append(table)
-    doc.build(story)
-    
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="products_inventory.pdf"'
-    return response
+    build_pdf(story, output_file, page_numbers=False, rightMargin=30, leftMargin=30, topMargin=50, bottomMargin=50)
 
 @login_required
 def print_product_labels(request):
@@ -440,63 +430,22 @@ def print_product_labels(request):
         if not product_ids:
             return redirect('products:product_list')
 
-        labels_to_print = []
+        # প্রতিটি প্রোডাক্টের কপি সংখ্যা; ভুল id বা সংখ্যা বাদ যায়
+        quantities = {}
         for pid in product_ids:
             try:
-                product = Product.objects.get(id=int(pid))
-                quantity = int(request.POST.get(f'quantity_{pid}', 1))
-                
-                if product.barcode and hasattr(product.barcode, 'path'):
-                    for _ in range(quantity):
-                        labels_to_print.append({
-                            'name': product.name,
-                            'price': f"{product.sale_price:.2f}",
-                            'currency': DEFAULT_CURRENCY_SYMBOL,
-                            'barcode_path': product.barcode.path,
-                            'product_code': product.product_code
-                        })
-            except (Product.DoesNotExist, ValueError):
+                quantities[int(pid)] = int(request.POST.get(f'quantity_{pid}', 1))
+            except ValueError:
                 continue
 
-        if not labels_to_print:
+        # সব প্রোডাক্ট একটি কুয়েরিতে; বারকোড product_code থেকে সরাসরি আঁকা হয়, PNG ফাইল পড়া হয় না
+        label_items = load_label_items(quantities)
+        if not label_items:
             return redirect('products:product_list')
 
-        # --- Thermal Printer-এর জন্য PDF তৈরির প্রক্রিয়া ---
+        template = LABEL_TEMPLATES.get(request.POST.get('label_template'), LABEL_TEMPLATES[DEFAULT_LABEL_TEMPLATE])
         buffer = BytesIO()
-        label_width, label_height = 2.25 * inch, 1.25 * inch
-        doc = SimpleDocTemplate(buffer, pagesize=(label_width, label_height), leftMargin=0.05*inch, rightMargin=0.05*inch, topMargin=0.05*inch, bottomMargin=0.05*inch)
-        story = []
-        
-        for label_data in labels_to_print:
-            product_name = label_data['name']
-            if len(product_name) > 30:
-                 name_style = ParagraphStyle('LabelName', fontSize=6, alignment=TA_CENTER, leading=7)
-            else:
-                 name_style = ParagraphStyle('LabelName', fontSize=7, alignment=TA_CENTER, leading=8)
-
-            inner_table_data = [
-                [Paragraph(product_name, name_style)],
-                [RLImage(label_data['barcode_path'], width=1.8*inch, height=0.4*inch)],
-                [
-                    Paragraph(label_data['product_code'], ParagraphStyle('LabelCode', fontName='Helvetica', fontSize=7, alignment=TA_LEFT)),
-                    Paragraph(f"<b>{label_data['currency']}{label_data['price']}</b>", ParagraphStyle('LabelPrice', fontName='Helvetica-Bold', fontSize=10, alignment=TA_RIGHT))
-                ]
-            ]
-            
-            inner_table = Table(inner_table_data, 
-                                colWidths=[1.025*inch, 1.025*inch], 
-                                rowHeights=[0.25*inch, 0.45*inch, 0.2*inch])
-            
-            inner_table.setStyle(TableStyle([
-                ('SPAN', (0,0), (1,0)), ('SPAN', (0,1), (1,1)),
-                ('ALIGN', (0,0), (-1,-1), 'CENTER'), ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-                ('ALIGN', (0,2), (0,2), 'LEFT'), ('ALIGN', (1,2), (1,2), 'RIGHT'),
-                ('VALIGN', (0,2), (1,2), 'BOTTOM'),
-            ]))
-            
-            story.append(inner_table)
-
-        doc.build(story)
+        render_labels(label_items, buffer, template, currency=DEFAULT_CURRENCY_SYMBOL)
         buffer.seek(0)
         return HttpResponse(buffer, content_type='application/pdf')
 
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from purchase.replenishment import ReplenishmentPlanner
+
+
+class Command(BaseCommand):
+    help = 'Recomputes reorder suggestions per product and warehouse from smoothed demand, stock on hand, open POs and in-transit transfers. Schedule it (e.g. nightly via cron) after rebuild_sales_rollup.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Plan as of this day (YYYY-MM-DD). Defaults to today.')
+
+    def handle(self, *args, **options):
+        today = None
+        if options['date']:
+            today = parse_date(options['date'])
+            if today is None:
+                raise CommandError(f"Invalid --date value: {options['date']}")
+
+        self.stdout.write(self.style.NOTICE('Planning replenishment...'))
+        count = ReplenishmentPlanner.refresh(today)
+        self.stdout.write(self.style.SUCCESS(f'{count} reorder suggestions written.'))
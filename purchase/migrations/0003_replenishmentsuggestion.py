@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:48
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('purchase', '0002_stocktransferrequest_dispatched_lot'),
+        ('stock', '0003_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReplenishmentSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('demand_rate', models.DecimalField(decimal_places=3, default=0, max_digits=12)),
+                ('on_hand', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('on_order', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('in_transit', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('reorder_point', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('suggested_quantity', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('computed_at', models.DateTimeField()),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='replenishment_suggestions', to='products.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='replenishment_suggestions', to='stock.warehouse')),
+            ],
+            options={
+                'db_table': 'inventory_replenishmentsuggestion',
+                'indexes': [models.Index(fields=['warehouse', '-suggested_quantity'], name='inventory_r_warehou_0505c7_idx')],
+                'unique_together': {('product', 'warehouse')},
+            },
+        ),
+    ]
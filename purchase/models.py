@@ -119,4 +119,28 @@ class StockTransferRequest(models.Model):
     class Meta:
         db_table = 'inventory_stock_transfer_request'
         verbose_name = "Stock Transfer Request"
-        verbose_name_plural = "Stock Transfer Requests"
\ No newline at end of file
+        verbose_name_plural = "Stock Transfer Requests"
+
+
+class ReplenishmentSuggestion(models.Model):
+    """
+    plan_replenishment কমান্ড প্রতিবার চালানোর পরে নতুন করে লেখা রি-অর্ডার প্রস্তাব (প্রতি প্রোডাক্ট ও ওয়্যারহাউস)।
+    demand_rate হলো দৈনিক নেট চাহিদার (বিক্রি - রিটার্ন) exponential smoothing গড়।
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='replenishment_suggestions')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='replenishment_suggestions')
+    demand_rate = models.DecimalField(max_digits=12, decimal_places=3, default=0)
+    on_hand = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    on_order = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    in_transit = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    reorder_point = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    suggested_quantity = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.product.name} @ {self.warehouse.name}: {self.suggested_quantity}"
+
+    class Meta:
+        db_table = 'inventory_replenishmentsuggestion'
+        unique_together = ('product', 'warehouse')
+        indexes = [models.Index(fields=['warehouse', '-suggested_quantity'])]
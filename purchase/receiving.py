@@ -0,0 +1,192 @@
+# purchase/receiving.py
+
+import csv
+import io
+from collections import defaultdict
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.dateparse import parse_date
+
+from stock.models import Location, LotSerialNumber
+from stock.services import StockService
+from .models import PurchaseOrder, PurchaseOrderItem
+
+RECEIVABLE_STATUSES = ['confirmed', 'partially_received']
+ASN_COLUMNS = ['product_code', 'quantity', 'location', 'lot_number', 'expiration_date']
+
+
+class PurchaseReceivingService:
+    """
+    একটি PO এর অনেকগুলো লাইন একবারে রিসিভ করে। PO আইটেম একটি কুয়েরিতে আনা হয়, নতুন লট bulk_create হয়,
+    সব স্টক পরিবর্তন StockService.apply_movements এর একটি ব্যাচে যায় এবং quantity_received একটি
+    bulk_update এ লেখা হয়। লাইনের সংখ্যা যাই হোক, কুয়েরির সংখ্যা প্রায় একই থাকে।
+    """
+
+    @staticmethod
+    def receive(purchase_order, lines, user):
+        """
+        lines: dict এর তালিকা, প্রতিটিতে item_id, quantity, location (Location), ঐচ্ছিকভাবে lot_number ও expiration_date।
+        কোনো লাইন ভুল হলে সব লাইনের ভুলসহ ValidationError ওঠে এবং কিছুই সেভ হয় না।
+        রিসিভ হওয়া লাইনের সংখ্যা ফেরত দেয়।
+        """
+        lines = [line for line in lines if line['quantity'] > 0]
+        if not lines:
+            return 0
+
+        with transaction.atomic():
+            purchase_order = PurchaseOrder.objects.select_for_update().get(pk=purchase_order.pk)
+            if purchase_order.status not in RECEIVABLE_STATUSES:
+                raise ValidationError(f"Purchase order {purchase_order.id} is not ready to be received.")
+            items = {item.pk: item for item in purchase_order.items.select_related('product')}
+
+            # --- সব লাইন আগে যাচাই, একাধিক লাইন একই আইটেমের হলে মোট পরিমাণ দেখা হয় ---
+            errors = []
+            requested = defaultdict(Decimal)
+            for number, line in enumerate(lines, start=1):
+                item = items.get(line['item_id'])
+                if item is None:
+                    errors.append(f"Line {number}: item does not belong to PO-{purchase_order.id}.")
+                    continue
+                if line.get('location') is None:
+                    errors.append(f"Line {number}: destination location is required for {item.product.name}.")
+                    continue
+                requested[item.pk] += line['quantity']
+                if requested[item.pk] > item.quantity - (item.quantity_received or 0):
+                    errors.append(f"Line {number}: received quantity for {item.product.name} exceeds remaining quantity.")
+            if errors:
+                raise ValidationError(errors)
+
+            lots = PurchaseReceivingService._ensure_lots(lines, items)
+
+            stock_movements = []
+            for line in lines:
+                item = items[line['item_id']]
+                location = line['location']
+                stock_movements.append({
+                    'product': item.product,
+                    'warehouse': location.warehouse,
+                    'quantity_change': line['quantity'],
+                    'transaction_type': 'purchase',
+                    'user': user,
+                    'content_object': purchase_order,
+                    'location': location,
+                    'lot_serial': lots.get((item.product_id, location.pk, line.get('lot_number'))),
+                    'notes': f"Received PO-{purchase_order.id}",
+                    'unit_cost': item.unit_price,
+                })
+            StockService.apply_movements(stock_movements)
+
+            for item_id, quantity in requested.items():
+                items[item_id].quantity_received = (items[item_id].quantity_received or 0) + quantity
+            PurchaseOrderItem.objects.bulk_update([items[item_id] for item_id in requested], ['quantity_received'])
+
+            # সব আইটেম মেমোরিতেই আছে, তাই স্ট্যাটাসের জন্য আলাদা aggregate লাগে না
+            total_ordered = sum(item.quantity for item in items.values())
+            total_received = sum(item.quantity_received or 0 for item in items.values())
+            purchase_order.status = 'received' if total_received >= total_ordered else 'partially_received'
+            purchase_order.save(update_fields=['status'])
+        return len(lines)
+
+    @staticmethod
+    def _ensure_lots(lines, items):
+        """ট্র্যাক করা প্রোডাক্টের লাইনের লট খুঁজে বের করে, না থাকলে bulk_create করে; (product_id, location_id, lot_number) -> lot।"""
+        wanted = {}
+        for line in lines:
+            item = items[line['item_id']]
+            if item.product.tracking_method in ['lot', 'serial'] and line.get('lot_number'):
+                key = (item.product_id, line['location'].pk, line['lot_number'])
+                wanted.setdefault(key, line.get('expiration_date'))
+        if not wanted:
+            return {}
+
+        def fetch(keys):
+            candidates = LotSerialNumber.objects.filter(
+                product_id__in={key[0] for key in keys},
+                location_id__in={key[1] for key in keys},
+                lot_number__in={key[2] for key in keys},
+            ).select_related('location')
+            return {
+                (lot.product_id, lot.location_id, lot.lot_number): lot
+                for lot in candidates
+                if (lot.product_id, lot.location_id, lot.lot_number) in keys
+            }
+
+        lots = fetch(wanted.keys())
+        missing = wanted.keys() - lots.keys()
+        if missing:
+            LotSerialNumber.objects.bulk_create([
+                LotSerialNumber(
+                    product_id=product_id, location_id=location_id, lot_number=lot_number,
+                    expiration_date=wanted[(product_id, location_id, lot_number)], quantity=0
+                )
+                for product_id, location_id, lot_number in missing
+            ], batch_size=1000, ignore_conflicts=True)
+            lots.update(fetch(missing))
+        return lots
+
+    @staticmethod
+    def parse_asn(purchase_order, stream):
+        """
+        সাপ্লায়ারের ASN/CSV ফাইল (কলাম: product_code, quantity, location, lot_number, expiration_date)
+        receive() এর লাইনে রূপান্তর করে। location কলামে লোকেশনের id অথবা নাম দেওয়া যায়।
+        """
+        text = stream.read()
+        if isinstance(text, bytes):
+            text = text.decode('utf-8-sig')
+        reader = csv.DictReader(io.StringIO(text))
+        missing_columns = {'product_code', 'quantity', 'location'} - set(reader.fieldnames or [])
+        if missing_columns:
+            raise ValidationError(f"Missing columns: {', '.join(sorted(missing_columns))}.")
+        rows = list(reader)
+
+        items_by_code = {}
+        for item in purchase_order.items.select_related('product').order_by('pk'):
+            items_by_code.setdefault(item.product.product_code, item)
+
+        locations = Location.objects.select_related('warehouse')
+        if purchase_order.warehouse_id:
+            locations = locations.filter(warehouse_id=purchase_order.warehouse_id)
+        locations_by_id = {}
+        locations_by_name = {}
+        for location in locations:
+            locations_by_id[str(location.pk)] = location
+            locations_by_name.setdefault(location.name.strip().lower(), location)
+
+        errors = []
+        lines = []
+        for number, row in enumerate(rows, start=2):
+            code = (row.get('product_code') or '').strip()
+            item = items_by_code.get(code)
+            if item is None:
+                errors.append(f"Row {number}: product '{code}' is not on PO-{purchase_order.id}.")
+                continue
+            try:
+                quantity = Decimal((row.get('quantity') or '').strip())
+            except InvalidOperation:
+                errors.append(f"Row {number}: invalid quantity.")
+                continue
+            location_value = (row.get('location') or '').strip()
+            location = locations_by_id.get(location_value) or locations_by_name.get(location_value.lower())
+            if location is None:
+                errors.append(f"Row {number}: unknown location '{location_value}'.")
+                continue
+            expiration_value = (row.get('expiration_date') or '').strip()
+            try:
+                expiration_date = parse_date(expiration_value) if expiration_value else None
+            except ValueError:
+                expiration_date = None
+            if expiration_value and expiration_date is None:
+                errors.append(f"Row {number}: invalid expiration date.")
+                continue
+            lines.append({
+                'item_id': item.pk,
+                'quantity': quantity,
+                'location': location,
+                'lot_number': (row.get('lot_number') or '').strip() or None,
+                'expiration_date': expiration_date,
+            })
+        if errors:
+            raise ValidationError(errors)
+        return lines
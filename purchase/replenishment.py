@@ -0,0 +1,204 @@
+# purchase/replenishment.py
+
+import datetime
+import math
+from collections import defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.utils import timezone
+
+from products.models import Product
+from reports.models import DailySalesSummary
+from stock.ledger import StockLedger
+from stock.models import Stock
+from .models import ProductSupplier, PurchaseOrder, PurchaseOrderItem, ReplenishmentSuggestion, StockTransferRequest
+
+OPEN_PO_STATUSES = ['purchase_request', 'draft', 'confirmed', 'partially_received']
+
+
+def smoothed_rate(observations, alpha, until):
+    """
+    (date, quantity) তালিকা (তারিখ অনুযায়ী সাজানো) থেকে until তারিখের exponential smoothing গড়।
+    যেসব দিনে কোনো রো নেই সেগুলো শূন্য চাহিদা; k টি শূন্য দিনের প্রভাব একবারে (1 - alpha) ** k
+    দিয়ে হিসাব হয়, তাই লুপ চলে শুধু যেসব দিনে লেনদেন আছে সেগুলোর উপর।
+    প্রথম লেনদেনের আগের দিনগুলোও শূন্য চাহিদা ধরা হয় (level শুরু হয় 0 থেকে), তাই নতুন বা কম বিক্রির
+    প্রোডাক্টের একটিমাত্র বড় বিক্রি পুরো দৈনিক হার হয়ে যায় না।
+    """
+    level = 0.0
+    last_date = None
+    for date, quantity in observations:
+        if last_date is not None:
+            level *= (1 - alpha) ** (date - last_date).days
+        level += alpha * float(quantity)
+        last_date = date
+    if last_date is None:
+        return 0.0
+    return max(level * (1 - alpha) ** max((until - last_date).days, 0), 0.0)
+
+
+class ReplenishmentPlanner:
+    """
+    প্রতিটি (product, warehouse) এর জন্য চাহিদার হার, হাতে থাকা স্টক, খোলা PO ও পথে থাকা ট্রান্সফার
+    মিলিয়ে রি-অর্ডার প্রস্তাব তৈরি করে। চাহিদা পড়া হয় DailySalesSummary রোলআপ থেকে, তাই পুরো ইতিহাস
+    একটি গ্রুপড কুয়েরিতে আসে।
+    """
+
+    @staticmethod
+    def demand_rates(today=None, alpha=None):
+        """(product_id, warehouse_id) অনুযায়ী দৈনিক নেট চাহিদার (বিক্রি - রিটার্ন) হার।"""
+        today = today or timezone.localdate()
+        alpha = alpha if alpha is not None else getattr(settings, 'REPLENISHMENT_SMOOTHING_ALPHA', 0.2)
+
+        daily = DailySalesSummary.objects.filter(warehouse__isnull=False, date__lte=today).values(
+            'product_id', 'warehouse_id', 'date'
+        ).annotate(
+            sold=Sum('quantity_sold'), returned=Sum('quantity_returned')
+        ).order_by('product_id', 'warehouse_id', 'date').values_list(
+            'product_id', 'warehouse_id', 'date', 'sold', 'returned'
+        )
+
+        series = defaultdict(list)
+        for product_id, warehouse_id, date, sold, returned in daily.iterator(chunk_size=5000):
+            series[(product_id, warehouse_id)].append((date, (sold or 0) - (returned or 0)))
+        return {key: smoothed_rate(observations, alpha, today) for key, observations in series.items()}
+
+    @staticmethod
+    def open_order_quantities():
+        """খোলা PO গুলোতে এখনো না আসা পরিমাণ, (product_id, warehouse_id) অনুযায়ী।"""
+        rows = PurchaseOrderItem.objects.filter(
+            purchase_order__status__in=OPEN_PO_STATUSES, purchase_order__warehouse__isnull=False
+        ).values('product_id', 'purchase_order__warehouse_id').annotate(
+            outstanding=Sum(F('quantity') - F('quantity_received'))
+        ).values_list('product_id', 'purchase_order__warehouse_id', 'outstanding').order_by()
+        return {(product_id, warehouse_id): max(outstanding or 0, 0) for product_id, warehouse_id, outstanding in rows}
+
+    @staticmethod
+    def in_transit_quantities():
+        """পাঠানো হয়েছে কিন্তু গন্তব্যে পৌঁছায়নি এমন ট্রান্সফারের পরিমাণ, গন্তব্য ওয়্যারহাউস অনুযায়ী।"""
+        rows = StockTransferRequest.objects.filter(status='in_transit').values(
+            'product_id', 'destination_warehouse_id'
+        ).annotate(
+            pending=Sum(F('quantity_transferred') - F('quantity_received'))
+        ).values_list('product_id', 'destination_warehouse_id', 'pending').order_by()
+        return {(product_id, warehouse_id): max(pending or 0, 0) for product_id, warehouse_id, pending in rows}
+
+    @staticmethod
+    def plan(today=None):
+        """ReplenishmentSuggestion অবজেক্টের তালিকা (সেভ না করে) ফেরত দেয়; শুধু যেগুলোর প্রস্তাবিত পরিমাণ শূন্যের বেশি।"""
+        lead_time = getattr(settings, 'REPLENISHMENT_LEAD_TIME_DAYS', 7)
+        review_days = getattr(settings, 'REPLENISHMENT_REVIEW_DAYS', 14)
+        now = timezone.now()
+
+        rates = ReplenishmentPlanner.demand_rates(today)
+        on_order = ReplenishmentPlanner.open_order_quantities()
+        in_transit = ReplenishmentPlanner.in_transit_quantities()
+        if StockLedger.enabled():
+            # লেজার মোডে Stock কাউন্টার আপডেট হয় না
+            on_hand = StockLedger.balances(rates.keys())
+        else:
+            on_hand = {
+                (product_id, warehouse_id): quantity
+                for product_id, warehouse_id, quantity in Stock.objects.values_list('product_id', 'warehouse_id', 'quantity')
+            }
+        safety_stock = dict(Product.objects.filter(is_active=True).values_list('pk', 'min_stock_level'))
+
+        suggestions = []
+        for key, rate in rates.items():
+            product_id, warehouse_id = key
+            if product_id not in safety_stock or rate <= 0:
+                continue
+            position = Decimal(on_hand.get(key, 0)) + Decimal(on_order.get(key, 0)) + Decimal(in_transit.get(key, 0))
+            reorder_point = Decimal(math.ceil(rate * lead_time + safety_stock[product_id]))
+            if position > reorder_point:
+                continue
+            target = Decimal(math.ceil(rate * (lead_time + review_days) + safety_stock[product_id]))
+            suggested = target - position
+            if suggested <= 0:
+                continue
+            suggestions.append(ReplenishmentSuggestion(
+                product_id=product_id, warehouse_id=warehouse_id,
+                demand_rate=Decimal(str(round(rate, 3))),
+                on_hand=on_hand.get(key, 0), on_order=on_order.get(key, 0), in_transit=in_transit.get(key, 0),
+                reorder_point=reorder_point, suggested_quantity=suggested, computed_at=now,
+            ))
+        return suggestions
+
+    @staticmethod
+    def refresh(today=None):
+        """প্রস্তাবের টেবিল একটি ট্রানজেকশনে নতুন করে লেখে; লেখা রো এর সংখ্যা ফেরত দেয়।"""
+        suggestions = ReplenishmentPlanner.plan(today)
+        with transaction.atomic():
+            ReplenishmentSuggestion.objects.all().delete()
+            ReplenishmentSuggestion.objects.bulk_create(suggestions, batch_size=1000)
+        return len(suggestions)
+
+
+class DraftOrderGenerator:
+    """
+    রি-অর্ডার প্রস্তাব থেকে একবারে PO তৈরি করে: প্রতিটি (পছন্দের সাপ্লায়ার, ওয়্যারহাউস) এর জন্য একটি PO।
+    পছন্দের সাপ্লায়ার হলো ProductSupplier এ সবচেয়ে কম দামের সাপ্লায়ার; না থাকলে প্রোডাক্টের ডিফল্ট
+    সাপ্লায়ার ও cost_price। PO, আইটেম ও total_amount যথাক্রমে bulk_create ও একটি UPDATE দিয়ে লেখা হয়।
+    """
+
+    @staticmethod
+    def preferred_suppliers(product_ids):
+        """product_id -> (supplier_id, unit_price)।"""
+        preferred = {}
+        prices = ProductSupplier.objects.filter(product_id__in=product_ids).order_by(
+            'product_id', 'price', 'supplier_id'
+        ).values_list('product_id', 'supplier_id', 'price')
+        for product_id, supplier_id, price in prices:
+            preferred.setdefault(product_id, (supplier_id, price))
+        return preferred
+
+    @staticmethod
+    def generate(suggestions, user, status='draft', expected_delivery_date=None):
+        """
+        suggestions: ReplenishmentSuggestion queryset। status='purchase_request' দিলে (ব্রাঞ্চ ইউজার)
+        সাপ্লায়ার ফাঁকা রাখা হয় এবং প্রতি ওয়্যারহাউসে একটি রিকোয়েস্ট হয়। ব্যবহৃত প্রস্তাবগুলো মুছে ফেলা হয়।
+        তৈরি হওয়া PO গুলোর তালিকা ফেরত দেয়।
+        """
+        expected_delivery_date = expected_delivery_date or (
+            timezone.localdate() + datetime.timedelta(days=getattr(settings, 'REPLENISHMENT_LEAD_TIME_DAYS', 7))
+        )
+        with transaction.atomic():
+            rows = list(suggestions.select_for_update(of=('self',)).values_list(
+                'pk', 'product_id', 'warehouse_id', 'suggested_quantity', 'product__supplier_id', 'product__cost_price'
+            ))
+            if not rows:
+                return []
+            preferred = DraftOrderGenerator.preferred_suppliers({row[1] for row in rows})
+
+            groups = defaultdict(list)
+            for pk, product_id, warehouse_id, quantity, default_supplier_id, cost_price in rows:
+                supplier_id, unit_price = preferred.get(product_id, (default_supplier_id, cost_price or 0))
+                if status == 'purchase_request':
+                    supplier_id = None
+                groups[(supplier_id, warehouse_id)].append((product_id, quantity, unit_price))
+
+            group_keys = sorted(groups, key=lambda key: (key[1], key[0] or 0))
+            orders = PurchaseOrder.objects.bulk_create([
+                PurchaseOrder(
+                    supplier_id=supplier_id, warehouse_id=warehouse_id, user=user, status=status,
+                    expected_delivery_date=expected_delivery_date,
+                    notes="Generated from replenishment suggestions."
+                )
+                for supplier_id, warehouse_id in group_keys
+            ])
+            PurchaseOrderItem.objects.bulk_create([
+                PurchaseOrderItem(purchase_order=order, product_id=product_id, quantity=quantity, unit_price=unit_price)
+                for order, key in zip(orders, group_keys)
+                for product_id, quantity, unit_price in groups[key]
+            ], batch_size=1000)
+
+            order_ids = [order.pk for order in orders]
+            PurchaseOrder.objects.filter(pk__in=order_ids).update(total_amount=Subquery(
+                PurchaseOrderItem.objects.filter(purchase_order=OuterRef('pk')).values('purchase_order').annotate(
+                    total=Sum(F('quantity') * F('unit_price'))
+                ).values('total')
+            ))
+            ReplenishmentSuggestion.objects.filter(pk__in=[row[0] for row in rows]).delete()
+        return orders
@@ -1,14 +1,23 @@
 # purchase/tests.py
 
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.utils import timezone
 from datetime import timedelta
 from django.db.models import Sum # নিশ্চিত করুন এই লাইনটি আছে
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
 
 # Local Application Imports
-from .models import ProductSupplier, PurchaseOrder, PurchaseOrderItem
+from .models import ProductSupplier, PurchaseOrder, PurchaseOrderItem, ReplenishmentSuggestion, StockTransferRequest
+from .receiving import PurchaseReceivingService
+from .replenishment import DraftOrderGenerator, ReplenishmentPlanner, smoothed_rate
 from products.models import Product, Category, UnitOfMeasure, UnitOfMeasureCategory
 from partners.models import Supplier
+from reports.models import DailySalesSummary
+from stock.models import Location, LotSerialNumber, Stock, Warehouse
+from stock.services import StockService
 
 # ProductSupplier মডেলের জন্য টেস্ট কেস।
 class ProductSupplierModelTest(TestCase):
@@ -187,3 +196,204 @@ class PurchaseOrderItemModelTest(TestCase):
         self.purchase_order.save()
         self.purchase_order.refresh_from_db()
         self.assertAlmostEqual(float(self.purchase_order.total_amount), 160.00) # 100 + 60 = 160
+
+
+class ReplenishmentPlannerTest(TestCase):
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name="Main Store")
+        self.other_warehouse = Warehouse.objects.create(name="Hub")
+        category = Category.objects.create(name="Grocery")
+        uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.product = Product.objects.create(
+            name="Rice", product_code="RI001", category=category, price=3.00,
+            unit_of_measure=unit_of_measure, min_stock_level=0
+        )
+        self.today = timezone.localdate()
+
+    def test_smoothed_rate_treats_missing_days_as_zero_demand(self):
+        observations = [(self.today - timedelta(days=2), 10), (self.today, 10)]
+        # 0 থেকে শুরু: 5 -> 2.5 (গ্যাপের দিন) -> 0.5 * 10 + 0.5 * 2.5
+        self.assertAlmostEqual(smoothed_rate(observations, 0.5, self.today), 6.25)
+        self.assertAlmostEqual(smoothed_rate(observations, 0.5, self.today + timedelta(days=1)), 3.125)
+
+    def test_single_sale_is_not_taken_as_daily_rate(self):
+        DailySalesSummary.objects.create(
+            date=self.today - timedelta(days=1), warehouse=self.warehouse, product=self.product, quantity_sold=100
+        )
+        with self.settings(REPLENISHMENT_SMOOTHING_ALPHA=0.2, REPLENISHMENT_LEAD_TIME_DAYS=7, REPLENISHMENT_REVIEW_DAYS=14):
+            # 0.2 * 100, তারপর একদিন ক্ষয়: 16/দিন (আগে প্রথম দিনের 100 থেকে শুরু হয়ে 80/দিন হতো)
+            self.assertAlmostEqual(ReplenishmentPlanner.demand_rates(self.today)[(self.product.pk, self.warehouse.pk)], 16)
+            ReplenishmentPlanner.refresh(self.today)
+        self.assertEqual(ReplenishmentSuggestion.objects.get().suggested_quantity, 336)
+
+    def test_plan_nets_returns_open_orders_and_transfers(self):
+        # লম্বা ইতিহাস, যাতে শূন্য থেকে শুরুর প্রভাব মিলিয়ে যায়
+        for days_ago in range(60):
+            DailySalesSummary.objects.create(
+                date=self.today - timedelta(days=days_ago), warehouse=self.warehouse, product=self.product,
+                quantity_sold=12, quantity_returned=2
+            )
+        Stock.objects.create(product=self.product, warehouse=self.warehouse, quantity=20)
+        order = PurchaseOrder.objects.create(
+            warehouse=self.warehouse, status='confirmed', expected_delivery_date=self.today
+        )
+        PurchaseOrderItem.objects.create(purchase_order=order, product=self.product, quantity=50, unit_price=3, quantity_received=20)
+        StockTransferRequest.objects.create(
+            product=self.product, quantity=10, quantity_transferred=10, status='in_transit',
+            source_warehouse=self.other_warehouse, destination_warehouse=self.warehouse
+        )
+
+        with self.settings(REPLENISHMENT_LEAD_TIME_DAYS=7, REPLENISHMENT_REVIEW_DAYS=14):
+            self.assertEqual(ReplenishmentPlanner.refresh(self.today), 1)
+
+        suggestion = ReplenishmentSuggestion.objects.get()
+        self.assertEqual(suggestion.demand_rate, 10)
+        self.assertEqual((suggestion.on_order, suggestion.in_transit), (30, 10))
+        # লক্ষ্য 10 * 21 = 210, হাতে + অর্ডারে + পথে = 60
+        self.assertEqual(suggestion.suggested_quantity, 150)
+
+    @override_settings(STOCK_LEDGER_MODE=True)
+    def test_ledger_mode_takes_on_hand_from_the_ledger(self):
+        DailySalesSummary.objects.create(
+            date=self.today, warehouse=self.warehouse, product=self.product, quantity_sold=100
+        )
+        StockService.change_stock(self.product, self.warehouse, 40, 'purchase', None)
+        with self.settings(REPLENISHMENT_SMOOTHING_ALPHA=0.2):
+            suggestion = ReplenishmentPlanner.plan(self.today)[0]
+        self.assertEqual(Stock.objects.get(product=self.product, warehouse=self.warehouse).quantity, 0)
+        self.assertEqual(suggestion.on_hand, 40)
+
+
+class DraftOrderGeneratorTest(TestCase):
+    def setUp(self):
+        self.main = Warehouse.objects.create(name="Main Store")
+        self.branch = Warehouse.objects.create(name="Branch Store")
+        self.cheap = Supplier.objects.create(name="Cheap Foods", email="cheap@example.com")
+        self.dear = Supplier.objects.create(name="Dear Foods", email="dear@example.com")
+        category = Category.objects.create(name="Pantry")
+        uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.oil = Product.objects.create(name="Oil", product_code="OI001", category=category, price=8, unit_of_measure=unit_of_measure)
+        self.salt = Product.objects.create(name="Salt", product_code="SA001", category=category, price=1, unit_of_measure=unit_of_measure)
+        self.flour = Product.objects.create(
+            name="Flour", product_code="FL001", category=category, price=2, cost_price=1.5,
+            supplier=self.dear, unit_of_measure=unit_of_measure
+        )
+        ProductSupplier.objects.create(product=self.oil, supplier=self.cheap, price=5)
+        ProductSupplier.objects.create(product=self.oil, supplier=self.dear, price=6)
+        ProductSupplier.objects.create(product=self.salt, supplier=self.cheap, price=0.5)
+
+        now = timezone.now()
+        for product, warehouse, quantity in [
+            (self.oil, self.main, 10), (self.salt, self.main, 20), (self.flour, self.main, 4), (self.oil, self.branch, 3),
+        ]:
+            ReplenishmentSuggestion.objects.create(
+                product=product, warehouse=warehouse, suggested_quantity=quantity, computed_at=now
+            )
+
+    def test_groups_by_preferred_supplier_and_warehouse(self):
+        orders = DraftOrderGenerator.generate(ReplenishmentSuggestion.objects.all(), None)
+        self.assertEqual(len(orders), 3)
+
+        totals = {
+            (po.supplier.name, po.warehouse.name): (po.status, po.total_amount, po.items.count())
+            for po in PurchaseOrder.objects.select_related('supplier', 'warehouse')
+        }
+        self.assertEqual(totals, {
+            ("Cheap Foods", "Main Store"): ('draft', 60, 2),
+            ("Dear Foods", "Main Store"): ('draft', 6, 1),
+            ("Cheap Foods", "Branch Store"): ('draft', 15, 1),
+        })
+        self.assertFalse(ReplenishmentSuggestion.objects.exists())
+
+    def test_purchase_requests_have_one_order_per_warehouse(self):
+        orders = DraftOrderGenerator.generate(
+            ReplenishmentSuggestion.objects.filter(warehouse=self.main), None, status='purchase_request'
+        )
+        self.assertEqual(len(orders), 1)
+        order = PurchaseOrder.objects.get()
+        self.assertIsNone(order.supplier)
+        self.assertEqual(order.total_amount, 66)
+        self.assertEqual(ReplenishmentSuggestion.objects.count(), 1)
+
+    def test_view_converts_only_selected_suggestions(self):
+        self.client.force_login(get_user_model().objects.create_superuser(username="buyer", password="x", email="b@example.com"))
+        url = reverse('purchase:generate_draft_purchase_orders')
+
+        response = self.client.post(url)
+        self.assertRedirects(response, reverse('reports:purchase_suggestion_report'), fetch_redirect_response=False)
+        self.assertFalse(PurchaseOrder.objects.exists())
+        self.assertEqual(ReplenishmentSuggestion.objects.count(), 4)
+
+        selected = ReplenishmentSuggestion.objects.get(product=self.flour)
+        self.client.post(url, {'suggestion_ids': [selected.pk]})
+        self.assertEqual(list(PurchaseOrderItem.objects.values_list('product_id', flat=True)), [self.flour.pk])
+        self.assertEqual(ReplenishmentSuggestion.objects.count(), 3)
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class PurchaseReceivingServiceTest(TestCase):
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name="Receiving Dock")
+        self.location = Location.objects.create(name="Bay 1", warehouse=self.warehouse)
+        category = Category.objects.create(name="Pharmacy")
+        uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.order = PurchaseOrder.objects.create(
+            warehouse=self.warehouse, status='confirmed', expected_delivery_date=timezone.now().date()
+        )
+        self.items = []
+        for index in range(6):
+            product = Product.objects.create(
+                name=f"Tablet {index}", product_code=f"TB{index:03}", category=category, price=1,
+                unit_of_measure=unit_of_measure, tracking_method='lot' if index % 2 else 'none'
+            )
+            self.items.append(PurchaseOrderItem.objects.create(
+                purchase_order=self.order, product=product, quantity=10, unit_price=1
+            ))
+
+    def _lines(self, quantity):
+        return [
+            {'item_id': item.pk, 'quantity': quantity, 'location': self.location, 'lot_number': f"L{item.pk}"}
+            for item in self.items
+        ]
+
+    def test_receive_is_batched(self):
+        # নতুন প্রোডাক্টের কস্ট লেয়ার রো তৈরি সহ; লাইন বাড়লেও সংখ্যা একই থাকে
+        with self.assertNumQueries(22):
+            PurchaseReceivingService.receive(self.order, self._lines(4), None)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'partially_received')
+        self.assertEqual(LotSerialNumber.objects.filter(quantity=4).count(), 3)
+        self.assertEqual(Stock.objects.filter(warehouse=self.warehouse, quantity=4).count(), 6)
+
+        # দ্বিতীয়বার একই লট ব্যবহার হয়, নতুন লট তৈরি হয় না
+        PurchaseReceivingService.receive(self.order, self._lines(6), None)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'received')
+        self.assertEqual(LotSerialNumber.objects.filter(quantity=10).count(), 3)
+
+    def test_over_receipt_rejects_whole_batch(self):
+        lines = self._lines(4) + [{'item_id': self.items[0].pk, 'quantity': 7, 'location': self.location}]
+        with self.assertRaises(ValidationError):
+            PurchaseReceivingService.receive(self.order, lines, None)
+        self.assertFalse(Stock.objects.exists())
+
+    def test_asn_upload(self):
+        user = get_user_model().objects.create_superuser('receiver', 'receiver@example.com', 'x')
+        self.client.force_login(user)
+        rows = ["product_code,quantity,location,lot_number,expiration_date"]
+        rows += [f"{item.product.product_code},10,Bay 1,LOT-A,2030-01-31" for item in self.items]
+        upload = SimpleUploadedFile("asn.csv", "\n".join(rows).encode(), content_type="text/csv")
+        response = self.client.post(reverse('purchase:upload_purchase_receipt', args=[self.order.pk]), {'asn_file': upload})
+        self.assertRedirects(response, reverse('purchase:purchase_order_detail', args=[self.order.pk]), fetch_redirect_response=False)
+        self.order.refresh_from_db()
+        self.assertEqual(self.order.status, 'received')
+        self.assertEqual(LotSerialNumber.objects.filter(lot_number="LOT-A", quantity=10).count(), 3)
@@ -7,11 +7,13 @@ app_name = 'purchase'
 urlpatterns = [
     path('', views.purchase_order_list, name='purchase_order_list'),
     path('create/', views.create_purchase_order, name='create_purchase_order'),
+    path('generate-drafts/', views.generate_draft_purchase_orders, name='generate_draft_purchase_orders'),
     path('<int:pk>/', views.purchase_order_detail, name='purchase_order_detail'),
     path('<int:pk>/edit/', views.edit_purchase_order, name='edit_purchase_order'),
     path('export/excel/', views.export_purchase_orders_excel, name='export_purchase_orders_excel'),
     path('export/pdf/', views.export_purchase_orders_pdf, name='export_purchase_orders_pdf'),
     path('<int:pk>/receive/', views.receive_purchase_order, name='receive_purchase_order'),
+    path('<int:pk>/receive/upload/', views.upload_purchase_receipt, name='upload_purchase_receipt'),
     path('<int:pk>/export/pdf/', views.export_single_purchase_order_pdf, name='export_single_purchase_order_pdf'),
     path('<int:pk>/export/receipt/pdf/', views.export_single_purchase_receipt_pdf, name='export_single_purchase_receipt_pdf'),
     
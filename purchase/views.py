@@ -3,33 +3,32 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.http import HttpResponse, JsonResponse
 from django.contrib.auth.decorators import login_required, permission_required
+from django.views.decorators.http import require_POST
 from django.db import transaction
-from django.db.models import Sum, Q, F, Count
+from django.db.models import Q, F, Count
 from django.core.paginator import Paginator
 from django.contrib import messages
 from django.forms import formset_factory
 from datetime import timedelta
 import json
-from io import BytesIO
-import os
+from itertools import chain
 from django.conf import settings
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.pagesizes import A4
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.lib.units import mm
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
 from django.utils import timezone
 from django.contrib.auth import get_user_model
 
 
-from .models import PurchaseOrder, PurchaseOrderItem, ProductSupplier, StockTransferRequest
+from .models import PurchaseOrder, PurchaseOrderItem, ProductSupplier, ReplenishmentSuggestion, StockTransferRequest
+from .receiving import ASN_COLUMNS, PurchaseReceivingService
+from .replenishment import DraftOrderGenerator
 from stock.models import InventoryTransaction, LotSerialNumber, Location, Warehouse, Stock
 from stock.services import StockService
+from inventory_system.pdf import build_pdf, document_header, get_styles, pdf_response, render_response, signature_block, table_chunks
 from .forms import StockTransferFilterForm
 
 from .forms import (
@@ -52,12 +51,12 @@ def add_page_number(canvas, doc):
     text = f"Page {page_num}"
     canvas.drawString(doc.leftMargin, inch / 2, text)
 
-def apply_purchase_order_filters(queryset, request):
-    start_date_str = request.GET.get('start_date')
-    end_date_str = request.GET.get('end_date')
-    status = request.GET.get('status')
-    user_id = request.GET.get('user')  # <-- নতুন ফিল্টার
-    warehouse_id = request.GET.get('warehouse')  # <-- নতুন ফিল্টার
+def apply_purchase_order_filters(queryset, params):
+    start_date_str = params.get('start_date')
+    end_date_str = params.get('end_date')
+    status = params.get('status')
+    user_id = params.get('user')  # <-- নতুন ফিল্টার
+    warehouse_id = params.get('warehouse')  # <-- নতুন ফিল্টার
 
     if start_date_str:
         start_date = timezone.datetime.strptime(start_date_str, '%Y-%m-%d')
@@ -87,7 +86,7 @@ def purchase_order_list(request):
             purchase_orders_list = PurchaseOrder.objects.none()
     
     # এখানে ফিল্টার ফাংশনটি আপডেট করা হয়েছে
-    purchase_orders_list = apply_purchase_order_filters(purchase_orders_list, request)
+    purchase_orders_list = apply_purchase_order_filters(purchase_orders_list, request.GET)
 
     paginator = Paginator(purchase_orders_list, 10)
     page_number = request.GET.get('page')
@@ -156,6 +155,29 @@ def create_purchase_order(request):
     return render(request, 'purchase/create_purchase_order.html', context)
 
 
+@login_required
+@permission_required('purchase.add_purchaseorder', login_url='/admin/')
+@require_POST
+def generate_draft_purchase_orders(request):
+    # পারচেজ সাজেশন রিপোর্ট থেকে নির্বাচিত প্রস্তাবগুলোর জন্য একবারে PO তৈরি; কিছু নির্বাচন না করলে কিছুই হয় না
+    selected_ids = [pk for pk in request.POST.getlist('suggestion_ids') if pk.isdigit()]
+    if not selected_ids:
+        messages.warning(request, "Select the suggestions to convert into purchase orders.")
+        return redirect('reports:purchase_suggestion_report')
+    suggestions = ReplenishmentSuggestion.objects.filter(pk__in=selected_ids)
+    if not request.user.is_superuser:
+        suggestions = suggestions.filter(warehouse=getattr(request.user, 'warehouse', None))
+
+    status = 'draft' if request.user.is_superuser else 'purchase_request'
+    orders = DraftOrderGenerator.generate(suggestions, request.user, status=status)
+    if orders:
+        item_count = PurchaseOrderItem.objects.filter(purchase_order__in=orders).count()
+        messages.success(request, f"{len(orders)} purchase orders created with {item_count} lines.")
+    else:
+        messages.warning(request, "No purchase suggestions to convert.")
+    return redirect('purchase:purchase_order_list')
+
+
 @login_required
 @permission_required('purchase.view_purchaseorder', login_url='/admin/')
 def purchase_order_detail(request, pk):
@@ -260,35 +282,13 @@ def edit_purchase_order(request, pk):
 def export_single_purchase_order_pdf(request, pk):
     purchase_order = get_object_or_404(PurchaseOrder.objects.select_related('supplier', 'warehouse', 'user'), pk=pk)
     supplier_name_for_file = purchase_order.supplier.name if purchase_order.supplier else "No_Supplier"
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="PO-{purchase_order.pk}_{supplier_name_for_file}.pdf"'
-
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30)
     story = []
 
-    # --- কাস্টম স্টাইল ---
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='TitleStyle', fontSize=22, fontName='Helvetica-Bold', alignment=TA_RIGHT, textColor=colors.HexColor("#2B3674")))
-    styles.add(ParagraphStyle(name='CompanyInfo', fontSize=9, fontName='Helvetica', alignment=TA_RIGHT, leading=12))
-    styles.add(ParagraphStyle(name='SupplierInfo', fontSize=10, fontName='Helvetica', leading=14))
-    styles.add(ParagraphStyle(name='HeaderStyle', fontSize=10, fontName='Helvetica-Bold', alignment=TA_LEFT))
-    styles.add(ParagraphStyle(name='TotalHeaderStyle', fontSize=10, fontName='Helvetica-Bold', alignment=TA_RIGHT))
-    styles.add(ParagraphStyle(name='SignatureStyle', fontSize=10, fontName='Helvetica', alignment=TA_CENTER))
-    styles.add(ParagraphStyle(name='BoldText', fontName='Helvetica-Bold'))
+    # --- শেয়ার্ড স্টাইল (প্রসেসে একবার তৈরি) ---
+    styles = get_styles()
 
     # --- ১. হেডার: লোগো এবং কোম্পানির তথ্য ---
-    logo_path = os.path.join(settings.STATICFILES_DIRS[0], 'images', 'logo.png')
-    logo = Image(logo_path, width=1.5*inch, height=0.5*inch)
-    company_info = "<b>NOVO ERP Solutions</b><br/>Doha, Qatar"
-    
-    header_data = [[logo, Paragraph("PURCHASE ORDER", styles['TitleStyle'])]]
-    # --- মূল পরিবর্তন: কলামের প্রস্থ ঠিক করা হলো ---
-    header_table = Table(header_data, colWidths=[3*inch, 4.5*inch], style=[('VALIGN', (0,0), (-1,-1), 'TOP')])
-    story.append(header_table)
-    story.append(Spacer(1, 0.1*inch))
-    story.append(Paragraph(company_info, styles['CompanyInfo']))
+    story.extend(document_header("PURCHASE ORDER", (1.5*inch, 0.5*inch), [3*inch, 4.5*inch]))
     story.append(Spacer(1, 0.5*inch))
 
     # --- ২. সরবরাহকারীর তথ্য এবং অর্ডারের বিবরণ ---
@@ -344,18 +344,12 @@ def export_single_purchase_order_pdf(request, pk):
     story.append(Spacer(1, 1.2*inch))
 
     # --- ৪. সিগনেচার সেকশন ---
-    signature_data = [
-        [Paragraph('--------------------------------<br/>Prepared By', styles['SignatureStyle']),
-         Paragraph('--------------------------------<br/>Approved By', styles['SignatureStyle'])]
-    ]
-    signature_table = Table(signature_data, colWidths=[3.5*inch, 3.5*inch], hAlign='CENTER')
-    story.append(signature_table)
+    story.append(signature_block(['Prepared By', 'Approved By'], 3.5*inch))
 
-    doc.build(story)
-    
-    buffer.seek(0)
-    response.write(buffer.getvalue())
-    return response
+    return pdf_response(
+        story, f"PO-{purchase_order.pk}_{supplier_name_for_file}.pdf",
+        rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30
+    )
 
 
 @login_required
@@ -365,31 +359,13 @@ def export_single_purchase_receipt_pdf(request, pk):
     related_transactions = InventoryTransaction.objects.filter(
         notes__startswith=f"Received PO-{purchase_order.id}"
     ).select_related('product', 'lot_serial', 'lot_serial__location', 'destination_location')
-
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="GRN-{purchase_order.pk}.pdf"'
-    
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30)
     story = []
 
-    # --- স্টাইল ---
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='TitleStyle', fontSize=22, fontName='Helvetica-Bold', alignment=TA_RIGHT, textColor=colors.HexColor("#2B3674")))
-    styles.add(ParagraphStyle(name='CompanyInfo', fontSize=9, fontName='Helvetica', alignment=TA_RIGHT, leading=12))
-    styles.add(ParagraphStyle(name='SupplierInfo', fontSize=10, fontName='Helvetica', leading=14))
-    styles.add(ParagraphStyle(name='SignatureStyle', fontSize=10, fontName='Helvetica', alignment=TA_CENTER))
+    # --- শেয়ার্ড স্টাইল (প্রসেসে একবার তৈরি) ---
+    styles = get_styles()
 
     # --- ১. হেডার সেকশন ---
-    logo_path = os.path.join(settings.STATICFILES_DIRS[0], 'images', 'logo.png')
-    logo = Image(logo_path, width=1.5*inch, height=0.5*inch)
-    company_info = "<b>NOVO ERP Solutions</b><br/>Doha, Qatar"
-    
-    header_data = [[logo, Paragraph("Goods Received Note (GRN)", styles['TitleStyle'])]]
-    header_table = Table(header_data, colWidths=[3*inch, 4.5*inch], style=[('VALIGN', (0,0), (-1,-1), 'TOP')])
-    story.append(header_table)
-    story.append(Spacer(1, 0.1*inch))
-    story.append(Paragraph(company_info, styles['CompanyInfo']))
+    story.extend(document_header("Goods Received Note (GRN)", (1.5*inch, 0.5*inch), [3*inch, 4.5*inch]))
     story.append(Spacer(1, 0.5*inch))
     
     # --- ২. রিসিট বিবরণ ---
@@ -440,18 +416,12 @@ def export_single_purchase_receipt_pdf(request, pk):
     story.append(Spacer(1, 1.2*inch))
 
     # --- ৪. সিগনেচার সেকশন ---
-    signature_data = [
-        [Paragraph('--------------------------------<br/>Received By', styles['SignatureStyle']),
-         Paragraph('--------------------------------<br/>Store Keeper', styles['SignatureStyle'])]
-    ]
-    signature_table = Table(signature_data, colWidths=[3.5*inch, 3.5*inch], hAlign='CENTER')
-    story.append(signature_table)
+    story.append(signature_block(['Received By', 'Store Keeper'], 3.5*inch))
 
-    doc.build(story)
-    
-    buffer.seek(0)
-    response.write(buffer.getvalue())
-    return response
+    return pdf_response(
+        story, f"GRN-{purchase_order.pk}.pdf",
+        rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30
+    )
 
 @login_required
 def get_products_by_supplier_ajax(request):
@@ -518,7 +488,7 @@ def export_purchase_orders_excel(request):
 
     # --- Fetch Data ---
     purchase_orders = PurchaseOrder.objects.select_related('supplier', 'warehouse').all().order_by('-order_date')
-    filtered_result = apply_purchase_order_filters(purchase_orders, request)
+    filtered_result = apply_purchase_order_filters(purchase_orders, request.GET)
 
     # handle return type
     if isinstance(filtered_result, tuple):
@@ -567,95 +537,66 @@ def export_purchase_orders_excel(request):
 @login_required
 @permission_required('purchase.view_purchaseorder', login_url='/admin/')
 def export_purchase_orders_pdf(request):
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30)
+    return render_response(render_purchase_orders_pdf, request, 'purchase_orders.pdf')
+
+
+def render_purchase_orders_pdf(user, params, output_file):
     story = []
 
-    # --- Styles ---
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='TitleStyle', fontSize=18, fontName='Helvetica-Bold',
-                              alignment=TA_CENTER, textColor=colors.HexColor("#2B3674")))
-    styles.add(ParagraphStyle(name='TableHeader', fontSize=9, fontName='Helvetica-Bold',
-                              alignment=TA_CENTER, textColor=colors.HexColor("#2B3674")))
-    styles.add(ParagraphStyle(name='TableCell', fontSize=8, fontName='Helvetica', alignment=TA_CENTER))
-
-    # --- Header Section ---
-    logo_path = os.path.join(settings.STATICFILES_DIRS[0], 'images', 'logo.png') #যদি শপের লোগো ব্যবহার করতে চান তাহলে এখানে পরিবর্তন করুন
-    if os.path.exists(logo_path):
-        logo = Image(logo_path, width=1.7*inch, height=0.4*inch)
-        header_table = Table([[logo, Paragraph("Purchase Orders Report", styles['TitleStyle'])]],
-                             colWidths=[2*inch, 4.5*inch])
-        header_table.setStyle(TableStyle([('VALIGN', (0,0), (-1,-1), 'MIDDLE')]))
-        story.append(header_table)
-    else:
-        story.append(Paragraph("Purchase Orders Report", styles['TitleStyle']))
+    # --- Styles (শেয়ার্ড, প্রসেসে একবার তৈরি) ---
+    styles = get_styles()
+
+    # --- Header Section (লোগো না থাকলে শুধু শিরোনাম) ---
+    story.extend(document_header(
+        "Purchase Orders Report", (1.7*inch, 0.4*inch), [2*inch, 4.5*inch],
+        title_style='ReportTitle', company_info=None, valign='MIDDLE'
+    ))
 
     story.append(Spacer(1, 0.4 * inch))
 
     # --- Table Header ---
-    data = [[
-        Paragraph(h, styles['TableHeader']) for h in
+    header = [
+        Paragraph(h, styles['TableHeaderCenter']) for h in
         ['PO #', 'Supplier', 'Order Date', 'Expected Delivery', 'Status', 'Total']
-    ]]
+    ]
 
     # --- Fetch Data ---
     purchase_orders = PurchaseOrder.objects.select_related('supplier', 'warehouse').all().order_by('-order_date')
-    filtered_result = apply_purchase_order_filters(purchase_orders, request)
-
-    if isinstance(filtered_result, tuple):
-        purchase_orders, _ = filtered_result
-    else:
-        purchase_orders = filtered_result
-
-    if not hasattr(purchase_orders, "__iter__"):
-        purchase_orders = [purchase_orders]
-
-    # --- Table Data ---
-    if not purchase_orders:
-        data.append([Paragraph("No purchase orders found for the selected filters.", styles['TableCell'])])
-        table_style = [
-            ('SPAN', (0, 1), (-1, 1)),
-            ('ALIGN', (0, 1), (-1, 1), 'CENTER')
-        ]
-        col_widths = [6.5*inch]
-    else:
-        for po in purchase_orders:
-            data.append([
-                Paragraph(f"PO-{po.id}", styles['TableCell']),
-                Paragraph(po.supplier.name if po.supplier else 'N/A', styles['TableCell']),
-                Paragraph(po.order_date.strftime('%d %b %Y') if po.order_date else 'N/A', styles['TableCell']),
-                Paragraph(po.expected_delivery_date.strftime('%d %b %Y') if po.expected_delivery_date else 'N/A', styles['TableCell']),
-                Paragraph(po.get_status_display(), styles['TableCell']),
-                Paragraph(f"{DEFAULT_CURRENCY_SYMBOL}{po.total_amount:.2f}", styles['TableCell'])
-            ])
-        table_style = []
-        col_widths = [0.8*inch, 2.0*inch, 1.2*inch, 1.2*inch, 1*inch, 1.2*inch]
+    purchase_orders = apply_purchase_order_filters(purchase_orders, params)
 
-    # --- Table Styling ---
-    table = Table(data, colWidths=col_widths)
-    table.setStyle(TableStyle([
+    table_style = [
         ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor("#E0E5F2")),
         ('TEXTCOLOR', (0, 0), (-1, 0), colors.HexColor("#2B3674")),
         ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
         ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
         ('VALIGN', (0, 0), (-1, -1), 'MIDDLE'),
         ('GRID', (0, 0), (-1, -1), 0.5, colors.HexColor("#CCCCCC")),
-    ] + table_style))
-
-    story.append(table)
-
-    # --- Footer (Page Numbers) ---
-    def add_page_number(canvas, doc):
-        page_num = canvas.getPageNumber()
-        canvas.setFont("Helvetica", 8)
-        canvas.drawRightString(200*mm, 15*mm, f"Page {page_num}")
+    ]
 
-    doc.build(story, onFirstPage=add_page_number, onLaterPages=add_page_number)
+    col_widths = [0.8*inch, 2.0*inch, 1.2*inch, 1.2*inch, 1*inch, 1.2*inch]
 
-    buffer.seek(0)
-    response = HttpResponse(buffer, content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="purchase_orders.pdf"'
-    return response
+    # --- Table Data: কুয়েরি টুকরো টুকরো করে পড়ে কয়েকশো রো এর একেকটি Table ---
+    if not purchase_orders.exists():
+        empty_row = [Paragraph("No purchase orders found for the selected filters.", styles['TableCell'])] + [''] * 5
+        tables = [Table([header, empty_row], colWidths=col_widths, style=TableStyle(table_style + [('SPAN', (0, 1), (-1, 1))]))]
+    else:
+        def rows():
+            for po in purchase_orders.iterator(chunk_size=1000):
+                yield [
+                    f"PO-{po.id}",
+                    Paragraph(po.supplier.name if po.supplier else 'N/A', styles['TableCell']),
+                    po.order_date.strftime('%d %b %Y') if po.order_date else 'N/A',
+                    po.expected_delivery_date.strftime('%d %b %Y') if po.expected_delivery_date else 'N/A',
+                    po.get_status_display(),
+                    f"{DEFAULT_CURRENCY_SYMBOL}{po.total_amount:.2f}"
+                ]
+        tables = table_chunks(header, rows(), col_widths, table_style + [('FONTSIZE', (0, 1), (-1, -1), 8)])
+
+    # --- পেজ নম্বর ("Page X of Y") PageCountCanvas আঁকে ---
+    build_pdf(
+        chain(story, tables), output_file,
+        rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30
+    )
 
 @login_required
 @permission_required('purchase.change_purchaseorder', login_url='/admin/')
@@ -684,74 +625,31 @@ def receive_purchase_order(request, pk):
         formset = PurchaseReceiveFormSet(request.POST)
 
         if formset.is_valid():
+            lines = [
+                {
+                    'item_id': form.cleaned_data.get('purchase_order_item_id'),
+                    'quantity': form.cleaned_data.get('quantity_to_receive'),
+                    'location': form.cleaned_data.get('destination_location'),
+                    'lot_number': form.cleaned_data.get('lot_number'),
+                    'expiration_date': form.cleaned_data.get('expiration_date'),
+                }
+                for form in formset
+                if form.has_changed() and form.cleaned_data.get('quantity_to_receive', 0) > 0
+            ]
             try:
-                with transaction.atomic():
-                    received_items_count = 0
-                    for form in formset:
-                        if form.has_changed() and form.cleaned_data.get('quantity_to_receive', 0) > 0:
-                            item_id = form.cleaned_data.get('purchase_order_item_id')
-                            quantity_to_receive = form.cleaned_data.get('quantity_to_receive')
-                            destination_location = form.cleaned_data.get('destination_location')
-                            lot_number = form.cleaned_data.get('lot_number')
-                            expiration_date = form.cleaned_data.get('expiration_date')
-
-                            po_item = get_object_or_404(PurchaseOrderItem, pk=item_id)
-                            product = po_item.product
-
-                            if quantity_to_receive > po_item.quantity - (po_item.quantity_received or 0):
-                                raise ValidationError(f"Received quantity for {product.name} exceeds remaining quantity.")
-
-                            lot_serial_obj = None
-                            if product.tracking_method in ['lot', 'serial'] and lot_number:
-                                # get_or_create ব্যবহার করে নতুন লট তৈরি বা পুরনোটি খুঁজে বের করা
-                                lot_serial_obj, created = LotSerialNumber.objects.get_or_create(
-                                    product=product,
-                                    lot_number=lot_number,
-                                    location=destination_location,
-                                    defaults={'expiration_date': expiration_date, 'quantity': 0}
-                                )
-                            
-                            # ================== পরিবর্তিত অংশ শুরু ==================
-                            # পুরনো InventoryTransaction তৈরির কোডটি StockService দিয়ে প্রতিস্থাপন করা হলো
-                            # এটি পারমাণবিকভাবে স্টক এবং লট উভয়কেই আপডেট করবে
-                            
-                            StockService.change_stock(
-                                product=product,
-                                warehouse=destination_location.warehouse,
-                                quantity_change=quantity_to_receive, # স্টক বাড়ছে
-                                transaction_type='purchase',
-                                user=request.user,
-                                content_object=purchase_order,
-                                location=destination_location,
-                                lot_serial=lot_serial_obj,
-                                notes=f"Received PO-{purchase_order.id}"
-                            )
-                            # ================== পরিবর্তিত অংশ শেষ ===================
-
-                            # পারচেজ অর্ডারের আইটেমে প্রাপ্ত পরিমাণ আপডেট করুন
-                            po_item.quantity_received = (po_item.quantity_received or 0) + quantity_to_receive
-                            po_item.save()
-                            received_items_count += 1
-
-                    if received_items_count > 0:
-                        # অর্ডারের স্ট্যাটাস আপডেট করুন
-                        total_ordered = purchase_order.items.aggregate(total=Sum('quantity'))['total'] or 0
-                        total_received = purchase_order.items.aggregate(total=Sum('quantity_received'))['total'] or 0
-
-                        if total_received >= total_ordered:
-                            purchase_order.status = 'received'
-                        elif total_received > 0:
-                            purchase_order.status = 'partially_received'
-                        
-                        purchase_order.save()
-
-                        messages.success(request, f"Purchase order {purchase_order.id} received successfully and stock has been updated.")
-                        return redirect('purchase:purchase_order_detail', pk=pk)
-                    else:
-                        messages.warning(request, "No items were marked as received.")
-                        return redirect('purchase:receive_purchase_order', pk=pk)
-
-            except (ValidationError, ValueError) as e: # ValueError যোগ করা হয়েছে
+                # সব লাইন একবারে যাচাই ও পোস্ট হয় (PurchaseReceivingService দেখুন)
+                received_items_count = PurchaseReceivingService.receive(purchase_order, lines, request.user)
+                if received_items_count > 0:
+                    messages.success(request, f"Purchase order {purchase_order.id} received successfully and stock has been updated.")
+                    return redirect('purchase:purchase_order_detail', pk=pk)
+                else:
+                    messages.warning(request, "No items were marked as received.")
+                    return redirect('purchase:receive_purchase_order', pk=pk)
+
+            except ValidationError as e:
+                for error in e.messages:
+                    messages.error(request, error)
+            except ValueError as e:
                 messages.error(request, str(e))
             except Exception as e:
                 messages.error(request, f"An unexpected error occurred: {e}")
@@ -763,6 +661,7 @@ def receive_purchase_order(request, pk):
                 'formset': formset, # এররসহ ফর্মসেটটি আবার পাস করা হলো
                 'items_to_receive': items_to_receive,
                 'title': f'Receive PO-{purchase_order.id}',
+                'asn_columns': ASN_COLUMNS,
             }
             return render(request, 'purchase/receive_purchase_order.html', context)
     
@@ -773,10 +672,39 @@ def receive_purchase_order(request, pk):
         'purchase_order': purchase_order,
         'formset': formset,
         'items_to_receive': items_to_receive,
-        'title': f'Receive PO-{purchase_order.id}'
+        'title': f'Receive PO-{purchase_order.id}',
+        'asn_columns': ASN_COLUMNS,
     }
     return render(request, 'purchase/receive_purchase_order.html', context)
 
+@login_required
+@permission_required('purchase.change_purchaseorder', login_url='/admin/')
+@require_POST
+def upload_purchase_receipt(request, pk):
+    # সাপ্লায়ারের ASN/CSV ফাইল থেকে পুরো চালান একবারে রিসিভ করা
+    purchase_order = get_object_or_404(PurchaseOrder, pk=pk)
+    asn_file = request.FILES.get('asn_file')
+    if not asn_file:
+        messages.error(request, "Please choose a CSV file to upload.")
+        return redirect('purchase:receive_purchase_order', pk=pk)
+
+    try:
+        lines = PurchaseReceivingService.parse_asn(purchase_order, asn_file)
+        received_items_count = PurchaseReceivingService.receive(purchase_order, lines, request.user)
+    except ValidationError as e:
+        for error in e.messages[:20]:
+            messages.error(request, error)
+        return redirect('purchase:receive_purchase_order', pk=pk)
+    except (ValueError, UnicodeDecodeError) as e:
+        messages.error(request, str(e))
+        return redirect('purchase:receive_purchase_order', pk=pk)
+
+    if not received_items_count:
+        messages.warning(request, "No items were marked as received.")
+        return redirect('purchase:receive_purchase_order', pk=pk)
+    messages.success(request, f"{received_items_count} lines received for PO-{purchase_order.id} and stock has been updated.")
+    return redirect('purchase:purchase_order_detail', pk=pk)
+
 #স্টক ট্রান্সফার রিকোয়েস্ট ভিউগুলি।
 
 @login_required
@@ -0,0 +1,46 @@
+# reports/dashboard_cache.py
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+ALL_WAREHOUSES = 'all'
+
+
+def ttl():
+    return getattr(settings, 'DASHBOARD_CACHE_TTL', 300)
+
+
+def _version_key(scope):
+    return f'dashboard:version:{scope}'
+
+
+def _version(scope):
+    return cache.get_or_set(_version_key(scope), 1, None)
+
+
+def make_key(user, user_warehouse, start_date, end_date):
+    """
+    (warehouse, তারিখ সীমা, আজকের তারিখ, superuser কি না) অনুযায়ী ক্যাশ key।
+    ওয়্যারহাউসের ভার্সন key এর অংশ, তাই ভার্সন বাড়ালেই পুরোনো ক্যাশ আর পড়া হয় না।
+    """
+    if not user.is_superuser and user_warehouse:
+        scope = user_warehouse.pk
+    else:
+        scope = ALL_WAREHOUSES
+    role = 'admin' if user.is_superuser else 'staff'
+    return (
+        f'dashboard:{scope}:v{_version(scope)}:{role}:'
+        f'{start_date}:{end_date}:{timezone.now().date()}'
+    )
+
+
+def invalidate(warehouse_ids):
+    """প্রতিটি ওয়্যারহাউসের এবং সব-ওয়্যারহাউসের ড্যাশবোর্ড ক্যাশ বাতিল করে।"""
+    scopes = {warehouse_id for warehouse_id in warehouse_ids if warehouse_id} | {ALL_WAREHOUSES}
+    for scope in scopes:
+        try:
+            cache.incr(_version_key(scope))
+        except ValueError:
+            # ভার্সন key এখনো তৈরি হয়নি বা মুছে গেছে
+            cache.set(_version_key(scope), 2, None)
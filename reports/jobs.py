@@ -0,0 +1,123 @@
+# reports/jobs.py
+
+import os
+import traceback
+
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.datastructures import MultiValueDict
+from django.utils.module_loading import import_string
+
+from .models import ReportJob
+
+# এক্সপোর্টের ধরন -> যে render(user, params, output_file) ফাংশন ফাইলটি তৈরি করে। ভিউ ও ওয়ার্কার দুজনেই
+# একই ফাংশন কল করে; ভিউয়ের ডেকোরেটরের বদলে এখানে permission / superuser_only দিয়ে অনুমতি যাচাই হয়।
+REPORT_JOB_TYPES = {
+    'daily_sales_pdf': {
+        'label': 'Daily Sales Report (PDF)',
+        'render': 'reports.views.render_daily_sales_pdf',
+        'filename': 'daily_sales_report.pdf',
+    },
+    'job_costing_pdf': {
+        'label': 'Job Costing Report (PDF)',
+        'render': 'costing.views.render_job_costing_pdf',
+        'filename': 'job_costing_report.pdf',
+        'superuser_only': True,
+    },
+    'purchase_orders_pdf': {
+        'label': 'Purchase Orders (PDF)',
+        'render': 'purchase.views.render_purchase_orders_pdf',
+        'filename': 'purchase_orders.pdf',
+        'permission': 'purchase.view_purchaseorder',
+    },
+    'products_pdf': {
+        'label': 'Product List (PDF)',
+        'render': 'products.views.render_products_pdf',
+        'filename': 'products.pdf',
+        'permission': 'products.view_product',
+    },
+}
+
+
+def enqueue(kind, user, params):
+    if kind not in REPORT_JOB_TYPES:
+        raise ValueError(f"Unknown report type: {kind}")
+    return ReportJob.objects.create(kind=kind, user=user, params=params)
+
+
+def claim_pending(limit):
+    """
+    সর্বোচ্চ limit টি pending জব running হিসেবে চিহ্নিত করে তাদের id ফেরত দেয়।
+    status=pending শর্তসহ UPDATE করা হয়, তাই দুটি ওয়ার্কার একই জব নিতে পারে না।
+    """
+    claimed = []
+    candidate_ids = ReportJob.objects.filter(status='pending').order_by('created_at').values_list('pk', flat=True)[:limit]
+    for pk in list(candidate_ids):
+        now = timezone.now()
+        updated = ReportJob.objects.filter(pk=pk, status='pending').update(
+            status='running', progress=5, started_at=now, heartbeat_at=now
+        )
+        if updated:
+            claimed.append(pk)
+    return claimed
+
+
+def run_job(job_id):
+    """একটি জব চালায়। ওয়ার্কার প্রসেস পুলে এই ফাংশনটিই পাঠানো হয়।"""
+    job = ReportJob.objects.select_related('user').get(pk=job_id)
+    job_type = REPORT_JOB_TYPES[job.kind]
+    storage = job.file.storage
+    name = None
+    try:
+        if not _allowed(job.user, job_type):
+            raise PermissionError(f"{job.user} is missing permission for {job.kind}")
+        render = import_string(job_type['render'])
+
+        ReportJob.objects.filter(pk=job.pk).update(progress=20)
+        # ফাইলের নাম আগে সংরক্ষণ করে PDF সরাসরি সেই ফাইলে লেখা হয়, মেমোরিতে জমা হয় না
+        name = storage.save(job.file.field.generate_filename(job, _filename(job, job_type)), ContentFile(b''))
+        with storage.open(name, 'wb') as output_file:
+            render(job.user, MultiValueDict(job.params), output_file)
+
+        job.file.name = name
+        job.status = 'done'
+        job.progress = 100
+    except Exception:
+        if name:
+            storage.delete(name)
+        job.status = 'failed'
+        job.error = traceback.format_exc()
+    job.finished_at = timezone.now()
+    job.save(update_fields=['file', 'status', 'progress', 'error', 'finished_at'])
+    return job.status
+
+
+def heartbeat(job_ids):
+    """ওয়ার্কার যে জবগুলো এখনো চালাচ্ছে সেগুলোর heartbeat_at হালনাগাদ করে।"""
+    if job_ids:
+        ReportJob.objects.filter(pk__in=job_ids, status='running').update(heartbeat_at=timezone.now())
+
+
+def requeue_stale(older_than):
+    """
+    ওয়ার্কার বন্ধ হয়ে গেলে running অবস্থায় আটকে থাকা জবগুলো আবার pending করে। শুধু যেসব জবের heartbeat
+    older_than এর আগের, তাই অন্য চালু ওয়ার্কারের লম্বা জব (যার heartbeat হালনাগাদ হচ্ছে) নেওয়া হয় না।
+    """
+    stale = Q(heartbeat_at__lt=older_than) | Q(heartbeat_at__isnull=True, started_at__lt=older_than)
+    with transaction.atomic():
+        return ReportJob.objects.filter(stale, status='running').update(
+            status='pending', progress=0, started_at=None, heartbeat_at=None
+        )
+
+
+def _filename(job, job_type):
+    name, ext = os.path.splitext(job_type['filename'])
+    return f"{name}_{job.pk}{ext}"
+
+
+def _allowed(user, job_type):
+    if job_type.get('superuser_only') and not user.is_superuser:
+        return False
+    return not job_type.get('permission') or user.has_perm(job_type['permission'])
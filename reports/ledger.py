@@ -0,0 +1,66 @@
+# reports/ledger.py
+
+from decimal import Decimal
+
+from django.db.models import CharField, DecimalField, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from sales.models import SalesReturnItem
+
+AMOUNT = DecimalField(max_digits=12, decimal_places=2)
+# দুই দিকের SELECT এর কলাম একই নাম ও একই ক্রমে থাকতে হবে
+LEDGER_FIELDS = ('type', 'entry_id', 'date', 'order_id', 'customer_name', 'username', 'warehouse_name', 'amount')
+
+
+def sale_total():
+    """একটি ডেলিভারড SalesOrder এর লেজার amount।"""
+    return Coalesce(F('total_amount'), Value(Decimal('0')), output_field=AMOUNT)
+
+
+def return_total():
+    """একটি SalesReturn এর মোট (quantity * unit_price), ডেটাবেসেই যোগ করা সাবকুয়েরি।"""
+    items = SalesReturnItem.objects.filter(sales_return=OuterRef('pk')).values('sales_return').annotate(
+        total=Sum(F('quantity') * F('unit_price'), output_field=AMOUNT)
+    ).values('total')
+    return Coalesce(Subquery(items, output_field=AMOUNT), Value(Decimal('0')), output_field=AMOUNT)
+
+
+def ledger_entries(sales_qs, returns_qs):
+    """
+    ডেলিভারড সেলস ও রিটার্নের একটি UNION ALL কুয়েরি, নতুন থেকে পুরনো ক্রমে।
+    কিছুই মেমোরিতে আনা হয় না: Paginator শুধু নির্দিষ্ট পেজ (LIMIT/OFFSET) পড়ে, আর এক্সপোর্ট
+    .iterator() দিয়ে টুকরো টুকরো পড়ে। প্রতিটি রো LEDGER_FIELDS এর একটি dict; রিটার্নের amount ঋণাত্মক।
+    """
+    sales = sales_qs.order_by().annotate(
+        type=Value('Sale', output_field=CharField()),
+        entry_id=F('pk'),
+        date=F('order_date'),
+        order_id=F('pk'),
+        customer_name=F('customer__name'),
+        username=F('user__username'),
+        warehouse_name=F('warehouse__name'),
+        amount=sale_total(),
+    ).values(*LEDGER_FIELDS)
+    returns = returns_qs.order_by().annotate(
+        type=Value('Return', output_field=CharField()),
+        entry_id=F('pk'),
+        date=F('return_date'),
+        order_id=F('sales_order_id'),
+        customer_name=F('sales_order__customer__name'),
+        username=F('user__username'),
+        warehouse_name=F('warehouse__name'),
+        amount=Value(Decimal('0'), output_field=AMOUNT) - return_total(),
+    ).values(*LEDGER_FIELDS)
+    return sales.union(returns, all=True).order_by('-date', '-entry_id')
+
+
+def ledger_totals(sales_qs, returns_qs):
+    """
+    ledger_entries() এর রো গুলোর একই কলাম থেকে (মোট সেলস, মোট রিটার্ন), যাতে পেজের মোট আর তালিকা সবসময় মেলে।
+    রিটার্নের মোট ধনাত্মক।
+    """
+    total_sales = sales_qs.order_by().aggregate(total=Sum(sale_total()))['total']
+    total_returns = SalesReturnItem.objects.filter(sales_return__in=returns_qs.order_by().values('pk')).aggregate(
+        total=Sum(F('quantity') * F('unit_price'), output_field=AMOUNT)
+    )['total']
+    return total_sales or Decimal('0'), total_returns or Decimal('0')
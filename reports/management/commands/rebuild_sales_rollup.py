@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+from reports.services import SalesRollupService
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the DailySalesSummary rollup table from delivered sales orders and sales returns.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help='First day to rebuild (YYYY-MM-DD). Defaults to the whole history.')
+        parser.add_argument('--end', help='Last day to rebuild (YYYY-MM-DD).')
+
+    def handle(self, *args, **options):
+        start_date = self._parse(options['start'], '--start')
+        end_date = self._parse(options['end'], '--end')
+
+        self.stdout.write(self.style.NOTICE('Rebuilding daily sales rollup...'))
+        count = SalesRollupService.rebuild(start_date, end_date)
+        self.stdout.write(self.style.SUCCESS(f'Daily sales rollup rebuilt with {count} rows.'))
+
+    def _parse(self, value, option):
+        if not value:
+            return None
+        parsed = parse_date(value)
+        if parsed is None:
+            raise CommandError(f'Invalid {option} value: {value}')
+        return parsed
@@ -0,0 +1,70 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from datetime import timedelta
+
+import django
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+# এই মডিউলটি spawn করা চাইল্ড প্রসেসেও ইম্পোর্ট হয়, তাই মডেল নির্ভর ইম্পোর্টগুলো ফাংশনের ভিতরে রাখা হয়েছে
+
+
+def _init_worker():
+    # spawn করা প্রসেসে Django আবার সেটআপ করতে হয়
+    django.setup()
+
+
+def _run_job(job_id):
+    from reports import jobs
+    return jobs.run_job(job_id)
+
+
+class Command(BaseCommand):
+    help = 'Runs queued report export jobs (PDF/Excel) in a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Number of worker processes.')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds to wait between queue polls.')
+        parser.add_argument('--once', action='store_true', help='Process the jobs currently in the queue and exit.')
+        parser.add_argument('--stale-after', type=int, default=30, help='Requeue "running" jobs whose worker has not sent a heartbeat for this many minutes.')
+
+    def handle(self, *args, **options):
+        from reports import jobs
+
+        workers = max(1, options['workers'])
+        requeued = jobs.requeue_stale(timezone.now() - timedelta(minutes=options['stale_after']))
+        if requeued:
+            self.stdout.write(self.style.WARNING(f'{requeued} stale jobs requeued.'))
+
+        self.stdout.write(self.style.NOTICE(f'Report worker started with {workers} processes.'))
+        # fork এর বদলে spawn, যাতে প্যারেন্টের ডেটাবেস কানেকশন চাইল্ড প্রসেসে শেয়ার না হয়
+        context = multiprocessing.get_context('spawn')
+        running = {}
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_init_worker) as pool:
+            while True:
+                # এই ওয়ার্কারের জবগুলো চালু আছে জানানো হয়, যাতে অন্য ওয়ার্কারের requeue_stale() সেগুলো না নেয়
+                jobs.heartbeat(list(running.values()))
+                free_slots = workers - len(running)
+                if free_slots:
+                    for job_id in jobs.claim_pending(free_slots):
+                        running[pool.submit(_run_job, job_id)] = job_id
+                        self.stdout.write(f'Job #{job_id} started.')
+
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in done:
+                    job_id = running.pop(future)
+                    try:
+                        status = future.result()
+                    except Exception as exc:
+                        status = f'crashed ({exc})'
+                    style = self.style.SUCCESS if status == 'done' else self.style.ERROR
+                    self.stdout.write(style(f'Job #{job_id} {status}.'))
+
+        self.stdout.write(self.style.SUCCESS('Report worker stopped.'))
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from reports.valuation import INTERVALS, ValuationSnapshotService, is_snapshot_day
+
+
+class Command(BaseCommand):
+    help = 'Writes the end-of-day inventory valuation snapshot (per warehouse, category and product) when the configured interval is due.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help='Snapshot day (YYYY-MM-DD). Defaults to today.')
+        parser.add_argument('--interval', choices=INTERVALS, help='Overrides settings.VALUATION_SNAPSHOT_INTERVAL.')
+        parser.add_argument('--force', action='store_true', help='Write the snapshot even if the interval is not due on this day.')
+
+    def handle(self, *args, **options):
+        as_of = timezone.localdate()
+        if options['date']:
+            as_of = parse_date(options['date'])
+            if as_of is None:
+                raise CommandError(f"Invalid --date value: {options['date']}")
+        interval = options['interval'] or getattr(settings, 'VALUATION_SNAPSHOT_INTERVAL', 'monthly')
+
+        if not options['force'] and not is_snapshot_day(as_of, interval):
+            self.stdout.write(self.style.NOTICE(f'No {interval} valuation snapshot due on {as_of}.'))
+            return
+
+        count = ValuationSnapshotService.take(as_of)
+        self.stdout.write(self.style.SUCCESS(f'Valuation snapshot for {as_of} written with {count} rows.'))
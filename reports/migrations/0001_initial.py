@@ -0,0 +1,41 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:36
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('stock', '0003_stocksnapshot'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('quantity_sold', models.IntegerField(default=0)),
+                ('sales_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('sales_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('quantity_returned', models.IntegerField(default=0)),
+                ('returns_amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('returns_cost', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='products.product')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='daily_sales', to=settings.AUTH_USER_MODEL)),
+                ('warehouse', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='stock.warehouse')),
+            ],
+            options={
+                'db_table': 'inventory_dailysalessummary',
+                'indexes': [models.Index(fields=['warehouse', 'date'], name='inventory_d_warehou_4f5994_idx')],
+                'unique_together': {('date', 'warehouse', 'product', 'user')},
+            },
+        ),
+    ]
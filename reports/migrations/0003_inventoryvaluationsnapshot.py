@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('reports', '0002_reportjob'),
+        ('stock', '0004_stockvaluation'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InventoryValuationSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('as_of', models.DateField()),
+                ('quantity', models.IntegerField(default=0)),
+                ('value', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='valuation_snapshots', to='products.category')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valuation_snapshots', to='products.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valuation_snapshots', to='stock.warehouse')),
+            ],
+            options={
+                'db_table': 'inventory_valuationsnapshot',
+                'indexes': [models.Index(fields=['as_of', 'warehouse', 'category'], name='inventory_v_as_of_5a6801_idx')],
+                'unique_together': {('as_of', 'warehouse', 'product')},
+            },
+        ),
+    ]
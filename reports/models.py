@@ -1,3 +1,93 @@
+# reports/models.py
 from django.db import models
+from django.conf import settings
 
-# Create your models here.
+
+class DailySalesSummary(models.Model):
+    """
+    ড্যাশবোর্ড ও রিপোর্টের জন্য প্রতিদিনের বিক্রি ও রিটার্নের প্রি-অ্যাগ্রিগেটেড হিসাব।
+    প্রতিটি রো একটি (date, warehouse, product, user) এর জন্য; শুধুমাত্র 'delivered' অর্ডার গণনা হয়।
+    reports.services.SalesRollupService এই টেবিল হালনাগাদ রাখে।
+    """
+    date = models.DateField()
+    warehouse = models.ForeignKey('stock.Warehouse', on_delete=models.CASCADE, null=True, blank=True, related_name='daily_sales')
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='daily_sales')
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='daily_sales')
+
+    quantity_sold = models.IntegerField(default=0)
+    sales_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    # বিক্রির সময়ের cost_price (SalesOrderItem.cost_price) অনুযায়ী COGS
+    sales_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    quantity_returned = models.IntegerField(default=0)
+    returns_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    returns_cost = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.date} - {self.product.name}: {self.quantity_sold} sold, {self.quantity_returned} returned"
+
+    class Meta:
+        unique_together = ('date', 'warehouse', 'product', 'user')
+        indexes = [models.Index(fields=['warehouse', 'date'])]
+        db_table = 'inventory_dailysalessummary'
+
+
+class InventoryValuationSnapshot(models.Model):
+    """
+    নির্দিষ্ট দিনের শেষে (as_of) প্রতিটি (warehouse, product) এর স্টক ও তার মূল্য। category রো-তেই রাখা হয়,
+    যাতে ক্যাটাগরি অনুযায়ী রিপোর্টে প্রোডাক্ট টেবিল join করতে না হয়। শূন্য স্টকের রো রাখা হয় না।
+    reports.valuation.ValuationSnapshotService এই টেবিল লেখে।
+    """
+    as_of = models.DateField()
+    warehouse = models.ForeignKey('stock.Warehouse', on_delete=models.CASCADE, related_name='valuation_snapshots')
+    category = models.ForeignKey('products.Category', on_delete=models.SET_NULL, null=True, blank=True, related_name='valuation_snapshots')
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='valuation_snapshots')
+    quantity = models.IntegerField(default=0)
+    value = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.as_of} - {self.product.name} at {self.warehouse.name}: {self.value:.2f}"
+
+    class Meta:
+        unique_together = ('as_of', 'warehouse', 'product')
+        indexes = [models.Index(fields=['as_of', 'warehouse', 'category'])]
+        db_table = 'inventory_valuationsnapshot'
+
+
+class ReportJob(models.Model):
+    """
+    ভারী PDF/Excel এক্সপোর্টের জন্য ব্যাকগ্রাউন্ড জব। ভিউ শুধু জবটি কিউতে রাখে,
+    `run_report_worker` কমান্ড সেটি চালিয়ে তৈরি ফাইল file ফিল্ডে সংরক্ষণ করে।
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='report_jobs')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    progress = models.PositiveSmallIntegerField(default=0)
+    file = models.FileField(upload_to='report_jobs/', null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # জবটি চালানো ওয়ার্কার প্রতিটি পোলে এটি হালনাগাদ করে; পুরনো হয়ে গেলে ধরা হয় ওয়ার্কারটি আর চলছে না
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"{self.get_kind_display()} #{self.pk} ({self.status})"
+
+    def get_kind_display(self):
+        from .jobs import REPORT_JOB_TYPES
+        return REPORT_JOB_TYPES.get(self.kind, {}).get('label', self.kind)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [models.Index(fields=['status', 'created_at'])]
@@ -0,0 +1,108 @@
+# reports/services.py
+
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+from inventory_system.transactions import on_commit_batch
+from sales.models import SalesOrderItem, SalesReturnItem
+from .models import DailySalesSummary
+
+ZERO = Decimal('0.00')
+MONEY = DecimalField(max_digits=14, decimal_places=2)
+
+
+class SalesRollupService:
+    """
+    DailySalesSummary টেবিল রক্ষণাবেক্ষণ করে। একটি দিনের একটি ওয়্যারহাউসের নির্দিষ্ট প্রোডাক্টগুলোর
+    রো মুছে মূল ডেটা থেকে আবার হিসাব করা হয়, তাই একই বাকেট একাধিকবার রিফ্রেশ করলেও ফল একই থাকে।
+    """
+
+    @staticmethod
+    def schedule_refresh(date, warehouse_id, product_ids):
+        """
+        ট্রানজেকশন কমিট হওয়ার পরে বাকেট রিফ্রেশ করে। একই ট্রানজেকশনে একই বাকেট একবারই রিফ্রেশ হয়,
+        আর রোলব্যাক হলে বাকেটটি বাদ যায়।
+        """
+        product_ids = set(product_ids)
+        if not product_ids:
+            return
+        on_commit_batch(
+            ('sales_rollup', date, warehouse_id), set, lambda pending: pending.update(product_ids),
+            lambda pending: SalesRollupService.refresh(date, warehouse_id, pending)
+        )
+
+    @staticmethod
+    def refresh(date, warehouse_id, product_ids=None):
+        sales_filter = {'sales_order__order_date__date': date, 'sales_order__warehouse_id': warehouse_id}
+        returns_filter = {'sales_return__return_date__date': date, 'sales_return__warehouse_id': warehouse_id}
+        summary_filter = {'date': date, 'warehouse_id': warehouse_id}
+        if product_ids is not None:
+            sales_filter['product_id__in'] = product_ids
+            returns_filter['product_id__in'] = product_ids
+            summary_filter['product_id__in'] = product_ids
+
+        with transaction.atomic():
+            DailySalesSummary.objects.filter(**summary_filter).delete()
+            return SalesRollupService._write(sales_filter, returns_filter)
+
+    @staticmethod
+    def rebuild(start_date=None, end_date=None):
+        """নির্দিষ্ট সময়সীমার (না দিলে পুরো ইতিহাসের) রোলআপ দুটি গ্রুপড কুয়েরি দিয়ে নতুন করে তৈরি করে।"""
+        sales_filter, returns_filter, summary_filter = {}, {}, {}
+        if start_date:
+            sales_filter['sales_order__order_date__date__gte'] = start_date
+            returns_filter['sales_return__return_date__date__gte'] = start_date
+            summary_filter['date__gte'] = start_date
+        if end_date:
+            sales_filter['sales_order__order_date__date__lte'] = end_date
+            returns_filter['sales_return__return_date__date__lte'] = end_date
+            summary_filter['date__lte'] = end_date
+
+        with transaction.atomic():
+            DailySalesSummary.objects.filter(**summary_filter).delete()
+            return SalesRollupService._write(sales_filter, returns_filter)
+
+    @staticmethod
+    def _write(sales_filter, returns_filter):
+        rows = {}
+
+        def row_for(date, warehouse_id, product_id, user_id):
+            key = (date, warehouse_id, product_id, user_id)
+            if key not in rows:
+                rows[key] = DailySalesSummary(
+                    date=date, warehouse_id=warehouse_id, product_id=product_id, user_id=user_id,
+                    sales_amount=ZERO, sales_cost=ZERO, returns_amount=ZERO, returns_cost=ZERO,
+                )
+            return rows[key]
+
+        sales = SalesOrderItem.objects.filter(sales_order__status='delivered', **sales_filter).annotate(
+            day=TruncDate('sales_order__order_date')
+        ).values('day', 'sales_order__warehouse_id', 'product_id', 'sales_order__user_id').annotate(
+            total_quantity=Sum('quantity'),
+            total_amount=Coalesce(Sum(F('quantity') * F('unit_price'), output_field=MONEY), ZERO, output_field=MONEY),
+            total_cost=Coalesce(Sum(F('quantity') * F('cost_price'), output_field=MONEY), ZERO, output_field=MONEY),
+        ).order_by()
+        for item in sales:
+            row = row_for(item['day'], item['sales_order__warehouse_id'], item['product_id'], item['sales_order__user_id'])
+            row.quantity_sold = item['total_quantity']
+            row.sales_amount = item['total_amount']
+            row.sales_cost = item['total_cost']
+
+        returns = SalesReturnItem.objects.filter(**returns_filter).annotate(
+            day=TruncDate('sales_return__return_date')
+        ).values('day', 'sales_return__warehouse_id', 'product_id', 'sales_return__user_id').annotate(
+            total_quantity=Sum('quantity'),
+            total_amount=Coalesce(Sum(F('quantity') * F('unit_price'), output_field=MONEY), ZERO, output_field=MONEY),
+            total_cost=Coalesce(Sum(F('quantity') * F('product__cost_price'), output_field=MONEY), ZERO, output_field=MONEY),
+        ).order_by()
+        for item in returns:
+            row = row_for(item['day'], item['sales_return__warehouse_id'], item['product_id'], item['sales_return__user_id'])
+            row.quantity_returned = item['total_quantity']
+            row.returns_amount = item['total_amount']
+            row.returns_cost = item['total_cost']
+
+        DailySalesSummary.objects.bulk_create(rows.values(), batch_size=1000)
+        return len(rows)
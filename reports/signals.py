@@ -0,0 +1,87 @@
+# reports/signals.py
+
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from sales.models import SalesOrder, SalesOrderItem, SalesReturnItem
+from stock.signals import stock_changed
+from . import dashboard_cache
+from .services import SalesRollupService
+
+
+# এই ফিল্ডগুলোর কোনোটি না বদলালে অর্ডার সেভে রোলআপে কিছু বদলায় না; আইটেমের পরিবর্তন আইটেমের সিগন্যাল থেকে আসে
+ROLLUP_ORDER_FIELDS = {'status', 'order_date', 'warehouse'}
+
+
+@receiver(pre_save, sender=SalesOrder)
+def remember_sales_rollup_bucket(sender, instance, update_fields=None, **kwargs):
+    # দিন বা ওয়্যারহাউস বদলালে পুরনো বাকেট থেকেও বিক্রিটি সরাতে হবে, তাই আগের মান মনে রাখা হয়
+    instance._previous_rollup_state = None
+    if instance.pk is None or (update_fields is not None and not ROLLUP_ORDER_FIELDS & set(update_fields)):
+        return
+    instance._previous_rollup_state = SalesOrder.objects.filter(pk=instance.pk).values_list(
+        'status', 'order_date', 'warehouse_id'
+    ).first()
+
+
+@receiver(post_save, sender=SalesOrder)
+def refresh_sales_rollup_on_order_save(sender, instance, created, **kwargs):
+    # ডেলিভারি বা বাতিল, দুই ক্ষেত্রেই সংশ্লিষ্ট দিনের রোলআপ নতুন করে হিসাব হবে
+    if instance.status in ('delivered', 'cancelled'):
+        _invalidate_dashboard_on_commit(instance.warehouse_id)
+    previous = getattr(instance, '_previous_rollup_state', None)
+    # নতুন অর্ডারের তখনো কোনো আইটেম নেই; total_amount এর মতো অন্য ফিল্ডের সেভ বা অপরিবর্তিত সেভ বাদ
+    if created or previous is None or previous == (instance.status, instance.order_date, instance.warehouse_id):
+        return
+
+    product_ids = set(instance.items.values_list('product_id', flat=True))
+    bucket = (timezone.localdate(instance.order_date), instance.warehouse_id)
+    SalesRollupService.schedule_refresh(*bucket, product_ids)
+
+    previous_bucket = (timezone.localdate(previous[1]), previous[2])
+    if previous_bucket != bucket:
+        SalesRollupService.schedule_refresh(*previous_bucket, product_ids)
+        _invalidate_dashboard_on_commit(previous_bucket[1])
+
+
+@receiver(post_save, sender=SalesOrderItem)
+def refresh_sales_rollup_on_item_save(sender, instance, **kwargs):
+    # শুধু ডেলিভারড অর্ডারের আইটেম রোলআপে থাকে; অর্ডারটি সাধারণত আইটেমের সাথে আগে থেকেই লোড করা থাকে
+    order = instance.sales_order
+    if order.status != 'delivered':
+        return
+    SalesRollupService.schedule_refresh(timezone.localdate(order.order_date), order.warehouse_id, [instance.product_id])
+    _invalidate_dashboard_on_commit(order.warehouse_id)
+
+
+@receiver(post_delete, sender=SalesOrderItem)
+def refresh_sales_rollup_on_item_delete(sender, instance, **kwargs):
+    # শুধু ডেলিভারড অর্ডারের আইটেম রোলআপে থাকে; অর্ডার মুছলে আইটেমগুলো আগে মোছে, তখনও অর্ডারটি পাওয়া যায়
+    order = SalesOrder.objects.filter(pk=instance.sales_order_id, status='delivered').values_list(
+        'order_date', 'warehouse_id'
+    ).first()
+    if order is None:
+        return
+    SalesRollupService.schedule_refresh(timezone.localdate(order[0]), order[1], [instance.product_id])
+    _invalidate_dashboard_on_commit(order[1])
+
+
+@receiver([post_save, post_delete], sender=SalesReturnItem)
+def refresh_sales_rollup_on_return(sender, instance, **kwargs):
+    sales_return = instance.sales_return
+    SalesRollupService.schedule_refresh(
+        timezone.localdate(sales_return.return_date), sales_return.warehouse_id, [instance.product_id]
+    )
+    _invalidate_dashboard_on_commit(sales_return.warehouse_id)
+
+
+@receiver(stock_changed)
+def invalidate_dashboard_on_stock_change(sender, warehouse_ids, **kwargs):
+    dashboard_cache.invalidate(warehouse_ids)
+
+
+def _invalidate_dashboard_on_commit(warehouse_id):
+    # রোলআপ রিফ্রেশের পরে চালানোর জন্য on_commit ব্যবহার করা হয়েছে
+    transaction.on_commit(lambda: dashboard_cache.invalidate([warehouse_id]))
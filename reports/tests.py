@@ -1,3 +1,599 @@
-from django.test import TestCase
+import re
+from io import StringIO
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test import RequestFactory, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from datetime import timedelta
+from unittest import mock
+
+from products.barcodes import BarcodeService
+from products.models import Product, Category, UnitOfMeasure, UnitOfMeasureCategory
+from sales.models import SalesOrder, SalesOrderItem, SalesReturn, SalesReturnItem
+from stock.allocation import LotAllocator
+from stock.models import InventoryTransaction, Location, LotSerialNumber, Stock, Warehouse
+from stock.services import StockService
+from . import dashboard_cache, jobs
+from .models import DailySalesSummary, InventoryValuationSnapshot, ReportJob
+from .views import _visible_report_jobs, get_daily_ledger_data
+from .services import SalesRollupService
+from .valuation import ValuationSnapshotService, is_snapshot_day
+
+
+class DailySalesSummaryTest(TestCase):
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name="Rollup Warehouse")
+        category = Category.objects.create(name="Bakery")
+        uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.product = Product.objects.create(
+            name="Rollup Bread", product_code="RB001", category=category, price=5.00,
+            cost_price=3.00, unit_of_measure=unit_of_measure
+        )
+
+    def _deliver_order(self, quantity, unit_price):
+        with self.captureOnCommitCallbacks(execute=True):
+            order = SalesOrder.objects.create(warehouse=self.warehouse, status='draft')
+            SalesOrderItem.objects.create(
+                sales_order=order, product=self.product, quantity=quantity,
+                unit_price=unit_price, cost_price=Decimal('3.00')
+            )
+            order.status = 'delivered'
+            order.save()
+        return order
+
+    def test_delivery_and_return_update_rollup(self):
+        order = self._deliver_order(4, Decimal('5.00'))
+        self._deliver_order(2, Decimal('6.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            sales_return = SalesReturn.objects.create(sales_order=order, warehouse=self.warehouse)
+            SalesReturnItem.objects.create(sales_return=sales_return, product=self.product, quantity=1, unit_price=Decimal('5.00'))
+
+        summary = DailySalesSummary.objects.get(date=timezone.localdate(), warehouse=self.warehouse, product=self.product)
+        self.assertEqual(summary.quantity_sold, 6)
+        self.assertEqual(summary.sales_amount, Decimal('32.00'))
+        self.assertEqual(summary.sales_cost, Decimal('18.00'))
+        self.assertEqual(summary.quantity_returned, 1)
+        self.assertEqual(summary.returns_amount, Decimal('5.00'))
+        self.assertEqual(summary.returns_cost, Decimal('3.00'))
+
+    def test_cancelled_order_is_removed_from_rollup(self):
+        order = self._deliver_order(4, Decimal('5.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            order.status = 'cancelled'
+            order.save()
+        self.assertFalse(DailySalesSummary.objects.filter(quantity_sold__gt=0).exists())
+
+    def test_rebuild_matches_incremental_rows(self):
+        self._deliver_order(3, Decimal('5.00'))
+        incremental = list(DailySalesSummary.objects.values_list('date', 'product_id', 'quantity_sold', 'sales_amount'))
+        SalesRollupService.rebuild()
+        rebuilt = list(DailySalesSummary.objects.values_list('date', 'product_id', 'quantity_sold', 'sales_amount'))
+        self.assertEqual(incremental, rebuilt)
+
+    def test_moved_order_leaves_its_previous_bucket(self):
+        order = self._deliver_order(3, Decimal('5.00'))
+        other_warehouse = Warehouse.objects.create(name="Second Rollup Warehouse")
+        with self.captureOnCommitCallbacks(execute=True):
+            order.order_date -= timedelta(days=1)
+            order.warehouse = other_warehouse
+            order.save()
+
+        self.assertEqual(
+            list(DailySalesSummary.objects.filter(quantity_sold__gt=0).values_list('date', 'warehouse_id', 'quantity_sold')),
+            [(timezone.localdate() - timedelta(days=1), other_warehouse.pk, 3)]
+        )
+
+    def test_deleted_item_is_removed_from_rollup(self):
+        order = self._deliver_order(3, Decimal('5.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            order.items.get().delete()
+        self.assertFalse(DailySalesSummary.objects.filter(quantity_sold__gt=0).exists())
+
+    def test_rebuild_command_backfills_existing_sales(self):
+        self._deliver_order(3, Decimal('5.00'))
+        DailySalesSummary.objects.all().delete()
+        call_command('rebuild_sales_rollup', stdout=StringIO())
+        self.assertEqual(DailySalesSummary.objects.get(product=self.product).quantity_sold, 3)
+
+    def test_total_amount_save_does_not_refresh_rollup(self):
+        order = self._deliver_order(3, Decimal('5.00'))
+        order.total_amount = Decimal('15.00')
+        with mock.patch.object(SalesRollupService, 'schedule_refresh') as schedule_refresh:
+            with self.assertNumQueries(1):
+                order.save(update_fields=['total_amount'])
+            order.save()
+        schedule_refresh.assert_not_called()
+
+    def test_item_added_to_delivered_order_updates_rollup(self):
+        order = self._deliver_order(3, Decimal('5.00'))
+        with self.captureOnCommitCallbacks(execute=True):
+            SalesOrderItem.objects.create(
+                sales_order=order, product=self.product, quantity=2, unit_price=Decimal('5.00'), cost_price=Decimal('3.00')
+            )
+        self.assertEqual(DailySalesSummary.objects.get(product=self.product).quantity_sold, 5)
+
+    def test_daily_ledger_merges_sales_and_returns_in_one_query(self):
+        order = self._deliver_order(4, Decimal('5.00'))
+        # অর্ডারের মোট (ছাড়ের পরে) আইটেমের যোগফলের চেয়ে কম
+        SalesOrder.objects.filter(pk=order.pk).update(total_amount=Decimal('18.00'))
+        SalesOrder.objects.create(warehouse=self.warehouse, status='draft', total_amount=Decimal('99.00'))
+        sales_return = SalesReturn.objects.create(sales_order=order, warehouse=self.warehouse)
+        SalesReturnItem.objects.create(sales_return=sales_return, product=self.product, quantity=2, unit_price=Decimal('5.00'))
+        SalesReturnItem.objects.create(sales_return=sales_return, product=self.product, quantity=1, unit_price=Decimal('2.50'))
+
+        request = RequestFactory().get('/')
+        request.user = get_user_model().objects.create_superuser('ledger', 'ledger@example.com', 'pass')
+        report_data = get_daily_ledger_data(request.user, request.GET)
+        with self.assertNumQueries(1):
+            entries = list(report_data['daily_ledger'])
+        self.assertEqual(
+            [(entry['type'], entry['order_id'], entry['amount']) for entry in entries],
+            [('Return', order.pk, Decimal('-12.50')), ('Sale', order.pk, Decimal('18.00'))]
+        )
+        # মোট হিসাব তালিকার রো গুলোর সাথেই মেলে
+        self.assertEqual((report_data['total_sales'], report_data['total_returns']), (Decimal('18.00'), Decimal('12.50')))
+        self.assertEqual(report_data['net_sales'], sum(entry['amount'] for entry in entries))
+
+        self.client.force_login(request.user)
+        response = self.client.get(reverse('reports:daily_sales_report'))
+        self.assertEqual(len(response.context['daily_ledger']), 2)
+        self.assertContains(response, f"SO-{order.pk}")
+        response = self.client.get(reverse('reports:export_daily_sales_excel'))
+        self.assertEqual(response.status_code, 200)
+
+
+class DashboardCacheTest(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.warehouse = Warehouse.objects.create(name="Cache Warehouse")
+        self.other_warehouse = Warehouse.objects.create(name="Other Cache Warehouse")
+        self.user = get_user_model().objects.create_user(username="branch", password="x", warehouse=self.warehouse)
+        category = Category.objects.create(name="Dairy")
+        uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.product = Product.objects.create(
+            name="Cache Milk", product_code="CM001", category=category, price=5.00, unit_of_measure=unit_of_measure
+        )
+
+    def _key(self):
+        today = timezone.localdate()
+        return dashboard_cache.make_key(self.user, self.warehouse, today, today)
+
+    def test_stock_change_invalidates_only_affected_warehouse(self):
+        key = self._key()
+        with self.captureOnCommitCallbacks(execute=True):
+            StockService.change_stock(self.product, self.other_warehouse, 5, 'purchase', None)
+        self.assertEqual(self._key(), key)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            StockService.change_stock(self.product, self.warehouse, 5, 'purchase', None)
+        self.assertNotEqual(self._key(), key)
+
+    def test_delivery_invalidates_dashboard(self):
+        key = self._key()
+        with self.captureOnCommitCallbacks(execute=True):
+            SalesOrder.objects.create(warehouse=self.warehouse, status='delivered')
+        self.assertNotEqual(self._key(), key)
+
+
+class ReportJobTest(TestCase):
+    def setUp(self):
+        self.admin = get_user_model().objects.create_superuser(username="admin", password="x", email="a@example.com")
+        self.staff = get_user_model().objects.create_user(username="staff", password="x")
+
+    def test_enqueue_and_run_job(self):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('reports:enqueue_report_job', args=['products_pdf']) + '?status=active')
+        self.assertRedirects(response, reverse('reports:report_job_list'))
+        job = ReportJob.objects.get()
+        self.assertEqual(job.params, {'status': ['active']})
+
+        self.assertEqual(jobs.claim_pending(5), [job.pk])
+        self.assertEqual(jobs.claim_pending(5), [])
+        self.assertEqual(jobs.run_job(job.pk), 'done')
+
+        status = self.client.get(reverse('reports:report_job_status', args=[job.pk])).json()
+        self.assertEqual(status['progress'], 100)
+        download = self.client.get(status['download_url'])
+        self.assertTrue(b''.join(download.streaming_content).startswith(b'%PDF'))
+
+    def test_every_report_type_renders_into_the_job_file(self):
+        for kind in jobs.REPORT_JOB_TYPES:
+            with self.subTest(kind=kind):
+                job = jobs.enqueue(kind, self.admin, {'start_date': ['2024-01-01']})
+                self.assertEqual(jobs.run_job(job.pk), 'done', ReportJob.objects.get(pk=job.pk).error)
+                with ReportJob.objects.get(pk=job.pk).file.open('rb') as report_file:
+                    self.assertEqual(report_file.read(4), b'%PDF')
+
+    def test_job_fails_without_permission_and_is_owner_only(self):
+        job = jobs.enqueue('products_pdf', self.staff, {})
+        self.assertEqual(jobs.run_job(job.pk), 'failed')
+        self.assertIn('missing permission', ReportJob.objects.get(pk=job.pk).error)
+        self.assertFalse(ReportJob.objects.get(pk=job.pk).file)
+
+        other = get_user_model().objects.create_user(username="other", password="x")
+        self.assertFalse(_visible_report_jobs(other).filter(pk=job.pk).exists())
+        self.assertTrue(_visible_report_jobs(self.admin).filter(pk=job.pk).exists())
+
+    def test_requeue_skips_jobs_with_a_recent_heartbeat(self):
+        live, abandoned = jobs.enqueue('products_pdf', self.admin, {}), jobs.enqueue('products_pdf', self.admin, {})
+        jobs.claim_pending(2)
+        long_ago = timezone.now() - timedelta(hours=2)
+        ReportJob.objects.update(started_at=long_ago, heartbeat_at=long_ago)
+        # অন্য একটি চালু ওয়ার্কার লম্বা জবটির heartbeat পাঠাচ্ছে
+        jobs.heartbeat([live.pk])
+
+        self.assertEqual(jobs.requeue_stale(timezone.now() - timedelta(minutes=30)), 1)
+        self.assertEqual(ReportJob.objects.get(pk=live.pk).status, 'running')
+        self.assertEqual(ReportJob.objects.get(pk=abandoned.pk).status, 'pending')
+
+
+class InventoryValuationSnapshotTest(TestCase):
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name="Valuation Warehouse")
+        self.other_warehouse = Warehouse.objects.create(name="Other Warehouse")
+        self.category = Category.objects.create(name="Tools")
+        uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.product = Product.objects.create(
+            name="Wrench", product_code="WR001", category=self.category, price=20,
+            cost_price=5, unit_of_measure=unit_of_measure
+        )
+        self.today = timezone.localdate()
+        self.yesterday = self.today - timedelta(days=1)
+
+    def _post(self, warehouse, quantity, unit_cost=None, days_ago=0):
+        created = StockService.apply_movements([{
+            'product': self.product, 'warehouse': warehouse, 'quantity_change': quantity,
+            'transaction_type': 'purchase' if quantity > 0 else 'sale', 'user': None, 'unit_cost': unit_cost,
+        }])
+        InventoryTransaction.objects.filter(pk=created[0].pk).update(
+            transaction_date=timezone.now() - timedelta(days=days_ago)
+        )
+
+    def test_past_snapshot_excludes_later_transactions(self):
+        self._post(self.warehouse, 10, unit_cost=4, days_ago=2)
+        self._post(self.warehouse, 5, unit_cost=10)
+        self._post(self.warehouse, -3)
+
+        self.assertEqual(ValuationSnapshotService.take(self.yesterday), 1)
+        snapshot = InventoryValuationSnapshot.objects.get(as_of=self.yesterday)
+        self.assertEqual((snapshot.quantity, snapshot.value, snapshot.category_id), (10, Decimal('40'), self.category.pk))
+
+    def test_report_groups_and_compares(self):
+        self._post(self.warehouse, 10, unit_cost=4, days_ago=2)
+        self._post(self.other_warehouse, 2, unit_cost=4, days_ago=2)
+        ValuationSnapshotService.take(self.yesterday)
+        self._post(self.warehouse, 5, unit_cost=4)
+        ValuationSnapshotService.take(self.today)
+
+        report = ValuationSnapshotService.report(self.today, 'warehouse', compare_to=self.yesterday)
+        self.assertEqual(
+            [(row['label'], row['value'], row['value_change']) for row in report['rows']],
+            [("Valuation Warehouse", Decimal('60'), Decimal('20')), ("Other Warehouse", Decimal('8'), Decimal('0'))]
+        )
+        self.assertEqual(report['total_value'], Decimal('68'))
+
+        # স্ন্যাপশটের মাঝের দিনে আগের সর্বশেষ স্ন্যাপশট ব্যবহার হয়
+        drill = ValuationSnapshotService.report(self.today + timedelta(days=3), 'product', warehouse_id=self.warehouse.pk)
+        self.assertEqual(drill['snapshot_date'], self.today)
+        self.assertEqual([row['quantity'] for row in drill['rows']], [15])
+
+    def test_interval_and_view(self):
+        self.assertTrue(is_snapshot_day(timezone.datetime(2024, 2, 29).date(), 'monthly'))
+        self.assertFalse(is_snapshot_day(timezone.datetime(2024, 2, 28).date(), 'monthly'))
+
+        self._post(self.warehouse, 4, unit_cost=5)
+        ValuationSnapshotService.take(self.today)
+        user = get_user_model().objects.create_superuser('valuer', 'valuer@example.com', 'pass')
+        self.client.force_login(user)
+        response = self.client.get(reverse('reports:inventory_valuation_report'), {'group': 'category'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['report']['total_value'], Decimal('20'))
+        self.assertContains(response, "Tools")
+
+
+# বড় হলে পুরো টেবিল পড়া চলবে না এমন টেবিল
+HOT_TABLES = {
+    'inventory_inventorytransaction', 'inventory_salesorder', 'inventory_salesorderitem',
+    'inventory_lotserialnumber', 'inventory_stock', 'sales_salesreturn',
+}
+
+
+def full_scans(sql):
+    """
+    sql এর query plan এ HOT_TABLES এর কোনো টেবিল index ছাড়া পুরোটা পড়া হলে সেই টেবিলগুলোর নাম।
+    PostgreSQL এ seq scan বন্ধ করে EXPLAIN চালানো হয়, তাই তখনও 'Seq Scan' থাকলে ব্যবহারযোগ্য index নেই।
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute('EXPLAIN ' + sql)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+            return {table for table in re.findall(r'Seq Scan on (\w+)', plan) if table in HOT_TABLES}
+        cursor.execute('EXPLAIN QUERY PLAN ' + sql)
+        # সাবকুয়েরিতে Django টেবিলের alias (U0, T3) দেয়; plan এ alias দেখায়
+        aliases = dict((alias, table) for table, alias in re.findall(r'"(\w+)" ([UT]\d+)\b', sql))
+        scanned = {aliases.get(name, name) for name in re.findall(r'^SCAN (\w+)$', '\n'.join(row[-1] for row in cursor.fetchall()), re.M)}
+        return scanned & HOT_TABLES
+
+
+class QueryPlanTest(TestCase):
+    """ড্যাশবোর্ড, FEFO লট, দৈনিক লেজার ও ট্রানজেকশন তালিকার কুয়েরি যেন index ব্যবহার করে।"""
+
+    def setUp(self):
+        cache.clear()
+        self.warehouse = Warehouse.objects.create(name="Plan Warehouse")
+        self.location = Location.objects.create(name="Plan Shelf", warehouse=self.warehouse)
+        category = Category.objects.create(name="Plan Category")
+        uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.product = Product.objects.create(
+            name="Plan Product", product_code="PL001", category=category, price=10,
+            cost_price=6, unit_of_measure=unit_of_measure, tracking_method='lot'
+        )
+        today = timezone.localdate()
+        for days in (10, 40, 200):
+            LotSerialNumber.objects.create(
+                product=self.product, location=self.location, lot_number=f"PL-{days}",
+                quantity=5, expiration_date=today + timedelta(days=days)
+            )
+        Stock.objects.create(product=self.product, warehouse=self.warehouse, quantity=15)
+        for status in ('delivered', 'confirmed', 'draft'):
+            order = SalesOrder.objects.create(warehouse=self.warehouse, status=status, total_amount=10)
+            SalesOrderItem.objects.create(sales_order=order, product=self.product, quantity=1, unit_price=10)
+        SalesReturn.objects.create(sales_order=order, warehouse=self.warehouse)
+        InventoryTransaction.objects.create(
+            product=self.product, warehouse=self.warehouse, quantity=15, transaction_type='purchase',
+            destination_location=self.location,
+        )
+        self.superuser = get_user_model().objects.create_superuser('planner', 'planner@example.com', 'pass')
+        self.branch_user = get_user_model().objects.create_user('branch_planner', password='pass', warehouse=self.warehouse)
+
+    def assertNoFullScans(self, queries):
+        for query in queries:
+            if query['sql'].startswith('SELECT'):
+                self.assertEqual(full_scans(query['sql']), set(), query['sql'])
+
+    def test_detects_full_scan(self):
+        with CaptureQueriesContext(connection) as queries:
+            list(InventoryTransaction.objects.filter(notes='x'))
+        self.assertEqual(full_scans(queries.captured_queries[0]['sql']), {'inventory_inventorytransaction'})
+
+    def test_dashboard_metrics(self):
+        from inventory_system.views import _dashboard_metrics
+        with CaptureQueriesContext(connection) as queries:
+            _dashboard_metrics(self.branch_user, self.warehouse, None, None)
+        self.assertNoFullScans(queries.captured_queries)
+
+    def test_fefo_lot_lookup(self):
+        with CaptureQueriesContext(connection) as queries:
+            LotAllocator.allocate(self.warehouse, [(self.product, 7)], 'fefo')
+        self.assertNoFullScans(queries.captured_queries)
+
+    def test_daily_ledger(self):
+        for user in (self.superuser, self.branch_user):
+            request = RequestFactory().get('/', {'start_date': '2024-01-01'})
+            request.user = user
+            with CaptureQueriesContext(connection) as queries:
+                get_daily_ledger_data(request.user, request.GET)
+            self.assertNoFullScans(queries.captured_queries)
+
+    def test_transaction_list(self):
+        for user in (self.superuser, self.branch_user):
+            self.client.force_login(user)
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse('stock:transaction_list'), {'start_date': '2024-01-01'})
+            self.assertNoFullScans(queries.captured_queries)
+
+
+class PdfRenderingTest(TestCase):
+    def test_rows_are_split_into_chunked_tables(self):
+        from reportlab.platypus import Table
+        from inventory_system.pdf import FlowableStream, pdf_response, table_chunks
+
+        rows = ([str(i), f"Row {i}"] for i in range(450))
+        tables = list(table_chunks(['#', 'Name'], rows, [50, 200], chunk_size=200))
+        self.assertEqual([len(table._cellvalues) for table in tables], [201, 201, 51])
+
+        # story generator থেকে শুধু দরকারি flowable টেনে আনা হয়
+        story = FlowableStream(Table([[str(i)]]) for i in range(5))
+        self.assertEqual(list.__len__(story), 0)
+        self.assertEqual(len(story), 2)
+
+        rows = ([str(i), f"Row {i}"] for i in range(1200))
+        response = pdf_response(table_chunks(['#', 'Name'], rows, [50, 200]), 'rows.pdf')
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        content = b''.join(response.streaming_content)
+        self.assertTrue(content.startswith(b'%PDF'))
+        # "Page X of Y" এর মোট সংখ্যা একটিমাত্র form এ, প্রতিটি পেজ সেটি ব্যবহার করে
+        self.assertEqual(content.count(b'/Subtype /Form'), 1)
+        self.assertGreater(content.count(b'/FormXob.page_count_total'), 20)
+
+    def test_daily_sales_pdf_streams(self):
+        self.client.force_login(get_user_model().objects.create_superuser('pdfuser', 'pdf@example.com', 'pass'))
+        response = self.client.get(reverse('reports:export_daily_sales_pdf'))
+        self.assertTrue(response.streaming)
+        self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+    def test_toolkit_is_built_once_per_process(self):
+        from inventory_system.pdf import get_styles, logo, logo_image
+
+        self.assertIs(get_styles(), get_styles())
+        self.assertEqual(get_styles()['TitleStyleGrey'].fontSize, 22)
+        # লোগো একবারই ডিকোড হয়; প্রতিটি flowable শুধু মাপ আলাদা রাখে
+        first, second = logo(100, 30), logo(50, 15)
+        self.assertIs(first._img, logo_image())
+        self.assertIs(second._img, logo_image())
+        self.assertIsNotNone(logo_image()._data)
+
+    def test_all_exporters_use_shared_toolkit(self):
+        from costing.models import JobCost
+        from purchase.models import PurchaseOrder
+
+        self.client.force_login(get_user_model().objects.create_superuser('pdfadmin', 'pdfadmin@example.com', 'pass'))
+        warehouse = Warehouse.objects.create(name="PDF Branch")
+        sales_order = SalesOrder.objects.create(warehouse=warehouse, status='delivered')
+        JobCost.objects.create(sales_order=sales_order, total_revenue=10, total_material_cost=15, profit=-5)
+        purchase_order = PurchaseOrder.objects.create(warehouse=warehouse, expected_delivery_date=timezone.now().date())
+
+        urls = [
+            reverse('costing:export_job_costing_pdf'),
+            reverse('products:export_products_pdf'),
+            reverse('purchase:export_purchase_orders_pdf'),
+            reverse('purchase:export_single_purchase_order_pdf', args=[purchase_order.pk]),
+            reverse('purchase:export_single_purchase_receipt_pdf', args=[purchase_order.pk]),
+            reverse('sales:export_sales_order_pdf', args=[sales_order.pk]),
+        ]
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertEqual(response.status_code, 200)
+                # শেয়ার্ড টুলকিট অস্থায়ী ফাইল থেকে FileResponse হিসেবে পাঠায়
+                self.assertTrue(response.streaming)
+                self.assertTrue(b''.join(response.streaming_content).startswith(b'%PDF'))
+
+
+class LabelSheetTest(TestCase):
+    def setUp(self):
+        category = Category.objects.create(name="Shelf")
+        uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.products = [
+            Product.objects.create(
+                name=f"Label Product {i}", product_code=f"LBL{i:03d}", category=category, price=5.00,
+                sale_price=7.50, cost_price=3.00, unit_of_measure=unit_of_measure
+            )
+            for i in range(3)
+        ]
+
+    def test_products_load_in_one_query_in_selection_order(self):
+        from products.labels import load_label_items
+
+        quantities = {self.products[2].pk: 2, self.products[0].pk: 1, 999999: 5, self.products[1].pk: 0}
+        with self.assertNumQueries(1):
+            items = load_label_items(quantities)
+        self.assertEqual([(product.pk, copies) for product, copies in items], [(self.products[2].pk, 2), (self.products[0].pk, 1)])
+
+    def test_each_product_is_drawn_once_and_reused_per_copy(self):
+        from io import BytesIO
+        from products.labels import LABEL_TEMPLATES, barcode_drawing, render_labels
+
+        barcode_drawing.cache_clear()
+        output = BytesIO()
+        items = [(self.products[0], 30), (self.products[1], 20)]
+        self.assertEqual(render_labels(items, output, LABEL_TEMPLATES['a4_3x8'], currency='QAR '), 50)
+        content = output.getvalue()
+        # ৫০টি লেবেল, ২৪টি করে প্রতি পেজে: ৩ পেজ, কিন্তু প্রতিটি প্রোডাক্টের একটিই form
+        self.assertEqual(content.count(b'/Type /Page\n'), 3)
+        self.assertEqual(content.count(b'/Subtype /Form'), 2)
+        self.assertEqual(barcode_drawing.cache_info().misses, 2)
+
+        render_labels(items, BytesIO(), LABEL_TEMPLATES['thermal'])
+        self.assertEqual(barcode_drawing.cache_info().misses, 2)
+
+    def test_print_labels_view_uses_selected_template(self):
+        self.client.force_login(get_user_model().objects.create_superuser('labeluser', 'label@example.com', 'pass'))
+        response = self.client.post(reverse('products:print_product_labels'), {
+            'product_ids': [self.products[0].pk, self.products[1].pk],
+            f'quantity_{self.products[0].pk}': '3',
+            f'quantity_{self.products[1].pk}': 'x',
+            'label_template': 'a4_4x10',
+        })
+        self.assertEqual(response['Content-Type'], 'application/pdf')
+        self.assertTrue(response.content.startswith(b'%PDF'))
+        self.assertEqual(response.content.count(b'/Subtype /Form'), 1)
+
+
+class ProductBarcodeTest(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name="Barcoded")
+        uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        self.unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=uom_category, ratio=1.0, is_base_unit=True
+        )
+
+    def _create(self, code):
+        return Product.objects.create(
+            name=f"Product {code}", product_code=code, category=self.category, price=5.00,
+            cost_price=3.00, unit_of_measure=self.unit_of_measure
+        )
+
+    def test_barcode_is_rendered_after_commit_not_in_save(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            product = self._create('BC001')
+            self.assertFalse(product.barcode)
+        for callback in callbacks:
+            callback()
+        product.refresh_from_db()
+        self.assertEqual(product.barcode.name, 'barcodes/BC001.png')
+        self.assertTrue(product.barcode.storage.exists(product.barcode.name))
+
+    def test_changed_product_code_regenerates_and_removes_old_image(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            product = self._create('BC002')
+        product = Product.objects.get(pk=product.pk)
+        storage = product.barcode.storage
+
+        # রোলব্যাক হওয়া পরিবর্তনে পুরনো ছবি থেকে যায়
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    product.product_code = 'BC002-X'
+                    product.save()
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertTrue(storage.exists('barcodes/BC002.png'))
+
+        product = Product.objects.get(pk=product.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            product.product_code = 'BC002-B'
+            product.save()
+        product.refresh_from_db()
+        self.assertEqual(product.barcode.name, 'barcodes/BC002-B.png')
+        self.assertFalse(storage.exists('barcodes/BC002.png'))
+
+    def test_rolled_back_products_are_not_rendered(self):
+        with mock.patch.object(BarcodeService, 'generate', return_value=(0, [])) as generate:
+            with self.captureOnCommitCallbacks(execute=True):
+                try:
+                    with transaction.atomic():
+                        self._create('BC005')
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                product = self._create('BC006')
+        generate.assert_called_once_with([product.pk], [])
+
+    def test_generate_barcodes_command_fills_missing_only(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            done = self._create('BC003')
+        pending = self._create('BC004')  # on_commit চলেনি, তাই ছবি নেই
+        done.refresh_from_db()
+
+        out = StringIO()
+        call_command('generate_barcodes', '--missing-only', stdout=out)
+        self.assertIn('Generated 1 barcodes', out.getvalue())
+        pending.refresh_from_db()
+        self.assertEqual(pending.barcode.name, 'barcodes/BC004.png')
+        self.assertEqual(Product.objects.get(pk=done.pk).barcode.name, done.barcode.name)
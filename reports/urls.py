@@ -9,8 +9,15 @@ urlpatterns = [
     path('expiry-report/', views.expiry_report_view, name='expiry_report'),
     path('dead-stock-report/', views.dead_stock_report_view, name='dead_stock_report'),
     path('purchase-suggestion-report/', views.purchase_suggestion_report_view, name='purchase_suggestion_report'),
+    path('inventory-valuation/', views.inventory_valuation_report_view, name='inventory_valuation_report'),
     
     # --- নতুন এবং উন্নত URL ---
     path('daily-sales-report/export/excel/', views.export_daily_sales_excel, name='export_daily_sales_excel'),
     path('daily-sales-report/export/pdf/', views.export_daily_sales_pdf, name='export_daily_sales_pdf'), # <-- নতুন PDF URL
-]
\ No newline at end of file
+
+    # --- ব্যাকগ্রাউন্ড রিপোর্ট জব ---
+    path('jobs/', views.report_job_list, name='report_job_list'),
+    path('jobs/enqueue/<str:kind>/', views.enqueue_report_job, name='enqueue_report_job'),
+    path('jobs/<int:pk>/status/', views.report_job_status, name='report_job_status'),
+    path('jobs/<int:pk>/download/', views.download_report_job, name='download_report_job'),
+]
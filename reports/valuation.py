@@ -0,0 +1,140 @@
+# reports/valuation.py
+
+import calendar
+import datetime
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import DecimalField, F, Max, Sum
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from products.models import Product
+from stock.models import InventoryTransaction, StockValuation
+from .models import InventoryValuationSnapshot
+
+ZERO = Decimal('0')
+MONEY = DecimalField(max_digits=16, decimal_places=4)
+INTERVALS = ('daily', 'weekly', 'monthly')
+# রিপোর্টের গ্রুপিং: (key ফিল্ড, নামের ফিল্ড)
+GROUPINGS = {
+    'warehouse': ('warehouse_id', 'warehouse__name'),
+    'category': ('category_id', 'category__name'),
+    'product': ('product_id', 'product__name'),
+}
+
+
+def is_snapshot_day(date, interval):
+    """daily: প্রতিদিন, weekly: প্রতি রবিবার, monthly: মাসের শেষ দিন।"""
+    if interval == 'daily':
+        return True
+    if interval == 'weekly':
+        return date.weekday() == 6
+    if interval == 'monthly':
+        return date.day == calendar.monthrange(date.year, date.month)[1]
+    raise ValueError(f"Unknown snapshot interval: {interval}")
+
+
+class ValuationSnapshotService:
+    """
+    ইনভেন্টরি ভ্যালুয়েশনের দিন-শেষের স্ন্যাপশট লেখে ও পড়ে। মূল্য আসে কস্ট লেয়ারের (StockValuation)
+    বর্তমান অবস্থা থেকে; পুরনো তারিখের জন্য তার পরের ট্রানজেকশনগুলো তাদের পোস্টিং খরচে বাদ দেওয়া হয়,
+    তাই দেরিতে চালানো জবও সঠিক তারিখের স্ন্যাপশট লিখতে পারে।
+    """
+
+    @staticmethod
+    def positions(as_of):
+        """as_of দিনের শেষে (warehouse_id, product_id) অনুযায়ী [quantity, value]।"""
+        positions = defaultdict(lambda: [0, ZERO])
+        for warehouse_id, product_id, quantity, value in StockValuation.objects.values_list(
+            'warehouse_id', 'product_id', 'quantity', 'value'
+        ):
+            positions[(warehouse_id, product_id)] = [quantity, value]
+
+        day_end = timezone.make_aware(datetime.datetime.combine(as_of + datetime.timedelta(days=1), datetime.time.min))
+        later = InventoryTransaction.objects.filter(
+            transaction_date__gte=day_end, warehouse__isnull=False
+        ).values('warehouse_id', 'product_id').annotate(
+            quantity_total=Sum('quantity'),
+            value_total=Sum(F('quantity') * Coalesce('unit_cost', 'product__cost_price', output_field=MONEY), output_field=MONEY),
+        ).values_list('warehouse_id', 'product_id', 'quantity_total', 'value_total').order_by()
+        for warehouse_id, product_id, quantity, value in later:
+            position = positions[(warehouse_id, product_id)]
+            position[0] -= quantity or 0
+            position[1] -= value or ZERO
+        return positions
+
+    @staticmethod
+    def take(as_of=None):
+        """as_of দিনের স্ন্যাপশট (আগে থাকলে নতুন করে) লেখে; লেখা রো এর সংখ্যা ফেরত দেয়।"""
+        as_of = as_of or timezone.localdate()
+        positions = {key: position for key, position in ValuationSnapshotService.positions(as_of).items() if position[0]}
+        categories = dict(
+            Product.objects.filter(pk__in={product_id for _, product_id in positions}).values_list('pk', 'category_id')
+        )
+        rows = [
+            InventoryValuationSnapshot(
+                as_of=as_of, warehouse_id=warehouse_id, product_id=product_id,
+                category_id=categories.get(product_id), quantity=quantity, value=value
+            )
+            for (warehouse_id, product_id), (quantity, value) in positions.items()
+        ]
+        with transaction.atomic():
+            InventoryValuationSnapshot.objects.filter(as_of=as_of).delete()
+            InventoryValuationSnapshot.objects.bulk_create(rows, batch_size=1000)
+        return len(rows)
+
+    @staticmethod
+    def snapshot_date(as_of):
+        """as_of বা তার আগের সর্বশেষ স্ন্যাপশটের তারিখ; কোনো স্ন্যাপশট না থাকলে None।"""
+        return InventoryValuationSnapshot.objects.filter(as_of__lte=as_of).aggregate(date=Max('as_of'))['date']
+
+    @staticmethod
+    def totals(snapshot_date, group_by, **filters):
+        """একটি স্ন্যাপশটের group_by অনুযায়ী মোট; key -> {'key', 'label', 'quantity', 'value'}।"""
+        if snapshot_date is None:
+            return {}
+        key_field, label_field = GROUPINGS[group_by]
+        rows = InventoryValuationSnapshot.objects.filter(as_of=snapshot_date, **filters).values(
+            key_field, label_field
+        ).annotate(quantity_total=Sum('quantity'), value_total=Sum('value')).order_by()
+        return {
+            row[key_field]: {
+                'key': row[key_field], 'label': row[label_field] or 'Uncategorized',
+                'quantity': row['quantity_total'], 'value': row['value_total'],
+            }
+            for row in rows
+        }
+
+    @staticmethod
+    def report(as_of, group_by='warehouse', compare_to=None, **filters):
+        """
+        as_of (আর compare_to দিলে সেই তারিখেরও) স্ন্যাপশট থেকে group_by অনুযায়ী রিপোর্ট।
+        filters: warehouse_id / category_id দিয়ে ড্রিল-ডাউন। মূল্য অনুযায়ী বড় থেকে ছোট সাজানো রো ফেরত দেয়।
+        """
+        snapshot_date = ValuationSnapshotService.snapshot_date(as_of)
+        compare_date = ValuationSnapshotService.snapshot_date(compare_to) if compare_to else None
+        current = ValuationSnapshotService.totals(snapshot_date, group_by, **filters)
+        previous = ValuationSnapshotService.totals(compare_date, group_by, **filters)
+
+        rows = []
+        for key in current.keys() | previous.keys():
+            row = dict(current.get(key) or previous[key])
+            if key not in current:
+                row.update(quantity=0, value=ZERO)
+            before = previous.get(key)
+            row['compare_quantity'] = before['quantity'] if before else 0
+            row['compare_value'] = before['value'] if before else ZERO
+            row['value_change'] = row['value'] - row['compare_value']
+            rows.append(row)
+        rows.sort(key=lambda row: (-row['value'], row['label']))
+
+        return {
+            'snapshot_date': snapshot_date,
+            'compare_date': compare_date,
+            'rows': rows,
+            'total_quantity': sum(row['quantity'] for row in rows),
+            'total_value': sum((row['value'] for row in rows), ZERO),
+            'total_compare_value': sum((row['compare_value'] for row in rows), ZERO),
+        }
@@ -1,52 +1,60 @@
 # reports/views.py (সংশোধিত)
 
 import os
-from django.shortcuts import render
+from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Q
 from django.conf import settings
 from datetime import timedelta, datetime
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse, FileResponse, Http404
+from django.views.decorators.http import require_POST
+from django.contrib import messages
 from django.contrib.auth import get_user_model
 from django.core.paginator import Paginator
 from django.utils import timezone
+from django.urls import reverse
 from django.utils.dateparse import parse_date
-from io import BytesIO
+from itertools import chain
 
 # মডেল ইম্পোর্ট
 from sales.models import SalesOrder, SalesReturn
-from stock.models import Warehouse, LotSerialNumber, Stock
+from stock.models import Warehouse, LotSerialNumber
 from sales.models import SalesOrderItem
-from products.models import Product
+from products.models import Category
+from purchase.models import ReplenishmentSuggestion
+from .models import ReportJob
+from .ledger import ledger_entries, ledger_totals
+from .valuation import GROUPINGS, ValuationSnapshotService
+from . import jobs
+from inventory_system.pdf import build_pdf, document_header, get_styles, render_response, signature_block, table_chunks
 
 # এক্সেল এবং পিডিএফ তৈরির লাইব্রেরি
 from openpyxl import Workbook
 from openpyxl.styles import Font, Alignment, Border, Side, PatternFill
 from openpyxl.utils.units import points_to_pixels
 import openpyxl
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+from reportlab.platypus import Paragraph, Spacer, Table, PageBreak
 from reportlab.lib.pagesizes import A4, landscape
 from reportlab.lib import colors
 from reportlab.lib.units import inch
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
 
 
 User = get_user_model()
 DEFAULT_CURRENCY_SYMBOL = 'QAR '
 
-def get_daily_ledger_data(request):
+def _day_start(date):
+    """date দিনের শুরুর aware datetime; __date lookup এর বদলে সীমা দিলে order_date এর index ব্যবহার হয়।"""
+    return timezone.make_aware(datetime.combine(date, datetime.min.time()))
+
+def get_daily_ledger_data(user, params):
     """
-    এই কেন্দ্রীয় ফাংশনটি request থেকে ফিল্টার নেয় এবং সেলস ও রিটার্নের সমন্বিত তালিকা 
+    এই কেন্দ্রীয় ফাংশনটি params (GET ফিল্টার) থেকে ফিল্টার নেয় এবং সেলস ও রিটার্নের সমন্বিত তালিকা 
     এবং মোট হিসাব প্রদান করে। ওয়েবপেজ ও ডাউনলোড ফাংশন এখন এটি ব্যবহার করবে।
     """
-    user = request.user
-
     # --- ১. ফর্ম থেকে ফিল্টারের তথ্য গ্রহণ ---
-    start_date_str = request.GET.get('start_date')
-    end_date_str = request.GET.get('end_date')
-    user_id = request.GET.get('user')
-    warehouse_id = request.GET.get('warehouse')
+    start_date_str = params.get('start_date')
+    end_date_str = params.get('end_date')
+    user_id = params.get('user')
+    warehouse_id = params.get('warehouse')
 
     # --- নতুন: ডিফল্ট তারিখের যুক্তি ---
     form_start_date = parse_date(start_date_str) if start_date_str else None
@@ -60,8 +68,8 @@ def get_daily_ledger_data(request):
         query_start_date, query_end_date = today, today
 
     # --- ২. কুয়েরিসেট তৈরি ও ফিল্টার ---
-    sales_qs = SalesOrder.objects.filter(status='delivered').select_related('customer', 'user', 'warehouse')
-    returns_qs = SalesReturn.objects.select_related('sales_order__customer', 'user', 'warehouse').prefetch_related('items')
+    sales_qs = SalesOrder.objects.filter(status='delivered')
+    returns_qs = SalesReturn.objects.all()
 
     # ব্যবহারকারীর ভূমিকা অনুযায়ী ওয়্যারহাউস ফিল্টার
     if not user.is_superuser:
@@ -72,11 +80,11 @@ def get_daily_ledger_data(request):
 
     # ফর্ম থেকে আসা ফিল্টার প্রয়োগ
     if query_start_date:
-        sales_qs = sales_qs.filter(order_date__date__gte=query_start_date)
-        returns_qs = returns_qs.filter(return_date__date__gte=query_start_date)
+        sales_qs = sales_qs.filter(order_date__gte=_day_start(query_start_date))
+        returns_qs = returns_qs.filter(return_date__gte=_day_start(query_start_date))
     if query_end_date:
-        sales_qs = sales_qs.filter(order_date__date__lte=query_end_date)
-        returns_qs = returns_qs.filter(return_date__date__lte=query_end_date)
+        sales_qs = sales_qs.filter(order_date__lt=_day_start(query_end_date + timedelta(days=1)))
+        returns_qs = returns_qs.filter(return_date__lt=_day_start(query_end_date + timedelta(days=1)))
     if user_id:
         sales_qs = sales_qs.filter(user_id=user_id)
         returns_qs = returns_qs.filter(user_id=user_id)
@@ -84,32 +92,11 @@ def get_daily_ledger_data(request):
         sales_qs = sales_qs.filter(warehouse_id=warehouse_id)
         returns_qs = returns_qs.filter(warehouse_id=warehouse_id)
 
-    # --- ৩. সেলস এবং রিটার্নকে একটি লিস্টে একত্রিত করা ---
-    daily_ledger = []
-    for sale in sales_qs:
-        daily_ledger.append({
-            'date': sale.order_date,
-            'type': 'Sale',
-            'order_obj': sale,
-            'return_obj': None,
-            'amount': sale.total_amount
-        })
-    
-    for ret in returns_qs:
-        return_amount = sum(item.subtotal for item in ret.items.all())
-        daily_ledger.append({
-            'date': ret.return_date,
-            'type': 'Return',
-            'order_obj': ret.sales_order,
-            'return_obj': ret,
-            'amount': -return_amount
-        })
-        
-    daily_ledger.sort(key=lambda x: x['date'], reverse=True)
+    # --- ৩. সেলস এবং রিটার্নের একটি UNION কুয়েরি (lazy; ডেটাবেসেই ক্রম, যোগফল ও পেজিনেশন) ---
+    daily_ledger = ledger_entries(sales_qs, returns_qs)
 
-    # --- ৪. মোট হিসাব গণনা ---
-    total_sales = sales_qs.aggregate(total=Sum('total_amount'))['total'] or 0
-    total_returns = sum(sum(item.subtotal for item in r.items.all()) for r in returns_qs)
+    # --- ৪. মোট হিসাব গণনা (তালিকার রো গুলোর একই কুয়েরিসেট ও কলাম থেকে) ---
+    total_sales, total_returns = ledger_totals(sales_qs, returns_qs)
     net_sales = total_sales - total_returns
 
     return {
@@ -123,7 +110,7 @@ def get_daily_ledger_data(request):
 
 def daily_sales_report(request):
     user = request.user
-    report_data = get_daily_ledger_data(request)
+    report_data = get_daily_ledger_data(request.user, request.GET)
 
     paginator = Paginator(report_data['daily_ledger'], 15)
     page_number = request.GET.get('page')
@@ -153,7 +140,7 @@ def daily_sales_report(request):
 
 
 def export_daily_sales_excel(request):
-    report_data = get_daily_ledger_data(request)
+    report_data = get_daily_ledger_data(request.user, request.GET)
     daily_ledger = report_data['daily_ledger']
 
     response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
@@ -205,28 +192,16 @@ def export_daily_sales_excel(request):
         cell.alignment = center_align
 
     # --- ৩. ডেটা সারি ---
-    for entry in daily_ledger:
+    for entry in daily_ledger.iterator(chunk_size=2000):
         naive_datetime = timezone.localtime(entry['date']).replace(tzinfo=None)
-        
-        if entry['type'] == 'Sale':
-            order = entry['order_obj']
-            row_data = [ 
-                f"SO-{order.id}", naive_datetime, 'Sale', 
-                order.customer.name if order.customer else 'N/A', 
-                order.user.username if order.user else 'N/A', 
-                order.warehouse.name if order.warehouse else 'N/A', 
-                float(entry['amount']) 
-            ]
-        else: # Return
-            ret = entry['return_obj']
-            order = entry['order_obj']
-            row_data = [ 
-                f"RT-{ret.id}", naive_datetime, 'Return', 
-                order.customer.name if order.customer else 'N/A', 
-                ret.user.username if ret.user else 'N/A', 
-                ret.warehouse.name if ret.warehouse else 'N/A', 
-                float(entry['amount']) 
-            ]
+        prefix = 'SO' if entry['type'] == 'Sale' else 'RT'
+        row_data = [
+            f"{prefix}-{entry['entry_id']}", naive_datetime, entry['type'],
+            entry['customer_name'] or 'N/A',
+            entry['username'] or 'N/A',
+            entry['warehouse_name'] or 'N/A',
+            float(entry['amount'])
+        ]
         ws.append(row_data)
         
         # প্রতিটি সেলে বর্ডার এবং ফরম্যাট যোগ করা
@@ -264,47 +239,24 @@ def export_daily_sales_excel(request):
 
 
 def export_daily_sales_pdf(request):
-    report_data = get_daily_ledger_data(request)
+    return render_response(render_daily_sales_pdf, request, 'Daily_Sales_Report.pdf')
+
+
+def render_daily_sales_pdf(user, params, output_file):
+    report_data = get_daily_ledger_data(user, params)
     daily_ledger = report_data['daily_ledger']
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = 'attachment; filename="Daily_Sales_Report.pdf"'
-    
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=landscape(A4), topMargin=0.5*inch, bottomMargin=0.5*inch, leftMargin=0.5*inch, rightMargin=0.5*inch)
     story = []
 
-    # --- কাস্টম স্টাইল তৈরি ---
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='TitleStyle', fontSize=22, fontName='Helvetica-Bold', alignment=TA_RIGHT, textColor=colors.HexColor("#2B3674")))
-    styles.add(ParagraphStyle(name='CompanyInfo', fontSize=9, fontName='Helvetica', alignment=TA_RIGHT, leading=12))
-    styles.add(ParagraphStyle(name='ReportInfo', fontSize=10, fontName='Helvetica', leading=14))
-    styles.add(ParagraphStyle(name='TotalLabel', fontSize=10, fontName='Helvetica-Bold', alignment=TA_RIGHT))
-    styles.add(ParagraphStyle(name='TotalValue', fontSize=10, fontName='Helvetica-Bold', alignment=TA_RIGHT))
-    styles.add(ParagraphStyle(name='SignatureStyle', fontSize=10, fontName='Helvetica', alignment=TA_CENTER))
-    
-    # --- মূল পরিবর্তন: অনুপস্থিত স্টাইলগুলো এখানে যোগ করা হলো ---
-    styles.add(ParagraphStyle(name='TableHeader', fontSize=9, fontName='Helvetica-Bold', alignment=TA_LEFT, textColor=colors.HexColor("#2B3674")))
-    styles.add(ParagraphStyle(name='TableCellLeft', fontSize=9, alignment=TA_LEFT))
-    styles.add(ParagraphStyle(name='TableCellRight', fontSize=9, alignment=TA_RIGHT))
-    styles.add(ParagraphStyle(name='TableCellRightRed', fontSize=9, alignment=TA_RIGHT, textColor=colors.red))
-
+    # --- শেয়ার্ড স্টাইল (প্রসেসে একবার তৈরি) ---
+    styles = get_styles()
 
     # --- ১. হেডার সেকশন ---
-    logo_path = os.path.join(settings.STATICFILES_DIRS[0], 'images', 'logo.png')
-    logo = Image(logo_path, width=1.85*inch, height=0.5*inch)
-    company_info = "<b>NOVO ERP Solutions</b><br/>Doha, Qatar"
-    
-    header_data = [[logo, Paragraph("Daily Sales Report", styles['TitleStyle'])]]
-    header_table = Table(header_data, colWidths=[7*inch, 3.5*inch], style=[('VALIGN', (0,0), (-1,-1), 'TOP')])
-    story.append(header_table)
-    story.append(Spacer(1, 0.05*inch))
-    story.append(Paragraph(company_info, styles['CompanyInfo']))
+    story.extend(document_header("Daily Sales Report", (1.85*inch, 0.5*inch), [7*inch, 3.5*inch], gap=0.05*inch))
     story.append(Spacer(1, 0.3*inch))
 
     # --- ২. রিপোর্টের তথ্য ---
-    start_date = request.GET.get('start_date', 'N/A')
-    end_date = request.GET.get('end_date', 'N/A')
+    start_date = params.get('start_date', 'N/A')
+    end_date = params.get('end_date', 'N/A')
     report_info_text = f"<b>Date Range:</b> {start_date} to {end_date}<br/><b>Report Generated:</b> {timezone.now().strftime('%d %b, %Y %I:%M %p')}"
     story.append(Paragraph(report_info_text, styles['ReportInfo']))
     story.append(Spacer(1, 0.3*inch))
@@ -319,44 +271,33 @@ def export_daily_sales_pdf(request):
         Paragraph('Branch', styles['TableHeader']),
         Paragraph('Amount', styles['TableHeader']),
     ]
-    table_data = [table_header]
-    
-    for entry in daily_ledger:
-        amount_style = styles['TableCellRightRed'] if entry['type'] == 'Return' else styles['TableCellRight']
-        
-        if entry['type'] == 'Sale':
-            order = entry['order_obj']
-            row_data = [
-                Paragraph(f"SO-{order.id}", styles['TableCellLeft']),
-                Paragraph(order.order_date.strftime('%Y-%m-%d %H:%M'), styles['TableCellLeft']),
-                Paragraph('Sale', styles['TableCellLeft']),
-                Paragraph(order.customer.name if order.customer else 'N/A', styles['TableCellLeft']),
-                Paragraph(order.user.username if order.user else 'N/A', styles['TableCellLeft']),
-                Paragraph(order.warehouse.name if order.warehouse else 'N/A', styles['TableCellLeft']),
-                Paragraph(f"{entry['amount']:,.2f}", amount_style)
-            ]
-        else: # Return
-            ret = entry['return_obj']
-            order = entry['order_obj']
-            row_data = [
-                Paragraph(f"RT-{ret.id}", styles['TableCellLeft']),
-                Paragraph(ret.return_date.strftime('%Y-%m-%d %H:%M'), styles['TableCellLeft']),
-                Paragraph('Return', styles['TableCellLeft']),
-                Paragraph(order.customer.name if order.customer else 'N/A', styles['TableCellLeft']),
-                Paragraph(ret.user.username if ret.user else 'N/A', styles['TableCellLeft']),
-                Paragraph(ret.warehouse.name if ret.warehouse else 'N/A', styles['TableCellLeft']),
+
+    # লেজার টুকরো টুকরো করে পড়া হয় এবং প্রতি কয়েকশো রো এর একটি করে Table তৈরি হয়;
+    # ছোট ঘরগুলো সাধারণ টেক্সট, শুধু কাস্টমারের নাম (wrap) ও পরিমাণ (রং) Paragraph
+    def ledger_rows():
+        for entry in daily_ledger.iterator(chunk_size=2000):
+            amount_style = styles['TableCellRightRed'] if entry['type'] == 'Return' else styles['TableCellRight']
+            prefix = 'SO' if entry['type'] == 'Sale' else 'RT'
+            yield [
+                f"{prefix}-{entry['entry_id']}",
+                entry['date'].strftime('%Y-%m-%d %H:%M'),
+                entry['type'],
+                Paragraph(entry['customer_name'] or 'N/A', styles['TableCellLeft']),
+                entry['username'] or 'N/A',
+                entry['warehouse_name'] or 'N/A',
                 Paragraph(f"{entry['amount']:,.2f}", amount_style)
             ]
-        table_data.append(row_data)
-        
-    table = Table(table_data, colWidths=[0.8*inch, 1.2*inch, 0.6*inch, 3.2*inch, 1.3*inch, 1.55*inch, 1.85*inch])
-    table.setStyle(TableStyle([
+
+    table_style = [
         ('BACKGROUND', (0,0), (-1,0), colors.HexColor("#E0E5F2")),
         ('GRID', (0,0), (-1,-1), 1, colors.HexColor("#CCCCCC")),
         ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-    ]))
-    story.append(table)
-    story.append(Spacer(1, 0.3*inch))
+        ('FONTSIZE', (0,1), (-1,-1), 9),
+    ]
+    tables = table_chunks(
+        table_header, ledger_rows(), [0.8*inch, 1.2*inch, 0.6*inch, 3.2*inch, 1.3*inch, 1.55*inch, 1.85*inch], table_style
+    )
+    closing = [Spacer(1, 0.3*inch)]
 
     # --- ৪. মোট হিসাব সেকশন ---
     total_data = [
@@ -365,24 +306,16 @@ def export_daily_sales_pdf(request):
         [Paragraph('Net Sales:', styles['TotalLabel']), Paragraph(f"{settings.DEFAULT_CURRENCY_SYMBOL} {report_data['net_sales']:,.2f}", styles['TotalValue'])],
     ]
     total_table = Table(total_data, colWidths=[1.5*inch, 2*inch], hAlign='RIGHT')
-    story.append(total_table)
+    closing.append(total_table)
     
     # --- ৫. সিগনেচার সেকশন ---
-    story.append(Spacer(1, 0.5*inch))
-    signature_data = [
-        [Paragraph('--------------------------------<br/>Prepared By', styles['SignatureStyle']),
-         Paragraph('--------------------------------<br/>Checked By', styles['SignatureStyle']),
-         Paragraph('--------------------------------<br/>Approved By', styles['SignatureStyle'])]
-    ]
-    signature_table = Table(signature_data, colWidths=[3*inch, 3*inch, 3*inch], hAlign='CENTER')
-    story.append(signature_table)
+    closing.append(Spacer(1, 0.5*inch))
+    closing.append(signature_block(['Prepared By', 'Checked By', 'Approved By'], 3*inch))
 
-    doc.build(story)
-    
-    buffer.seek(0)
-    response.write(buffer.getvalue())
-    buffer.close()
-    return response
+    build_pdf(
+        chain(story, tables, closing), output_file, pagesize=landscape(A4),
+        topMargin=0.5*inch, bottomMargin=0.5*inch, leftMargin=0.5*inch, rightMargin=0.5*inch
+    )
 
 @login_required
 def expiry_report_view(request):
@@ -443,43 +376,118 @@ def dead_stock_report_view(request):
 
 @login_required
 def purchase_suggestion_report_view(request):
+    # প্রস্তাবগুলো plan_replenishment কমান্ড আগে থেকেই হিসাব করে রাখে; এখানে শুধু টেবিল থেকে পড়া হয়
     user = request.user
     user_warehouse = getattr(user, 'warehouse', None)
-    today = timezone.now().date()
-    thirty_days_ago = today - timedelta(days=30)
-    
-    stock_qs = Stock.objects.all()
-    if not user.is_superuser and user_warehouse:
-        stock_qs = stock_qs.filter(warehouse=user_warehouse)
-        
-    products_in_stock = stock_qs.filter(quantity__gt=0).values('product_id').annotate(current_stock=Sum('quantity'))
-    product_stock_map = {item['product_id']: item['current_stock'] for item in products_in_stock}
 
-    sales_qs = SalesOrderItem.objects.filter(
-        sales_order__order_date__gte=thirty_days_ago,
-        product_id__in=product_stock_map.keys()
-    )
+    suggestions = ReplenishmentSuggestion.objects.select_related('product', 'warehouse')
     if not user.is_superuser and user_warehouse:
-        sales_qs = sales_qs.filter(sales_order__warehouse=user_warehouse)
-
-    sales_last_30_days = sales_qs.values('product_id').annotate(total_sold=Sum('quantity'))
+        suggestions = suggestions.filter(warehouse=user_warehouse)
+    suggestions = suggestions.order_by('warehouse__name', '-suggested_quantity', 'product__name')
 
-    suggestion_list = []
-    for sale in sales_last_30_days:
-        product_id = sale['product_id']
-        current_stock = product_stock_map.get(product_id, 0)
-        total_sold = sale['total_sold']
-        
-        if current_stock < total_sold:
-            product = Product.objects.get(id=product_id)
-            suggestion_list.append({
-                'product': product, 'current_stock': current_stock,
-                'sold_last_30_days': total_sold, 'suggested_quantity': total_sold - current_stock,
-            })
-            
-    paginator = Paginator(suggestion_list, 20)
+    paginator = Paginator(suggestions, 20)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
-    
-    context = {'title': 'Purchase Suggestion Report', 'page_obj': page_obj}
-    return render(request, 'reports/purchase_suggestion_report.html', context)
\ No newline at end of file
+
+    last_run = ReplenishmentSuggestion.objects.order_by('-computed_at').values_list('computed_at', flat=True).first()
+    context = {'title': 'Purchase Suggestion Report', 'page_obj': page_obj, 'computed_at': last_run}
+    return render(request, 'reports/purchase_suggestion_report.html', context)
+
+
+@login_required
+def inventory_valuation_report_view(request):
+    """
+    দিন-শেষের ভ্যালুয়েশন স্ন্যাপশট থেকে as-of রিপোর্ট। ওয়্যারহাউস -> ক্যাটাগরি -> প্রোডাক্ট ড্রিল-ডাউন এবং
+    compare_to দিলে দুই তারিখের তুলনা। লাইভ স্টক টেবিলে কোনো কুয়েরি চলে না।
+    """
+    user = request.user
+    user_warehouse = getattr(user, 'warehouse', None)
+
+    as_of = parse_date(request.GET.get('as_of') or '') or timezone.localdate()
+    compare_to = parse_date(request.GET.get('compare_to') or '')
+    group_by = request.GET.get('group')
+    if group_by not in GROUPINGS:
+        group_by = 'warehouse' if user.is_superuser or not user_warehouse else 'category'
+
+    filters = {}
+    warehouse = None
+    if not user.is_superuser and user_warehouse:
+        warehouse = user_warehouse
+    elif request.GET.get('warehouse', '').isdigit():
+        warehouse = Warehouse.objects.filter(pk=request.GET['warehouse']).first()
+    if warehouse:
+        filters['warehouse_id'] = warehouse.pk
+    category = None
+    if request.GET.get('category', '').isdigit():
+        category = Category.objects.filter(pk=request.GET['category']).first()
+        if category:
+            filters['category_id'] = category.pk
+
+    report = ValuationSnapshotService.report(as_of, group_by, compare_to, **filters)
+    # পরের ধাপের গ্রুপিং: ওয়্যারহাউস থেকে ক্যাটাগরি, ক্যাটাগরি থেকে প্রোডাক্ট
+    drill_down = {'warehouse': 'category', 'category': 'product'}.get(group_by)
+
+    context = {
+        'title': 'Inventory Valuation Report',
+        'report': report,
+        'as_of': as_of,
+        'compare_to': compare_to,
+        'group_by': group_by,
+        'drill_down': drill_down,
+        'warehouse': warehouse,
+        'category': category,
+        'warehouses': Warehouse.objects.order_by('name') if user.is_superuser else [],
+    }
+    return render(request, 'reports/inventory_valuation_report.html', context)
+
+
+# --- ব্যাকগ্রাউন্ড রিপোর্ট জব ---
+
+def _visible_report_jobs(user):
+    report_jobs = ReportJob.objects.select_related('user')
+    if not user.is_superuser:
+        report_jobs = report_jobs.filter(user=user)
+    return report_jobs
+
+
+@login_required
+@require_POST
+def enqueue_report_job(request, kind):
+    # বর্তমান পেজের ফিল্টারগুলো (query string) জবের সাথে সংরক্ষণ করা হয়
+    params = {key: request.GET.getlist(key) for key in request.GET}
+    try:
+        job = jobs.enqueue(kind, request.user, params)
+    except ValueError:
+        raise Http404("Unknown report type")
+    messages.success(request, f"'{job.get_kind_display()}' is being generated in the background. It will be available for download here.")
+    return redirect('reports:report_job_list')
+
+
+@login_required
+def report_job_list(request):
+    paginator = Paginator(_visible_report_jobs(request.user), 20)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    context = {
+        'title': 'Report Downloads',
+        'page_obj': page_obj,
+    }
+    return render(request, 'reports/report_job_list.html', context)
+
+
+@login_required
+def report_job_status(request, pk):
+    job = get_object_or_404(_visible_report_jobs(request.user), pk=pk)
+    return JsonResponse({
+        'id': job.pk,
+        'status': job.status,
+        'progress': job.progress,
+        'download_url': reverse('reports:download_report_job', args=[job.pk]) if job.status == 'done' else None,
+    })
+
+
+@login_required
+def download_report_job(request, pk):
+    job = get_object_or_404(_visible_report_jobs(request.user), pk=pk, status='done')
+    if not job.file:
+        raise Http404("Report file not found")
+    return FileResponse(job.file.open('rb'), as_attachment=True, filename=os.path.basename(job.file.name))
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('partners', '0002_customer_is_active'),
+        ('products', '0001_initial'),
+        ('sales', '0005_salesorderitem_cost_price_alter_salesorder_status'),
+        ('stock', '0005_inventorytransaction_balance_after'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['status', 'order_date'], name='inventory_s_status_d1a94a_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['warehouse', 'status', 'order_date'], name='inventory_s_warehou_a42b1b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorderitem',
+            index=models.Index(fields=['sales_order', 'product'], name='inventory_s_sales_o_0aedb4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesreturn',
+            index=models.Index(fields=['return_date'], name='sales_sales_return__64bfc8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesreturn',
+            index=models.Index(fields=['warehouse', 'return_date'], name='sales_sales_warehou_3b1fa9_idx'),
+        ),
+    ]
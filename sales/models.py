@@ -42,6 +42,11 @@ class SalesOrder(models.Model):
     
     class Meta:
         db_table = 'inventory_salesorder'
+        # লেজার/ড্যাশবোর্ড: status এবং order_date এর সীমা, ব্রাঞ্চ ইউজারের জন্য ওয়্যারহাউস সহ
+        indexes = [
+            models.Index(fields=['status', 'order_date']),
+            models.Index(fields=['warehouse', 'status', 'order_date']),
+        ]
     
 class SalesOrderItem(models.Model):
     sales_order = models.ForeignKey(SalesOrder, related_name='items', on_delete=models.CASCADE)
@@ -76,6 +81,8 @@ class SalesOrderItem(models.Model):
     
     class Meta:
         db_table = 'inventory_salesorderitem'
+        # তারিখের সীমার অর্ডার থেকে প্রোডাক্ট (ডেড স্টক, রোলআপ) টেবিল না পড়েই পাওয়া যায়
+        indexes = [models.Index(fields=['sales_order', 'product'])]
 
 # --- Sales Return মডেলগুলো নিচে যোগ করা হয়েছে ---
 class SalesReturn(models.Model):
@@ -89,6 +96,12 @@ class SalesReturn(models.Model):
     def __str__(self):
         return f"Return for SO-{self.sales_order.id}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['return_date']),
+            models.Index(fields=['warehouse', 'return_date']),
+        ]
+
 class SalesReturnItem(models.Model):
     sales_return = models.ForeignKey(SalesReturn, related_name='items', on_delete=models.CASCADE)
     product = models.ForeignKey('products.Product', on_delete=models.CASCADE)
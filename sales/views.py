@@ -1,7 +1,7 @@
 # sales/views.py
 
 from django.shortcuts import render, redirect, get_object_or_404
-from django.http import HttpResponse, JsonResponse
+from django.http import JsonResponse
 from django.contrib.auth.decorators import login_required, permission_required
 from django.db import transaction
 from django.db.models import Sum, Q, F, Count
@@ -11,23 +11,18 @@ from django.forms import formset_factory, inlineformset_factory
 from datetime import timedelta
 import json
 from io import BytesIO
-import os
-from django.conf import settings
+from itertools import chain, islice
 from openpyxl import Workbook
 from openpyxl.styles import Font
 
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.pagesizes import A4
+from reportlab.platypus import Paragraph, Spacer, Table, TableStyle, PageBreak
 from reportlab.lib import colors
-from reportlab.lib.units import inch, mm
-from reportlab.lib.enums import TA_CENTER, TA_RIGHT, TA_LEFT
+from reportlab.lib.units import inch
 from django.core.exceptions import ObjectDoesNotExist, ValidationError
-from reportlab.pdfgen import canvas
 
 from .forms import SalesOrderFilterForm
 from .models import SalesOrder, SalesOrderItem, SalesReturn, SalesReturnItem
-from stock.models import InventoryTransaction, LotSerialNumber, Location, Stock
+from stock.models import LotSerialNumber, Location, Stock
 from .forms import (
     SalesOrderForm,
     SalesOrderItemFormSet,
@@ -43,6 +38,9 @@ from partners.forms import CustomerForm
 from partners.models import Customer
 from stock.forms import DateRangeForm
 from stock.services import StockService
+from stock.costing import CostingEngine
+from stock.allocation import LotAllocator, InsufficientStockError
+from inventory_system.pdf import document_header, get_styles, pdf_response, signature_block, table_chunks
 
 DEFAULT_CURRENCY_SYMBOL = 'QAR '
 
@@ -182,44 +180,34 @@ def create_sales_order(request):
                         if not sales_order.warehouse:
                                 raise ValidationError("Cannot fulfill order: No warehouse assigned to the order.")
 
-                        for item in sales_order.items.all():
-                            product = item.product
-                            quantity_to_sell = item.quantity
-                            
-                            available_lots = LotSerialNumber.objects.filter(
-                                product=product,
-                                location__warehouse=sales_order.warehouse,
-                                quantity__gt=0
-                            ).order_by('expiration_date', 'created_at')
-
-                            if (available_lots.aggregate(total=Sum('quantity'))['total'] or 0) < quantity_to_sell:
-                                raise ValidationError(f"Insufficient stock for {product.name} in {sales_order.warehouse.name}. Cannot complete delivery.")
-
-                            remaining_qty_to_sell = quantity_to_sell
-                            for lot in available_lots:
-                                if remaining_qty_to_sell <= 0: break
-                                
-                                qty_from_this_lot = min(lot.quantity, remaining_qty_to_sell)
-
-                                StockService.change_stock(
-                                    product=product,
-                                    warehouse=sales_order.warehouse,
-                                    quantity_change=-qty_from_this_lot,
-                                    transaction_type='sale',
-                                    user=request.user,
-                                    content_object=sales_order,
-                                    location=lot.location,
-                                    lot_serial=lot,
-                                    notes=f"Direct Sale from SO-{sales_order.id}"
-                                )
-                                remaining_qty_to_sell -= qty_from_this_lot
-                            
-                            first_lot_sold = available_lots.first()
-                            if first_lot_sold:
-                                item.lot_serial = first_lot_sold
-                            
+                        stock_movements = []
+                        delivered_items = list(sales_order.items.select_related('product'))
+                        # সব লাইনের লট বরাদ্দ একটি কুয়েরিতে (একই প্রোডাক্ট একাধিক লাইনে থাকলেও সঠিকভাবে)
+                        try:
+                            allocation_plan = LotAllocator.allocate(
+                                sales_order.warehouse, [(item.product, item.quantity) for item in delivered_items]
+                            )
+                        except InsufficientStockError as e:
+                            raise ValidationError(f"Insufficient stock for {e.product.name} in {sales_order.warehouse.name}. Cannot complete delivery.")
+
+                        movement_counts = []
+                        for item, picks in zip(delivered_items, allocation_plan):
+                            item_movements = LotAllocator.movements(
+                                picks, item.product, sales_order.warehouse, 'sale', request.user,
+                                content_object=sales_order, notes=f"Direct Sale from SO-{sales_order.id}"
+                            )
+                            stock_movements.extend(item_movements)
+                            movement_counts.append(len(item_movements))
+                            if picks:
+                                item.lot_serial = picks[0][0]
                             item.quantity_fulfilled = item.quantity
-                            item.save()
+
+                        # সব লাইনের স্টক একবারে পোস্ট করা হচ্ছে; প্রতিটি লাইনের খরচ তার লটগুলোর ইউনিট খরচ থেকে
+                        posted = iter(StockService.apply_movements(stock_movements))
+                        for item, count in zip(delivered_items, movement_counts):
+                            if count:
+                                item.cost_price = CostingEngine.issued_cost(list(islice(posted, count)))
+                        SalesOrderItem.objects.bulk_update(delivered_items, ['lot_serial', 'quantity_fulfilled', 'cost_price'])
 
                 messages.success(request, f"Sales Order #{sales_order.pk} created and delivered successfully!")
                 return redirect('sales:sales_order_detail', pk=sales_order.pk)
@@ -252,59 +240,71 @@ def edit_sales_order(request, pk):
     
     if request.method == 'POST':
         if sales_order_form.is_valid() and item_formset.is_valid():
-            with transaction.atomic():
-                sales_order = sales_order_form.save()
-                item_formset.save()
+            try:
+                with transaction.atomic():
+                    sales_order = sales_order_form.save()
+                    item_formset.save()
                 
-                total_amount = sum(item.subtotal for item in sales_order.items.all())
-                sales_order.total_amount = total_amount
-                sales_order.save(update_fields=['total_amount'])
+                    total_amount = sum(item.subtotal for item in sales_order.items.all())
+                    sales_order.total_amount = total_amount
+                    sales_order.save(update_fields=['total_amount'])
                 
-                if sales_order.status == 'delivered' and original_status != 'delivered':
-                    user_warehouse = sales_order.warehouse
-                    if not user_warehouse:
-                        raise Exception("Cannot fulfill order: No warehouse assigned.")
-
-                    for item in sales_order.items.all():
-                        if item.quantity_fulfilled < item.quantity:
-                            product = item.product
-                            quantity_to_fulfill = item.quantity - item.quantity_fulfilled
-                            
-                            if product.tracking_method in ['lot', 'serial']:
-                                available_lots = LotSerialNumber.objects.filter(
-                                    product=product,
-                                    location__warehouse=user_warehouse,
-                                    quantity__gt=0
-                                ).order_by('created_at')
-
-                                for lot in available_lots:
-                                    if quantity_to_fulfill <= 0: break
-                                    quantity_from_this_lot = min(lot.quantity, quantity_to_fulfill)
-                                    InventoryTransaction.objects.create(
-                                        user=request.user,
-                                        product=product, transaction_type='sale',
-                                        quantity=quantity_from_this_lot,
-                                        source_location=lot.location, lot_serial=lot,
-                                        notes=f"Sale from updated SO-{sales_order.id}"
-                                    )
-                                    quantity_to_fulfill -= quantity_from_this_lot
-                            else:
-                                stock_record = Stock.objects.filter(product=product, location__warehouse=user_warehouse, quantity__gte=quantity_to_fulfill).first()
-                                if not stock_record:
-                                    raise Exception(f"Insufficient stock for {product.name}.")
-                                InventoryTransaction.objects.create(
-                                    user=request.user,
-                                    product=product, transaction_type='sale',
-                                    quantity=quantity_to_fulfill,
-                                    source_location=stock_record.location,
-                                    notes=f"Sale from updated SO-{sales_order.id}"
-                                )
-                            
+                    if sales_order.status == 'delivered' and original_status != 'delivered':
+                        user_warehouse = sales_order.warehouse
+                        if not user_warehouse:
+                            raise ValidationError("Cannot fulfill order: No warehouse assigned.")
+
+                        pending_items = [
+                            item for item in sales_order.items.select_related('product')
+                            if item.quantity_fulfilled < item.quantity
+                        ]
+                        # লট ট্র্যাক করা প্রোডাক্টগুলোর বরাদ্দ একসাথে, বাকিগুলো সরাসরি ওয়্যারহাউসের স্টক থেকে
+                        tracked_items = [item for item in pending_items if item.product.tracking_method in ['lot', 'serial']]
+                        try:
+                            allocation_plan = LotAllocator.allocate(
+                                user_warehouse, [(item.product, item.quantity - item.quantity_fulfilled) for item in tracked_items]
+                            )
+                        except InsufficientStockError as e:
+                            raise ValidationError(f"Insufficient stock for {e.product.name}.")
+
+                        line_movements = []
+                        for item, picks in zip(tracked_items, allocation_plan):
+                            line_movements.append((item, item.quantity_fulfilled, LotAllocator.movements(
+                                picks, item.product, user_warehouse, 'sale', request.user,
+                                content_object=sales_order, notes=f"Sale from updated SO-{sales_order.id}"
+                            )))
+                        for item in pending_items:
+                            if item not in tracked_items:
+                                line_movements.append((item, item.quantity_fulfilled, [{
+                                    'product': item.product, 'warehouse': user_warehouse,
+                                    'quantity_change': -(item.quantity - item.quantity_fulfilled),
+                                    'transaction_type': 'sale', 'user': request.user, 'content_object': sales_order,
+                                    'notes': f"Sale from updated SO-{sales_order.id}",
+                                }]))
                             item.quantity_fulfilled = item.quantity
-                            item.save()
-
-            messages.success(request, f"Sales Order #{sales_order.pk} updated successfully!")
-            return redirect('sales:sales_order_detail', pk=sales_order.pk)
+                        stock_movements = [m for _, _, item_movements in line_movements for m in item_movements]
+
+                        # স্টক কম থাকলে apply_movements() ValueError দেয় এবং পুরো পরিবর্তন বাতিল হয়
+                        try:
+                            posted = iter(StockService.apply_movements(stock_movements))
+                        except ValueError as e:
+                            raise ValidationError(str(e))
+                        for item, already_fulfilled, item_movements in line_movements:
+                            if not item_movements:
+                                continue
+                            issued = list(islice(posted, len(item_movements)))
+                            unit_cost = CostingEngine.issued_cost(issued)
+                            if already_fulfilled and item.cost_price is not None:
+                                # আগে ডেলিভার হওয়া অংশের খরচের সাথে পরিমাণ অনুযায়ী মেলানো হয়
+                                issued_quantity = item.quantity - already_fulfilled
+                                unit_cost = (already_fulfilled * item.cost_price + issued_quantity * unit_cost) / item.quantity
+                            item.cost_price = unit_cost
+                        SalesOrderItem.objects.bulk_update(pending_items, ['quantity_fulfilled', 'cost_price'])
+
+                messages.success(request, f"Sales Order #{sales_order.pk} updated successfully!")
+                return redirect('sales:sales_order_detail', pk=sales_order.pk)
+            except ValidationError as e:
+                messages.error(request, e.message)
 
     context = {
         'title': f'Edit Sales Order #{sales_order.pk}',
@@ -479,68 +479,26 @@ def get_product_sale_price_ajax(request):
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
 
-# --- পিডিএফ তৈরির জন্য একটি Helper Class (ঐচ্ছিক কিন্তু পরিচ্ছন্ন কোডের জন্য ভালো) ---
-class NumberedCanvas(canvas.Canvas):
-    def __init__(self, *args, **kwargs):
-        canvas.Canvas.__init__(self, *args, **kwargs)
-        self._saved_page_states = []
-
-    def showPage(self):
-        self._saved_page_states.append(dict(self.__dict__))
-        self._startPage()
-
-    def save(self):
-        """add page info to each page (page x of y)"""
-        num_pages = len(self._saved_page_states)
-        for state in self._saved_page_states:
-            self.__dict__.update(state)
-            self.draw_page_number(num_pages)
-            canvas.Canvas.showPage(self)
-
-    def draw_page_number(self, page_count):
-        self.setFont("Helvetica", 9)
-        self.drawRightString(200*mm, 20*mm, f"Page {self._pageNumber} of {page_count}")
-
-
 @login_required
 @permission_required('sales.view_salesorder', raise_exception=True)
 def export_sales_order_pdf(request, pk):
     sales_order = get_object_or_404(SalesOrder, pk=pk)
-    
-    response = HttpResponse(content_type='application/pdf')
-    response['Content-Disposition'] = f'attachment; filename="SO-{sales_order.pk}_{sales_order.customer.name if sales_order.customer else "Walk-in"}.pdf"'
-
-    doc = SimpleDocTemplate(response, pagesize=A4, rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30)
+    filename = f'SO-{sales_order.pk}_{sales_order.customer.name if sales_order.customer else "Walk-in"}.pdf'
     story = []
 
-    # --- কাস্টম স্টাইল তৈরি ---
-    styles = getSampleStyleSheet()
-    styles.add(ParagraphStyle(name='TitleStyle', fontSize=22, fontName='Helvetica-Bold', alignment=TA_RIGHT, textColor=colors.HexColor("#444444")))
-    styles.add(ParagraphStyle(name='CompanyInfo', fontSize=9, fontName='Helvetica', alignment=TA_RIGHT, leading=12))
-    styles.add(ParagraphStyle(name='CustomerInfo', fontSize=10, fontName='Helvetica', leading=14)) # leading বাড়ানো হয়েছে
-    styles.add(ParagraphStyle(name='HeaderStyle', fontSize=10, fontName='Helvetica-Bold', alignment=TA_LEFT))
-    styles.add(ParagraphStyle(name='TotalHeaderStyle', fontSize=10, fontName='Helvetica-Bold', alignment=TA_RIGHT))
-    styles.add(ParagraphStyle(name='SignatureStyle', fontSize=10, fontName='Helvetica', alignment=TA_CENTER))
-    # --- নতুন বোল্ড স্টাইল যোগ করা হলো ---
-    styles.add(ParagraphStyle(name='BoldText', fontName='Helvetica-Bold'))
-
+    # --- শেয়ার্ড স্টাইল (প্রসেসে একবার তৈরি) ---
+    styles = get_styles()
 
     # --- ১. হেডার: লোগো এবং কোম্পানির তথ্য ---
-    logo_path = os.path.join(settings.STATICFILES_DIRS[0], 'images', 'logo.png')
-    logo = Image(logo_path, width=1.8*inch, height=0.5*inch)
-    
     company_info = """
     <b>NOVO ERP Solutions</b><br/>
     Doha, Qatar<br/>
     Email: haymijan@gmail.com<br/>
     Phone: +974 502 902 83
     """
-    
-    header_data = [[logo, Paragraph("SALES ORDER", styles['TitleStyle'])]]
-    header_table = Table(header_data, colWidths=[4*inch, 3.5*inch], style=[('VALIGN', (0,0), (-1,-1), 'TOP')])
-    story.append(header_table)
-    story.append(Spacer(1, 0.1*inch))
-    story.append(Paragraph(company_info, styles['CompanyInfo']))
+    story.extend(document_header(
+        "SALES ORDER", (1.8*inch, 0.5*inch), [4*inch, 3.5*inch], title_style='TitleStyleGrey', company_info=company_info
+    ))
 
     story.append(Spacer(1, 0.5*inch))
 
@@ -573,56 +531,61 @@ def export_sales_order_pdf(request, pk):
 
     # --- ৩. আইটেম টেবিল ---
     items_header = ['#', 'ITEM DESCRIPTION', 'QTY', 'UNIT PRICE', 'TOTAL']
-    items_data = [items_header]
-    
-    for i, item in enumerate(sales_order.items.all(), 1):
-        items_data.append([
-            i,
-            Paragraph(item.product.name, styles['Normal']),
-            item.quantity,
-            f"{item.unit_price:,.2f}",
-            f"{item.subtotal:,.2f}"
-        ])
-
-    # --- PDF গঠন সমাধান: Paragraph এবং নতুন স্টাইল ব্যবহার করা হলো ---
-    grand_total_text = f"{DEFAULT_CURRENCY_SYMBOL} {sales_order.total_amount:,.2f}"
-    items_data.append(['', '', '', Paragraph('Subtotal', styles['TotalHeaderStyle']), f"{sales_order.total_amount:,.2f}"])
-    items_data.append(['', '', '', Paragraph('Grand Total', styles['TotalHeaderStyle']), Paragraph(grand_total_text, styles['BoldText'])])
-
-    items_table = Table(items_data, colWidths=[0.4*inch, 3.6*inch, 0.7*inch, 1.1*inch, 1.2*inch])
-    items_table.setStyle(TableStyle([
+    col_widths = [0.4*inch, 3.6*inch, 0.7*inch, 1.1*inch, 1.2*inch]
+
+    def item_rows():
+        items = sales_order.items.select_related('product').order_by('pk').iterator(chunk_size=500)
+        for i, item in enumerate(items, 1):
+            yield [
+                i,
+                Paragraph(item.product.name, styles['Normal']),
+                item.quantity,
+                f"{item.unit_price:,.2f}",
+                f"{item.subtotal:,.2f}"
+            ]
+
+    items_tables = table_chunks(items_header, item_rows(), col_widths, [
         ('BACKGROUND', (0,0), (-1,0), colors.HexColor("#E0E5F2")),
         ('TEXTCOLOR', (0,0), (-1,0), colors.HexColor("#2B3674")),
         ('FONTNAME', (0,0), (-1,0), 'Helvetica-Bold'),
-        ('GRID', (0,0), (-1,-3), 1, colors.HexColor("#E0E5F2")),
+        ('GRID', (0,0), (-1,-1), 1, colors.HexColor("#E0E5F2")),
         ('ALIGN', (2,1), (-1,-1), 'RIGHT'),
         ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
-        ('GRID', (3,-2), (-1,-1), 1, colors.HexColor("#E0E5F2")),
+    ])
+
+    # --- PDF গঠন সমাধান: Paragraph এবং নতুন স্টাইল ব্যবহার করা হলো ---
+    grand_total_text = f"{DEFAULT_CURRENCY_SYMBOL} {sales_order.total_amount:,.2f}"
+    totals_data = [
+        ['', '', '', Paragraph('Subtotal', styles['TotalHeaderStyle']), f"{sales_order.total_amount:,.2f}"],
+        ['', '', '', Paragraph('Grand Total', styles['TotalHeaderStyle']), Paragraph(grand_total_text, styles['BoldText'])],
+    ]
+    totals_table = Table(totals_data, colWidths=col_widths)
+    totals_table.setStyle(TableStyle([
+        ('ALIGN', (2,0), (-1,-1), 'RIGHT'),
+        ('VALIGN', (0,0), (-1,-1), 'MIDDLE'),
+        ('GRID', (3,0), (-1,-1), 1, colors.HexColor("#E0E5F2")),
         ('ALIGN', (4,-1), (4,-1), 'RIGHT'), # Grand Total ডানদিকে অ্যালাইন করা হয়েছে
-        ('SPAN', (0, -2), (2, -2)),
-        ('SPAN', (0, -1), (2, -1)),
+        ('SPAN', (0, 0), (2, 0)),
+        ('SPAN', (0, 1), (2, 1)),
     ]))
-    story.append(items_table)
+    closing = [totals_table]
 
-    story.append(Spacer(1, 0.8*inch))
+    closing.append(Spacer(1, 0.8*inch))
 
     # --- ৪. নোট এবং শর্তাবলী ---
-    story.append(Paragraph("<b>Notes / Terms & Conditions:</b>", styles['HeaderStyle']))
-    story.append(Paragraph("1. Please check all items upon delivery. Goods once sold are not returnable unless there is a manufacturing defect.", styles['CustomerInfo']))
-    story.append(Paragraph("2. Payment to be made within 15 days of the invoice date.", styles['CustomerInfo']))
+    closing.append(Paragraph("<b>Notes / Terms & Conditions:</b>", styles['HeaderStyle']))
+    closing.append(Paragraph("1. Please check all items upon delivery. Goods once sold are not returnable unless there is a manufacturing defect.", styles['CustomerInfo']))
+    closing.append(Paragraph("2. Payment to be made within 15 days of the invoice date.", styles['CustomerInfo']))
 
-    story.append(Spacer(1, 1.2*inch))
+    closing.append(Spacer(1, 1.2*inch))
 
     # --- ৫. সিগনেচার সেকশন ---
-    signature_data = [
-        [Paragraph('--------------------------------<br/>Authorized Signature', styles['SignatureStyle']),
-         Paragraph('--------------------------------<br/>Customer Signature', styles['SignatureStyle'])]
-    ]
-    signature_table = Table(signature_data, colWidths=[3.5*inch, 3.5*inch], hAlign='CENTER')
-    story.append(signature_table)
+    closing.append(signature_block(['Authorized Signature', 'Customer Signature'], 3.5*inch))
 
-    doc.build(story)
-    return response
+    return pdf_response(
+        chain(story, items_tables, closing), filename,
+        rightMargin=30, leftMargin=30, topMargin=30, bottomMargin=30
+    )
 
 
 @login_required
@@ -693,6 +656,7 @@ def create_sales_return(request):
                             returned_items = item_formset.save(commit=False)
                             
                             total_return_amount = 0
+                            stock_movements = []
                             for item in returned_items:
                                 if item.quantity > 0:
                                     # --- মূল পরিবর্তন: মূল সেলস আইটেম থেকে unit_price নেওয়া এবং যোগ করা ---
@@ -702,17 +666,20 @@ def create_sales_return(request):
                                     total_return_amount += item.subtotal
                                     # --- পরিবর্তন শেষ ---
 
-                                    StockService.change_stock(
-                                        product=item.product,
-                                        warehouse=sales_return.warehouse,
-                                        quantity_change=item.quantity,
-                                        transaction_type='sale_return',
-                                        user=request.user,
-                                        content_object=sales_return,
-                                        location=item.lot_serial.location if item.lot_serial else sales_return.warehouse.locations.first(), 
-                                        lot_serial=item.lot_serial,
-                                        notes=f"Return for SO-{sales_order.id}"
-                                    )
+                                    stock_movements.append({
+                                        'product': item.product,
+                                        'warehouse': sales_return.warehouse,
+                                        'quantity_change': item.quantity,
+                                        'transaction_type': 'sale_return',
+                                        'user': request.user,
+                                        'content_object': sales_return,
+                                        'location': item.lot_serial.location if item.lot_serial else sales_return.warehouse.locations.first(),
+                                        'lot_serial': item.lot_serial,
+                                        'notes': f"Return for SO-{sales_order.id}",
+                                    })
+
+                            # সব ফেরত লাইনের স্টক একবারে পোস্ট করা হচ্ছে
+                            StockService.apply_movements(stock_movements)
                             
                             sales_return.total_amount = total_return_amount
                             sales_return.save()
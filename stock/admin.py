@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Warehouse, Location, Stock, LotSerialNumber, InventoryTransaction
+from .models import Warehouse, Location, Stock, LotSerialNumber, InventoryTransaction, StockValuation
 
 @admin.register(Warehouse)
 class WarehouseAdmin(admin.ModelAdmin):
@@ -18,6 +18,12 @@ class StockAdmin(admin.ModelAdmin):
     list_filter = ('warehouse',)
     search_fields = ('product__name', 'warehouse__name')
 
+@admin.register(StockValuation)
+class StockValuationAdmin(admin.ModelAdmin):
+    list_display = ('product', 'warehouse', 'quantity', 'value', 'updated_at')
+    list_filter = ('warehouse',)
+    search_fields = ('product__name', 'warehouse__name')
+
 @admin.register(LotSerialNumber)
 class LotSerialNumberAdmin(admin.ModelAdmin):
     list_display = ('product', 'lot_number', 'location', 'quantity', 'expiration_date')
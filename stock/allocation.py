@@ -0,0 +1,147 @@
+# stock/allocation.py
+
+import datetime
+from collections import defaultdict
+
+from django.conf import settings
+
+from .ledger import StockLedger
+from .models import LotSerialNumber
+
+_NO_EXPIRY = datetime.date.max
+
+
+def _fefo_key(lot):
+    # মেয়াদ নেই এমন লট সবার শেষে; একই মেয়াদের লটের মধ্যে পুরোনোটি আগে
+    return (lot.expiration_date or _NO_EXPIRY, lot.created_at, lot.pk)
+
+
+def _fifo_key(lot):
+    return (lot.created_at, lot.pk)
+
+
+def _lifo_key(lot):
+    return (-lot.created_at.timestamp(), -lot.pk)
+
+
+STRATEGIES = {
+    'fefo': _fefo_key,
+    'fifo': _fifo_key,
+    'lifo': _lifo_key,
+}
+
+
+class InsufficientStockError(ValueError):
+    def __init__(self, product, requested, available):
+        self.product = product
+        self.requested = requested
+        self.available = available
+        super().__init__(f"Insufficient stock for {product.name}.")
+
+
+class LotAllocator:
+    """
+    পুরো বাস্কেটের জন্য কোন লট থেকে কত পরিমাণ নেওয়া হবে তা ঠিক করে।
+    সব প্রোডাক্টের লট একটি কুয়েরিতে আনা হয় এবং বরাদ্দ মেমোরিতে হিসাব হয়, তাই লাইন সংখ্যা
+    যাই হোক কুয়েরি একটিই। একই প্রোডাক্ট একাধিক লাইনে থাকলে আগের লাইনের বরাদ্দ বাদ দিয়ে হিসাব হয়।
+    """
+
+    @staticmethod
+    def allocate(warehouse, lines, strategy=None):
+        """
+        lines: (product, quantity) জোড়ার তালিকা।
+        strategy: 'fefo' / 'fifo' / 'lifo', অথবা product নিয়ে এর যেকোনো একটি ফেরত দেয় এমন ফাংশন।
+        না দিলে settings.STOCK_ALLOCATION_STRATEGY (ডিফল্ট 'fefo') ব্যবহার হয়।
+        প্রতিটি লাইনের জন্য (lot, quantity) জোড়ার একটি তালিকা ফেরত দেয়; স্টক কম থাকলে InsufficientStockError।
+        """
+        lines = list(lines)
+        if not lines:
+            return []
+        session = LotAllocator.session(warehouse, [product for product, _ in lines], strategy)
+        return session.allocate(lines)
+
+    @staticmethod
+    def session(warehouse, products, strategy=None):
+        """
+        একাধিক বাস্কেট (যেমন অফলাইন টিলের জমানো বিক্রি) একের পর এক বরাদ্দ করার জন্য।
+        লট একবারই আনা হয়; প্রতিটি allocate() কল আগের সফল কলগুলোর বরাদ্দ বাদ দিয়ে হিসাব করে।
+        """
+        return AllocationSession(warehouse, products, strategy)
+
+    @staticmethod
+    def movements(picks, product, warehouse, transaction_type, user, content_object=None, notes=''):
+        """একটি লাইনের বরাদ্দকে StockService.apply_movements() এর মুভমেন্ট dict এ রূপান্তর করে।"""
+        return [
+            {
+                'product': product,
+                'warehouse': warehouse,
+                'quantity_change': -quantity,
+                'transaction_type': transaction_type,
+                'user': user,
+                'content_object': content_object,
+                'location': lot.location,
+                'lot_serial': lot,
+                'notes': notes,
+            }
+            for lot, quantity in picks
+        ]
+
+
+class AllocationSession:
+    def __init__(self, warehouse, products, strategy=None):
+        strategy = strategy or getattr(settings, 'STOCK_ALLOCATION_STRATEGY', 'fefo')
+        products = {product.pk: product for product in products}
+        self.lots_by_product = defaultdict(list)
+        self.remaining = {}
+        if not products:
+            return
+
+        candidate_lots = LotSerialNumber.objects.filter(
+            product_id__in=products.keys(),
+            location__warehouse=warehouse
+        ).select_related('location')
+        if StockLedger.enabled():
+            # লেজার মোডে লট কাউন্টার আপডেট হয় না, তাই বাকি পরিমাণ লেজার থেকে নেওয়া হয়
+            candidate_lots = list(candidate_lots)
+            lot_balances = StockLedger.lot_balances([lot.pk for lot in candidate_lots])
+            for lot in candidate_lots:
+                lot.quantity = lot_balances[lot.pk]
+        else:
+            candidate_lots = candidate_lots.filter(quantity__gt=0)
+        for lot in candidate_lots:
+            if lot.quantity <= 0:
+                continue
+            self.lots_by_product[lot.product_id].append(lot)
+
+        for product_id, lots in self.lots_by_product.items():
+            strategy_name = strategy(products[product_id]) if callable(strategy) else strategy
+            lots.sort(key=STRATEGIES[strategy_name])
+
+    def allocate(self, lines):
+        """
+        পুরো বাস্কেট বরাদ্দ হলে তবেই বাকি পরিমাণ আপডেট হয়; কোনো লাইনে স্টক কম থাকলে
+        InsufficientStockError এবং আগের অবস্থা অপরিবর্তিত থাকে।
+        """
+        remaining = dict(self.remaining)
+        plan = []
+        for product, quantity in lines:
+            lots = self.lots_by_product.get(product.pk, [])
+            available = sum(remaining.get(lot.pk, lot.quantity) for lot in lots)
+            if available < quantity:
+                raise InsufficientStockError(product, quantity, available)
+
+            picks = []
+            quantity_left = quantity
+            for lot in lots:
+                if quantity_left <= 0:
+                    break
+                lot_remaining = remaining.get(lot.pk, lot.quantity)
+                if lot_remaining <= 0:
+                    continue
+                quantity_from_lot = min(lot_remaining, quantity_left)
+                remaining[lot.pk] = lot_remaining - quantity_from_lot
+                picks.append((lot, quantity_from_lot))
+                quantity_left -= quantity_from_lot
+            plan.append(picks)
+        self.remaining = remaining
+        return plan
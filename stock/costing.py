@@ -0,0 +1,205 @@
+# stock/costing.py
+
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.contrib.contenttypes.models import ContentType
+from django.utils import timezone
+
+from .models import InventoryTransaction, StockValuation
+
+UNIT_COST_PLACES = Decimal('0.0001')
+
+
+def _quantize(value):
+    return Decimal(value).quantize(UNIT_COST_PLACES, rounding=ROUND_HALF_UP)
+
+
+class CostLayers:
+    """
+    একটি (product, warehouse) এর কস্ট লেয়ার মেমোরিতে। receive() নতুন লেয়ার যোগ করে, issue() পুরনো
+    লেয়ার থেকে খরচ করে; দুটোই প্রতি ইউনিটের খরচ ফেরত দেয়। শেষে store() দিয়ে StockValuation এ লেখা হয়।
+    """
+
+    def __init__(self, valuation, method):
+        self.method = method
+        self.layers = [[int(quantity), Decimal(cost)] for quantity, cost in valuation.layers]
+
+    @property
+    def quantity(self):
+        return sum(quantity for quantity, _ in self.layers)
+
+    @property
+    def value(self):
+        return sum((quantity * cost for quantity, cost in self.layers), Decimal('0'))
+
+    def average_cost(self):
+        quantity = self.quantity
+        return _quantize(self.value / quantity) if quantity > 0 else None
+
+    def receive(self, quantity, unit_cost):
+        unit_cost = _quantize(unit_cost)
+        if self.method == 'average':
+            total = self.quantity + quantity
+            self.layers = [[total, _quantize((self.value + quantity * unit_cost) / total)]]
+        elif self.layers and self.layers[-1][1] == unit_cost:
+            # একই দামের পরপর রিসিভ একটি লেয়ারেই জমা হয়, যাতে লেয়ারের তালিকা ছোট থাকে
+            self.layers[-1][0] += quantity
+        else:
+            self.layers.append([quantity, unit_cost])
+        return unit_cost
+
+    def issue(self, quantity, fallback_cost):
+        """সবচেয়ে পুরনো লেয়ার থেকে quantity খরচ করে; লেয়ারে কম থাকলে বাকিটা fallback_cost ধরে হিসাব হয়।"""
+        remaining = quantity
+        cost = Decimal('0')
+        while remaining and self.layers:
+            layer = self.layers[0]
+            taken = min(layer[0], remaining)
+            cost += taken * layer[1]
+            layer[0] -= taken
+            remaining -= taken
+            if not layer[0]:
+                self.layers.pop(0)
+        cost += remaining * Decimal(fallback_cost)
+        return _quantize(cost / quantity)
+
+    def store(self, valuation, now):
+        # Stock এর মতোই পরিমাণ পূর্ণসংখ্যা হিসেবে রাখা হয়
+        valuation.quantity = int(self.quantity)
+        valuation.value = self.value
+        valuation.layers = [[int(quantity), str(cost)] for quantity, cost in self.layers]
+        valuation.updated_at = now
+
+
+class CostingEngine:
+    """
+    StockService.apply_movements() এর ভিতরে, একই ট্রানজেকশনে, কস্ট লেয়ার আপডেট করে।
+    পদ্ধতি settings.STOCK_COSTING_METHOD থেকে: 'average' অথবা 'fifo'। ব্যাচে যতগুলো মুভমেন্টই থাকুক,
+    ভ্যালুয়েশন রো লক করতে একটি এবং লিখতে একটি কুয়েরি লাগে।
+    """
+
+    @staticmethod
+    def method():
+        return getattr(settings, 'STOCK_COSTING_METHOD', 'average')
+
+    @staticmethod
+    def post(movements, opening_balances):
+        """
+        movements: apply_movements() এর মুভমেন্ট dict (ঐচ্ছিক 'unit_cost' সহ, যেমন PO রিসিভে)।
+        opening_balances: মুভমেন্টের আগের স্টক, (product_id, warehouse_id) অনুযায়ী; নতুন ভ্যালুয়েশন রো এ লাগে।
+        মুভমেন্টের ক্রমে প্রতিটির ইউনিট খরচের তালিকা ফেরত দেয়।
+        """
+        products = {m['product'].pk: m['product'] for m in movements}
+        valuations = CostingEngine._lock_valuations(
+            {(m['product'].pk, m['warehouse'].pk) for m in movements}, opening_balances, products
+        )
+        method = CostingEngine.method()
+        books = {key: CostLayers(valuation, method) for key, valuation in valuations.items()}
+        dispatched = CostingEngine._dispatched_costs(movements)
+
+        unit_costs = []
+        for m in movements:
+            book = books[(m['product'].pk, m['warehouse'].pk)]
+            quantity_change = m['quantity_change']
+            fallback_cost = m['product'].cost_price or 0
+            transfer_key = CostingEngine._transfer_key(m)
+            if quantity_change > 0:
+                unit_cost = m.get('unit_cost')
+                if unit_cost is None and m['transaction_type'] == 'transfer_in' and transfer_key in dispatched:
+                    # ট্রান্সফার ইন সোর্স থেকে যে খরচে বের হয়েছিল সেই খরচেই ঢোকে
+                    quantity, value = dispatched[transfer_key]
+                    unit_cost = value / quantity
+                if unit_cost is None:
+                    # দাম জানা না থাকলে (অ্যাডজাস্টমেন্ট, ট্রান্সফার, রিটার্ন) বর্তমান গড় খরচ ধরা হয়
+                    unit_cost = book.average_cost()
+                    if unit_cost is None:
+                        unit_cost = fallback_cost
+                unit_costs.append(book.receive(quantity_change, unit_cost))
+            else:
+                unit_cost = book.issue(-quantity_change, fallback_cost)
+                if m['transaction_type'] == 'transfer_out' and transfer_key is not None:
+                    # একই ব্যাচে পরে আসা ট্রান্সফার ইন এর জন্য
+                    quantity, value = dispatched.get(transfer_key, (0, Decimal('0')))
+                    dispatched[transfer_key] = (quantity - quantity_change, value - quantity_change * unit_cost)
+                unit_costs.append(unit_cost)
+
+        now = timezone.now()
+        for key, book in books.items():
+            book.store(valuations[key], now)
+        StockValuation.objects.bulk_update(valuations.values(), ['quantity', 'value', 'layers', 'updated_at'])
+        return unit_costs
+
+    @staticmethod
+    def issued_cost(transactions):
+        """একটি লাইনের (লট অনুযায়ী এক বা একাধিক) ইস্যু ট্রানজেকশনের পরিমাণ-ভারিত ইউনিট খরচ; খালি হলে None।"""
+        quantity = sum(-t.quantity for t in transactions)
+        if not quantity:
+            return None
+        return _quantize(sum((-t.quantity * t.unit_cost for t in transactions), Decimal('0')) / quantity)
+
+    @staticmethod
+    def _transfer_key(movement):
+        content_object = movement.get('content_object')
+        if movement['transaction_type'] not in ('transfer_in', 'transfer_out') or content_object is None:
+            return None
+        return (ContentType.objects.get_for_model(content_object).pk, content_object.pk)
+
+    @staticmethod
+    def _dispatched_costs(movements):
+        """
+        ব্যাচের transfer_in গুলোর ট্রান্সফার রিকোয়েস্টের আগে পোস্ট হওয়া transfer_out থেকে
+        {(content_type_id, object_id): (পরিমাণ, মোট খরচ)} ফেরত দেয়।
+        """
+        keys = {
+            CostingEngine._transfer_key(m) for m in movements
+            if m['transaction_type'] == 'transfer_in' and m.get('unit_cost') is None
+        } - {None}
+        dispatched = {}
+        if not keys:
+            return dispatched
+        rows = InventoryTransaction.objects.filter(
+            transaction_type='transfer_out', unit_cost__isnull=False,
+            content_type_id__in={content_type_id for content_type_id, _ in keys},
+            object_id__in={object_id for _, object_id in keys}
+        ).values_list('content_type_id', 'object_id', 'quantity', 'unit_cost')
+        for content_type_id, object_id, quantity, unit_cost in rows:
+            key = (content_type_id, object_id)
+            if key in keys:
+                total_quantity, value = dispatched.get(key, (0, Decimal('0')))
+                dispatched[key] = (total_quantity - quantity, value - quantity * unit_cost)
+        return dispatched
+
+    @staticmethod
+    def _lock_valuations(keys, opening_balances, products):
+        """
+        ভ্যালুয়েশন রো গুলো লক করে dict আকারে ফেরত দেয়। যেগুলো নেই সেগুলো আগের স্টক ও প্রোডাক্টের
+        cost_price দিয়ে একটি লেয়ারে শুরু করা হয়।
+        """
+        product_ids = {product_id for product_id, _ in keys}
+        warehouse_ids = {warehouse_id for _, warehouse_id in keys}
+
+        def fetch():
+            rows = StockValuation.objects.select_for_update().filter(
+                product_id__in=product_ids, warehouse_id__in=warehouse_ids
+            ).order_by('pk')
+            return {
+                (valuation.product_id, valuation.warehouse_id): valuation
+                for valuation in rows
+                if (valuation.product_id, valuation.warehouse_id) in keys
+            }
+
+        valuations = fetch()
+        missing = keys - valuations.keys()
+        if missing:
+            seeded = []
+            for product_id, warehouse_id in missing:
+                quantity = max(opening_balances.get((product_id, warehouse_id), 0), 0)
+                cost = _quantize(products[product_id].cost_price or 0)
+                seeded.append(StockValuation(
+                    product_id=product_id, warehouse_id=warehouse_id, quantity=quantity,
+                    value=quantity * cost, layers=[[quantity, str(cost)]] if quantity else []
+                ))
+            StockValuation.objects.bulk_create(seeded, ignore_conflicts=True)
+            valuations = fetch()
+        return valuations
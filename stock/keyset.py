@@ -0,0 +1,110 @@
+# stock/keyset.py
+
+import datetime
+import hashlib
+
+from django.core.cache import cache
+from django.db.models import Q
+
+from .models import Location
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.timezone.utc)
+ORDERING = ('-transaction_date', '-id')
+COUNT_CACHE_TTL = 120
+
+
+def encode_cursor(inventory_transaction):
+    """ট্রানজেকশনের (transaction_date, id) কে URL-এ নিরাপদ একটি স্ট্রিং এ রূপান্তর করে।"""
+    microseconds = (inventory_transaction.transaction_date - EPOCH) // datetime.timedelta(microseconds=1)
+    return f"{microseconds}-{inventory_transaction.pk}"
+
+
+def decode_cursor(cursor):
+    """encode_cursor() এর উল্টো; ভুল কার্সর হলে None।"""
+    try:
+        microseconds, pk = (int(part) for part in (cursor or '').split('-'))
+    except ValueError:
+        return None
+    return EPOCH + datetime.timedelta(microseconds=microseconds), pk
+
+
+class KeysetPage:
+    """একটি পেজের রো এবং আগের (নতুন) ও পরের (পুরনো) পেজের কার্সর।"""
+
+    def __init__(self, rows, next_cursor, previous_cursor):
+        self.object_list = rows
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def keyset_page(queryset, cursor=None, per_page=50, direction='older'):
+    """
+    InventoryTransaction queryset কে নতুন থেকে পুরনো ক্রমে keyset পেজিনেশন করে। OFFSET বা COUNT চলে না,
+    তাই যত পুরনো পেজই হোক, প্রতিটি পেজ একই খরচে আসে।
+    direction='older' হলে cursor এর পরের (পুরনো) পেজ, 'newer' হলে cursor এর আগের (নতুন) পেজ।
+    """
+    position = decode_cursor(cursor)
+    if position is None:
+        direction = 'older'
+    else:
+        transaction_date, pk = position
+        if direction == 'newer':
+            queryset = queryset.filter(Q(transaction_date__gt=transaction_date) | Q(transaction_date=transaction_date, pk__gt=pk))
+        else:
+            queryset = queryset.filter(Q(transaction_date__lt=transaction_date) | Q(transaction_date=transaction_date, pk__lt=pk))
+
+    if direction == 'newer':
+        rows = list(queryset.order_by('transaction_date', 'id')[:per_page + 1])
+        has_more = len(rows) > per_page
+        rows = rows[:per_page][::-1]
+        # cursor এর রো-টি এই পেজের চেয়ে পুরনো, তাই পরের পেজ সবসময় আছে
+        return KeysetPage(rows, encode_cursor(rows[-1]) if rows else cursor, encode_cursor(rows[0]) if has_more else None)
+
+    rows = list(queryset.order_by(*ORDERING)[:per_page + 1])
+    has_more = len(rows) > per_page
+    rows = rows[:per_page]
+    next_cursor = encode_cursor(rows[-1]) if has_more else None
+    previous_cursor = encode_cursor(rows[0]) if position is not None and rows else None
+    return KeysetPage(rows, next_cursor, previous_cursor)
+
+
+def cached_count(queryset, ttl=COUNT_CACHE_TTL):
+    """
+    ফিল্টার করা queryset এর মোট সংখ্যা। একই ফিল্টারের COUNT কিছুক্ষণ ক্যাশে থাকে, তাই পেজ বদলালে
+    আবার পুরো টেবিল গোনা হয় না; সংখ্যাটি তাই আনুমানিক (সর্বোচ্চ ttl সেকেন্ড পুরনো)।
+    """
+    queryset = queryset.order_by()
+    sql, params = queryset.query.sql_with_params()
+    key = 'stock_txn_count:' + hashlib.md5(f'{sql}|{params}'.encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, ttl)
+    return count
+
+
+def warehouse_filter(warehouse, include_warehouse_field=True):
+    """
+    ওয়্যারহাউসের ট্রানজেকশন বাছাই করার Q। লোকেশন টেবিল join না করে ঐ ওয়্যারহাউসের লোকেশন id এর
+    সাবকুয়েরি ব্যবহার হয়, তাই কোনো রো দুবার আসে না এবং DISTINCT লাগে না।
+    """
+    location_ids = Location.objects.filter(warehouse=warehouse).values('pk')
+    condition = Q(source_location_id__in=location_ids) | Q(destination_location_id__in=location_ids)
+    if include_warehouse_field:
+        condition |= Q(warehouse=warehouse)
+    return condition
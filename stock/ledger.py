@@ -0,0 +1,231 @@
+# stock/ledger.py
+
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Max, Sum
+from django.utils import timezone
+
+from .models import InventoryTransaction, LotSerialNumber, Stock, StockSnapshot
+
+
+class StockLedger:
+    """
+    InventoryTransaction টেবিলকে append-only লেজার হিসেবে পড়ার API।
+    যেকোনো সময়ের ব্যালেন্স = ঐ সময়ের আগের শেষ স্ন্যাপশট রান + তার পরের ট্রানজেকশনের যোগফল।
+    """
+
+    @staticmethod
+    def latest_run(as_of=None, before=False):
+        """as_of পর্যন্ত (before=True হলে as_of এর আগ পর্যন্ত) সর্বশেষ স্ন্যাপশট রানের সময়।"""
+        snapshots = StockSnapshot.objects.all()
+        if as_of is not None:
+            snapshots = snapshots.filter(as_of__lt=as_of) if before else snapshots.filter(as_of__lte=as_of)
+        return snapshots.aggregate(run=Max('as_of'))['run']
+
+    @staticmethod
+    def enabled():
+        return getattr(settings, 'STOCK_LEDGER_MODE', False)
+
+    @staticmethod
+    def balances(stock_keys, as_of=None):
+        """
+        (product_id, warehouse_id) জোড়াগুলোর ব্যালেন্স dict আকারে ফেরত দেয়।
+        কী-এর সংখ্যা যাই হোক, স্ন্যাপশট ও ডেল্টা মিলিয়ে সর্বোচ্চ তিনটি কুয়েরি লাগে।
+        """
+        stock_keys = set(stock_keys)
+        if not stock_keys:
+            return {}
+        totals = StockLedger.totals(
+            {product_id for product_id, _ in stock_keys}, {warehouse_id for _, warehouse_id in stock_keys}, as_of
+        )
+        return {key: totals.get(key, 0) for key in stock_keys}
+
+    @staticmethod
+    def totals(product_ids=None, warehouse_ids=None, as_of=None):
+        """
+        product_ids / warehouse_ids (None হলে সব) এর প্রতিটি (product_id, warehouse_id) এর ব্যালেন্স।
+        লেজার মোডে Stock কাউন্টারের বদলে এটি পড়া হয় (যেমন POS ক্যাটালগ)।
+        """
+        run = StockLedger.latest_run(as_of)
+
+        def scoped(queryset):
+            if product_ids is not None:
+                queryset = queryset.filter(product_id__in=product_ids)
+            if warehouse_ids is not None:
+                queryset = queryset.filter(warehouse_id__in=warehouse_ids)
+            return queryset
+
+        result = defaultdict(int)
+        if run is not None:
+            snapshot_rows = scoped(StockSnapshot.objects.filter(
+                as_of=run, lot_serial__isnull=True
+            )).values_list('product_id', 'warehouse_id', 'quantity')
+            for product_id, warehouse_id, quantity in snapshot_rows:
+                result[(product_id, warehouse_id)] += quantity
+
+        deltas = scoped(StockLedger._delta_queryset(run, as_of).filter(warehouse__isnull=False)).values(
+            'product_id', 'warehouse_id'
+        ).annotate(total=Sum('quantity')).values_list('product_id', 'warehouse_id', 'total')
+        for product_id, warehouse_id, total in deltas:
+            result[(product_id, warehouse_id)] += total or 0
+
+        return dict(result)
+
+    @staticmethod
+    def lot_balances(lot_ids, as_of=None):
+        """লট id অনুযায়ী ব্যালেন্স dict আকারে ফেরত দেয়।"""
+        lot_ids = set(lot_ids)
+        if not lot_ids:
+            return {}
+        run = StockLedger.latest_run(as_of)
+
+        result = defaultdict(int)
+        if run is not None:
+            snapshot_rows = StockSnapshot.objects.filter(
+                as_of=run, lot_serial_id__in=lot_ids
+            ).values_list('lot_serial_id', 'quantity')
+            for lot_id, quantity in snapshot_rows:
+                result[lot_id] += quantity
+
+        deltas = StockLedger._delta_queryset(run, as_of).filter(
+            lot_serial_id__in=lot_ids
+        ).values('lot_serial_id').annotate(total=Sum('quantity')).values_list('lot_serial_id', 'total')
+        for lot_id, total in deltas:
+            result[lot_id] += total or 0
+
+        return {lot_id: result[lot_id] for lot_id in lot_ids}
+
+    @staticmethod
+    def on_hand(product, warehouse, as_of=None, lot_serial=None):
+        """একটি প্রোডাক্টের (অথবা নির্দিষ্ট লটের) as_of সময়ের স্টক।"""
+        if lot_serial is not None:
+            return StockLedger.lot_balances([lot_serial.pk], as_of)[lot_serial.pk]
+        key = (product.pk, warehouse.pk)
+        return StockLedger.balances([key], as_of)[key]
+
+    @staticmethod
+    def take_snapshot(as_of=None):
+        """
+        আগের স্ন্যাপশট রান + তার পরের ট্রানজেকশন দিয়ে as_of সময়ের নতুন একটি সম্পূর্ণ রান তৈরি করে।
+        তৈরি হওয়া রো এর সংখ্যা ফেরত দেয়।
+
+        transaction_date কমিটের আগেই বসে যায়, তাই এখনো কমিট না হওয়া পোস্টিং as_of এর আগের তারিখ নিয়ে
+        পরে দেখা দিতে পারে এবং পরের রানের ডেল্টাতেও আসবে না। তাই as_of কখনো
+        settings.STOCK_SNAPSHOT_LAG_SECONDS (ডিফল্ট ৩০০) সেকেন্ডের চেয়ে নতুন হয় না।
+        """
+        latest = timezone.now() - timedelta(seconds=getattr(settings, 'STOCK_SNAPSHOT_LAG_SECONDS', 300))
+        as_of = min(as_of, latest) if as_of else latest
+        with transaction.atomic():
+            previous_run = StockLedger.latest_run(as_of, before=True)
+            stock_totals = defaultdict(int)
+            lot_totals = defaultdict(int)
+
+            if previous_run is not None:
+                snapshot_rows = StockSnapshot.objects.filter(as_of=previous_run).values_list(
+                    'product_id', 'warehouse_id', 'lot_serial_id', 'quantity'
+                )
+                for product_id, warehouse_id, lot_id, quantity in snapshot_rows:
+                    if lot_id is None:
+                        stock_totals[(product_id, warehouse_id)] += quantity
+                    else:
+                        lot_totals[(product_id, warehouse_id, lot_id)] += quantity
+
+            deltas = StockLedger._delta_queryset(previous_run, as_of).filter(warehouse__isnull=False)
+            stock_rows = deltas.values('product_id', 'warehouse_id').annotate(
+                total=Sum('quantity')
+            ).values_list('product_id', 'warehouse_id', 'total')
+            for product_id, warehouse_id, total in stock_rows:
+                stock_totals[(product_id, warehouse_id)] += total or 0
+
+            lot_rows = deltas.filter(lot_serial__isnull=False).values('product_id', 'warehouse_id', 'lot_serial_id').annotate(
+                total=Sum('quantity')
+            ).values_list('product_id', 'warehouse_id', 'lot_serial_id', 'total')
+            for product_id, warehouse_id, lot_id, total in lot_rows:
+                lot_totals[(product_id, warehouse_id, lot_id)] += total or 0
+
+            return StockLedger._write_run(as_of, stock_totals, lot_totals)
+
+    @staticmethod
+    def seed_from_counters(as_of=None):
+        """
+        লেজার মোড চালুর আগে একবার চালাতে হয়: বর্তমান Stock ও লট কাউন্টারগুলোকে
+        opening balance হিসেবে একটি স্ন্যাপশট রানে লিখে দেয়।
+        """
+        as_of = as_of or timezone.now()
+        with transaction.atomic():
+            stock_totals = {
+                (product_id, warehouse_id): quantity
+                for product_id, warehouse_id, quantity in Stock.objects.values_list('product_id', 'warehouse_id', 'quantity')
+            }
+            lot_totals = {
+                (product_id, warehouse_id, lot_id): quantity
+                for lot_id, product_id, warehouse_id, quantity in LotSerialNumber.objects.values_list(
+                    'pk', 'product_id', 'location__warehouse_id', 'quantity'
+                )
+            }
+            return StockLedger._write_run(as_of, stock_totals, lot_totals)
+
+    @staticmethod
+    def materialize_counters(as_of=None):
+        """
+        লেজার মোডে Stock ও লট কাউন্টারগুলো সরাসরি আপডেট হয় না; এই মেথড এগুলোকে
+        লেজারের ব্যালেন্সের সাথে মিলিয়ে দেয়, যাতে রিপোর্ট ও ড্যাশবোর্ড সঠিক থাকে।
+        পরিবর্তিত রো এর সংখ্যা ফেরত দেয়।
+        """
+        with transaction.atomic():
+            stocks = list(Stock.objects.select_for_update().order_by('pk'))
+            balances = StockLedger.balances({(s.product_id, s.warehouse_id) for s in stocks}, as_of)
+            changed_stocks = []
+            for stock in stocks:
+                balance = balances[(stock.product_id, stock.warehouse_id)]
+                if stock.quantity != balance:
+                    stock.quantity = balance
+                    changed_stocks.append(stock)
+            Stock.objects.bulk_update(changed_stocks, ['quantity'], batch_size=1000)
+
+            lots = list(LotSerialNumber.objects.select_for_update().order_by('pk'))
+            lot_balances = StockLedger.lot_balances({lot.pk for lot in lots}, as_of)
+            changed_lots = []
+            for lot in lots:
+                if lot.quantity != lot_balances[lot.pk]:
+                    lot.quantity = lot_balances[lot.pk]
+                    changed_lots.append(lot)
+            LotSerialNumber.objects.bulk_update(changed_lots, ['quantity'], batch_size=1000)
+
+            return len(changed_stocks) + len(changed_lots)
+
+    @staticmethod
+    def prune(keep):
+        """সর্বশেষ keep টি রান রেখে বাকি স্ন্যাপশট মুছে ফেলে।"""
+        runs = list(StockSnapshot.objects.values_list('as_of', flat=True).distinct().order_by('-as_of')[:keep])
+        if len(runs) < keep or not runs:
+            return 0
+        deleted, _ = StockSnapshot.objects.filter(as_of__lt=runs[-1]).delete()
+        return deleted
+
+    @staticmethod
+    def _delta_queryset(since, until):
+        transactions = InventoryTransaction.objects.all()
+        if since is not None:
+            transactions = transactions.filter(transaction_date__gt=since)
+        if until is not None:
+            transactions = transactions.filter(transaction_date__lte=until)
+        return transactions.order_by()
+
+    @staticmethod
+    def _write_run(as_of, stock_totals, lot_totals):
+        snapshots = [
+            StockSnapshot(product_id=product_id, warehouse_id=warehouse_id, quantity=quantity, as_of=as_of)
+            for (product_id, warehouse_id), quantity in stock_totals.items()
+            if quantity
+        ]
+        snapshots += [
+            StockSnapshot(product_id=product_id, warehouse_id=warehouse_id, lot_serial_id=lot_id, quantity=quantity, as_of=as_of)
+            for (product_id, warehouse_id, lot_id), quantity in lot_totals.items()
+            if quantity
+        ]
+        StockSnapshot.objects.bulk_create(snapshots, batch_size=1000)
+        return len(snapshots)
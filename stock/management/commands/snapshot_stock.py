@@ -0,0 +1,43 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from stock.ledger import StockLedger
+
+
+class Command(BaseCommand):
+    help = 'Writes a stock ledger snapshot run (per product/warehouse and per lot balances) and optionally refreshes the Stock counters.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--as-of', dest='as_of', help='Snapshot time as "YYYY-MM-DD" or "YYYY-MM-DD HH:MM" (default and upper bound: now minus STOCK_SNAPSHOT_LAG_SECONDS).')
+        parser.add_argument('--seed', action='store_true', help='Seed the ledger from the current Stock/lot counters (run once before enabling STOCK_LEDGER_MODE).')
+        parser.add_argument('--materialize', action='store_true', help='Update Stock and lot counters to match the ledger balances.')
+        parser.add_argument('--keep', type=int, help='Keep only the latest N snapshot runs.')
+
+    def handle(self, *args, **options):
+        as_of = self._parse_as_of(options['as_of'])
+
+        if options['seed']:
+            count = StockLedger.seed_from_counters(as_of)
+            self.stdout.write(self.style.SUCCESS(f'Seeded ledger with {count} opening balance rows.'))
+        else:
+            count = StockLedger.take_snapshot(as_of)
+            self.stdout.write(self.style.SUCCESS(f'Snapshot written with {count} rows.'))
+
+        if options['materialize']:
+            changed = StockLedger.materialize_counters()
+            self.stdout.write(self.style.SUCCESS(f'{changed} stock/lot counters refreshed from the ledger.'))
+
+        if options['keep']:
+            deleted = StockLedger.prune(options['keep'])
+            self.stdout.write(self.style.NOTICE(f'{deleted} old snapshot rows removed.'))
+
+    def _parse_as_of(self, value):
+        if not value:
+            return None
+        for fmt in ('%Y-%m-%d %H:%M', '%Y-%m-%d'):
+            try:
+                return timezone.make_aware(datetime.strptime(value, fmt))
+            except ValueError:
+                continue
+        raise CommandError(f'Invalid --as-of value: {value}')
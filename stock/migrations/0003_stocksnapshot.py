@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:33
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('stock', '0002_inventorytransaction_content_type_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField()),
+                ('as_of', models.DateTimeField(db_index=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('lot_serial', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='stock.lotserialnumber')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='products.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='stock_snapshots', to='stock.warehouse')),
+            ],
+            options={
+                'db_table': 'inventory_stocksnapshot',
+                'indexes': [models.Index(fields=['as_of', 'product', 'warehouse'], name='inventory_s_as_of_82e04d_idx')],
+                'unique_together': {('product', 'warehouse', 'lot_serial', 'as_of')},
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def seed_valuations(apps, schema_editor):
+    # আগে থেকে থাকা স্টকের খরচ প্রোডাক্টের cost_price ধরে একটি লেয়ার হিসেবে শুরু হয়
+    Stock = apps.get_model('stock', 'Stock')
+    StockValuation = apps.get_model('stock', 'StockValuation')
+    valuations = []
+    for product_id, warehouse_id, quantity, cost_price in Stock.objects.filter(quantity__gt=0).values_list(
+        'product_id', 'warehouse_id', 'quantity', 'product__cost_price'
+    ).iterator():
+        cost_price = cost_price or 0
+        valuations.append(StockValuation(
+            product_id=product_id, warehouse_id=warehouse_id, quantity=quantity,
+            value=quantity * cost_price, layers=[[quantity, str(cost_price)]]
+        ))
+    StockValuation.objects.bulk_create(valuations, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('stock', '0003_stocksnapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='unit_cost',
+            field=models.DecimalField(blank=True, decimal_places=4, max_digits=12, null=True),
+        ),
+        migrations.CreateModel(
+            name='StockValuation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.IntegerField(default=0)),
+                ('value', models.DecimalField(decimal_places=4, default=0, max_digits=16)),
+                ('layers', models.JSONField(blank=True, default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valuations', to='products.product')),
+                ('warehouse', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='valuations', to='stock.warehouse')),
+            ],
+            options={
+                'db_table': 'inventory_stockvaluation',
+                'unique_together': {('product', 'warehouse')},
+            },
+        ),
+        migrations.RunPython(seed_valuations, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:01
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_balances(apps, schema_editor):
+    # পুরনো ট্রানজেকশনের ব্যালেন্স বর্তমান কাউন্টার থেকে নতুন থেকে পুরনো দিকে পিছিয়ে হিসাব করা হয়
+    Stock = apps.get_model('stock', 'Stock')
+    LotSerialNumber = apps.get_model('stock', 'LotSerialNumber')
+    InventoryTransaction = apps.get_model('stock', 'InventoryTransaction')
+
+    def walk(current, key_fields, balance_field):
+        changed = []
+        running = {}
+        rows = InventoryTransaction.objects.exclude(**{f'{key_fields[-1]}__isnull': True}).order_by(
+            *key_fields, '-transaction_date', '-id'
+        ).only('id', 'quantity', *key_fields)
+        for row in rows.iterator(chunk_size=2000):
+            key = tuple(getattr(row, field) for field in key_fields)
+            if key not in running:
+                running[key] = current.get(key, 0)
+            setattr(row, balance_field, running[key])
+            running[key] -= row.quantity
+            changed.append(row)
+            if len(changed) >= 2000:
+                InventoryTransaction.objects.bulk_update(changed, [balance_field])
+                changed = []
+        if changed:
+            InventoryTransaction.objects.bulk_update(changed, [balance_field])
+
+    walk(
+        {(p, w): q for p, w, q in Stock.objects.values_list('product_id', 'warehouse_id', 'quantity')},
+        ('product_id', 'warehouse_id'), 'balance_after'
+    )
+    walk(
+        {(pk,): q for pk, q in LotSerialNumber.objects.values_list('pk', 'quantity')},
+        ('lot_serial_id',), 'lot_balance_after'
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('partners', '0002_customer_is_active'),
+        ('products', '0001_initial'),
+        ('stock', '0004_stockvaluation'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='balance_after',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='inventorytransaction',
+            name='lot_balance_after',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['product', 'warehouse', 'transaction_date'], name='inventory_i_product_75b41b_idx'),
+        ),
+        migrations.RunPython(backfill_balances, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:07
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('contenttypes', '0002_remove_content_type_name'),
+        ('partners', '0002_customer_is_active'),
+        ('products', '0001_initial'),
+        ('stock', '0005_inventorytransaction_balance_after'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['transaction_date', 'id'], name='inventory_i_transac_15791c_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='inventorytransaction',
+            index=models.Index(fields=['warehouse', 'transaction_date'], name='inventory_i_warehou_1d6a0d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lotserialnumber',
+            index=models.Index(condition=models.Q(('quantity__gt', 0)), fields=['product', 'location', 'expiration_date'], name='lot_available_fefo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lotserialnumber',
+            index=models.Index(condition=models.Q(('expiration_date__isnull', False), ('quantity__gt', 0)), fields=['expiration_date'], name='lot_expiring_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stock',
+            index=models.Index(condition=models.Q(('quantity__gt', 0)), fields=['warehouse', 'product'], name='stock_in_stock_idx'),
+        ),
+    ]
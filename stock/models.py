@@ -63,6 +63,8 @@ class Stock(models.Model):
     
     class Meta:
         unique_together = ('product', 'warehouse') 
+        # ড্যাশবোর্ড/ডেড স্টক শুধু quantity > 0 এর রো পড়ে
+        indexes = [models.Index(fields=['warehouse', 'product'], condition=models.Q(quantity__gt=0), name='stock_in_stock_idx')]
         verbose_name_plural = "Stocks"
         db_table = 'inventory_stock'
     
@@ -81,6 +83,11 @@ class LotSerialNumber(models.Model):
 
     class Meta:
         unique_together = ('product', 'location', 'lot_number')
+        # খালি লট বাদ দিয়ে partial index: FEFO বরাদ্দ (product, location) এবং মেয়াদের রিপোর্ট (expiration_date)
+        indexes = [
+            models.Index(fields=['product', 'location', 'expiration_date'], condition=models.Q(quantity__gt=0), name='lot_available_fefo_idx'),
+            models.Index(fields=['expiration_date'], condition=models.Q(quantity__gt=0, expiration_date__isnull=False), name='lot_expiring_idx'),
+        ]
         db_table = 'inventory_lotserialnumber'
 
 class InventoryTransaction(models.Model):
@@ -118,9 +125,69 @@ class InventoryTransaction(models.Model):
     destination_location = models.ForeignKey('Location', on_delete=models.SET_NULL, null=True, blank=True, related_name='incoming_transactions')
     transaction_date = models.DateTimeField(default=timezone.now)
     notes = models.TextField(blank=True, null=True)
+    # পোস্টিং এর সময় কস্ট লেয়ার থেকে পাওয়া প্রতি ইউনিটের খরচ (stock.costing)
+    unit_cost = models.DecimalField(max_digits=12, decimal_places=4, null=True, blank=True)
+    # এই ট্রানজেকশনের পরে (product, warehouse) এর এবং লটের স্টক; পোস্টিং এর সময় লক ধরে রেখে লেখা হয়
+    balance_after = models.IntegerField(null=True, blank=True)
+    lot_balance_after = models.IntegerField(null=True, blank=True)
 
     def __str__(self):
         return f"{self.get_transaction_type_display()} of {self.quantity} x {self.product.name}"
 
     class Meta:
-        db_table = 'inventory_inventorytransaction'
\ No newline at end of file
+        db_table = 'inventory_inventorytransaction'
+        indexes = [
+            models.Index(fields=['product', 'warehouse', 'transaction_date']),
+            # ট্রানজেকশন তালিকার keyset ক্রম (transaction_date, id) এবং ওয়্যারহাউস অনুযায়ী তারিখের ফিল্টার
+            models.Index(fields=['transaction_date', 'id']),
+            models.Index(fields=['warehouse', 'transaction_date']),
+        ]
+
+
+class StockSnapshot(models.Model):
+    """
+    লেজার মোডে InventoryTransaction-ই আসল হিসাব। এই টেবিলে নির্দিষ্ট সময় (as_of) পর্যন্ত
+    প্রতিটি (product, warehouse) এবং প্রতিটি লটের ব্যালেন্স জমা রাখা হয়, যাতে
+    যেকোনো সময়ের স্টক = শেষ স্ন্যাপশট + তার পরের ট্রানজেকশন দিয়ে বের করা যায়।
+    একটি স্ন্যাপশট রানের সব রো একই as_of ব্যবহার করে; শূন্য ব্যালেন্সের রো রাখা হয় না।
+    """
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='stock_snapshots')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='stock_snapshots')
+    # lot_serial খালি থাকলে রো-টি পুরো ওয়্যারহাউসের ব্যালেন্স, না হলে শুধু ঐ লটের
+    lot_serial = models.ForeignKey(LotSerialNumber, on_delete=models.CASCADE, null=True, blank=True, related_name='snapshots')
+    quantity = models.IntegerField()
+    as_of = models.DateTimeField(db_index=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.product.name} ({self.quantity}) at {self.warehouse.name} as of {self.as_of:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        unique_together = ('product', 'warehouse', 'lot_serial', 'as_of')
+        indexes = [models.Index(fields=['as_of', 'product', 'warehouse'])]
+        db_table = 'inventory_stocksnapshot'
+
+
+class StockValuation(models.Model):
+    """
+    প্রতিটি (product, warehouse) এর কস্ট লেয়ারের অবস্থা, স্টক পোস্টিং এর সাথে সাথেই আপডেট হয়।
+    value = হাতে থাকা স্টকের মোট খরচ। layers এ খোলা লেয়ারগুলো [পরিমাণ, "ইউনিট খরচ"] আকারে পুরনো থেকে
+    নতুন ক্রমে থাকে; weighted-average মোডে সব মিলিয়ে একটি মাত্র লেয়ার থাকে।
+    """
+    product = models.ForeignKey('products.Product', on_delete=models.CASCADE, related_name='valuations')
+    warehouse = models.ForeignKey(Warehouse, on_delete=models.CASCADE, related_name='valuations')
+    quantity = models.IntegerField(default=0)
+    value = models.DecimalField(max_digits=16, decimal_places=4, default=0)
+    layers = models.JSONField(default=list, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def unit_cost(self):
+        return self.value / self.quantity if self.quantity else None
+
+    def __str__(self):
+        return f"{self.product.name} at {self.warehouse.name}: {self.value:.2f}"
+
+    class Meta:
+        unique_together = ('product', 'warehouse')
+        db_table = 'inventory_stockvaluation'
@@ -0,0 +1,125 @@
+# stock/reconciliation.py
+
+import csv
+import json
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+from products.models import Product
+from .models import InventoryTransaction, LotSerialNumber, Stock, Warehouse
+
+TRACKED_METHODS = ['lot', 'serial']
+
+REPORT_FIELDS = [
+    'product_id', 'product_code', 'product_name', 'warehouse_id', 'warehouse_name',
+    'stored_quantity', 'lot_quantity', 'difference',
+]
+
+
+class StockReconciliation:
+    """
+    লট/সিরিয়াল ট্র্যাক করা প্রোডাক্টের Stock.quantity কে ঐ ওয়্যারহাউসের লটের যোগফলের সাথে মেলায়।
+    প্রোডাক্ট সংখ্যা যাই হোক, পুরো ক্যাটালগের জন্য নির্দিষ্ট কয়েকটি কুয়েরিতেই কাজ শেষ হয়।
+    """
+
+    @staticmethod
+    def find_discrepancies(warehouse_id=None, since=None, include_without_lots=False):
+        """
+        শুধু যেসব (product, warehouse) এ লট আছে সেগুলো মেলানো হয়। include_without_lots=True হলে লট ছাড়া
+        ওয়্যারহাউসের Stock রো ও গড়মিল হিসেবে আসে (লটের যোগফল 0), অর্থাৎ apply করলে সেগুলো শূন্য হয়ে যায়।
+        """
+        lots = LotSerialNumber.objects.filter(product__tracking_method__in=TRACKED_METHODS)
+        stocks = Stock.objects.filter(product__tracking_method__in=TRACKED_METHODS)
+        if warehouse_id:
+            lots = lots.filter(location__warehouse_id=warehouse_id)
+            stocks = stocks.filter(warehouse_id=warehouse_id)
+
+        active_keys = None
+        if since:
+            # শুধু since এর পরে যেসব (product, warehouse) এ মুভমেন্ট হয়েছে সেগুলো দেখা হবে
+            active = InventoryTransaction.objects.filter(transaction_date__gte=since, warehouse__isnull=False)
+            if warehouse_id:
+                active = active.filter(warehouse_id=warehouse_id)
+            active_keys = set(active.values_list('product_id', 'warehouse_id').distinct().order_by())
+            product_ids = {product_id for product_id, _ in active_keys}
+            lots = lots.filter(product_id__in=product_ids)
+            stocks = stocks.filter(product_id__in=product_ids)
+
+        lot_totals = {
+            (row['product_id'], row['location__warehouse_id']): row['total'] or 0
+            for row in lots.values('product_id', 'location__warehouse_id').annotate(total=Sum('quantity')).order_by()
+        }
+        stock_rows = {
+            (row['product_id'], row['warehouse_id']): row
+            for row in stocks.values('id', 'product_id', 'warehouse_id', 'quantity')
+        }
+
+        keys = set(lot_totals)
+        if include_without_lots:
+            keys |= stock_rows.keys()
+        if active_keys is not None:
+            keys &= active_keys
+
+        discrepancies = []
+        for key in keys:
+            stock_row = stock_rows.get(key)
+            stored_quantity = stock_row['quantity'] if stock_row else 0
+            lot_quantity = lot_totals.get(key, 0)
+            if stored_quantity != lot_quantity:
+                discrepancies.append({
+                    'stock_id': stock_row['id'] if stock_row else None,
+                    'product_id': key[0],
+                    'warehouse_id': key[1],
+                    'stored_quantity': stored_quantity,
+                    'lot_quantity': lot_quantity,
+                    'difference': lot_quantity - stored_quantity,
+                })
+
+        StockReconciliation._attach_names(discrepancies)
+        discrepancies.sort(key=lambda d: (d['warehouse_name'], d['product_name']))
+        return discrepancies
+
+    @staticmethod
+    def apply(discrepancies):
+        """
+        ব্যবধানগুলো একটি bulk_update (এবং অনুপস্থিত রো এর জন্য একটি bulk_create) দিয়ে ঠিক করে।
+        F('quantity') + difference ব্যবহার করা হয়েছে, যাতে রিপোর্ট তৈরির পরে কোনো বিক্রি হলে তা হারিয়ে না যায়।
+        """
+        to_update = [
+            Stock(pk=d['stock_id'], quantity=F('quantity') + d['difference'])
+            for d in discrepancies if d['stock_id'] and d['difference']
+        ]
+        to_create = [
+            Stock(product_id=d['product_id'], warehouse_id=d['warehouse_id'], quantity=d['lot_quantity'])
+            for d in discrepancies if not d['stock_id']
+        ]
+        with transaction.atomic():
+            if to_update:
+                Stock.objects.bulk_update(to_update, ['quantity'], batch_size=1000)
+            if to_create:
+                Stock.objects.bulk_create(to_create, batch_size=1000, ignore_conflicts=True)
+        return len(to_update) + len(to_create)
+
+    @staticmethod
+    def write_report(discrepancies, stream, fmt='csv'):
+        rows = [{field: d[field] for field in REPORT_FIELDS} for d in discrepancies]
+        if fmt == 'json':
+            json.dump(rows, stream, ensure_ascii=False, indent=2)
+            return
+        writer = csv.DictWriter(stream, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+    @staticmethod
+    def _attach_names(discrepancies):
+        product_ids = {d['product_id'] for d in discrepancies}
+        warehouse_ids = {d['warehouse_id'] for d in discrepancies}
+        products = {
+            pk: (code, name)
+            for pk, code, name in Product.objects.filter(pk__in=product_ids).values_list('pk', 'product_code', 'name')
+        } if product_ids else {}
+        warehouses = dict(Warehouse.objects.filter(pk__in=warehouse_ids).values_list('pk', 'name')) if warehouse_ids else {}
+        for d in discrepancies:
+            d['product_code'], d['product_name'] = products.get(d['product_id'], ('', ''))
+            d['warehouse_name'] = warehouses.get(d['warehouse_id'], '')
@@ -1,71 +1,202 @@
 # stock/services.py
 
+from collections import defaultdict
+
 from django.db import transaction
 from django.db.models import F
+from .costing import CostingEngine
+from .ledger import StockLedger
 from .models import Stock, InventoryTransaction, Location, LotSerialNumber, Warehouse
+from .signals import stock_changed
 
 class StockService:
     @staticmethod
-    def change_stock(product, warehouse, quantity_change, transaction_type, user, 
+    def change_stock(product, warehouse, quantity_change, transaction_type, user,
                      content_object=None, location=None, lot_serial=None, notes=''):
         if quantity_change == 0:
             return
 
+        # একটি মাত্র লাইনের জন্যও ব্যাচ পোস্টিং পাথটি ব্যবহার করা হচ্ছে, যাতে লকিং ও লগিং এর নিয়ম এক জায়গায় থাকে
+        StockService.apply_movements([{
+            'product': product,
+            'warehouse': warehouse,
+            'quantity_change': quantity_change,
+            'transaction_type': transaction_type,
+            'user': user,
+            'content_object': content_object,
+            'location': location,
+            'lot_serial': lot_serial,
+            'notes': notes,
+        }])
+
+    @staticmethod
+    def apply_movements(movements):
+        """
+        একাধিক স্টক মুভমেন্ট এক ট্রানজেকশনে পোস্ট করে।
+        প্রতিটি মুভমেন্ট একটি dict, যার key গুলো change_stock() এর আর্গুমেন্টের মতোই
+        (product, warehouse, quantity_change, transaction_type, user, content_object,
+        location, lot_serial, notes), সাথে ঐচ্ছিক unit_cost (রিসিভের ইউনিট খরচ)। সব Stock/লট রো একবারে id অনুযায়ী লক করা হয়,
+        যাতে একাধিক POS একসাথে চললেও deadlock না হয়। তৈরি হওয়া InventoryTransaction গুলো রিটার্ন করে।
+
+        settings.STOCK_LEDGER_MODE চালু থাকলে Stock/লট কাউন্টার আপডেট হয় না; যাচাই হয়
+        StockLedger এর ব্যালেন্স দিয়ে এবং শুধু ট্রানজেকশন রো যোগ হয়।
+        """
+        movements = [m for m in movements if m.get('quantity_change')]
+        if not movements:
+            return []
+
         with transaction.atomic():
-            stock, created = Stock.objects.select_for_update().get_or_create(
-                product=product,
-                warehouse=warehouse,
-                defaults={'quantity': 0}
-            )
+            stock_keys = {(m['product'].pk, m['warehouse'].pk) for m in movements}
+            stocks = StockService._lock_stock_rows(stock_keys)
 
-            if quantity_change < 0 and stock.quantity < abs(quantity_change):
-                raise ValueError(f"'{product.name}' এর পর্যাপ্ত স্টক '{warehouse.name}'-এ নেই।")
+            lot_ids = {m['lot_serial'].pk for m in movements if m.get('lot_serial')}
+            lots = {}
+            if lot_ids:
+                lots = {
+                    lot.pk: lot
+                    for lot in LotSerialNumber.objects.select_for_update().filter(pk__in=lot_ids).order_by('pk')
+                }
 
-            stock.quantity = F('quantity') + quantity_change
-            stock.save(update_fields=['quantity'])
+            # লেজার মোডেও Stock রো লক করা হচ্ছে, যাতে একই প্রোডাক্টের দুটি বিক্রি একসাথে যাচাই না হয়
+            ledger_mode = StockLedger.enabled()
+            if ledger_mode:
+                stock_balance = StockLedger.balances(stock_keys)
+                lot_balance = StockLedger.lot_balances(lots.keys())
+            else:
+                stock_balance = {key: stock.quantity for key, stock in stocks.items()}
+                lot_balance = {pk: lot.quantity for pk, lot in lots.items()}
 
-            if lot_serial:
-                lot = LotSerialNumber.objects.select_for_update().get(id=lot_serial.id)
-                if quantity_change < 0 and lot.quantity < abs(quantity_change):
-                    raise ValueError(f"'{lot.lot_number}' লটে পর্যাপ্ত স্টক নেই।")
-                
-                lot.quantity = F('quantity') + quantity_change
-                lot.save(update_fields=['quantity'])
+            # --- মেমোরিতে ক্রমানুসারে যাচাই: change_stock() এর মতোই প্রতিটি লাইন আগের লাইনের পরের ব্যালেন্স দেখে ---
+            opening_balances = dict(stock_balance)
+            stock_deltas = defaultdict(int)
+            lot_deltas = defaultdict(int)
 
-            # --- ট্রানজেকশন লগিং এর জন্য নতুন এবং উন্নত লজিক ---
-            source_loc = None
-            dest_loc = None
-            
-            # content_object থেকে StockTransferRequest মডেলের instance আনা হচ্ছে
-            StockTransferRequest = content_object.__class__
+            # প্রতিটি মুভমেন্টের পরের ব্যালেন্স (স্টক কার্ডের জন্য ট্রানজেকশনের সাথে লেখা হয়)
+            balances_after = []
+            for m in movements:
+                quantity_change = m['quantity_change']
+                key = (m['product'].pk, m['warehouse'].pk)
+                if quantity_change < 0 and stock_balance[key] < abs(quantity_change):
+                    raise ValueError(f"'{m['product'].name}' এর পর্যাপ্ত স্টক '{m['warehouse'].name}'-এ নেই।")
+                stock_balance[key] += quantity_change
+                stock_deltas[key] += quantity_change
 
-            if transaction_type == 'transfer_out' and isinstance(content_object, StockTransferRequest):
-                source_loc = location
-                # ডেস্টিনেশন ওয়্যারহাউসের প্রথম লোকেশনটি ডিফল্ট হিসেবে নেওয়া হলো
-                dest_loc = content_object.destination_warehouse.locations.first()
-            elif transaction_type == 'transfer_in' and isinstance(content_object, StockTransferRequest):
-                # সোর্স ওয়্যারহাউসের প্রথম লোকেশনটি ডিফল্ট হিসেবে নেওয়া হলো
-                # dispatched_lot থেকে আসল সোর্স লোকেশন পাওয়া আরও সঠিক হবে
-                if content_object.dispatched_lot:
-                    source_loc = content_object.dispatched_lot.location
-                else: # ফলব্যাক
-                    source_loc = content_object.source_warehouse.locations.first()
+                lot_balance_after = None
+                if m.get('lot_serial'):
+                    lot = lots[m['lot_serial'].pk]
+                    if quantity_change < 0 and lot_balance[lot.pk] < abs(quantity_change):
+                        raise ValueError(f"'{lot.lot_number}' লটে পর্যাপ্ত স্টক নেই।")
+                    lot_balance[lot.pk] += quantity_change
+                    lot_deltas[lot.pk] += quantity_change
+                    lot_balance_after = lot_balance[lot.pk]
+                balances_after.append((stock_balance[key], lot_balance_after))
+
+            # --- পরিমাণ আপডেট: F() এক্সপ্রেশন সহ bulk_update, যাতে প্রতিটি রো-এর জন্য আলাদা UPDATE না লাগে ---
+            if not ledger_mode:
+                changed_stocks = []
+                for key, delta in stock_deltas.items():
+                    if delta:
+                        stock = stocks[key]
+                        stock.quantity = F('quantity') + delta
+                        changed_stocks.append(stock)
+                if changed_stocks:
+                    Stock.objects.bulk_update(changed_stocks, ['quantity'])
+
+                changed_lots = []
+                for pk, delta in lot_deltas.items():
+                    if delta:
+                        lot = lots[pk]
+                        lot.quantity = F('quantity') + delta
+                        changed_lots.append(lot)
+                if changed_lots:
+                    LotSerialNumber.objects.bulk_update(changed_lots, ['quantity'])
+
+            # --- কস্ট লেয়ার: প্রতিটি মুভমেন্টের ইউনিট খরচ ট্রানজেকশনের সাথে লগ হয় ---
+            unit_costs = CostingEngine.post(movements, opening_balances)
+
+            # --- ট্রানজেকশন লগিং: সব লাইন একটি bulk_create এ ---
+            transactions = []
+            for m, unit_cost, (balance_after, lot_balance_after) in zip(movements, unit_costs, balances_after):
+                source_loc, dest_loc = StockService._resolve_locations(
+                    m['transaction_type'], m['quantity_change'], m.get('location'), m.get('content_object')
+                )
+                transactions.append(InventoryTransaction(
+                    product=m['product'],
+                    warehouse=m['warehouse'],
+                    quantity=m['quantity_change'],
+                    transaction_type=m['transaction_type'],
+                    user=m.get('user'),
+                    content_object=m.get('content_object'),
+                    source_location=source_loc,
+                    destination_location=dest_loc,
+                    lot_serial=m.get('lot_serial'),
+                    notes=m.get('notes', ''),
+                    unit_cost=unit_cost,
+                    balance_after=balance_after,
+                    lot_balance_after=lot_balance_after
+                ))
+            created = InventoryTransaction.objects.bulk_create(transactions)
+
+            # কমিটের পরে অন্যান্য অংশকে (যেমন ড্যাশবোর্ড ক্যাশ) জানানো হয়
+            warehouse_ids = {warehouse_id for _, warehouse_id in stock_keys}
+            transaction.on_commit(lambda: stock_changed.send(
+                sender=StockService, warehouse_ids=warehouse_ids, stock_keys=stock_keys
+            ))
+            return created
+
+    @staticmethod
+    def _lock_stock_rows(stock_keys):
+        """
+        (product_id, warehouse_id) জোড়াগুলোর Stock রো লক করে dict আকারে ফেরত দেয়।
+        যে রো গুলো নেই সেগুলো quantity=0 দিয়ে তৈরি করা হয়।
+        """
+        product_ids = {product_id for product_id, _ in stock_keys}
+        warehouse_ids = {warehouse_id for _, warehouse_id in stock_keys}
+
+        def fetch():
+            rows = Stock.objects.select_for_update().filter(
+                product_id__in=product_ids, warehouse_id__in=warehouse_ids
+            ).order_by('pk')
+            return {
+                (stock.product_id, stock.warehouse_id): stock
+                for stock in rows
+                if (stock.product_id, stock.warehouse_id) in stock_keys
+            }
+
+        stocks = fetch()
+        missing = stock_keys - stocks.keys()
+        if missing:
+            Stock.objects.bulk_create(
+                [Stock(product_id=product_id, warehouse_id=warehouse_id, quantity=0) for product_id, warehouse_id in missing],
+                ignore_conflicts=True
+            )
+            stocks = fetch()
+        return stocks
+
+    @staticmethod
+    def _resolve_locations(transaction_type, quantity_change, location, content_object):
+        # --- ট্রানজেকশন লগিং এর জন্য নতুন এবং উন্নত লজিক ---
+        source_loc = None
+        dest_loc = None
+
+        # content_object থেকে StockTransferRequest মডেলের instance আনা হচ্ছে
+        StockTransferRequest = content_object.__class__
+
+        if transaction_type == 'transfer_out' and isinstance(content_object, StockTransferRequest):
+            source_loc = location
+            # ডেস্টিনেশন ওয়্যারহাউসের প্রথম লোকেশনটি ডিফল্ট হিসেবে নেওয়া হলো
+            dest_loc = content_object.destination_warehouse.locations.first()
+        elif transaction_type == 'transfer_in' and isinstance(content_object, StockTransferRequest):
+            # সোর্স ওয়্যারহাউসের প্রথম লোকেশনটি ডিফল্ট হিসেবে নেওয়া হলো
+            # dispatched_lot থেকে আসল সোর্স লোকেশন পাওয়া আরও সঠিক হবে
+            if content_object.dispatched_lot:
+                source_loc = content_object.dispatched_lot.location
+            else: # ফলব্যাক
+                source_loc = content_object.source_warehouse.locations.first()
+            dest_loc = location
+        else: # Purchase, Sale, Adjustment ইত্যাদি।
+            if quantity_change > 0: # স্টক বাড়লে
                 dest_loc = location
-            else: # Purchase, Sale, Adjustment ইত্যাদি।
-                if quantity_change > 0: # স্টক বাড়লে
-                    dest_loc = location
-                else: # স্টক কমলে
-                    source_loc = location
-
-            InventoryTransaction.objects.create(
-                product=product,
-                warehouse=warehouse,
-                quantity=quantity_change,
-                transaction_type=transaction_type,
-                user=user,
-                content_object=content_object,
-                source_location=source_loc,
-                destination_location=dest_loc,
-                lot_serial=lot_serial,
-                notes=notes
-            )
\ No newline at end of file
+            else: # স্টক কমলে
+                source_loc = location
+        return source_loc, dest_loc
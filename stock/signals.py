@@ -0,0 +1,7 @@
+# stock/signals.py
+
+from django.dispatch import Signal
+
+# StockService স্টক পরিবর্তন কমিট হওয়ার পরে এটি পাঠায়; warehouse_ids আর্গুমেন্টে পরিবর্তিত ওয়্যারহাউসগুলোর id
+# এবং stock_keys আর্গুমেন্টে পরিবর্তিত (product_id, warehouse_id) জোড়াগুলো থাকে
+stock_changed = Signal()
@@ -1,11 +1,24 @@
 # stock/tests.py
 
+import json
+from decimal import Decimal
+from io import StringIO
+
+from django.core.management import call_command
 from django.test import TestCase
-from .models import Warehouse, Location, Stock, LotSerialNumber, InventoryTransaction
+from .models import Warehouse, Location, Stock, LotSerialNumber, InventoryTransaction, StockSnapshot, StockValuation
 from products.models import Product, Category, UnitOfMeasure, UnitOfMeasureCategory
 from partners.models import Customer, Supplier
+from purchase.models import StockTransferRequest
 from django.utils import timezone
 from datetime import timedelta
+from .services import StockService
+from .ledger import StockLedger
+from .reconciliation import StockReconciliation
+from .allocation import LotAllocator, InsufficientStockError
+from .keyset import keyset_page
+from django.test import override_settings
+from django.urls import reverse
 
 # Warehouse মডেলের জন্য টেস্ট কেস।
 class WarehouseModelTest(TestCase):
@@ -278,3 +291,501 @@ class InventoryTransactionModelTest(TestCase):
         transaction.delete()
         self.assertEqual(InventoryTransaction.objects.count(), 0)
 
+
+
+# StockService.apply_movements এর জন্য টেস্ট কেস।
+class StockServiceApplyMovementsTest(TestCase):
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name="Service Warehouse")
+        self.location = Location.objects.create(name="Service Shelf", warehouse=self.warehouse)
+        self.category = Category.objects.create(name="Snacks")
+        self.uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        self.unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=self.uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.products = [
+            Product.objects.create(
+                name=f"Service Product {i}", product_code=f"SP{i:03}", category=self.category, price=10.00,
+                unit_of_measure=self.unit_of_measure, tracking_method='lot'
+            )
+            for i in range(5)
+        ]
+        self.lots = []
+        for product in self.products:
+            Stock.objects.create(product=product, warehouse=self.warehouse, quantity=20)
+            self.lots.append(LotSerialNumber.objects.create(
+                product=product, location=self.location, lot_number=f"LOT-{product.product_code}", quantity=20
+            ))
+
+    def _sale(self, product, lot, quantity):
+        return {
+            'product': product, 'warehouse': self.warehouse, 'quantity_change': -quantity,
+            'transaction_type': 'sale', 'user': None, 'location': self.location, 'lot_serial': lot,
+        }
+
+    def test_batch_updates_stock_lots_and_logs(self):
+        movements = [self._sale(product, lot, 3) for product, lot in zip(self.products, self.lots)]
+        created = StockService.apply_movements(movements)
+
+        self.assertEqual(len(created), 5)
+        self.assertEqual(InventoryTransaction.objects.filter(transaction_type='sale').count(), 5)
+        for product, lot in zip(self.products, self.lots):
+            self.assertEqual(Stock.objects.get(product=product, warehouse=self.warehouse).quantity, 17)
+            lot.refresh_from_db()
+            self.assertEqual(lot.quantity, 17)
+        # সোর্স লোকেশন ঠিকমতো লগ হয়েছে কি না
+        self.assertTrue(all(t.source_location_id == self.location.id for t in InventoryTransaction.objects.all()))
+
+    def test_query_count_does_not_grow_with_basket_size(self):
+        movements = [self._sale(product, lot, 1) for product, lot in zip(self.products, self.lots)]
+        # প্রথম পোস্টিং এ কস্ট লেয়ারের ভ্যালুয়েশন রো তৈরি হয়, তাই স্থির অবস্থা মাপা হচ্ছে দ্বিতীয়বারে
+        StockService.apply_movements(movements)
+        # লক (Stock + লট + ভ্যালুয়েশন), তিনটি bulk_update এবং একটি bulk_create — সাথে savepoint
+        with self.assertNumQueries(9):
+            StockService.apply_movements(movements)
+
+    def test_insufficient_stock_rolls_back_whole_batch(self):
+        movements = [self._sale(self.products[0], self.lots[0], 5), self._sale(self.products[1], self.lots[1], 50)]
+        with self.assertRaises(ValueError):
+            StockService.apply_movements(movements)
+        self.assertEqual(Stock.objects.get(product=self.products[0], warehouse=self.warehouse).quantity, 20)
+        self.assertEqual(InventoryTransaction.objects.count(), 0)
+
+    def test_lines_are_validated_in_order(self):
+        # একই লটে পরপর দুটি বিক্রি: দ্বিতীয়টি প্রথমটির পরের ব্যালেন্স দেখে যাচাই হবে
+        movements = [self._sale(self.products[0], self.lots[0], 15), self._sale(self.products[0], self.lots[0], 10)]
+        with self.assertRaises(ValueError):
+            StockService.apply_movements(movements)
+
+    def test_missing_stock_row_is_created_on_receipt(self):
+        product = self.products[0]
+        other_warehouse = Warehouse.objects.create(name="Other Warehouse")
+        StockService.change_stock(product, other_warehouse, 8, 'purchase', None)
+        self.assertEqual(Stock.objects.get(product=product, warehouse=other_warehouse).quantity, 8)
+
+
+class StockLedgerTest(TestCase):
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name="Ledger Warehouse")
+        self.location = Location.objects.create(name="Ledger Shelf", warehouse=self.warehouse)
+        self.category = Category.objects.create(name="Drinks")
+        self.uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        self.unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=self.uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.product = Product.objects.create(
+            name="Ledger Product", product_code="LP001", category=self.category, price=10.00,
+            unit_of_measure=self.unit_of_measure, tracking_method='lot'
+        )
+        self.lot = LotSerialNumber.objects.create(
+            product=self.product, location=self.location, lot_number="LOT-LP001", quantity=0
+        )
+        self.start = timezone.now() - timedelta(days=10)
+
+    def _post(self, quantity, days_after_start):
+        created = StockService.apply_movements([{
+            'product': self.product, 'warehouse': self.warehouse, 'quantity_change': quantity,
+            'transaction_type': 'purchase' if quantity > 0 else 'sale', 'user': None,
+            'location': self.location, 'lot_serial': self.lot,
+        }])
+        InventoryTransaction.objects.filter(pk=created[0].pk).update(
+            transaction_date=self.start + timedelta(days=days_after_start)
+        )
+
+    def test_on_hand_as_of_uses_snapshot_plus_delta(self):
+        self._post(30, 1)
+        self._post(-5, 2)
+        StockLedger.take_snapshot(self.start + timedelta(days=3))
+        self._post(-4, 4)
+
+        self.assertEqual(StockLedger.on_hand(self.product, self.warehouse, self.start + timedelta(days=1, hours=1)), 30)
+        self.assertEqual(StockLedger.on_hand(self.product, self.warehouse, self.start + timedelta(days=3)), 25)
+        self.assertEqual(StockLedger.on_hand(self.product, self.warehouse), 21)
+        self.assertEqual(StockLedger.on_hand(self.product, self.warehouse, lot_serial=self.lot), 21)
+
+    def test_snapshot_runs_are_incremental(self):
+        self._post(30, 1)
+        StockLedger.take_snapshot(self.start + timedelta(days=2))
+        self._post(-10, 3)
+        StockLedger.take_snapshot(self.start + timedelta(days=4))
+
+        latest = StockSnapshot.objects.get(as_of=self.start + timedelta(days=4), lot_serial__isnull=True)
+        self.assertEqual(latest.quantity, 20)
+        # শেষ রানের পরে কোনো ট্রানজেকশন নেই, তাই ব্যালেন্স হুবহু স্ন্যাপশট থেকে আসে
+        with self.assertNumQueries(3):
+            self.assertEqual(StockLedger.on_hand(self.product, self.warehouse), 20)
+
+    @override_settings(STOCK_LEDGER_MODE=True)
+    def test_ledger_mode_skips_counters_but_validates(self):
+        StockLedger.seed_from_counters(self.start)
+        self._post(12, 1)
+        self._post(-2, 2)
+
+        # কাউন্টার আপডেট হয়নি, কিন্তু লেজারে ব্যালেন্স ঠিক আছে
+        self.lot.refresh_from_db()
+        self.assertEqual(self.lot.quantity, 0)
+        self.assertEqual(StockLedger.on_hand(self.product, self.warehouse), 10)
+        with self.assertRaises(ValueError):
+            self._post(-11, 3)
+
+        StockLedger.materialize_counters()
+        self.lot.refresh_from_db()
+        self.assertEqual(self.lot.quantity, 10)
+        self.assertEqual(Stock.objects.get(product=self.product, warehouse=self.warehouse).quantity, 10)
+
+    @override_settings(STOCK_LEDGER_MODE=True)
+    def test_ledger_mode_allocates_from_ledger_balances(self):
+        self._post(12, 1)
+        self.assertEqual(LotAllocator.allocate(self.warehouse, [(self.product, 5)]), [[(self.lot, 5)]])
+        with self.assertRaises(InsufficientStockError):
+            LotAllocator.allocate(self.warehouse, [(self.product, 13)])
+
+    @override_settings(STOCK_SNAPSHOT_LAG_SECONDS=600)
+    def test_snapshot_leaves_recent_postings_to_the_next_run(self):
+        self._post(30, 1)
+        self._post(-5, 10)
+        StockLedger.take_snapshot()
+
+        run = StockLedger.latest_run()
+        self.assertLessEqual(run, timezone.now() - timedelta(seconds=600))
+        self.assertEqual(StockSnapshot.objects.get(as_of=run, lot_serial__isnull=True).quantity, 30)
+        self.assertEqual(StockLedger.on_hand(self.product, self.warehouse), 25)
+
+
+class StockReconciliationTest(TestCase):
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name="Recon Warehouse")
+        self.location = Location.objects.create(name="Recon Shelf", warehouse=self.warehouse)
+        self.category = Category.objects.create(name="Frozen")
+        self.uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        self.unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=self.uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.products = [
+            Product.objects.create(
+                name=f"Recon Product {i}", product_code=f"RP{i:03}", category=self.category, price=10.00,
+                unit_of_measure=self.unit_of_measure, tracking_method='lot'
+            )
+            for i in range(3)
+        ]
+        for product in self.products:
+            LotSerialNumber.objects.create(product=product, location=self.location, lot_number=f"A-{product.product_code}", quantity=6)
+            LotSerialNumber.objects.create(product=product, location=self.location, lot_number=f"B-{product.product_code}", quantity=4)
+        Stock.objects.create(product=self.products[0], warehouse=self.warehouse, quantity=10)
+        Stock.objects.create(product=self.products[1], warehouse=self.warehouse, quantity=7)
+        # products[2] এর কোনো Stock রো নেই
+
+    def test_finds_discrepancies_with_fixed_query_count(self):
+        with self.assertNumQueries(4):
+            discrepancies = StockReconciliation.find_discrepancies()
+        by_product = {d['product_id']: d for d in discrepancies}
+        self.assertEqual(set(by_product), {self.products[1].id, self.products[2].id})
+        self.assertEqual(by_product[self.products[1].id]['difference'], 3)
+        self.assertIsNone(by_product[self.products[2].id]['stock_id'])
+
+    def test_apply_fixes_and_creates_missing_rows(self):
+        StockReconciliation.apply(StockReconciliation.find_discrepancies())
+        for product in self.products:
+            self.assertEqual(Stock.objects.get(product=product, warehouse=self.warehouse).quantity, 10)
+        self.assertEqual(StockReconciliation.find_discrepancies(), [])
+
+    def test_since_limits_to_recent_movements(self):
+        InventoryTransaction.objects.create(
+            product=self.products[1], warehouse=self.warehouse, quantity=1, transaction_type='adjustment_in'
+        )
+        discrepancies = StockReconciliation.find_discrepancies(since=timezone.now() - timedelta(days=1))
+        self.assertEqual([d['product_id'] for d in discrepancies], [self.products[1].id])
+
+    def test_stock_without_lots_is_left_alone_unless_requested(self):
+        other_warehouse = Warehouse.objects.create(name="Recon Overflow")
+        Stock.objects.create(product=self.products[0], warehouse=other_warehouse, quantity=5)
+        self.assertNotIn(other_warehouse.id, {d['warehouse_id'] for d in StockReconciliation.find_discrepancies()})
+
+        discrepancies = StockReconciliation.find_discrepancies(warehouse_id=other_warehouse.id, include_without_lots=True)
+        self.assertEqual([(d['product_id'], d['difference']) for d in discrepancies], [(self.products[0].id, -5)])
+
+    def test_report_on_stdout_keeps_status_lines_on_stderr(self):
+        for command in ('reconcile_lots', 'reconcile_stock'):
+            with self.subTest(command=command):
+                out, err = StringIO(), StringIO()
+                call_command(command, '--dry-run', '--report', '-', '--format', 'json', stdout=out, stderr=err)
+                report = json.loads(out.getvalue())
+                self.assertEqual(len(report), 2)
+                self.assertIn('Dry run: 2 discrepancies found', err.getvalue())
+                self.assertIn('Discrepancy found for "Recon Product 1"', err.getvalue())
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class TransactionReportDownloadTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        self.user = get_user_model().objects.create_superuser(username="reporter", password="x", email="r@example.com")
+        self.client.force_login(self.user)
+        warehouse = Warehouse.objects.create(name="Report Warehouse")
+        location = Location.objects.create(name="Report Shelf", warehouse=warehouse)
+        category = Category.objects.create(name="Report Category")
+        uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=uom_category, ratio=1.0, is_base_unit=True
+        )
+        product = Product.objects.create(
+            name="Report Product", product_code="RPT001", category=category, price=1.00, unit_of_measure=unit_of_measure
+        )
+        for quantity in (5, -2, 3):
+            InventoryTransaction.objects.create(
+                product=product, warehouse=warehouse, quantity=quantity, user=self.user,
+                transaction_type='purchase' if quantity > 0 else 'sale',
+                destination_location=location if quantity > 0 else None,
+                source_location=location if quantity < 0 else None,
+            )
+
+    def test_csv_export_streams_rows(self):
+        response = self.client.get(reverse('stock:download_transaction_report'), {'export': 'csv'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Date,Product,Type,Quantity,User,Source,Destination,Notes')
+        self.assertEqual(len(lines), 4)
+        self.assertIn('Report Shelf (Report Warehouse)', lines[1])
+
+    def test_xlsx_export_uses_write_only_workbook(self):
+        from io import BytesIO
+        from openpyxl import load_workbook
+        response = self.client.get(reverse('stock:download_transaction_report'))
+        workbook = load_workbook(BytesIO(b''.join(response.streaming_content)))
+        rows = list(workbook.active.values)
+        self.assertEqual(rows[0][0], 'Date')
+        self.assertEqual(len(rows), 4)
+
+
+class LotAllocatorTest(TestCase):
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name="Picking Warehouse")
+        self.location = Location.objects.create(name="Picking Shelf", warehouse=self.warehouse)
+        self.category = Category.objects.create(name="Medicine")
+        self.uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        self.unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=self.uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.product = Product.objects.create(
+            name="Picking Product", product_code="PK001", category=self.category, price=10.00,
+            unit_of_measure=self.unit_of_measure, tracking_method='lot'
+        )
+        today = timezone.now().date()
+        now = timezone.now()
+        # oldest লটটির মেয়াদ সবচেয়ে দেরিতে, newest লটটির মেয়াদ সবার আগে
+        self.oldest = self._lot("OLD", 5, today + timedelta(days=90), now - timedelta(days=3))
+        self.middle = self._lot("MID", 5, None, now - timedelta(days=2))
+        self.newest = self._lot("NEW", 5, today + timedelta(days=10), now - timedelta(days=1))
+
+    def _lot(self, number, quantity, expiration_date, created_at):
+        lot = LotSerialNumber.objects.create(
+            product=self.product, location=self.location, lot_number=number,
+            quantity=quantity, expiration_date=expiration_date
+        )
+        LotSerialNumber.objects.filter(pk=lot.pk).update(created_at=created_at)
+        return lot
+
+    def _picked(self, strategy, quantity=7):
+        plan = LotAllocator.allocate(self.warehouse, [(self.product, quantity)], strategy=strategy)
+        return [(lot.lot_number, qty) for lot, qty in plan[0]]
+
+    def test_strategies(self):
+        self.assertEqual(self._picked('fefo'), [("NEW", 5), ("OLD", 2)])
+        self.assertEqual(self._picked('fifo'), [("OLD", 5), ("MID", 2)])
+        self.assertEqual(self._picked('lifo'), [("NEW", 5), ("MID", 2)])
+        self.assertEqual(self._picked(lambda product: 'fifo'), [("OLD", 5), ("MID", 2)])
+
+    def test_repeated_product_lines_share_lots_in_one_query(self):
+        with self.assertNumQueries(1):
+            plan = LotAllocator.allocate(self.warehouse, [(self.product, 4), (self.product, 4)], strategy='fefo')
+        self.assertEqual([(lot.lot_number, qty) for lot, qty in plan[1]], [("NEW", 1), ("OLD", 3)])
+
+    def test_insufficient_stock(self):
+        with self.assertRaises(InsufficientStockError) as ctx:
+            LotAllocator.allocate(self.warehouse, [(self.product, 10), (self.product, 6)])
+        self.assertEqual(ctx.exception.available, 5)
+
+
+class CostingEngineTest(TestCase):
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name="Costing Warehouse")
+        self.category = Category.objects.create(name="Paint")
+        self.uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        self.unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=self.uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.product = Product.objects.create(
+            name="Primer", product_code="PR001", category=self.category, price=20.00,
+            cost_price=5, unit_of_measure=self.unit_of_measure
+        )
+
+    def _post(self, *lines):
+        created = StockService.apply_movements([
+            {
+                'product': self.product, 'warehouse': self.warehouse, 'quantity_change': quantity,
+                'transaction_type': 'purchase' if quantity > 0 else 'sale', 'user': None, 'unit_cost': unit_cost,
+            }
+            for quantity, unit_cost in lines
+        ])
+        return [t.unit_cost for t in created]
+
+    @override_settings(STOCK_COSTING_METHOD='fifo')
+    def test_fifo_consumes_oldest_layers(self):
+        self._post((10, 4), (10, 6))
+        self.assertEqual(self._post((-15, None)), [Decimal('4.6667')])
+
+        valuation = StockValuation.objects.get(product=self.product, warehouse=self.warehouse)
+        self.assertEqual(valuation.quantity, 5)
+        self.assertEqual(valuation.value, Decimal('30'))
+        self.assertEqual(valuation.layers, [[5, '6.0000']])
+
+    @override_settings(STOCK_COSTING_METHOD='average')
+    def test_weighted_average_merges_receipts(self):
+        self._post((10, 4), (30, 8))
+        self.assertEqual(self._post((-20, None), (5, None)), [Decimal('7.0000'), Decimal('7.0000')])
+
+        valuation = StockValuation.objects.get(product=self.product, warehouse=self.warehouse)
+        self.assertEqual((valuation.quantity, valuation.value), (25, Decimal('175')))
+
+    def test_existing_stock_is_seeded_at_cost_price(self):
+        Stock.objects.create(product=self.product, warehouse=self.warehouse, quantity=8)
+        self.assertEqual(self._post((-2, None)), [Decimal('5.0000')])
+        valuation = StockValuation.objects.get(product=self.product, warehouse=self.warehouse)
+        self.assertEqual((valuation.quantity, valuation.value), (6, Decimal('30')))
+
+    @override_settings(STOCK_COSTING_METHOD='fifo')
+    def test_transfer_in_carries_the_dispatched_cost(self):
+        destination = Warehouse.objects.create(name="Costing Branch")
+        Stock.objects.create(product=self.product, warehouse=destination, quantity=10)
+        self._post((10, 8))
+        transfer = StockTransferRequest.objects.create(
+            product=self.product, quantity=4, source_warehouse=self.warehouse, destination_warehouse=destination
+        )
+        StockService.change_stock(self.product, self.warehouse, -4, 'transfer_out', None, content_object=transfer)
+        StockService.change_stock(self.product, destination, 4, 'transfer_in', None, content_object=transfer)
+
+        received = InventoryTransaction.objects.get(transaction_type='transfer_in')
+        self.assertEqual(received.unit_cost, Decimal('8.0000'))
+        valuation = StockValuation.objects.get(product=self.product, warehouse=destination)
+        self.assertEqual((valuation.quantity, valuation.value), (14, Decimal('82')))
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class StockCardTest(TestCase):
+    def setUp(self):
+        self.warehouse = Warehouse.objects.create(name="Card Warehouse")
+        self.location = Location.objects.create(name="Card Shelf", warehouse=self.warehouse)
+        self.category = Category.objects.create(name="Bolts")
+        self.uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        self.unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=self.uom_category, ratio=1.0, is_base_unit=True
+        )
+        self.product = Product.objects.create(
+            name="Bolt", product_code="BT001", category=self.category, price=1.00,
+            unit_of_measure=self.unit_of_measure, tracking_method='lot'
+        )
+        self.lot = LotSerialNumber.objects.create(product=self.product, location=self.location, lot_number="B-1", quantity=0)
+
+    def _post(self, *quantities):
+        StockService.apply_movements([
+            {
+                'product': self.product, 'warehouse': self.warehouse, 'quantity_change': quantity,
+                'transaction_type': 'purchase' if quantity > 0 else 'sale', 'user': None,
+                'location': self.location, 'lot_serial': self.lot if index % 2 == 0 else None,
+            }
+            for index, quantity in enumerate(quantities)
+        ])
+
+    def test_balance_after_is_recorded_per_movement(self):
+        self._post(10, 5, -3)
+        self._post(-4)
+        rows = InventoryTransaction.objects.order_by('pk').values_list('balance_after', 'lot_balance_after')
+        self.assertEqual(list(rows), [(10, 10), (15, None), (12, 7), (8, 3)])
+
+    def test_keyset_pages_cover_all_movements_once(self):
+        self._post(*([1] * 7))
+        # একই সময়ের ট্রানজেকশনেও id দিয়ে ক্রম ঠিক থাকে
+        InventoryTransaction.objects.update(transaction_date=timezone.now())
+        seen, cursor, pages = [], None, []
+        while True:
+            page = keyset_page(InventoryTransaction.objects.all(), cursor, per_page=3)
+            pages.append([row.pk for row in page])
+            seen.extend(pages[-1])
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, sorted(InventoryTransaction.objects.values_list('pk', flat=True), reverse=True))
+        # শেষ পেজ থেকে 'newer' দিকে ফিরে গেলে আগের পেজটিই আসে
+        newer = keyset_page(InventoryTransaction.objects.all(), page.previous_cursor, per_page=3, direction='newer')
+        self.assertEqual([row.pk for row in newer], pages[-2])
+        self.assertTrue(newer.has_next())
+
+    def test_stock_card_view(self):
+        from django.contrib.auth import get_user_model
+        self.client.force_login(get_user_model().objects.create_superuser(username="auditor", password="x", email="a@example.com"))
+        self._post(10, -2)
+        response = self.client.get(reverse('stock:stock_card', args=[self.product.pk]), {'warehouse': self.warehouse.pk})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([row.balance_after for row in response.context['rows']], [8, 10])
+        self.assertFalse(response.context['rows'].has_other_pages())
+
+
+@override_settings(ALLOWED_HOSTS=['testserver'])
+class TransactionListKeysetTest(TestCase):
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        from django.core.cache import cache
+        cache.clear()
+        self.warehouse = Warehouse.objects.create(name="Main Branch")
+        self.other_warehouse = Warehouse.objects.create(name="Other Branch")
+        self.location = Location.objects.create(name="Main Shelf", warehouse=self.warehouse)
+        self.other_location = Location.objects.create(name="Other Shelf", warehouse=self.other_warehouse)
+        category = Category.objects.create(name="Paging")
+        uom_category = UnitOfMeasureCategory.objects.create(name="Units")
+        unit_of_measure = UnitOfMeasure.objects.create(
+            name="Piece", short_code="pc", category=uom_category, ratio=1.0, is_base_unit=True
+        )
+        product = Product.objects.create(
+            name="Pager", product_code="PG001", category=category, price=1.00, unit_of_measure=unit_of_measure
+        )
+        for _ in range(25):
+            InventoryTransaction.objects.create(
+                product=product, warehouse=self.warehouse, quantity=1, transaction_type='purchase',
+                destination_location=self.location,
+            )
+        # অন্য ব্রাঞ্চ থেকে এই ব্রাঞ্চে ট্রান্সফার: উৎস ও গন্তব্য দুটোই মিললেও একবারই দেখাতে হবে
+        InventoryTransaction.objects.create(
+            product=product, warehouse=self.warehouse, quantity=2, transaction_type='transfer',
+            source_location=self.other_location, destination_location=self.location,
+        )
+        InventoryTransaction.objects.create(
+            product=product, warehouse=self.other_warehouse, quantity=3, transaction_type='purchase',
+            destination_location=self.other_location,
+        )
+        self.user = get_user_model().objects.create_user(username="branch", password="x", warehouse=self.warehouse)
+        self.client.force_login(self.user)
+
+    def test_branch_user_pages_without_distinct(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('stock:transaction_list'))
+        self.assertFalse(any('DISTINCT' in query['sql'] for query in queries.captured_queries))
+        page = response.context['transactions']
+        self.assertEqual(len(page), 20)
+        self.assertEqual(response.context['total_count'], 26)
+        self.assertFalse(page.has_previous())
+
+        response = self.client.get(reverse('stock:transaction_list'), {'cursor': page.next_cursor})
+        older = response.context['transactions']
+        self.assertEqual(len(older), 6)
+        self.assertFalse(older.has_next())
+        seen = [row.pk for row in page] + [row.pk for row in older]
+        self.assertEqual(len(set(seen)), 26)
+
+    def test_total_count_is_cached_between_pages(self):
+        self.client.get(reverse('stock:stock_movement_report'))
+        InventoryTransaction.objects.filter(warehouse=self.warehouse).first().delete()
+        response = self.client.get(reverse('stock:stock_movement_report'))
+        self.assertEqual(response.context['total_count'], 26)
+        self.assertEqual(len(response.context['transactions']), 20)
@@ -37,6 +37,7 @@ urlpatterns = [
     
     # Product Stock Details URL
     path('product/<int:product_id>/details/', views.product_stock_details, name='product_stock_details'),
+    path('product/<int:product_id>/stock-card/', views.stock_card_view, name='stock_card'),
 
     # AJAX URLs
     path('ajax/check-product-tracking/<int:product_id>/', views.check_product_tracking, name='check_product_tracking'),
@@ -14,16 +14,18 @@ from django.http import JsonResponse
 from .forms import DateRangeForm
 from datetime import timedelta
 from django.http import JsonResponse
-from django.db.models import Q
-from django.core.paginator import Paginator
 from .forms import StockMovementFilterForm
-from django.http import HttpResponse
+from django.http import StreamingHttpResponse, FileResponse
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font
 from openpyxl.utils import get_column_letter
 from .forms import TransactionFilterForm
+import csv
+import tempfile
 from django.db.models import Sum
 from products.models import Product
+from .keyset import cached_count, keyset_page, warehouse_filter
 
 
 # --- Warehouse CRUD Views ---
@@ -153,24 +155,23 @@ def delete_lot_serial(request, pk):
         return redirect('stock:lot_serial_list')
     return render(request, 'confirm_delete.html', {'object': lot, 'title': f'Confirm Delete Lot/Serial: {lot.lot_number}'})
 
+def _filter_query(request):
+    """পেজিনেশন লিংকের জন্য বর্তমান ফিল্টারগুলো, কার্সর বাদ দিয়ে।"""
+    params = request.GET.copy()
+    for key in ('cursor', 'direction', 'page'):
+        params.pop(key, None)
+    return params.urlencode()
+
 @login_required
 def transaction_list(request):
-    transactions_queryset = InventoryTransaction.objects.select_related(
-        'product', 'warehouse', 'source_location__warehouse', 'destination_location__warehouse', 'lot_serial', 'user'
-    ).order_by('-transaction_date')
+    transactions_queryset = InventoryTransaction.objects.all()
 
     user = request.user
     if not user.is_superuser:
         user_warehouse = getattr(user, 'warehouse', None)
         if user_warehouse:
-            # ================== পরিবর্তিত অংশ শুরু ==================
-            # এই কুয়েরিটি এখন সরাসরি warehouse ফিল্ডও পরীক্ষা করবে
-            transactions_queryset = transactions_queryset.filter(
-                Q(source_location__warehouse=user_warehouse) | 
-                Q(destination_location__warehouse=user_warehouse) |
-                Q(warehouse=user_warehouse)
-            ).distinct()
-            # ================== পরিবর্তিত অংশ শেষ ===================
+            # উৎস/গন্তব্য লোকেশন অথবা সরাসরি warehouse ফিল্ড; সাবকুয়েরি দিয়ে, তাই DISTINCT লাগে না
+            transactions_queryset = transactions_queryset.filter(warehouse_filter(user_warehouse))
 
     form = TransactionFilterForm(request.GET, user=request.user)
     if form.is_valid():
@@ -187,19 +188,21 @@ def transaction_list(request):
             transactions_queryset = transactions_queryset.filter(user=selected_user)
         if warehouse and user.is_superuser:
             # অ্যাডমিনের ফিল্টারেও warehouse ফিল্ডটি যোগ করা হলো
-            transactions_queryset = transactions_queryset.filter(
-                Q(source_location__warehouse=warehouse) | 
-                Q(destination_location__warehouse=warehouse) |
-                Q(warehouse=warehouse)
-            ).distinct()
+            transactions_queryset = transactions_queryset.filter(warehouse_filter(warehouse))
 
-    paginator = Paginator(transactions_queryset, 20)
-    page_number = request.GET.get('page')
-    transactions = paginator.get_page(page_number)
+    # OFFSET এর বদলে (transaction_date, id) কার্সর; মোট সংখ্যা কিছুক্ষণের জন্য ক্যাশ করা
+    transactions = keyset_page(
+        transactions_queryset.select_related(
+            'product', 'warehouse', 'source_location__warehouse', 'destination_location__warehouse', 'lot_serial', 'user'
+        ),
+        request.GET.get('cursor'), 20, request.GET.get('direction')
+    )
 
     context = {
         'title': 'All Transactions',
         'transactions': transactions,
+        'total_count': cached_count(transactions_queryset),
+        'filter_query': _filter_query(request),
         'form': form,
     }
     return render(request, 'stock/transaction_list.html', context)
@@ -286,9 +289,7 @@ def stock_movement_report(request):
     """
     এই ভিউটি এখন ব্যবহারকারীর ব্রাঞ্চ অনুযায়ী স্টক মুভমেন্ট দেখাবে এবং পেজিনেশন যোগ করবে।
     """
-    transactions_list = InventoryTransaction.objects.select_related(
-        'product', 'source_location__warehouse', 'destination_location__warehouse'
-    ).order_by('-transaction_date')
+    transactions_list = InventoryTransaction.objects.all()
 
     # --- ব্যবহারকারীর ব্রাঞ্চ অনুযায়ী ফিল্টারিং ---
     user = request.user
@@ -296,10 +297,7 @@ def stock_movement_report(request):
         user_warehouse = getattr(user, 'warehouse', None)
         if user_warehouse:
             # শুধুমাত্র সেইসব লেনদেন দেখানো হবে যার উৎস বা গন্তব্য ব্যবহারকারীর ব্রাঞ্চ
-            transactions_list = transactions_list.filter(
-                Q(source_location__warehouse=user_warehouse) |
-                Q(destination_location__warehouse=user_warehouse)
-            )
+            transactions_list = transactions_list.filter(warehouse_filter(user_warehouse, include_warehouse_field=False))
 
     # --- ফর্ম ফিল্টার (আপনার form.py অনুযায়ী) ---
     form = StockMovementFilterForm(request.GET)
@@ -322,15 +320,13 @@ def stock_movement_report(request):
         # সুপারইউজার ফিল্টার করলে সব ব্রাঞ্চ দেখাবে, ব্রাঞ্চ ম্যানেজার করলে শুধু তার ব্রাঞ্চ
         if warehouse:
             if user.is_superuser:
-                 transactions_list = transactions_list.filter(
-                    Q(source_location__warehouse=warehouse) |
-                    Q(destination_location__warehouse=warehouse)
-                )
+                transactions_list = transactions_list.filter(warehouse_filter(warehouse, include_warehouse_field=False))
 
     # --- পেজিনেশন লজিক ---
-    paginator = Paginator(transactions_list, 20)  # প্রতি পৃষ্ঠায় ২০টি লেনদেন
-    page_number = request.GET.get('page')
-    transactions = paginator.get_page(page_number)
+    transactions = keyset_page(
+        transactions_list.select_related('product', 'source_location__warehouse', 'destination_location__warehouse'),
+        request.GET.get('cursor'), 20, request.GET.get('direction')
+    )
 
     # ব্রাঞ্চ ম্যানেজারের জন্য ফিল্টার ফর্মের ওয়্যারহাউস ফিল্ড محدود করা
     if not user.is_superuser:
@@ -344,6 +340,8 @@ def stock_movement_report(request):
     context = {
         'title': 'Stock Movement Report',
         'transactions': transactions,
+        'total_count': cached_count(transactions_list),
+        'filter_query': _filter_query(request),
         'form': form,
     }
     return render(request, 'stock/stock_movement_report.html', context)
@@ -376,20 +374,51 @@ def get_lots_by_location_and_product(request):
     
     return JsonResponse(list(lots), safe=False)
 
+TRANSACTION_REPORT_HEADERS = ['Date', 'Product', 'Type', 'Quantity', 'User', 'Source', 'Destination', 'Notes']
+TRANSACTION_REPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """csv.writer এর জন্য ফাইলের মতো অবজেক্ট, যা লেখা লাইনটি সরাসরি ফেরত দেয়।"""
+    def write(self, value):
+        return value
+
+
+def _transaction_report_rows(transactions_queryset):
+    """
+    ট্রানজেকশনগুলো values_list ও iterator দিয়ে অল্প অল্প করে পড়ে রিপোর্টের রো তৈরি করে,
+    যাতে রো যত বেশিই হোক মেমোরি ব্যবহার একই থাকে।
+    """
+    type_labels = dict(InventoryTransaction.TRANSACTION_TYPES)
+    rows = transactions_queryset.values_list(
+        'transaction_date', 'product__name', 'transaction_type', 'quantity', 'user__username',
+        'source_location__name', 'source_location__warehouse__name',
+        'destination_location__name', 'destination_location__warehouse__name', 'notes',
+    ).iterator(chunk_size=TRANSACTION_REPORT_CHUNK_SIZE)
+    for (transaction_date, product_name, transaction_type, quantity, username,
+         source_name, source_warehouse, destination_name, destination_warehouse, notes) in rows:
+        yield [
+            transaction_date.strftime('%Y-%m-%d %H:%M'),
+            product_name,
+            type_labels.get(transaction_type, transaction_type),
+            quantity,
+            username or 'N/A',
+            f"{source_name} ({source_warehouse})" if source_name else 'N/A',
+            f"{destination_name} ({destination_warehouse})" if destination_name else 'N/A',
+            notes or ''
+        ]
+
+
 @login_required
 def download_transaction_report(request):
-    # transaction_list ভিউ থেকে ফিল্টারিং লজিকটি এখানেও ব্যবহার করা হয়েছে
-    transactions_queryset = InventoryTransaction.objects.select_related(
-        'product', 'user', 'source_location__warehouse', 'destination_location__warehouse'
-    ).order_by('-transaction_date')
+    # transaction_list ভিউ থেকে ফিল্টারিং লজিকটি এখানেও ব্যবহার করা হয়েছে
+    transactions_queryset = InventoryTransaction.objects.order_by('-transaction_date')
 
     user = request.user
     if not user.is_superuser:
         user_warehouse = getattr(user, 'warehouse', None)
         if user_warehouse:
-            transactions_queryset = transactions_queryset.filter(
-                Q(source_location__warehouse=user_warehouse) | Q(destination_location__warehouse=user_warehouse)
-            )
+            transactions_queryset = transactions_queryset.filter(warehouse_filter(user_warehouse, include_warehouse_field=False))
 
     # GET প্যারামিটার থেকে ফিল্টার করা (ফর্ম ব্যবহার না করে সরাসরি)
     start_date = request.GET.get('start_date')
@@ -405,39 +434,45 @@ def download_transaction_report(request):
         transactions_queryset = transactions_queryset.filter(user_id=selected_user_id)
     if warehouse_id and user.is_superuser:
         transactions_queryset = transactions_queryset.filter(
-            Q(source_location__warehouse_id=warehouse_id) | Q(destination_location__warehouse_id=warehouse_id)
+            warehouse_filter(warehouse_id, include_warehouse_field=False)
         )
-    
-    # --- Excel ফাইল তৈরি ---
-    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
-    response['Content-Disposition'] = 'attachment; filename="transaction_report.xlsx"'
-    
-    workbook = Workbook()
-    worksheet = workbook.active
-    worksheet.title = "Transactions"
 
-    headers = ['Date', 'Product', 'Type', 'Quantity', 'User', 'Source', 'Destination', 'Notes']
-    worksheet.append(headers)
-    for cell in worksheet[1]:
-        cell.font = Font(bold=True)
-
-    for transaction in transactions_queryset:
-        worksheet.append([
-            transaction.transaction_date.strftime('%Y-%m-%d %H:%M'),
-            transaction.product.name,
-            transaction.get_transaction_type_display(),
-            transaction.quantity,
-            transaction.user.username if transaction.user else 'N/A',
-            f"{transaction.source_location.name} ({transaction.source_location.warehouse.name})" if transaction.source_location else 'N/A',
-            f"{transaction.destination_location.name} ({transaction.destination_location.warehouse.name})" if transaction.destination_location else 'N/A',
-            transaction.notes or ''
-        ])
-
-    for col_num, column_title in enumerate(headers, 1):
+    # --- CSV: StreamingHttpResponse দিয়ে রো তৈরি হওয়ার সাথে সাথে পাঠানো হয় ---
+    if request.GET.get('export') == 'csv':
+        writer = csv.writer(_Echo())
+        def stream():
+            yield writer.writerow(TRANSACTION_REPORT_HEADERS)
+            for row in _transaction_report_rows(transactions_queryset):
+                yield writer.writerow(row)
+        response = StreamingHttpResponse(stream(), content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="transaction_report.csv"'
+        return response
+
+    # --- Excel: write-only মোডে রো গুলো সরাসরি টেম্প ফাইলে লেখা হয়, পুরো শিট মেমোরিতে রাখা হয় না ---
+    workbook = Workbook(write_only=True)
+    worksheet = workbook.create_sheet("Transactions")
+    for col_num in range(1, len(TRANSACTION_REPORT_HEADERS) + 1):
         worksheet.column_dimensions[get_column_letter(col_num)].width = 20
 
-    workbook.save(response)
-    return response
+    header_cells = []
+    for title in TRANSACTION_REPORT_HEADERS:
+        cell = WriteOnlyCell(worksheet, value=title)
+        cell.font = Font(bold=True)
+        header_cells.append(cell)
+    worksheet.append(header_cells)
+
+    for row in _transaction_report_rows(transactions_queryset):
+        worksheet.append(row)
+
+    report_file = tempfile.TemporaryFile()
+    workbook.save(report_file)
+    report_file.seek(0)
+    return FileResponse(
+        report_file,
+        as_attachment=True,
+        filename='transaction_report.xlsx',
+        content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+    )
 
 @login_required
 def product_stock_details(request, product_id):
@@ -482,4 +517,47 @@ def product_stock_details(request, product_id):
         'lot_details': lot_details,
         'user_warehouse': user_warehouse
     }
-    return render(request, 'stock/product_stock_details.html', context)
\ No newline at end of file
+    return render(request, 'stock/product_stock_details.html', context)
+
+
+@login_required
+def stock_card_view(request, product_id):
+    """
+    একটি প্রোডাক্টের স্টক কার্ড: প্রতিটি মুভমেন্ট ও তার পরের ব্যালেন্স (balance_after, lot_balance_after)।
+    ব্যালেন্স পোস্টিং এর সময়েই লেখা থাকে, আর পেজ আসে keyset পেজিনেশনে, তাই আগের সব ট্রানজেকশন স্ক্যান করতে হয় না।
+    """
+    product = get_object_or_404(Product, pk=product_id)
+    user = request.user
+
+    movements = InventoryTransaction.objects.filter(product=product).select_related('warehouse', 'lot_serial', 'user')
+    warehouse = None
+    if not user.is_superuser:
+        warehouse = getattr(user, 'warehouse', None)
+        if warehouse is None:
+            movements = movements.none()
+    elif request.GET.get('warehouse', '').isdigit():
+        warehouse = Warehouse.objects.filter(pk=request.GET['warehouse']).first()
+    if warehouse:
+        movements = movements.filter(warehouse=warehouse)
+
+    lot = None
+    if request.GET.get('lot', '').isdigit():
+        lots = LotSerialNumber.objects.filter(product=product)
+        if warehouse:
+            lots = lots.filter(location__warehouse=warehouse)
+        lot = lots.filter(pk=request.GET['lot']).first()
+        if lot:
+            movements = movements.filter(lot_serial=lot)
+
+    rows = keyset_page(movements, request.GET.get('cursor'), 50, request.GET.get('direction'))
+
+    context = {
+        'title': f'Stock Card for {product.name}',
+        'product': product,
+        'rows': rows,
+        'filter_query': _filter_query(request),
+        'warehouse': warehouse,
+        'lot': lot,
+        'warehouses': Warehouse.objects.order_by('name') if user.is_superuser else [],
+    }
+    return render(request, 'stock/stock_card.html', context)